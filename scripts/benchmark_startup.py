@@ -0,0 +1,68 @@
+"""
+API startup benchmark.
+
+Measures, in fresh interpreters (like a newly forked worker), how long
+`import src.api.main` and `warm_up()` take, and which heavy dependencies the
+import alone loads (it should load none of them).
+
+Usage (from the project root):
+    python scripts/benchmark_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must stay out of sys.modules after importing the app
+HEAVY_MODULES = [
+    "tkinter", "pytesseract", "pdf2image", "reportlab", "xlsxwriter",
+    "pdfplumber", "pypdf", "ofxparse", "scipy", "src.parsing.banks.bb",
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import src.api.main
+imported = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules]
+from src.api.warmup import warm_up
+start = time.perf_counter()
+warm_up()
+warmed = time.perf_counter() - start
+print(json.dumps({{"import": imported, "warm_up": warmed, "loaded": loaded}}))
+"""
+
+
+def run_once() -> dict:
+    env = dict(os.environ, API_WARMUP="0", LOG_ASYNC="0")
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(heavy=HEAVY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    # The probe's JSON is the last line (log records go to stderr)
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    import_times = [r["import"] for r in results]
+    warmup_times = [r["warm_up"] for r in results]
+
+    print(f"runs: {args.runs}")
+    print(f"import src.api.main  median {statistics.median(import_times):.3f}s  max {max(import_times):.3f}s")
+    print(f"warm_up()            median {statistics.median(warmup_times):.3f}s  max {max(warmup_times):.3f}s")
+    loaded = sorted({m for r in results for m in r["loaded"]})
+    print(f"heavy modules loaded by import: {', '.join(loaded) or 'none'}")
+    return 1 if loaded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
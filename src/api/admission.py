@@ -0,0 +1,198 @@
+"""
+Admission Control for CPU-heavy Work
+
+PDF parsing, OCR and combinatorial matching are CPU-bound (and mostly hold
+the GIL), so running many at once only stretches every request past the
+proxy timeout. Endpoints doing such work take a slot of a work class first:
+
+    async with admission.slot("parse", request):
+        df = await run_in_threadpool(parse, ...)
+
+Per class there is a concurrency limit and a bounded wait queue. Waiters
+are served round-robin across sessions. Multi-file endpoints (bank upload,
+extractor) take one slot per file, so one user uploading fifty files does
+not starve the others; if a later file is turned away, the files already
+parsed are kept and the rest are reported back. When the queue is full, or a request waited
+longer than `ADMISSION_MAX_WAIT_SECONDS`, it is answered with
+429 + Retry-After (estimated from recent service times). Queue time,
+rejections and slot usage are exported to `/api/metrics`.
+
+Everything runs on the event loop thread, so no locks are needed.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+from src.common.logging_config import get_logger
+from src.common.metrics import registry
+
+logger = get_logger("api.admission")
+
+# Default slots per work class. More parse slots than cores (or than ~2,
+# given the GIL) only makes every parse slower; scale out with API_WORKERS.
+DEFAULT_LIMITS = {
+    "parse": int(os.getenv("ADMISSION_PARSE_CONCURRENCY", "2")),
+    "reconcile": int(os.getenv("ADMISSION_RECONCILE_CONCURRENCY", "1")),
+}
+QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "16"))
+MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "30"))
+
+# Smoothing of the per-class service time used for Retry-After
+SERVICE_TIME_ALPHA = 0.2
+MAX_RETRY_AFTER = 120
+
+QUEUE_TIME = registry.histogram(
+    "auditor_admission_queue_seconds",
+    "Time requests waited for a slot, by work class.",
+    ("work_class",),
+)
+REJECTED = registry.counter(
+    "auditor_admission_rejected_total",
+    "Requests answered with 429, by work class and reason (queue_full, timeout).",
+    ("work_class", "reason"),
+)
+
+
+class _WorkClass:
+    """Slots and per-session FIFO queues of one work class."""
+
+    def __init__(self, name: str, limit: int, queue_size: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_size = queue_size
+        self.running = 0
+        self.queued = 0
+        # session id -> waiters; the first session is served next
+        self.waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self.service_time = 1.0
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free for a new request."""
+        backlog = (self.queued + 1) / self.limit
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(backlog * self.service_time)))
+
+    def record_service(self, seconds: float) -> None:
+        self.service_time += SERVICE_TIME_ALPHA * (seconds - self.service_time)
+
+    def enqueue(self, session_id: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(session_id, deque()).append(future)
+        self.queued += 1
+        return future
+
+    def remove(self, session_id: str, future: asyncio.Future) -> None:
+        queue = self.waiters.get(session_id)
+        if queue is None or future not in queue:
+            return
+        queue.remove(future)
+        self.queued -= 1
+        if not queue:
+            del self.waiters[session_id]
+
+    def release(self) -> None:
+        """Hand the slot to the next session in turn, or free it."""
+        while self.waiters:
+            session_id, queue = next(iter(self.waiters.items()))
+            future = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self.waiters.move_to_end(session_id)
+            else:
+                del self.waiters[session_id]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.running -= 1
+
+
+class AdmissionController:
+    """Per-class concurrency limits with fair, bounded queues."""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        queue_size: int = QUEUE_SIZE,
+        max_wait: float = MAX_WAIT_SECONDS,
+    ):
+        self.max_wait = max_wait
+        self.classes = {
+            name: _WorkClass(name, limit, queue_size)
+            for name, limit in (limits or DEFAULT_LIMITS).items()
+        }
+
+    def _reject(self, work: _WorkClass, reason: str) -> HTTPException:
+        REJECTED.inc(work_class=work.name, reason=reason)
+        retry_after = work.retry_after()
+        logger.warning(
+            f"Admission rejected: {work.name}",
+            reason=reason, running=work.running, queued=work.queued, retry_after=retry_after,
+        )
+        return HTTPException(
+            status_code=429,
+            detail="Servidor ocupado processando outros arquivos. Tente novamente em instantes.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    async def _acquire(self, work: _WorkClass, session_id: str) -> None:
+        if work.running < work.limit and not work.queued:
+            work.running += 1
+            return
+        if work.queued >= work.queue_size:
+            raise self._reject(work, "queue_full")
+
+        future = work.enqueue(session_id)
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            work.remove(session_id, future)
+            raise self._reject(work, "timeout")
+        except asyncio.CancelledError:
+            # Client went away: give back a slot handed over meanwhile
+            if future.done() and not future.cancelled():
+                work.release()
+            else:
+                work.remove(session_id, future)
+            raise
+
+    @asynccontextmanager
+    async def slot(self, work_class: str, request: Optional[Request] = None, session_id: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold one slot of `work_class` for the duration of the block (429 when saturated)."""
+        work = self.classes[work_class]
+        if session_id is None and request is not None:
+            session_id = getattr(request.state, "session_id", None)
+        session_id = session_id or "anonymous"
+
+        queued_at = time.perf_counter()
+        await self._acquire(work, session_id)
+        started = time.perf_counter()
+        QUEUE_TIME.observe(started - queued_at, work_class=work_class)
+        try:
+            yield
+        finally:
+            work.record_service(time.perf_counter() - started)
+            work.release()
+
+    def stats(self) -> Dict[tuple, int]:
+        """Gauge callback: limit, running and queued per class."""
+        values = {}
+        for name, work in self.classes.items():
+            values[(name, "limit")] = work.limit
+            values[(name, "running")] = work.running
+            values[(name, "queued")] = work.queued
+        return values
+
+
+admission = AdmissionController()
+
+registry.gauge(
+    "auditor_admission_slots",
+    "Admission slots per work class (limit, running, queued).",
+    ("work_class", "state"),
+    callback=admission.stats,
+)
@@ -1,21 +1,28 @@
 """
 Endpoints de exportação de relatórios de conciliação.
 """
-from fastapi import APIRouter, HTTPException, Body, Request
-from fastapi.responses import StreamingResponse, Response
+from fastapi import APIRouter, HTTPException, Body, Request, Query
+from fastapi.responses import StreamingResponse, Response, FileResponse
 from src.api.state import get_session_state
-from src.exporters.pdf_renderer import PDFReportExporter
-from src.exporters.excel_exporter import ExcelExporter
+from src.api.export_jobs import export_jobs
 from src.exporting.ofx import OFXWriter
-from src.common.models import UnifiedTransaction
 from src.ui.unified_view import UnifiedViewController
+# PDFReportExporter (reportlab) e ExcelExporter (xlsxwriter) são importados
+# dentro dos endpoints: carregá-los na inicialização da API é caro.
 import io
 import pandas as pd
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 router = APIRouter()
 
+STATUS_OPTIONS = ['Conciliado', 'Apenas no Banco', 'Apenas no Diário']
+
+EXPORT_MEDIA_TYPES = {
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'pdf': ('pdf', 'application/pdf'),
+}
+
 @router.post("/excel")
 def export_excel(request: Request, rows_data: list[dict] = Body(...)):
     """Exporta relatório de conciliação em formato Excel moderno com dados filtrados."""
@@ -40,6 +47,7 @@ def export_excel(request: Request, rows_data: list[dict] = Body(...)):
             end_str = None
         
         # Criar exporter  
+        from src.exporters.excel_exporter import ExcelExporter
         state = get_session_state(request)
         exporter = ExcelExporter(
             company_name=state.company_name,
@@ -47,10 +55,8 @@ def export_excel(request: Request, rows_data: list[dict] = Body(...)):
             end_date=end_str
         )
         
-        # Gerar Excel
-        excel_bytes = exporter.generate(rows_data)
-        buffer = io.BytesIO(excel_bytes)
-        buffer.seek(0)
+        # Gerar Excel em modo streaming (constant_memory, enviado em blocos)
+        content = exporter.generate_stream(rows_data)
         
         # Nome do arquivo com timestamp
         timestamp = datetime.now().strftime('%Y-%m-%d_%H%M%S')
@@ -61,7 +67,7 @@ def export_excel(request: Request, rows_data: list[dict] = Body(...)):
         }
         
         return StreamingResponse(
-            buffer,
+            content,
             media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
             headers=headers
         )
@@ -74,14 +80,17 @@ def export_excel(request: Request, rows_data: list[dict] = Body(...)):
         raise HTTPException(status_code=500, detail=f"Erro ao gerar Excel: {str(e)}")
 
 @router.post("/pdf")
-def export_pdf(request: Request, rows_data: list[dict] = Body(...)):
-    """Exporta relatório de conciliação em formato PDF moderno com dados filtrados."""
+def export_pdf(request: Request, rows_data: list[dict] = Body(...), full: bool = False):
+    """
+    Exporta relatório de conciliação em formato PDF moderno com dados filtrados.
+    
+    Com `?full=true` o relatório lista todas as discrepâncias (sem o limite de 50 linhas).
+    """
     if not rows_data:
         raise HTTPException(status_code=400, detail="Nenhum dado fornecido para exportação.")
     
     try:
         # Separar dados por status para as tabelas de discrepância
-        conciliados = [r for r in rows_data if 'Conciliado' in r.get('status', '')]
         apenas_banco = [r for r in rows_data if r.get('status') == 'Apenas no Banco']
         apenas_diario = [r for r in rows_data if r.get('status') == 'Apenas no Diário']
         
@@ -107,6 +116,7 @@ def export_pdf(request: Request, rows_data: list[dict] = Body(...)):
             end_str = None
         
         # Criar exporter
+        from src.exporters.pdf_renderer import PDFReportExporter
         state = get_session_state(request)
         pdf_exporter = PDFReportExporter(
             company_name=state.company_name,
@@ -127,15 +137,14 @@ def export_pdf(request: Request, rows_data: list[dict] = Body(...)):
             'unmatched_ledger_count': len(apenas_diario)
         }
         
-        # Gerar PDF com todas as transações para o resumo
-        pdf_bytes = pdf_exporter.generate(
+        # Gerar PDF com todas as transações para o resumo (arquivo temporário, enviado em blocos)
+        content = pdf_exporter.generate_stream(
             summary_metrics, 
             df_apenas_banco, 
             df_apenas_diario,
-            all_rows=rows_data
+            all_rows=rows_data,
+            full_report=full
         )
-        buffer = io.BytesIO(pdf_bytes)
-        buffer.seek(0)
         
         # Nome do arquivo com timestamp
         timestamp = datetime.now().strftime('%Y-%m-%d_%H%M%S')
@@ -145,7 +154,7 @@ def export_pdf(request: Request, rows_data: list[dict] = Body(...)):
             'Content-Disposition': f'attachment; filename="{filename}"'
         }
         
-        return StreamingResponse(buffer, media_type='application/pdf', headers=headers)
+        return StreamingResponse(content, media_type='application/pdf', headers=headers)
         
     except HTTPException:
         raise
@@ -154,44 +163,168 @@ def export_pdf(request: Request, rows_data: list[dict] = Body(...)):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Erro ao gerar PDF: {str(e)}")
 
+def _filter_view(view: pd.DataFrame, status: List[str], search: Optional[str]) -> pd.DataFrame:
+    """Aplica os mesmos filtros da tela de conciliação (status e busca) de forma vetorizada."""
+    if view.empty:
+        return view
+    
+    statuses = view['status'].astype(str)
+    mask = pd.Series(False, index=view.index)
+    for s in status:
+        # 'Conciliado' também cobre 'Conciliado (Comb)', como no frontend
+        mask |= statuses.str.contains('Conciliado', regex=False) if s == 'Conciliado' else statuses == s
+    
+    if search:
+        term = search.lower()
+        desc = view['description'].astype(str).str.lower()
+        # Valor como o JavaScript exibe (100.0 -> "100")
+        amount = view['amount'].astype(str).str.replace(r'\.0$', '', regex=True)
+        mask &= desc.str.contains(term, regex=False) | amount.str.contains(term, regex=False)
+    
+    return view[mask]
+
+
+def _period_strings(dates: pd.Series):
+    """Período (dd/mm/aaaa) coberto pelas datas, ou (None, None)."""
+    dates = pd.to_datetime(dates, errors='coerce').dropna()
+    if dates.empty:
+        return None, None
+    return dates.min().strftime('%d/%m/%Y'), dates.max().strftime('%d/%m/%Y')
+
+
+def _write_pdf_report(view: pd.DataFrame, company_name: str, path: str, full_report: bool):
+    """Gera o PDF de conciliação a partir da visão unificada em cache."""
+    df_apenas_banco = view[view['status'] == 'Apenas no Banco']
+    df_apenas_diario = view[view['status'] == 'Apenas no Diário']
+    start_str, end_str = _period_strings(view['date'])
+    
+    source = view['source'].astype(str)
+    summary_metrics = {
+        'bank_total': view.loc[source == 'Banco', 'amount'].sum(),
+        'ledger_total': view.loc[source == 'Diário', 'amount'].sum(),
+        'net_diff': abs(df_apenas_diario['amount'].sum() - df_apenas_banco['amount'].sum()),
+        'unmatched_bank_count': len(df_apenas_banco),
+        'unmatched_ledger_count': len(df_apenas_diario)
+    }
+    
+    from src.exporters.pdf_renderer import PDFReportExporter
+    PDFReportExporter(company_name=company_name, start_date=start_str, end_date=end_str).generate_file(
+        path,
+        summary_metrics,
+        df_apenas_banco,
+        df_apenas_diario,
+        all_rows=view,
+        full_report=full_report
+    )
+
+
+def _job_response(request: Request, job: dict) -> dict:
+    response = {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "error": job.get("error"),
+        "download_url": None,
+    }
+    if job["status"] == "done":
+        response["download_url"] = request.url_for("download_export_job", job_id=job["job_id"]).path
+    return response
+
+
+@router.post("/reconciliation/{reconciliation_id}/{fmt}", status_code=202)
+def export_reconciliation(
+    request: Request,
+    reconciliation_id: str,
+    fmt: str,
+    status: List[str] = Query(default=STATUS_OPTIONS),
+    search: Optional[str] = None,
+    full: bool = False
+):
+    """
+    Gera Excel/PDF no servidor a partir do resultado de conciliação em cache.
+    
+    O navegador envia apenas o id da conciliação e os filtros da tela; a
+    exportação roda em segundo plano e o arquivo é baixado pelo job retornado
+    (`GET /jobs/{job_id}` e `GET /jobs/{job_id}/download`).
+    """
+    if fmt not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {fmt}. Use 'excel' ou 'pdf'.")
+    
+    state = get_session_state(request)
+    results = state.reconcile_results
+    if not results or results.get('reconciliation_id') != reconciliation_id:
+        raise HTTPException(
+            status_code=404,
+            detail="Conciliação não encontrada ou expirada. Execute a conciliação novamente."
+        )
+    
+    view = _filter_view(results['view'], status, search)
+    if view.empty:
+        raise HTTPException(status_code=400, detail="Nenhum dado encontrado para os filtros informados.")
+    
+    company_name = state.company_name
+    extension, media_type = EXPORT_MEDIA_TYPES[fmt]
+    timestamp = datetime.now().strftime('%Y-%m-%d_%H%M%S')
+    filename = f"conciliacao_{timestamp}.{extension}"
+    
+    if fmt == 'excel':
+        def build(path):
+            from src.exporters.excel_exporter import ExcelExporter
+            start_str, end_str = _period_strings(view['date'])
+            exporter = ExcelExporter(company_name=company_name, start_date=start_str, end_date=end_str)
+            # Lido do DataFrame linha a linha, sem materializar a lista de dicionários
+            exporter.generate_file(view, path)
+    else:
+        def build(path):
+            _write_pdf_report(view, company_name, path, full_report=full)
+    
+    job = export_jobs.submit(request.state.session_id, filename, media_type, build)
+    return _job_response(request, job)
+
+
+@router.get("/jobs/{job_id}")
+def get_export_job(request: Request, job_id: str):
+    """Consulta o andamento de uma exportação em segundo plano."""
+    job = export_jobs.get(job_id, request.state.session_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada.")
+    return _job_response(request, job)
+
+
+@router.get("/jobs/{job_id}/download")
+def download_export_job(request: Request, job_id: str):
+    """Baixa o arquivo de uma exportação concluída."""
+    job = export_jobs.get(job_id, request.state.session_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada.")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Exportação ainda não concluída (status: {job['status']}).")
+    return FileResponse(job["path"], media_type=job["media_type"], filename=job["filename"])
+
 @router.post("/ofx")
 def export_ofx(transactions: List[dict] = Body(...)):
     """
-    Export provided transactions as OFX.
+    Export provided transactions as OFX (streamed in chunks).
     """
     if not transactions:
         raise HTTPException(status_code=400, detail="No transactions provided.")
     
     try:
-        # Convert dicts back to UnifiedTransaction if needed, or modify OFXWriter
-        # OFXWriter expects List[UnifiedTransaction]
-        unified_txs = []
-        for t in transactions:
-            # Reconstruct date as datetime if it's string
-            dt = t.get('date')
-            if isinstance(dt, str):
-                dt = datetime.fromisoformat(dt.replace('Z', ''))
-            
-            ut = UnifiedTransaction(
-                date=dt,
-                amount=float(t.get('amount', 0)),
-                memo=t.get('memo', t.get('description', '')),
-                type=t.get('type', 'OTHER'),
-                doc_id=t.get('doc_id', ''),
-                fitid=t.get('fitid', '')
-            )
-            unified_txs.append(ut)
-            
+        # Columnar batch instead of one UnifiedTransaction per dict;
+        # ISO dates may carry a trailing 'Z' from the browser
+        df = pd.DataFrame(transactions)
+        if 'date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['date']):
+            df['date'] = pd.to_datetime(df['date'].astype(str).str.replace('Z', '', regex=False), format='ISO8601')
+        
         writer = OFXWriter()
-        ofx_content = writer.generate(unified_txs)
+        batch = writer.to_batch(df)
         
         headers = {
             'Content-Disposition': 'attachment; filename="extrato_exportado.ofx"'
         }
-        return Response(content=ofx_content, media_type='application/x-ofx', headers=headers)
+        return StreamingResponse(writer.generate_stream(batch), media_type='application/x-ofx', headers=headers)
         
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
-
@@ -2,19 +2,26 @@
 Endpoints para exportação de lançamentos contábeis
 """
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import Response
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional
 from src.api.state import get_session_state
+from src.api.lancamento_store import LancamentoStore
+from src.core.account_rules import AccountRuleRepository, AccountRuleSet
+from src.core.account_suggestions import AccountSuggestionRepository
 from src.exporters.lancamento_exporter import LancamentoExporter
 from src.common.logging_config import get_logger
-import pandas as pd
 from datetime import datetime
-import io
 
 logger = get_logger(__name__)
 router = APIRouter()
 
+# Regras de contas por empresa (arquivos JSON em ACCOUNT_RULES_DIR)
+account_rules = AccountRuleRepository()
+
+# Índices de sugestão por empresa (histórico de arquivos em LANCAMENTO_HISTORY_DIR)
+account_suggestions = AccountSuggestionRepository()
+
 
 class TransactionEdit(BaseModel):
     """Modelo para edição de transação"""
@@ -37,6 +44,44 @@ class ManualTransaction(BaseModel):
     documento: Optional[str] = "001"
 
 
+class BulkEditItem(TransactionEdit):
+    """Edição de uma transação dentro de uma edição em lote"""
+    id: str
+
+
+class BulkEditRequest(BaseModel):
+    """Modelo para edição em lote"""
+    edits: List[BulkEditItem]
+
+
+class AccountRuleModel(BaseModel):
+    """Regra de atribuição de contas (ver src.core.account_rules.AccountRule)"""
+    name: str
+    pattern: Optional[str] = None
+    sign: Optional[str] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    bank: Optional[str] = None
+    conta_debito: Optional[str] = None
+    participante_debito: Optional[str] = None
+    conta_credito: Optional[str] = None
+    participante_credito: Optional[str] = None
+    documento: Optional[str] = None
+
+
+class AccountRulesRequest(BaseModel):
+    """Modelo para salvar as regras de uma empresa"""
+    rules: List[AccountRuleModel]
+    company_name: Optional[str] = None
+
+
+class AssignmentRequest(BaseModel):
+    """Modelo para aplicação de regras ou sugestões de contas"""
+    company_name: Optional[str] = None
+    accept: bool = False  # Gravar as atribuições como edições
+    overwrite: bool = False  # Substituir edições já existentes
+
+
 class ExportRequest(BaseModel):
     """Modelo para requisição de exportação"""
     selected_ids: List[str]
@@ -47,50 +92,16 @@ class ExportRequest(BaseModel):
 
 
 @router.get("/transactions/bank")
-def get_bank_transactions(request: Request):
-    """Get all bank transactions that can be exported"""
-    state = get_session_state(request)
-    results = state.reconcile_results
-    
-    if not results:
-        return {"transactions": [], "count": 0}
-    
-    # Obter transações "apenas no banco"
-    remaining_b = results.get('remaining_b', pd.DataFrame())
-    
-    if remaining_b.empty:
-        return {"transactions": [], "count": 0}
-    
-    # Converter para lista de dicionários
-    transactions = []
-    for idx, row in remaining_b.iterrows():
-        txn_id = f"bank_{idx}"
-        
-        # Apply any edits from edited_transactions
-        edits = state.edited_transactions.get(txn_id, {})
-        
-        txn = {
-            "id": txn_id,
-            "date": row['date'].strftime('%Y-%m-%d') if hasattr(row['date'], 'strftime') else str(row['date']),
-            "amount": float(row['amount']),
-            "description": str(row['description']),
-            # Valores padrão ou editados
-            "conta_debito": edits.get('conta_debito', '78'),
-            "participante_debito": edits.get('participante_debito', ''),
-            "conta_credito": edits.get('conta_credito', '6670'),
-            "participante_credito": edits.get('participante_credito', ''),
-            "documento": edits.get('documento', '001'),
-            "bank_name": row.get('bank_account', ''),
-            "is_edited": txn_id in state.edited_transactions
-        }
-        transactions.append(txn)
+def get_bank_transactions(request: Request, offset: int = 0, limit: Optional[int] = None):
+    """Get bank transactions that can be exported (paginated with offset/limit)"""
+    store = LancamentoStore(get_session_state(request))
     
-    logger.info(f"Retrieved {len(transactions)} bank-only transactions")
+    # Transações "apenas no banco" com edições aplicadas
+    page = store.page(store.bank_frame(), offset, limit)
     
-    return {
-        "transactions": transactions,
-        "count": len(transactions)
-    }
+    logger.info(f"Retrieved {page['count']} of {page['total']} bank-only transactions")
+    
+    return page
 
 
 @router.get("/transactions/manual")
@@ -98,7 +109,7 @@ def get_manual_transactions(request: Request):
     """Get all manually added transactions"""
     state = get_session_state(request)
     return {
-        "transactions": state.manual_transactions,
+        "transactions": list(state.manual_transactions.values()),
         "count": len(state.manual_transactions)
     }
 
@@ -106,12 +117,9 @@ def get_manual_transactions(request: Request):
 @router.post("/transactions/manual")
 def add_manual_transaction(request: Request, transaction: ManualTransaction):
     """Add a new manual transaction"""
-    # Generate unique ID for manual transaction
-    state = get_session_state(request)
-    txn_id = f"manual_{len(state.manual_transactions)}"
+    store = LancamentoStore(get_session_state(request))
     
-    txn_dict = {
-        "id": txn_id,
+    txn_dict = store.add_manual({
         "date": transaction.date,
         "amount": transaction.amount,
         "description": transaction.description,
@@ -122,11 +130,9 @@ def add_manual_transaction(request: Request, transaction: ManualTransaction):
         "documento": transaction.documento or "001",
         "source": "manual",
         "is_edited": False
-    }
-    
-    state.manual_transactions.append(txn_dict)
+    })
     
-    logger.info(f"Added manual transaction: {txn_id}")
+    logger.info(f"Added manual transaction: {txn_dict['id']}")
     
     return {
         "success": True,
@@ -137,36 +143,140 @@ def add_manual_transaction(request: Request, transaction: ManualTransaction):
 @router.post("/transactions/edit/{transaction_id}")
 def edit_transaction(request: Request, transaction_id: str, edits: TransactionEdit):
     """Edit an existing bank transaction"""
-    state = get_session_state(request)
-    # Atualizar ou criar dicionário de edições
-    if transaction_id not in state.edited_transactions:
-        state.edited_transactions[transaction_id] = {}
+    store = LancamentoStore(get_session_state(request))
     
     # Aplicar edições fornecidas
     edit_dict = edits.dict(exclude_unset=True)
-    state.edited_transactions[transaction_id].update(edit_dict)
+    current = store.edit(transaction_id, edit_dict)
     
     logger.info(f"Updated transaction {transaction_id} with edits: {edit_dict}")
     
     return {
         "message": "Transaction edited successfully",
         "transaction_id": transaction_id,
-        "edits": state.edited_transactions[transaction_id]
+        "edits": current
+    }
+
+
+@router.post("/transactions/edit-bulk")
+def edit_transactions_bulk(request: Request, request_body: BulkEditRequest):
+    """Edit several bank transactions in one request (e.g. accepting rule results)"""
+    store = LancamentoStore(get_session_state(request))
+    
+    edits = {}
+    for item in request_body.edits:
+        edit_dict = item.dict(exclude_unset=True)
+        edit_dict.pop('id', None)
+        edits.setdefault(item.id, {}).update(edit_dict)
+    
+    count = store.edit_many(edits)
+    
+    logger.info(f"Bulk edited {count} transactions")
+    
+    return {
+        "message": "Transactions edited successfully",
+        "count": count
+    }
+
+
+@router.get("/rules")
+def get_account_rules(request: Request, company_name: Optional[str] = None):
+    """Get the account assignment rules of a company"""
+    company = company_name or get_session_state(request).company_name
+    return {
+        "company_name": company,
+        "rules": account_rules.load(company).to_dicts()
+    }
+
+
+@router.put("/rules")
+def save_account_rules(request: Request, request_body: AccountRulesRequest):
+    """Replace the account assignment rules of a company"""
+    company = request_body.company_name or get_session_state(request).company_name
+    
+    try:
+        rule_set = AccountRuleSet.from_dicts([r.dict() for r in request_body.rules])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    account_rules.save(company, rule_set)
+    
+    return {
+        "company_name": company,
+        "count": len(rule_set.rules)
+    }
+
+
+@router.post("/rules/apply")
+def apply_account_rules(request: Request, request_body: AssignmentRequest):
+    """
+    Aplica as regras da empresa a todas as transações "apenas no banco".
+    
+    Retorna as atribuições por transação; com accept=true elas são gravadas
+    como edições (as demais podem ser ajustadas via /transactions/edit-bulk).
+    """
+    state = get_session_state(request)
+    company = request_body.company_name or state.company_name
+    rule_set = account_rules.load(company)
+    
+    assignments = LancamentoStore(state).apply_rules(
+        rule_set, accept=request_body.accept, overwrite=request_body.overwrite
+    )
+    
+    logger.info(
+        f"Applied {len(rule_set.rules)} account rules: {len(assignments)} transactions matched",
+        company=company,
+        accepted=request_body.accept
+    )
+    
+    return {
+        "assignments": assignments.reset_index().to_dict(orient='records'),
+        "count": len(assignments),
+        "accepted": request_body.accept
+    }
+
+
+@router.post("/suggestions")
+def suggest_accounts(request: Request, request_body: AssignmentRequest):
+    """
+    Sugere conta_debito/conta_credito para as transações "apenas no banco"
+    a partir dos lançamentos já exportados pela empresa (vizinhos mais próximos
+    por similaridade de histórico).
+    
+    Mesma semântica de /rules/apply para accept e overwrite.
+    """
+    state = get_session_state(request)
+    company = request_body.company_name or state.company_name
+    index = account_suggestions.get(company)
+    
+    suggestions = LancamentoStore(state).suggest_accounts(
+        index, accept=request_body.accept, overwrite=request_body.overwrite
+    )
+    
+    logger.info(
+        f"Suggested accounts for {len(suggestions)} transactions",
+        company=company,
+        accepted=request_body.accept
+    )
+    
+    return {
+        "suggestions": suggestions.reset_index().to_dict(orient='records'),
+        "count": len(suggestions),
+        "accepted": request_body.accept
     }
 
 
 @router.delete("/transactions/manual/{transaction_id}")
 def delete_manual_transaction(request: Request, transaction_id: str):
     """Delete a manual transaction"""
-    state = get_session_state(request)
-    # Procurar e remover transação
-    for i, txn in enumerate(state.manual_transactions):
-        if txn['id'] == transaction_id:
-            removed = state.manual_transactions.pop(i)
-            logger.info(f"Deleted manual transaction: {transaction_id}")
-            return {"success": True, "deleted": removed}
+    store = LancamentoStore(get_session_state(request))
+    removed = store.delete_manual(transaction_id)
     
-    raise HTTPException(status_code=404, detail="Transaction not found")
+    if removed is None:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    
+    logger.info(f"Deleted manual transaction: {transaction_id}")
+    return {"success": True, "deleted": removed}
 
 
 @router.post("/generate")
@@ -175,49 +285,13 @@ def generate_export_file(request: Request, request_body: ExportRequest):
     Gera arquivo TXT de exportação com as transações selecionadas.
     """
     state = get_session_state(request)
-    # Coletar todas as transações disponíveis
-    all_transactions = []
-    
-    # Transações do banco
-    results = state.reconcile_results
-    if results:
-        remaining_b = results.get('remaining_b', pd.DataFrame())
-        if not remaining_b.empty:
-            for idx, row in remaining_b.iterrows():
-                txn_id = f"bank_{idx}"
-                if txn_id in request_body.selected_ids:
-                    edits = state.edited_transactions.get(txn_id, {})
-                    txn = {
-                        "date": row['date'].strftime('%Y-%m-%d') if hasattr(row['date'], 'strftime') else str(row['date']),
-                        "amount": float(row['amount']),
-                        "description": str(row['description']),
-                        "conta_debito": edits.get('conta_debito', '78'),
-                        "participante_debito": edits.get('participante_debito', ''),
-                        "conta_credito": edits.get('conta_credito', '6670'),
-                        "participante_credito": edits.get('participante_credito', ''),
-                        "documento": edits.get('documento', '001')
-                    }
-                    all_transactions.append(txn)
-    
-    # Add manual transactions
-    for txn in state.manual_transactions:
-        if txn['id'] in request_body.selected_ids:
-            all_transactions.append({
-                "date": txn['date'],
-                "amount": txn['amount'],
-                "description": txn['description'],
-                "conta_debito": txn['conta_debito'],
-                "participante_debito": txn['participante_debito'],
-                "conta_credito": txn['conta_credito'],
-                "participante_credito": txn['participante_credito'],
-                "documento": txn['documento']
-            })
-    
-    if not all_transactions:
-        raise HTTPException(status_code=400, detail="No transactions selected")
     
-    # Ordenar por data
-    all_transactions.sort(key=lambda x: x['date'])
+    # Transações selecionadas (banco + manuais), ordenadas por data
+    store = LancamentoStore(state)
+    selected = store.selected(request_body.selected_ids)
+    
+    if selected.empty:
+        raise HTTPException(status_code=400, detail="No transactions selected")
     
     # Gerar conteúdo do arquivo
     exporter = LancamentoExporter()
@@ -229,17 +303,21 @@ def generate_export_file(request: Request, request_body: ExportRequest):
     year = request_body.year or datetime.now().year
     bank = request_body.bank or "BANCO"
     
-    content = exporter.export_transactions(
-        transactions=all_transactions,
-        company_name=company_name,
-        month=month,
-        year=year,
-        bank=bank
-    )
+    content = exporter.export_frame(selected)
     
     filename = exporter.generate_filename(company_name, month, year, bank)
     
-    logger.info(f"Generated export file with {len(all_transactions)} transactions")
+    logger.info(f"Generated export file with {len(selected)} transactions")
+    
+    # Guardar no histórico da empresa para as sugestões de contas, só com as
+    # linhas editadas, atribuídas por regra ou manuais (as contas padrão
+    # 78/6670 não dizem nada sobre a descrição)
+    history = store.assigned(selected)
+    try:
+        if not history.empty:
+            account_suggestions.record_export(company_name, filename, exporter.export_frame(history))
+    except OSError as e:
+        logger.warning(f"Could not record export in suggestion history: {e}")
     
     # Retornar arquivo como download
     return Response(
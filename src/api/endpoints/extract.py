@@ -1,31 +1,33 @@
 from fastapi import APIRouter, File,  UploadFile, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
 from typing import List
 import os
-import tempfile
-import shutil
 import pandas as pd
 from src.parsing.config.registry import LayoutRegistry
-from src.parsing.pipeline import ExtractorPipeline
 from src.common.banks import get_bank_name
+from src.api.admission import admission
 from src.api.state import get_session_state
+from src.api.uploads import spooled_uploads
 
 router = APIRouter()
 
 @router.post("/")
-async def extract_and_validate(files: List[UploadFile] = File(...)):
+async def extract_and_validate(request: Request, files: List[UploadFile] = File(...)):
     """
     Mirror logic of extractor_app.py:
     Process multiple PDFs, run pipeline, return audit data and transactions.
     """
-    # Initialize Pipeline
+    # Initialize Pipeline (imported here: it loads pdfplumber)
+    from src.parsing.pipeline import ExtractorPipeline
     root = os.getcwd()
     layouts_dir = os.path.join(root, 'src', 'parsing', 'layouts')
-    registry = LayoutRegistry(layouts_dir)
+    registry = LayoutRegistry.shared(layouts_dir)
     pipeline = ExtractorPipeline(registry)
 
     all_raw_transactions = []
     audit_results = []
 
+    pdf_files = []
     for file in files:
         suffix = os.path.splitext(file.filename)[1].lower()
         if suffix != '.pdf':
@@ -35,48 +37,58 @@ async def extract_and_validate(files: List[UploadFile] = File(...)):
                 "message": "Somente arquivos PDF são suportados no conversor."
             })
             continue
+        pdf_files.append(file)
 
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                shutil.copyfileobj(file.file, tmp)
-                tmp_path = tmp.name
-            
-            result = pipeline.process_file(tmp_path)
-            
-            # Bank Info
-            bank_code = result.get('account_info', {}).get('bank_id', '')
-            bank_name = get_bank_name(bank_code) if bank_code else "Desconhecido"
-            
-            # Validation
-            validation = result.get('validation', {})
-            balances = result.get('balance_info', {})
-            
-            # Transactions for this file
-            txs = result.get('transactions', [])
-            tx_count = len(txs)
-            
-            # Convert UnifiedTransaction to dict
-            tx_dicts = [t.to_dict() for t in txs]
-            all_raw_transactions.extend(tx_dicts)
-            
-            audit_results.append({
-                "filename": file.filename,
-                "status": "success" if validation.get('is_valid') is not False else "warning",
-                "bank": f"{bank_name} ({bank_code})" if bank_code else "Não Detectado",
-                "tx_count": tx_count,
-                "validation": validation,
-                "balances": balances,
-                "transactions": tx_dicts # Keep file-level transactions if frontend wants to show per-file
-            })
-            
-            os.unlink(tmp_path)
-            
-        except Exception as e:
-            audit_results.append({
-                "filename": file.filename,
-                "status": "error",
-                "message": str(e)
-            })
+    async with spooled_uploads(pdf_files) as buffers:
+        for index, (file, buffer) in enumerate(zip(pdf_files, buffers)):
+            try:
+                # One slot per file, so other sessions are served between
+                # the files of a large batch
+                async with admission.slot("parse", request):
+                    result = await run_in_threadpool(pipeline.process_file, buffer, file.filename)
+                
+                # Bank Info
+                bank_code = result.get('account_info', {}).get('bank_id', '')
+                bank_name = get_bank_name(bank_code) if bank_code else "Desconhecido"
+                
+                # Validation
+                validation = result.get('validation', {})
+                balances = result.get('balance_info', {})
+                
+                # Transactions for this file
+                txs = result.get('transactions', [])
+                tx_count = len(txs)
+                
+                # Convert UnifiedTransaction to dict
+                tx_dicts = [t.to_dict() for t in txs]
+                all_raw_transactions.extend(tx_dicts)
+                
+                audit_results.append({
+                    "filename": file.filename,
+                    "status": "success" if validation.get('is_valid') is not False else "warning",
+                    "bank": f"{bank_name} ({bank_code})" if bank_code else "Não Detectado",
+                    "tx_count": tx_count,
+                    "validation": validation,
+                    "balances": balances,
+                    "transactions": tx_dicts # Keep file-level transactions if frontend wants to show per-file
+                })
+                
+            except HTTPException as e:
+                # Busy after some files were processed: keep them and report the rest
+                if e.status_code != 429 or index == 0:
+                    raise
+                audit_results.extend({
+                    "filename": skipped.filename,
+                    "status": "error",
+                    "message": "Servidor ocupado. Envie o arquivo novamente."
+                } for skipped in pdf_files[index:])
+                break
+            except Exception as e:
+                audit_results.append({
+                    "filename": file.filename,
+                    "status": "error",
+                    "message": str(e)
+                })
 
     # Prepare consolidated preview
     df_consolidated = pd.DataFrame(all_raw_transactions)
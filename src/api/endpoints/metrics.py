@@ -0,0 +1,62 @@
+"""
+Endpoint de métricas no formato texto do Prometheus.
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from anyio import to_thread
+from src.api.state import session_manager
+from src.common.metrics import registry
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _session_memory():
+    usage = session_manager.get_memory_usage()
+    return {
+        ("total",): sum(usage.values()),
+        ("max",): max(usage.values(), default=0),
+    }
+
+
+def _worker_pool():
+    # Sync endpoints (parsing, reconciliation, exports) run on anyio's default
+    # thread limiter, so its statistics are the worker pool of this process.
+    limiter = to_thread.current_default_thread_limiter()
+    stats = limiter.statistics()
+    return {
+        ("size",): limiter.total_tokens,
+        ("busy",): stats.borrowed_tokens,
+        ("queued",): stats.tasks_waiting,
+    }
+
+
+registry.gauge(
+    "auditor_sessions_active",
+    "Sessions currently held by SessionManager.",
+    callback=session_manager.get_session_count,
+)
+registry.gauge(
+    "auditor_session_memory_bytes",
+    "Approximate bytes held by session DataFrames (total and largest session).",
+    ("stat",),
+    callback=_session_memory,
+)
+registry.gauge(
+    "auditor_sessions_spilled",
+    "Sessions held by the session backend (spilled, or all sessions when shared).",
+    callback=session_manager.get_spilled_count,
+)
+registry.gauge(
+    "auditor_worker_pool",
+    "Worker thread pool size, busy workers and queued tasks.",
+    ("state",),
+    callback=_worker_pool,
+)
+
+
+@router.get("", response_class=PlainTextResponse)
+async def get_metrics():
+    """Expõe o registro de métricas para o Prometheus (scrape)."""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,16 +1,23 @@
 from fastapi import APIRouter, Request
+from starlette.concurrency import run_in_threadpool
+from src.api.admission import admission
 from src.api.state import get_session_state
-from src.core.reconciler import Reconciler
-from src.core.matcher import CombinatorialMatcher
-from src.ui.unified_view import UnifiedViewController
+from src.core.reconciliation import reconcile_frames
 from src.common.logging_config import get_logger
 import pandas as pd
+import uuid
 
 logger = get_logger(__name__)
 router = APIRouter()
 
 @router.post("/")
-def run_reconciliation(request: Request, tolerance: int = 3):
+async def run_reconciliation(request: Request, tolerance: int = 3):
+    # Combinatorial matching is CPU-bound: admitted by the scheduler, run on a worker thread
+    async with admission.slot("reconcile", request):
+        return await run_in_threadpool(_run_reconciliation, request, tolerance)
+
+
+def _run_reconciliation(request: Request, tolerance: int):
     state = get_session_state(request)
     start = state.ledger_df
     bank = state.bank_df
@@ -18,61 +25,33 @@ def run_reconciliation(request: Request, tolerance: int = 3):
     if start.empty or bank.empty:
         return {"error": "Missing data", "ledger_count": len(start), "bank_count": len(bank)}
 
-    # 1. Filter Bank by Ledger Period
-    start_date = start['date'].min()
-    end_date = start['date'].max()
-    
-    bank_filtered = bank[
-        (bank['date'] >= start_date) & 
-        (bank['date'] <= end_date)
-    ].copy()
-
-    logger.info("Reconciliation started.", ledger_range=(str(start_date), str(end_date)), bank_tx_count=len(bank_filtered))
-    
-    # 2. Reconcile
-    reconciler = Reconciler()
-    matched_l, matched_b, unmatched_l, unmatched_b = reconciler.reconcile(start, bank_filtered, date_tolerance=tolerance)
-    
-    logger.info("Exact matching completed.", matched_count=len(matched_l), unmatched_ledger=len(unmatched_l))
+    # 1-4. Period filter, exact and combinatorial matching, unified view
+    run = reconcile_frames(start, bank, tolerance)
+    bank_filtered = run['bank_filtered']
+    comb_matches = run['comb_matches']
+    df_view = run['view']
+    metrics = run['metrics']
     
-    # 3. Combinatorial
-    matcher = CombinatorialMatcher()
-    comb_matches, remaining_l, remaining_b = matcher.find_matches(
-        unmatched_l, unmatched_b, tolerance_days=tolerance
-    )
-    
-    logger.info("Combinatorial matching completed.", comb_matches=len(comb_matches), remaining_ledger=len(remaining_l))
-
-    # 4. Save results in session state (for export/pdf generation later if needed)
+    # 5. Save results in session state (server-side exports read the cached view by id)
+    reconciliation_id = uuid.uuid4().hex
     state.reconcile_results = {
-        'matched_l': matched_l,
-        'matched_b': matched_b,
+        'reconciliation_id': reconciliation_id,
+        'matched_l': run['matched_l'],
+        'matched_b': run['matched_b'],
         'comb_matches': comb_matches,
-        'remaining_l': remaining_l,
-        'remaining_b': remaining_b
+        'remaining_l': run['remaining_l'],
+        'remaining_b': run['remaining_b'],
+        'view': df_view
     }
     
-    # 5. Build Unified View for Frontend
-    # Frontend needs a flat JSON compatible list, UnifiedViewController produces a DF.
-    uv = UnifiedViewController()
-    df_view = uv.build_view_data(matched_l, matched_b, comb_matches, remaining_l, remaining_b)
-    
     # Transform for JSON
-    # Convert dates to ISO string
-    df_view['date'] = pd.to_datetime(df_view['date']).dt.strftime('%Y-%m-%d')
-    if 'cluster_date' in df_view.columns:
-        df_view['cluster_date'] = pd.to_datetime(df_view['cluster_date']).dt.strftime('%Y-%m-%d')
+    # Convert dates to ISO string (on a copy, the cached view keeps datetimes)
+    json_view = df_view.copy()
+    json_view['date'] = pd.to_datetime(json_view['date']).dt.strftime('%Y-%m-%d')
+    if 'cluster_date' in json_view.columns:
+        json_view['cluster_date'] = pd.to_datetime(json_view['cluster_date']).dt.strftime('%Y-%m-%d')
         
-    results = df_view.to_dict(orient='records')
-    
-    # Metrics
-    metrics = {
-        "ledger_total": int(len(start)),
-        "bank_total": int(len(bank_filtered)),
-        "diff_initial": abs(unmatched_l['amount'].sum() - unmatched_b['amount'].sum()),
-        "diff_final": abs(remaining_l['amount'].sum() - remaining_b['amount'].sum()),
-        "comb_count": len(comb_matches)
-    }
+    results = json_view.to_dict(orient='records')
     
     # Chart Data
     # Group by date for chart
@@ -99,6 +78,7 @@ def run_reconciliation(request: Request, tolerance: int = 3):
     )
 
     return {
+        "reconciliation_id": reconciliation_id,
         "metrics": metrics,
         "rows": results,
         "chart": chart_data
@@ -1,13 +1,13 @@
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from src.api.admission import admission
 from src.utils.scanner import FileScanner
 from src.parsing.facade import ParserFacade
 from src.core.consolidator import TransactionConsolidator
 from src.api.state import get_session_state
 import pandas as pd
 import os
-import tkinter as tk
-from tkinter import filedialog
 import traceback
 
 router = APIRouter()
@@ -33,6 +33,10 @@ def scan_folder(req: ScanRequest):
 @router.post("/browse")
 def browse_folder():
     try:
+        # Imported here: only the desktop folder picker needs a display/Tk
+        import tkinter as tk
+        from tkinter import filedialog
+        
         root = tk.Tk()
         root.withdraw()
         root.wm_attributes('-topmost', 1)
@@ -49,8 +53,14 @@ def browse_folder():
         raise HTTPException(status_code=500, detail=f"Error opening dialog: {e}")
 
 @router.post("/ingest")
-def ingest_scanned_files(request: Request, files: list[str]):
+async def ingest_scanned_files(request: Request, files: list[str]):
     """Process files from scanner and add to bank statements"""
+    # Parsing is CPU-bound: admitted by the scheduler, run on a worker thread
+    async with admission.slot("parse", request):
+        return await run_in_threadpool(_ingest_scanned_files, request, files)
+
+
+def _ingest_scanned_files(request: Request, files: list[str]):
     state = get_session_state(request)
     all_dfs = []
     errors = []
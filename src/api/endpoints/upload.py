@@ -1,13 +1,13 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from src.api.admission import admission
 from src.api.state import get_session_state
-from src.parsing.sources.ledger_pdf import LedgerParser
+from src.api.uploads import spooled_uploads
 from src.parsing.facade import ParserFacade
 from src.core.consolidator import TransactionConsolidator
 from src.common.logging_config import get_logger
 import pandas as pd
-import shutil
 import os
-import tempfile
 import traceback
 
 logger = get_logger(__name__)
@@ -18,27 +18,30 @@ async def upload_ledger(request: Request, file: UploadFile = File(...)):
     try:
         logger.info(f"Ledger upload started: {file.filename}")
         suffix = os.path.splitext(file.filename)[1].lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            tmp_path = tmp.name
+        if suffix == '.csv':
+            from src.parsing.sources.ledger_csv import LedgerCSVParser
+            parser = LedgerCSVParser()
+        else:
+            from src.parsing.sources.ledger_pdf import LedgerParser
+            parser = LedgerParser()
         
-        parser = LedgerParser()
-        try:
-            result = parser.parse(tmp_path)
-            # Check if result is a tuple (df, company_name) or just df
-            state = get_session_state(request)
-            if isinstance(result, tuple):
-                df, company_name = result
-                state.company_name = company_name
-                logger.info("Company name extracted from ledger.", company=company_name)
-            else:
-                df = result
-                logger.info("Ledger parsed (no company name extracted).")
-            
-            logger.info("Ledger parsed successfully.", tx_count=len(df), format=suffix)
-        except Exception as e:
-            logger.error(f"Ledger parsing error: {e}", exc_info=True)
-            raise ValueError(f"Erro no parser legado: {e}")
+        async with spooled_uploads([file]) as (buffer,), admission.slot("parse", request):
+            try:
+                result = await run_in_threadpool(parser.parse, buffer)
+                # Check if result is a tuple (df, company_name) or just df
+                state = get_session_state(request)
+                if isinstance(result, tuple):
+                    df, company_name = result
+                    state.company_name = company_name
+                    logger.info("Company name extracted from ledger.", company=company_name)
+                else:
+                    df = result
+                    logger.info("Ledger parsed (no company name extracted).")
+                
+                logger.info("Ledger parsed successfully.", tx_count=len(df), format=suffix)
+            except Exception as e:
+                logger.error(f"Ledger parsing error: {e}", exc_info=True)
+                raise ValueError(f"Erro no parser legado: {e}")
         
         if df.empty:
              logger.warning("No valid transactions found in ledger.")
@@ -57,6 +60,8 @@ async def upload_ledger(request: Request, file: UploadFile = File(...)):
         logger.info(f"Ledger updated: {file.filename}", total_count=len(state.ledger_df), file_type="ledger", company=state.company_name)
         return {"message": "Ledger uploaded successfully", "count": len(state.ledger_df), "filename": file.filename, "company": state.company_name}
         
+    except HTTPException:
+        raise
     except ValueError as ve:
          logger.warning(f"Ledger upload validation error: {ve}")
          raise HTTPException(status_code=400, detail=str(ve))
@@ -71,28 +76,35 @@ async def upload_bank(request: Request, files: list[UploadFile] = File(...)):
         all_dfs = []
         errors = []
         
-        for file in files:
-            logger.debug(f"Processing bank file: {file.filename}")
-            suffix = os.path.splitext(file.filename)[1].lower()
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                shutil.copyfileobj(file.file, tmp)
-                tmp_path = tmp.name
-            
-            try:
-                facade = ParserFacade.get_parser(tmp_path)
-                df, _ = facade.parse(tmp_path)
-                
-                if df is not None and not df.empty:
-                    logger.info(f"File {file.filename} parsed successfully.", tx_count=len(df))
-                    df['source_file'] = file.filename
-                    all_dfs.append(df)
-                else:
-                    logger.warning(f"No transactions found in {file.filename}")
-                    errors.append(f"No transactions found for {file.filename}")
+        async with spooled_uploads(files) as buffers:
+            for index, (file, buffer) in enumerate(zip(files, buffers)):
+                logger.debug(f"Processing bank file: {file.filename}")
+                try:
+                    # One slot per file, so other sessions are served between
+                    # the files of a large upload
+                    async with admission.slot("parse", request):
+                        facade = ParserFacade.get_parser(file.filename)
+                        df, _ = await run_in_threadpool(facade.parse, buffer, file.filename)
                     
-            except Exception as e:
-                logger.error(f"Error parsing {file.filename}: {e}", exc_info=True)
-                errors.append(f"Error parsing {file.filename}: {str(e)}")
+                    if df is not None and not df.empty:
+                        logger.info(f"File {file.filename} parsed successfully.", tx_count=len(df))
+                        df['source_file'] = file.filename
+                        all_dfs.append(df)
+                    else:
+                        logger.warning(f"No transactions found in {file.filename}")
+                        errors.append(f"No transactions found for {file.filename}")
+                        
+                except HTTPException as e:
+                    # Busy after some files were parsed: keep them and report the rest
+                    if e.status_code != 429 or index == 0:
+                        raise
+                    skipped = [f.filename for f in files[index:]]
+                    logger.warning("Bank upload interrupted by admission control.", skipped=len(skipped))
+                    errors.append(f"Server busy, upload again: {', '.join(skipped)}")
+                    break
+                except Exception as e:
+                    logger.error(f"Error parsing {file.filename}: {e}", exc_info=True)
+                    errors.append(f"Error parsing {file.filename}: {str(e)}")
         
         if all_dfs:
             consolidated = TransactionConsolidator.consolidate(all_dfs)
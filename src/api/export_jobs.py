@@ -0,0 +1,120 @@
+"""
+Background Export Jobs
+
+Exports generated on the server from the cached reconciliation result run on
+a small thread pool. Each job writes its file and a JSON status sidecar to
+`EXPORT_JOB_DIR`, so any worker process can answer status and download
+requests for it (same idea as the shared session backend).
+"""
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from src.common.logging_config import get_logger
+
+logger = get_logger("api.export_jobs")
+
+# Finished files are kept for download for this long
+JOB_TTL_SECONDS = 60 * 60
+
+
+class ExportJobManager:
+    """
+    Runs export builders in the background and tracks them by job id.
+
+    A builder is a callable receiving the output path and writing the file.
+    """
+
+    def __init__(
+        self,
+        job_dir: str = os.getenv("EXPORT_JOB_DIR", os.path.join("cache", "exports")),
+        max_workers: int = int(os.getenv("EXPORT_JOB_WORKERS", "2")),
+    ):
+        self.job_dir = job_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export-job")
+
+    def _meta_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def _write_meta(self, meta: Dict) -> None:
+        tmp_path = self._meta_path(meta["job_id"]) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(meta["job_id"]))
+
+    def submit(self, session_id: str, filename: str, media_type: str, builder: Callable[[str], None]) -> Dict:
+        """Queue an export and return its initial status"""
+        os.makedirs(self.job_dir, exist_ok=True)
+        self.cleanup_expired()
+
+        job_id = uuid.uuid4().hex
+        meta = {
+            "job_id": job_id,
+            "session_id": session_id,
+            "status": "pending",
+            "filename": filename,
+            "media_type": media_type,
+            "path": os.path.join(self.job_dir, f"{job_id}{os.path.splitext(filename)[1]}"),
+            "created_at": time.time(),
+            "error": None,
+        }
+        self._write_meta(meta)
+        self._executor.submit(self._run, meta, builder)
+        return meta
+
+    def _run(self, meta: Dict, builder: Callable[[str], None]) -> None:
+        start = time.perf_counter()
+        meta = dict(meta)
+        meta["status"] = "running"
+        self._write_meta(meta)
+        try:
+            builder(meta["path"])
+            meta["status"] = "done"
+            logger.info(
+                "Export job completed.",
+                job_id=meta["job_id"],
+                file_name=meta["filename"],
+                duration_ms=round((time.perf_counter() - start) * 1000, 2)
+            )
+        except Exception as e:
+            meta["status"] = "failed"
+            meta["error"] = str(e)
+            logger.error(f"Export job failed: {e}", job_id=meta["job_id"], exc_info=True)
+        self._write_meta(meta)
+
+    def get(self, job_id: str, session_id: str) -> Optional[Dict]:
+        """Job status, or None if unknown or owned by another session"""
+        # Job ids are hex uuids; anything else cannot name a job file
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._meta_path(job_id), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("session_id") != session_id:
+            return None
+        return meta
+
+    def cleanup_expired(self) -> int:
+        """Delete job files older than JOB_TTL_SECONDS"""
+        if not os.path.isdir(self.job_dir):
+            return 0
+        cutoff = time.time() - JOB_TTL_SECONDS
+        removed = 0
+        for fname in os.listdir(self.job_dir):
+            fpath = os.path.join(self.job_dir, fname)
+            try:
+                if os.path.getmtime(fpath) < cutoff:
+                    os.remove(fpath)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+# Global Export Job Manager Instance
+export_jobs = ExportJobManager()
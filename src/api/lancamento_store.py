@@ -0,0 +1,190 @@
+"""
+Indexed Transaction Store for the Lançamentos Export
+
+Wraps the session fields used by the export workflow:
+
+- bank transactions: `reconcile_results['remaining_b']`, addressed by the
+  stable id `bank_<index>`;
+- `edited_transactions`: {id: {field: value}}, merged column-wise over the
+  bank frame instead of being looked up row by row;
+- `manual_transactions`: {id: transaction} in insertion order, with ids from
+  a per-session sequence so they never collide after deletes.
+
+Listing and selection work on DataFrames indexed by transaction id, so a
+selection is a single `Index.isin` against a set.
+"""
+from typing import Any, Dict, Iterable, Optional
+
+import pandas as pd
+
+# Defaults applied to bank transactions without edits
+EDIT_DEFAULTS = {
+    "conta_debito": "78",
+    "participante_debito": "",
+    "conta_credito": "6670",
+    "participante_credito": "",
+    "documento": "001",
+}
+
+EXPORT_COLUMNS = ["date", "amount", "description"] + list(EDIT_DEFAULTS)
+
+
+class LancamentoStore:
+    """Indexed view over one session's exportable transactions."""
+
+    def __init__(self, state):
+        self.state = state
+
+    # -- Bank transactions ---------------------------------------------------
+
+    def bank_frame(self) -> pd.DataFrame:
+        """Bank-only transactions with edits merged, indexed by `bank_<index>`."""
+        results = self.state.reconcile_results or {}
+        remaining_b = results.get('remaining_b', pd.DataFrame())
+        if remaining_b is None or remaining_b.empty:
+            return pd.DataFrame(columns=EXPORT_COLUMNS + ["bank_name", "is_edited"])
+
+        dates = remaining_b['date']
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            date_str = dates.dt.strftime('%Y-%m-%d')
+        else:
+            date_str = dates.map(lambda d: d.strftime('%Y-%m-%d') if hasattr(d, 'strftime') else str(d))
+
+        frame = pd.DataFrame({
+            "date": date_str.to_numpy(),
+            "amount": remaining_b['amount'].astype(float).to_numpy(),
+            "description": remaining_b['description'].astype(str).to_numpy(),
+            "bank_name": (
+                remaining_b['bank_account'].fillna('').to_numpy()
+                if 'bank_account' in remaining_b.columns else ''
+            ),
+        }, index=pd.Index("bank_" + remaining_b.index.astype(str), name="id"))
+
+        # Edits as columns: one reindex + fillna instead of a dict lookup per row
+        edits = self.state.edited_transactions
+        if edits:
+            edits_df = pd.DataFrame.from_dict(edits, orient='index').reindex(
+                index=frame.index, columns=list(EDIT_DEFAULTS)
+            )
+            for col, default in EDIT_DEFAULTS.items():
+                frame[col] = edits_df[col].where(edits_df[col].notna(), default)
+            frame["is_edited"] = frame.index.isin(list(edits))
+        else:
+            for col, default in EDIT_DEFAULTS.items():
+                frame[col] = default
+            frame["is_edited"] = False
+
+        return frame
+
+    def edit(self, transaction_id: str, edits: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge field edits for a transaction and return its current edits."""
+        current = self.state.edited_transactions.setdefault(transaction_id, {})
+        current.update(edits)
+        return current
+
+    def edit_many(self, edits: Dict[str, Dict[str, Any]]) -> int:
+        """Merge edits for several transactions at once; returns how many."""
+        for transaction_id, fields in edits.items():
+            self.edit(transaction_id, fields)
+        return len(edits)
+
+    def _remaining_bank(self) -> pd.DataFrame:
+        results = self.state.reconcile_results or {}
+        remaining_b = results.get('remaining_b')
+        return pd.DataFrame() if remaining_b is None else remaining_b
+
+    def _assign(self, assignments: pd.DataFrame, accept: bool, overwrite: bool) -> pd.DataFrame:
+        """Drop already edited ids unless `overwrite`; store as edits with `accept`."""
+        assignments.index = "bank_" + assignments.index.astype(str)
+        assignments.index.name = "id"
+        if not overwrite and self.state.edited_transactions:
+            assignments = assignments[~assignments.index.isin(list(self.state.edited_transactions))]
+
+        if accept and not assignments.empty:
+            fields = assignments[[c for c in EDIT_DEFAULTS if c in assignments.columns]]
+            self.edit_many({
+                txn_id: {k: v for k, v in row.items() if v is not None}
+                for txn_id, row in fields.to_dict(orient='index').items()
+            })
+        return assignments
+
+    def apply_rules(self, rule_set, accept: bool = False, overwrite: bool = False) -> pd.DataFrame:
+        """
+        Run an AccountRuleSet over the bank-only transactions.
+
+        Returns the assignments indexed by transaction id. Transactions that
+        already have edits are left out unless `overwrite`; with `accept` the
+        assignments are stored as edits.
+        """
+        return self._assign(rule_set.apply(self._remaining_bank()), accept, overwrite)
+
+    def suggest_accounts(self, index, accept: bool = False, overwrite: bool = False) -> pd.DataFrame:
+        """
+        Account suggestions from an AccountSuggestionIndex for the bank-only
+        transactions, with the same filtering/accept semantics as apply_rules.
+        """
+        remaining_b = self._remaining_bank()
+        if remaining_b.empty:
+            return self._assign(index.suggest([]), accept, overwrite)
+
+        suggestions = index.suggest(remaining_b['description'].astype(str).tolist())
+        suggestions.index = remaining_b.index[suggestions.index.to_numpy(dtype=int)]
+        return self._assign(suggestions, accept, overwrite)
+
+    # -- Manual transactions -------------------------------------------------
+
+    def manual_frame(self) -> pd.DataFrame:
+        manual = self.state.manual_transactions
+        if not manual:
+            return pd.DataFrame(columns=EXPORT_COLUMNS)
+        return pd.DataFrame.from_dict(manual, orient='index').drop(columns="id").rename_axis("id")
+
+    def add_manual(self, transaction: Dict[str, Any]) -> Dict[str, Any]:
+        # Monotonic per-session sequence: ids stay unique after deletes
+        self.state.manual_seq = getattr(self.state, 'manual_seq', 0) + 1
+        txn_id = f"manual_{self.state.manual_seq}"
+        txn = {"id": txn_id, **transaction}
+        self.state.manual_transactions[txn_id] = txn
+        return txn
+
+    def delete_manual(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        return self.state.manual_transactions.pop(transaction_id, None)
+
+    # -- Listing / selection -------------------------------------------------
+
+    @staticmethod
+    def page(frame: pd.DataFrame, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Slice of a frame as JSON-ready records plus pagination info."""
+        total = len(frame)
+        end = total if limit is None else offset + limit
+        page = frame.iloc[offset:end].reset_index()
+        transactions = page.to_dict(orient='records')
+        return {
+            "transactions": transactions,
+            "count": len(transactions),
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+        }
+
+    def selected(self, selected_ids: Iterable[str]) -> pd.DataFrame:
+        """Selected bank and manual transactions (bank first), sorted by date."""
+        ids = set(selected_ids)
+        parts = []
+        for frame in (self.bank_frame(), self.manual_frame()):
+            if not frame.empty:
+                parts.append(frame.loc[frame.index.isin(ids), EXPORT_COLUMNS])
+        if not parts:
+            return pd.DataFrame(columns=EXPORT_COLUMNS)
+        # Stable sort keeps bank before manual for equal dates, as before
+        return pd.concat(parts).sort_values('date', kind='stable')
+
+    def assigned(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Rows of `frame` whose accounts were chosen by the user or a rule:
+        manual transactions and edited bank transactions. Bank rows still on
+        EDIT_DEFAULTS are left out, so they never teach the suggestion index.
+        """
+        chosen = list(self.state.manual_transactions) + list(self.state.edited_transactions)
+        keep = frame.index.isin(chosen)
+        return frame.loc[keep]
@@ -1,11 +1,15 @@
+from typing import Dict
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 import uuid
 import time
-from src.api.endpoints import upload, reconcile, scan, export, extract, export_lancamentos
+from src.api.endpoints import upload, reconcile, scan, export, extract, export_lancamentos, metrics
 from src.common.logging_config import setup_logging, set_request_id, get_logger
+from src.common.metrics import REQUEST_LATENCY
 from src.api.state import session_manager
+from src.api.warmup import WARMUP_ENABLED, warm_up
 
 # Initialize Structured Logging
 setup_logging()
@@ -14,6 +18,9 @@ logger = get_logger("api.main")
 # Session Cookie Name
 SESSION_COOKIE_NAME = "auditor_session_id"
 
+# Probes and scrapes: no session, no cookie, no end-of-request work
+SESSIONLESS_PATHS = ("/api/health", "/api/metrics")
+
 
 app = FastAPI(title="Auditor Contábil API", version="1.0.0")
 
@@ -21,6 +28,9 @@ app = FastAPI(title="Auditor Contábil API", version="1.0.0")
 @app.middleware("http")
 async def session_middleware(request: Request, call_next):
     """Manage session ID via cookies"""
+    if request.url.path in SESSIONLESS_PATHS:
+        return await call_next(request)
+    
     # Get or create session ID
     session_id = request.cookies.get(SESSION_COOKIE_NAME)
     
@@ -31,8 +41,15 @@ async def session_middleware(request: Request, call_next):
     # Store session_id in request state for use in endpoints
     request.state.session_id = session_id
     
-    # Process request
-    response = await call_next(request)
+    # Process request (session is pinned so budget eviction never spills it mid-request)
+    session_manager.begin_request(session_id)
+    try:
+        response = await call_next(request)
+    finally:
+        # Saving, re-measuring and spilling is blocking I/O: only go to the
+        # thread pool when the request used the session or memory is over budget
+        if session_manager.release_request(session_id):
+            await run_in_threadpool(session_manager.finish_request, session_id)
     
     # Set session cookie in response (if not already set)
     if SESSION_COOKIE_NAME not in request.cookies:
@@ -47,6 +64,22 @@ async def session_middleware(request: Request, call_next):
     return response
 
 
+# Full path template of every route of an included router, by route object.
+# Newer FastAPI puts the route as declared (without the include prefix) in
+# scope["route"]; older versions a prefixed copy, which is not in this map
+# and already carries the full path.
+_ROUTE_PATHS: Dict[int, str] = {}
+
+
+def _route_template(request: Request) -> str:
+    """Route path template (e.g. /api/x/{id}) to keep metric labels bounded"""
+    route = request.scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    return _ROUTE_PATHS.get(id(route), template)
+
+
 # Middleware for Request ID and Logging
 @app.middleware("http")
 async def logging_middleware(request: Request, call_next):
@@ -67,6 +100,12 @@ async def logging_middleware(request: Request, call_next):
     try:
         response = await call_next(request)
         process_time = time.time() - start_time
+        REQUEST_LATENCY.observe(
+            process_time,
+            method=request.method,
+            route=_route_template(request),
+            status=response.status_code
+        )
         
         logger.info(
             f"Request completed: {request.method} {request.url.path} - Status: {response.status_code}",
@@ -81,6 +120,7 @@ async def logging_middleware(request: Request, call_next):
         return response
     except Exception as e:
         process_time = time.time() - start_time
+        REQUEST_LATENCY.observe(process_time, method=request.method, route=_route_template(request), status=500)
         logger.error(
             f"Request failed: {str(e)}",
             extra_fields={
@@ -107,17 +147,52 @@ app.add_middleware(
 )
 
 # Include Routers
-app.include_router(upload.router, prefix="/api/upload", tags=["Upload"])
-app.include_router(reconcile.router, prefix="/api/reconcile", tags=["Reconcile"])
-app.include_router(scan.router, prefix="/api/scan", tags=["Scan"])
-app.include_router(export.router, prefix="/api/export", tags=["Export"])
-app.include_router(extract.router, prefix="/api/extract", tags=["Extract"])
-app.include_router(export_lancamentos.router, prefix="/api/export-lancamentos", tags=["Export Lancamentos"])
+def _include_router(router, prefix: str, tags: list):
+    app.include_router(router, prefix=prefix, tags=tags)
+    for route in router.routes:
+        _ROUTE_PATHS[id(route)] = prefix + route.path
+
+
+_include_router(upload.router, prefix="/api/upload", tags=["Upload"])
+_include_router(reconcile.router, prefix="/api/reconcile", tags=["Reconcile"])
+_include_router(scan.router, prefix="/api/scan", tags=["Scan"])
+_include_router(export.router, prefix="/api/export", tags=["Export"])
+_include_router(extract.router, prefix="/api/extract", tags=["Extract"])
+_include_router(export_lancamentos.router, prefix="/api/export-lancamentos", tags=["Export Lancamentos"])
+_include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
+
+@app.on_event("startup")
+def warm_up_worker():
+    # Runs before the worker accepts connections
+    if WARMUP_ENABLED:
+        warm_up()
+
+
+@app.on_event("startup")
+def start_session_reaper():
+    session_manager.start_reaper()
+
+
+@app.on_event("shutdown")
+def stop_session_reaper():
+    session_manager.stop_reaper()
+
 
 @app.get("/api/health")
 def health_check():
     return {"status": "ok", "app": "Auditor Contábil"}
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8010)
+    
+    workers = int(os.getenv("API_WORKERS", "1"))
+    if workers > 1 and not session_manager.backend.shared:
+        logger.warning("API_WORKERS > 1 requires SESSION_BACKEND=sqlite; falling back to a single worker.")
+        workers = 1
+    
+    if workers > 1:
+        # Multiple processes need the app as an import string
+        uvicorn.run("src.api.main:app", host="127.0.0.1", port=8010, workers=workers)
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=8010)
@@ -0,0 +1,405 @@
+"""
+Session Persistence Backends
+
+`SessionManager` keeps hot sessions in memory and delegates persistence to a
+backend:
+
+- `PickleSpillBackend` (default): process-local. Sessions are only written
+  when evicted from memory (budget or idle) and are removed from disk when
+  restored. Requires a single uvicorn worker.
+- `SQLiteSessionBackend`: shared by every worker process on the box.
+  Sessions are written through at the end of each request that changed them,
+  DataFrames are stored per column-block (Parquet when pyarrow is installed),
+  loaded lazily on first attribute access, and versioned so a worker can tell
+  that its cached copy is stale with a single indexed lookup. Saves are
+  compare-and-set on the version; when another worker saved in between, the
+  fields this worker changed are merged over the stored ones.
+
+Select the backend with `SESSION_BACKEND=pickle|sqlite`.
+"""
+import hashlib
+import importlib.util
+import io
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import pandas as pd
+
+from src.common.logging_config import get_logger
+
+logger = get_logger("api.session_store")
+
+# DataFrame attributes of AppState stored as separate, lazily loaded frames
+FRAME_FIELDS = ("ledger_df", "bank_df")
+RESULTS_FIELD = "reconcile_results"
+
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+
+class SessionBackend:
+    """Persistence interface used by SessionManager."""
+
+    # True when several processes share the backend (write-through + version checks)
+    shared = False
+
+    def save(self, session_id: str, state) -> Optional[int]:
+        """Persist a session. Returns the stored version (None if unversioned)."""
+        raise NotImplementedError
+
+    def load(self, session_id: str):
+        """Return the persisted AppState or None."""
+        raise NotImplementedError
+
+    def get_version(self, session_id: str) -> Optional[int]:
+        """Current stored version, or None when unknown/unversioned."""
+        return None
+
+    def delete(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    def expire(self, max_age: timedelta) -> int:
+        """Delete persisted sessions older than `max_age`. Returns the count."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+
+class PickleSpillBackend(SessionBackend):
+    """One pickle file per spilled session (single-process deployments)."""
+
+    def __init__(self, spill_dir: str):
+        self.spill_dir = spill_dir
+
+    def _path(self, session_id: str) -> str:
+        # Session ids come from cookies: keep only safe characters in the filename
+        safe_id = "".join(c for c in session_id if c.isalnum() or c == "-")
+        return os.path.join(self.spill_dir, f"{safe_id}.pkl")
+
+    def save(self, session_id: str, state) -> Optional[int]:
+        os.makedirs(self.spill_dir, exist_ok=True)
+        tmp_path = self._path(session_id) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(session_id))
+        return None
+
+    def load(self, session_id: str):
+        path = self._path(session_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        # Back in memory: the spilled copy is now stale
+        os.remove(path)
+        return state
+
+    def delete(self, session_id: str) -> bool:
+        try:
+            os.remove(self._path(session_id))
+            return True
+        except OSError:
+            return False
+
+    def expire(self, max_age: timedelta) -> int:
+        if not os.path.isdir(self.spill_dir):
+            return 0
+        cutoff = (datetime.now() - max_age).timestamp()
+        expired = 0
+        for fname in os.listdir(self.spill_dir):
+            fpath = os.path.join(self.spill_dir, fname)
+            if fname.endswith(".pkl") and os.path.getmtime(fpath) < cutoff:
+                try:
+                    os.remove(fpath)
+                    expired += 1
+                except OSError:
+                    pass
+        return expired
+
+    def count(self) -> int:
+        if not os.path.isdir(self.spill_dir):
+            return 0
+        return sum(1 for f in os.listdir(self.spill_dir) if f.endswith(".pkl"))
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    Shared session store in a local SQLite database (WAL mode).
+
+    Tables:
+        sessions(session_id, version, last_accessed, meta)  -- scalar fields, pickled
+        frames(session_id, name, fmt, data)                  -- one row per DataFrame
+
+    Only frames whose content changed since the last save are rewritten:
+    each frame's digest is kept on the state, so in-place edits
+    (`df.loc[...] = ...`, `drop(inplace=True)`) are detected as well. Scalar
+    fields are compared by their pickled bytes.
+    """
+
+    shared = True
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                last_accessed REAL NOT NULL,
+                meta BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_last_accessed ON sessions(last_accessed);
+            CREATE TABLE IF NOT EXISTS frames (
+                session_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                fmt TEXT NOT NULL,
+                data BLOB,
+                PRIMARY KEY (session_id, name)
+            );
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread (sqlite3 connections are not thread-safe)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._conn())
+
+    # -- Serialization -------------------------------------------------------
+
+    @staticmethod
+    def _dump_frame(df: pd.DataFrame):
+        if PARQUET_AVAILABLE:
+            try:
+                buffer = io.BytesIO()
+                df.to_parquet(buffer, index=True)
+                return "parquet", buffer.getvalue()
+            except Exception:
+                # Mixed-type object columns are not always Arrow-compatible
+                pass
+        return "pickle", pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load_frame(fmt: str, data: bytes) -> pd.DataFrame:
+        if fmt == "parquet":
+            return pd.read_parquet(io.BytesIO(data))
+        return pickle.loads(data)
+
+    @staticmethod
+    def _fingerprint(obj) -> bytes:
+        """Content digest telling whether a frame changed since it was saved or loaded."""
+        digest = hashlib.blake2b(digest_size=16)
+        if isinstance(obj, pd.DataFrame):
+            try:
+                digest.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+                digest.update(repr((list(obj.columns), [str(t) for t in obj.dtypes])).encode())
+                return digest.digest()
+            except TypeError:
+                # Unhashable cells (lists, dicts): fall back to the pickled bytes
+                digest = hashlib.blake2b(digest_size=16)
+        digest.update(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+        return digest.digest()
+
+    @staticmethod
+    def _merge_meta(meta: Dict, base_blob: Optional[bytes], stored_blob: bytes) -> Dict:
+        """Stored meta with the fields this worker changed (vs `base_blob`, its last saved copy) on top."""
+        base = pickle.loads(base_blob) if base_blob else {}
+        merged = pickle.loads(stored_blob)
+        for key, value in meta.items():
+            dumped = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            if key not in base or dumped != pickle.dumps(base[key], protocol=pickle.HIGHEST_PROTOCOL):
+                merged[key] = value
+        return merged
+
+    @staticmethod
+    def _frames_of(state) -> Dict[str, object]:
+        """Flatten the session's frames (results dict entries become `reconcile_results.<key>`)."""
+        frames = {name: state.__dict__.get(name) for name in FRAME_FIELDS if name in state.__dict__}
+        results = state.__dict__.get(RESULTS_FIELD)
+        if isinstance(results, dict):
+            for key, value in results.items():
+                frames[f"{RESULTS_FIELD}.{key}"] = value
+        return frames
+
+    # -- SessionBackend ------------------------------------------------------
+
+    def save(self, session_id: str, state) -> Optional[int]:
+        persisted = state.__dict__.setdefault("_persisted_frames", {})
+        frames = self._frames_of(state)
+        digests = {name: self._fingerprint(obj) for name, obj in frames.items()}
+        changed = {name: obj for name, obj in frames.items() if persisted.get(name) != digests[name]}
+        removed = [name for name in persisted if name not in frames]
+
+        # last_accessed has its own column so touching a session does not bump its version
+        meta = {
+            k: v for k, v in state.__dict__.items()
+            if not k.startswith("_") and k not in FRAME_FIELDS and k not in (RESULTS_FIELD, "last_accessed")
+        }
+        if RESULTS_FIELD in state.__dict__:
+            results = state.__dict__[RESULTS_FIELD]
+            meta["_result_keys"] = list(results.keys()) if isinstance(results, dict) else None
+        else:
+            # Results never loaded in this worker: keep the stored keys
+            meta["_result_keys"] = state.__dict__.get("_result_keys")
+        meta_blob = pickle.dumps(meta, protocol=pickle.HIGHEST_PROTOCOL)
+        last_accessed = state.__dict__.get("last_accessed", datetime.now()).timestamp()
+
+        version = state.__dict__.get("_version")
+        if not changed and not removed and meta_blob == state.__dict__.get("_persisted_meta"):
+            self._conn().execute(
+                "UPDATE sessions SET last_accessed = ? WHERE session_id = ?", (last_accessed, session_id)
+            )
+            return version
+
+        rows = []
+        for name, obj in changed.items():
+            if isinstance(obj, pd.DataFrame):
+                fmt, data = self._dump_frame(obj)
+            else:
+                fmt, data = "pickle", pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+            rows.append((session_id, name, fmt, data))
+
+        conflict = False
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT version, meta FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                new_version = 1
+                conn.execute(
+                    "INSERT INTO sessions (session_id, version, last_accessed, meta) VALUES (?, ?, ?, ?)",
+                    (session_id, new_version, last_accessed, meta_blob)
+                )
+            else:
+                stored, stored_meta = row
+                conflict = stored != version
+                if conflict:
+                    # Another worker saved in between: keep its fields, apply ours on top
+                    logger.warning("Session version conflict, merging changed fields.",
+                                   expected=version, stored=stored)
+                    meta_blob = pickle.dumps(
+                        self._merge_meta(meta, state.__dict__.get("_persisted_meta"), stored_meta),
+                        protocol=pickle.HIGHEST_PROTOCOL
+                    )
+                new_version = stored + 1
+                updated = conn.execute(
+                    "UPDATE sessions SET version = ?, last_accessed = ?, meta = ? "
+                    "WHERE session_id = ? AND version = ?",
+                    (new_version, last_accessed, meta_blob, session_id, stored)
+                ).rowcount
+                if updated != 1:
+                    raise sqlite3.OperationalError(f"session {session_id} changed during save")
+            conn.executemany(
+                "INSERT OR REPLACE INTO frames (session_id, name, fmt, data) VALUES (?, ?, ?, ?)", rows
+            )
+            conn.executemany(
+                "DELETE FROM frames WHERE session_id = ? AND name = ?", [(session_id, n) for n in removed]
+            )
+
+        persisted.update({name: digests[name] for name in changed})
+        for name in removed:
+            persisted.pop(name, None)
+        state.__dict__["_persisted_meta"] = meta_blob
+        state.__dict__["_result_keys"] = meta["_result_keys"]
+        # After a merge the stored session holds fields this copy lacks: leave
+        # the version unset so the next request reloads it
+        state.__dict__["_version"] = None if conflict else new_version
+        return new_version
+
+    def load(self, session_id: str):
+        from src.api.state import AppState
+
+        row = self._conn().execute(
+            "SELECT version, last_accessed, meta FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        version, last_accessed, meta_blob = row
+        meta = pickle.loads(meta_blob)
+        result_keys = meta.pop("_result_keys", None)
+
+        state = AppState.__new__(AppState)
+        state.__dict__.update(meta)
+        state.__dict__["last_accessed"] = datetime.fromtimestamp(last_accessed)
+        state.__dict__["_result_keys"] = result_keys
+        state.__dict__["_version"] = version
+        state.__dict__["_persisted_meta"] = meta_blob
+        state.__dict__["_persisted_frames"] = {}
+
+        def frame_loader(name):
+            def load_frame():
+                found = self._conn().execute(
+                    "SELECT fmt, data FROM frames WHERE session_id = ? AND name = ?", (session_id, name)
+                ).fetchone()
+                value = self._load_frame(*found) if found else pd.DataFrame()
+                state.__dict__["_persisted_frames"][name] = self._fingerprint(value)
+                return value
+            return load_frame
+
+        def results_loader():
+            return {key: frame_loader(f"{RESULTS_FIELD}.{key}")() for key in result_keys}
+
+        lazy = {name: frame_loader(name) for name in FRAME_FIELDS}
+        lazy[RESULTS_FIELD] = results_loader if result_keys is not None else dict
+        state.__dict__["_lazy"] = lazy
+        return state
+
+    def get_version(self, session_id: str) -> Optional[int]:
+        row = self._conn().execute(
+            "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def delete(self, session_id: str) -> bool:
+        with self._transaction() as conn:
+            deleted = conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount
+            conn.execute("DELETE FROM frames WHERE session_id = ?", (session_id,))
+        return deleted > 0
+
+    def expire(self, max_age: timedelta) -> int:
+        cutoff = time.time() - max_age.total_seconds()
+        with self._transaction() as conn:
+            expired = conn.execute("DELETE FROM sessions WHERE last_accessed < ?", (cutoff,)).rowcount
+            conn.execute("DELETE FROM frames WHERE session_id NOT IN (SELECT session_id FROM sessions)")
+        return expired
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+class _Transaction:
+    """Context manager running a block in an IMMEDIATE transaction on a shared connection."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def create_backend(spill_dir: str) -> SessionBackend:
+    """Backend selected by SESSION_BACKEND (default: process-local pickle spill)."""
+    kind = os.getenv("SESSION_BACKEND", "pickle").lower()
+    if kind == "sqlite":
+        db_path = os.getenv("SESSION_DB_PATH", os.path.join(spill_dir, "sessions.db"))
+        logger.info("Using shared SQLite session backend.", db_path=db_path)
+        return SQLiteSessionBackend(db_path)
+    return PickleSpillBackend(spill_dir)
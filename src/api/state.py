@@ -1,8 +1,16 @@
 import pandas as pd
+import os
 import uuid
+import itertools
+from contextlib import contextmanager
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 import threading
+from src.common.logging_config import get_logger
+from src.api.session_store import SessionBackend, create_backend
+
+logger = get_logger("api.state")
 
 # Session-Based State Management
 # Each user session gets its own isolated state
@@ -14,7 +22,8 @@ class AppState:
         self.ledger_filename = None
         self.company_name = "Empresa"  # Nome padrão
         # Export feature data
-        self.manual_transactions = []  # Lista de transações adicionadas manualmente
+        self.manual_transactions = {}  # Transações adicionadas manualmente {id: transação}
+        self.manual_seq = 0  # Sequência para ids de transações manuais
         self.edited_transactions = {}  # Dicionário de edições {id: dados_editados}
         # Session metadata
         self.last_accessed = datetime.now()
@@ -25,48 +34,304 @@ class AppState:
         self.reconcile_results = {}
         self.ledger_filename = None
         self.company_name = "Empresa"
-        self.manual_transactions = []
+        self.manual_transactions = {}
+        self.manual_seq = 0
         self.edited_transactions = {}
         self.last_accessed = datetime.now()
     
     def touch(self):
         """Update last accessed time"""
         self.last_accessed = datetime.now()
+    
+    def size_key(self) -> tuple:
+        """Identity and shape of the sized fields: while unchanged, estimate_bytes is not recomputed"""
+        def key(obj):
+            if isinstance(obj, (pd.DataFrame, pd.Series)):
+                return (id(obj), obj.shape)
+            if isinstance(obj, dict):
+                return tuple((k, key(v)) for k, v in obj.items())
+            if isinstance(obj, (list, tuple)):
+                return tuple(key(v) for v in obj)
+            return None
+        
+        return tuple(key(self.__dict__.get(name)) for name in ("ledger_df", "bank_df", "reconcile_results"))
+    
+    def __getattr__(self, name):
+        # Only called for missing attributes: DataFrames of sessions restored
+        # from a shared backend are loaded on first access
+        if name.startswith("__") or name == "_lazy":
+            raise AttributeError(name)
+        loader = self.__dict__.get("_lazy", {}).pop(name, None)
+        if loader is None:
+            raise AttributeError(name)
+        value = loader()
+        self.__dict__[name] = value
+        return value
+    
+    def estimate_bytes(self) -> int:
+        """Approximate memory held by this session's DataFrames and results"""
+        def df_bytes(obj) -> int:
+            if isinstance(obj, pd.DataFrame):
+                return int(obj.memory_usage(deep=True).sum())
+            if isinstance(obj, pd.Series):
+                return int(obj.memory_usage(deep=True))
+            if isinstance(obj, dict):
+                return sum(df_bytes(v) for v in obj.values())
+            if isinstance(obj, (list, tuple)):
+                return sum(df_bytes(v) for v in obj)
+            return 0
+        
+        # Read __dict__ directly so lazily loaded frames are not pulled in
+        return sum(
+            df_bytes(self.__dict__.get(name))
+            for name in ("ledger_df", "bank_df", "reconcile_results")
+        )
 
 
 class SessionManager:
-    """Manages multiple user sessions with automatic cleanup"""
+    """
+    Manages multiple user sessions with automatic cleanup.
+    
+    Memory is bounded by a global budget: approximate bytes are tracked per
+    session (refreshed when a request finishes) and, when the budget is
+    exceeded, the least recently used sessions are spilled to disk instead
+    of being dropped. Sessions idle for `idle_spill_minutes` are spilled too,
+    and a background reaper deletes anything older than the session timeout.
     
-    def __init__(self, session_timeout_hours: int = 4):
-        self._sessions: Dict[str, AppState] = {}
+    Persistence goes through a `SessionBackend` (see `src.api.session_store`).
+    With a shared backend every changed session is written through at the end
+    of the request and the cached copy is revalidated against the stored
+    version, so any worker process can serve any request.
+    """
+    
+    def __init__(
+        self,
+        session_timeout_hours: int = 4,
+        memory_budget_mb: int = int(os.getenv("SESSION_MEMORY_BUDGET_MB", "1024")),
+        idle_spill_minutes: int = int(os.getenv("SESSION_IDLE_SPILL_MINUTES", "30")),
+        spill_dir: str = os.getenv("SESSION_SPILL_DIR", os.path.join("cache", "sessions")),
+        backend: Optional[SessionBackend] = None,
+    ):
+        # Ordered by last access: first item is the least recently used
+        self._sessions: "OrderedDict[str, AppState]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        # size_key() of each session when it was last measured
+        self._size_keys: Dict[str, tuple] = {}
+        self._active_requests: Dict[str, int] = {}
+        # Sessions resolved by a request that has not finished yet
+        self._accessed: set = set()
+        self._spilling: Dict[str, Tuple[int, AppState]] = {}
+        self._spill_seq = itertools.count()
+        # Per-session locks for backend I/O: [lock, users]
+        self._io_locks: Dict[str, list] = {}
         self._lock = threading.Lock()
         self.session_timeout = timedelta(hours=session_timeout_hours)
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.idle_spill_after = timedelta(minutes=idle_spill_minutes)
+        self.spill_dir = spill_dir
+        self.backend = backend or create_backend(spill_dir)
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_stop = threading.Event()
     
     def get_or_create_session(self, session_id: str) -> AppState:
-        """Get existing session or create a new one"""
-        with self._lock:
-            if session_id not in self._sessions:
-                self._sessions[session_id] = AppState()
-            
-            state = self._sessions[session_id]
-            state.touch()
+        """Get existing session (restoring it from the backend if needed) or create a new one"""
+        self._mark_accessed(session_id)
+        state = self._resolve_cached(session_id)
+        if state is not None:
+            return state
+        with self._session_io(session_id):
+            state = self._resolve(session_id)
+            if state is None:
+                state = AppState()
+                with self._lock:
+                    self._sessions[session_id] = state
+                    self._sizes[session_id] = 0
+                    self._size_keys.pop(session_id, None)
             return state
     
     def get_session(self, session_id: str) -> Optional[AppState]:
         """Get existing session, return None if not found"""
+        self._mark_accessed(session_id)
+        state = self._resolve_cached(session_id)
+        if state is not None:
+            return state
+        with self._session_io(session_id):
+            return self._resolve(session_id)
+    
+    @contextmanager
+    def _session_io(self, session_id: str):
+        """
+        Serialize backend I/O of one session (restore, spill) without holding
+        the manager lock, so one session's disk access never blocks the others
+        """
+        with self._lock:
+            entry = self._io_locks.setdefault(session_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._io_locks[session_id]
+    
+    def _resolve_cached(self, session_id: str) -> Optional[AppState]:
+        """The session if it can be served without backend I/O, else None"""
         with self._lock:
             state = self._sessions.get(session_id)
-            if state:
-                state.touch()
-            return state
+            if state is not None:
+                if self.backend.shared and self._active_requests.get(session_id, 0) <= 1:
+                    # Needs revalidation against the stored version
+                    return None
+            else:
+                # A session still being spilled comes back without touching the disk
+                spilling = self._spilling.pop(session_id, None)
+                if spilling is None:
+                    return None
+                state = spilling[1]
+                self._sessions[session_id] = state
+                self._sizes.setdefault(session_id, 0)
+            self._sessions.move_to_end(session_id)
+        state.touch()
+        return state
     
-    def delete_session(self, session_id: str) -> bool:
-        """Delete a specific session"""
+    def _resolve(self, session_id: str) -> Optional[AppState]:
+        """Return the up-to-date in-memory session, restoring it if needed (session I/O lock held)"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            revalidate = (state is not None and self.backend.shared
+                          and self._active_requests.get(session_id, 0) <= 1)
+        
+        if revalidate:
+            stored = self._backend_call(self.backend.get_version, session_id)
+            if stored is not None and stored != state.__dict__.get("_version"):
+                # Another worker changed this session since we cached it
+                with self._lock:
+                    if self._sessions.get(session_id) is state:
+                        del self._sessions[session_id]
+                        self._forget_size(session_id)
+                state = None
+        
+        if state is None:
+            with self._lock:
+                spilling = self._spilling.pop(session_id, None)
+                if spilling is not None:
+                    state = spilling[1]
+                    self._sessions[session_id] = state
+                    self._sizes.setdefault(session_id, 0)
+            if state is None:
+                state = self._backend_call(self.backend.load, session_id)
+                if state is None:
+                    return None
+                with self._lock:
+                    self._sessions[session_id] = state
+                    self._sizes.setdefault(session_id, 0)
+        
         with self._lock:
             if session_id in self._sessions:
-                del self._sessions[session_id]
-                return True
-            return False
+                self._sessions.move_to_end(session_id)
+        state.touch()
+        return state
+    
+    def delete_session(self, session_id: str) -> bool:
+        """Delete a specific session (in memory and on disk)"""
+        with self._lock:
+            found = self._sessions.pop(session_id, None) is not None
+            self._forget_size(session_id)
+            self._spilling.pop(session_id, None)
+        return self._backend_call(self.backend.delete, session_id) or found
+    
+    def begin_request(self, session_id: str) -> None:
+        """Pin a session while a request is using it so it is never spilled mid-request"""
+        with self._lock:
+            self._active_requests[session_id] = self._active_requests.get(session_id, 0) + 1
+    
+    def end_request(self, session_id: str) -> None:
+        """Unpin a session, then save/re-measure it and enforce the memory budget if needed"""
+        if self.release_request(session_id):
+            self.finish_request(session_id)
+    
+    def release_request(self, session_id: str) -> bool:
+        """
+        Unpin a session (no I/O, safe on the event loop). Returns True when
+        finish_request has work to do: the request used the session, or the
+        memory budget is exceeded.
+        """
+        with self._lock:
+            remaining = self._active_requests.get(session_id, 1) - 1
+            if remaining > 0:
+                self._active_requests[session_id] = remaining
+            else:
+                self._active_requests.pop(session_id, None)
+            accessed = session_id in self._accessed
+            if remaining <= 0:
+                self._accessed.discard(session_id)
+            return accessed or sum(self._sizes.values()) > self.memory_budget
+    
+    def finish_request(self, session_id: str) -> None:
+        """Write the session through, re-measure it if it changed and enforce the budget (blocking I/O)"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+        
+        if state is not None:
+            if self.backend.shared:
+                # Write-through so other workers see this request's changes
+                self._backend_call(self.backend.save, session_id, state)
+            key = state.size_key()
+            with self._lock:
+                measured = session_id in self._sizes and self._size_keys.get(session_id) == key
+            if not measured:
+                size = state.estimate_bytes()
+                with self._lock:
+                    if self._sessions.get(session_id) is state:
+                        self._sizes[session_id] = size
+                        self._size_keys[session_id] = key
+        
+        self.enforce_memory_budget()
+    
+    def enforce_memory_budget(self) -> int:
+        """Spill least recently used idle sessions until memory fits the budget"""
+        victims = []
+        with self._lock:
+            total = sum(self._sizes.values())
+            if total <= self.memory_budget:
+                return 0
+            
+            for sid in list(self._sessions.keys()):
+                if total <= self.memory_budget:
+                    break
+                if sid in self._active_requests:
+                    continue
+                total -= self._sizes.get(sid, 0)
+                victims.append((sid, self._detach(sid)))
+        
+        for sid, entry in victims:
+            self._spill(sid, entry)
+        
+        if victims:
+            logger.info(
+                "Session memory budget exceeded, spilled LRU sessions to disk.",
+                spilled=len(victims),
+                budget_bytes=self.memory_budget
+            )
+        elif total > self.memory_budget:
+            logger.warning("Session memory budget exceeded by active sessions.", total_bytes=total)
+        return len(victims)
+    
+    def spill_idle_sessions(self) -> int:
+        """Move sessions idle longer than `idle_spill_after` from memory to disk"""
+        now = datetime.now()
+        with self._lock:
+            idle = [
+                (sid, self._detach(sid)) for sid, state in list(self._sessions.items())
+                if sid not in self._active_requests
+                and now - state.last_accessed > self.idle_spill_after
+                and now - state.last_accessed <= self.session_timeout
+            ]
+        for sid, entry in idle:
+            self._spill(sid, entry)
+        return len(idle)
     
     def cleanup_inactive_sessions(self) -> int:
         """Remove sessions that haven't been accessed within timeout period"""
@@ -75,18 +340,116 @@ class SessionManager:
             inactive_sessions = [
                 sid for sid, state in self._sessions.items()
                 if now - state.last_accessed > self.session_timeout
+                and sid not in self._active_requests
             ]
             
             for sid in inactive_sessions:
                 del self._sessions[sid]
-            
-            return len(inactive_sessions)
+                self._forget_size(sid)
+        
+        expired_persisted = self._backend_call(self.backend.expire, self.session_timeout) or 0
+        
+        return len(inactive_sessions) + expired_persisted
     
     def get_session_count(self) -> int:
-        """Get number of active sessions"""
+        """Get number of active (in-memory) sessions"""
         with self._lock:
             return len(self._sessions)
     
+    def get_spilled_count(self) -> int:
+        """Get number of sessions held by the backend (spilled, or all sessions if shared)"""
+        return self._backend_call(self.backend.count) or 0
+    
+    def get_memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes held per in-memory session (as of its last request)"""
+        with self._lock:
+            return dict(self._sizes)
+    
+    def start_reaper(self, interval_seconds: int = 60) -> None:
+        """Start the background thread that expires and spills idle sessions"""
+        if self._reaper and self._reaper.is_alive():
+            return
+        self._reaper_stop.clear()
+        
+        def run():
+            while not self._reaper_stop.wait(interval_seconds):
+                try:
+                    expired = self.cleanup_inactive_sessions()
+                    spilled = self.spill_idle_sessions()
+                    if expired or spilled:
+                        logger.info("Session reaper cycle.", expired=expired, spilled=spilled)
+                except Exception as e:
+                    logger.error(f"Session reaper error: {e}", exc_info=True)
+        
+        self._reaper = threading.Thread(target=run, name="session-reaper", daemon=True)
+        self._reaper.start()
+    
+    def stop_reaper(self) -> None:
+        """Stop the background reaper thread"""
+        self._reaper_stop.set()
+        if self._reaper:
+            self._reaper.join(timeout=5)
+            self._reaper = None
+    
+    def _mark_accessed(self, session_id: str) -> None:
+        with self._lock:
+            if session_id in self._active_requests:
+                self._accessed.add(session_id)
+    
+    def _forget_size(self, session_id: str) -> None:
+        """Drop the recorded size of a session leaving memory (lock held)"""
+        self._sizes.pop(session_id, None)
+        self._size_keys.pop(session_id, None)
+    
+    def _detach(self, session_id: str) -> Tuple[int, AppState]:
+        """Remove a session from memory, keeping it reachable until the spill completes (lock held)"""
+        state = self._sessions.pop(session_id)
+        self._forget_size(session_id)
+        # The sequence number tells this spill apart from a later one of the same session
+        entry = (next(self._spill_seq), state)
+        self._spilling[session_id] = entry
+        return entry
+    
+    def _spill(self, session_id: str, entry: Tuple[int, AppState]) -> None:
+        """Persist a detached session through the backend (outside the manager lock)"""
+        with self._session_io(session_id):
+            with self._lock:
+                if self._spilling.get(session_id) is not entry:
+                    # Restored (or superseded by a later spill) before we got here
+                    return
+            state = entry[1]
+            try:
+                self.backend.save(session_id, state)
+            except Exception as e:
+                logger.error(f"Failed to spill session to disk: {e}", exc_info=True)
+                # Keep it in memory rather than losing user data
+                with self._lock:
+                    if self._spilling.get(session_id) is entry:
+                        del self._spilling[session_id]
+                        if session_id not in self._sessions:
+                            self._sessions[session_id] = state
+                            self._sessions.move_to_end(session_id, last=False)
+                return
+            
+            with self._lock:
+                current = self._spilling.get(session_id)
+                if current is entry:
+                    del self._spilling[session_id]
+                    return
+                # Restored or deleted while saving; a later spill (current is
+                # not None) overwrites the file itself
+                stale = current is None and not self.backend.shared
+            if stale:
+                self._backend_call(self.backend.delete, session_id)
+    
+    def _backend_call(self, method, *args):
+        """Call a backend method, logging failures instead of failing the request"""
+        try:
+            return method(*args)
+        except Exception as e:
+            logger.error(f"Session backend error in {method.__name__}: {e}", exc_info=True)
+            return None
+    
     @staticmethod
     def generate_session_id() -> str:
         """Generate a new unique session ID"""
@@ -113,9 +476,6 @@ def get_session_state(request):
     Returns:
         AppState: The session state for this request
     """
-    from src.common.logging_config import get_logger
-    logger = get_logger("api.state")
-    
     session_id = getattr(request.state, "session_id", None)
     if not session_id:
         # This should not happen if middleware is working correctly
@@ -0,0 +1,78 @@
+"""
+Upload Spooling
+
+Uploaded files are read in chunks into a SpooledTemporaryFile each: kept in
+memory up to `UPLOAD_SPOOL_MB`, rolled over to an anonymous temporary file
+(no name in /tmp, removed when closed) above it. The parsers receive the
+file objects directly, so nothing is copied to a named temp file and
+nothing is left behind.
+
+Per-file and per-request size limits (`UPLOAD_MAX_FILE_MB`,
+`UPLOAD_MAX_REQUEST_MB`) are enforced while reading and answered with 413.
+"""
+import os
+from contextlib import asynccontextmanager
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, List
+
+from fastapi import HTTPException, UploadFile
+
+from src.common.logging_config import get_logger
+
+logger = get_logger("api.uploads")
+
+MB = 1024 * 1024
+
+UPLOAD_CHUNK_BYTES = MB
+UPLOAD_SPOOL_BYTES = int(float(os.getenv("UPLOAD_SPOOL_MB", "8")) * MB)
+MAX_UPLOAD_FILE_BYTES = int(float(os.getenv("UPLOAD_MAX_FILE_MB", "50")) * MB)
+MAX_UPLOAD_REQUEST_BYTES = int(float(os.getenv("UPLOAD_MAX_REQUEST_MB", "200")) * MB)
+
+
+def _too_large(what: str, limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"{what} excede o limite de {limit / MB:g} MB.")
+
+
+@asynccontextmanager
+async def spooled_uploads(
+    files: List[UploadFile],
+    max_file_bytes: int = MAX_UPLOAD_FILE_BYTES,
+    max_request_bytes: int = MAX_UPLOAD_REQUEST_BYTES,
+    spool_bytes: int = UPLOAD_SPOOL_BYTES,
+) -> AsyncIterator[List[SpooledTemporaryFile]]:
+    """
+    Spool `files` and yield one rewound binary file object per upload.
+
+    The spools are closed on exit, whatever happens in the block.
+    """
+    # Reject on the sizes the multipart parser already knows before copying
+    known = [f.size for f in files if f.size is not None]
+    for file in files:
+        if file.size is not None and file.size > max_file_bytes:
+            raise _too_large(f"Arquivo {file.filename}", max_file_bytes)
+    if sum(known) > max_request_bytes:
+        raise _too_large("O envio", max_request_bytes)
+
+    spools: List[SpooledTemporaryFile] = []
+    total = 0
+    try:
+        for file in files:
+            spool = SpooledTemporaryFile(max_size=spool_bytes)
+            spools.append(spool)
+            size = 0
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                total += len(chunk)
+                if size > max_file_bytes:
+                    raise _too_large(f"Arquivo {file.filename}", max_file_bytes)
+                if total > max_request_bytes:
+                    raise _too_large("O envio", max_request_bytes)
+                spool.write(chunk)
+            spool.seek(0)
+            # The multipart parser's own buffer is no longer needed
+            await file.close()
+            logger.debug(f"Upload spooled: {file.filename}", size_bytes=size)
+        yield spools
+    finally:
+        for spool in spools:
+            spool.close()
@@ -0,0 +1,63 @@
+"""
+Worker Warm-up
+
+Importing the API no longer loads the parsers and exporters (see
+`src.common.lazy`); `warm_up()` loads them explicitly, together with the bank
+layouts and their compiled patterns, so the first upload in a fresh worker
+does not pay for it. It runs in the startup event, before uvicorn accepts
+connections. Set API_WARMUP=0 to skip it (e.g. for tooling and tests).
+"""
+import importlib
+import os
+import time
+from typing import Dict, Optional
+
+from src.common.logging_config import get_logger
+
+logger = get_logger("api.warmup")
+
+WARMUP_ENABLED = os.getenv("API_WARMUP", "1") != "0"
+
+# Modules on the request path; OCR, Gemini and the Tk folder picker stay lazy
+WARMUP_MODULES = [
+    "src.parsing.pipeline",
+    "src.parsing.sources.ofx",
+    "src.parsing.sources.ledger_pdf",
+    "src.exporters.excel_exporter",
+    "src.exporters.pdf_renderer",
+]
+
+
+def warm_up(layouts_dir: Optional[str] = None) -> Dict[str, float]:
+    """
+    Preload layouts, bank parsers and request-path modules.
+
+    Returns the seconds spent per step. Failures are logged and skipped: a
+    missing optional dependency should fail its request, not the worker.
+    """
+    from src.parsing.banks import PARSERS
+    from src.parsing.config.registry import LayoutRegistry
+
+    timings: Dict[str, float] = {}
+
+    def step(name: str, fn) -> None:
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            logger.error(f"Warm-up step failed: {name}", error=str(e), exc_info=True)
+        timings[name] = round(time.perf_counter() - start, 4)
+
+    # Same location ParserFacade uses
+    layouts_dir = layouts_dir or os.path.join(os.getcwd(), 'src', 'parsing', 'layouts')
+    step("layouts", lambda: LayoutRegistry.shared(layouts_dir).warm_up())
+    step("bank_parsers", PARSERS.load_all)
+    for module in WARMUP_MODULES:
+        step(module, lambda module=module: importlib.import_module(module))
+
+    logger.info(
+        "Worker warm-up finished",
+        total_seconds=round(sum(timings.values()), 4),
+        steps=timings,
+    )
+    return timings
@@ -0,0 +1,4 @@
+"""
+Command-line entry points (run from the project root, e.g.
+`python -m src.cli.batch_reconcile manifest.json`).
+"""
@@ -0,0 +1,402 @@
+"""
+Batch Reconciliation CLI
+
+Reconciles many companies without the HTTP API: for each manifest entry the
+ledger and every statement in its folder are parsed (LedgerParser /
+ParserFacade), consolidated (TransactionConsolidator) and reconciled
+(`src.core.reconciliation`), and the result is written to
+<out>/<company>/conciliacao.xlsx and resultado.json. Companies run in a
+process pool; summary.json and summary.csv list every company.
+
+Progress is kept in a SQLite job ledger (<out>/jobs.db). Re-running the
+same command after a crash or a failure skips companies already done,
+unless their input files changed (or --force is given).
+
+Usage (from the project root):
+    python -m src.cli.batch_reconcile manifest.json --out output/batch --workers 4
+
+Manifest: a JSON list (or {"companies": [...]}) or a CSV with the columns
+company, ledger, statements and optionally tolerance (days). Relative
+paths are resolved against the manifest's directory.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from src.common.logging_config import get_logger, setup_logging
+
+logger = get_logger("cli.batch_reconcile")
+
+STATEMENT_EXTENSIONS = ('.pdf', '.ofx')
+DEFAULT_TOLERANCE = 3
+
+SUMMARY_FIELDS = [
+    'company', 'status', 'attempts', 'company_name', 'ledger_count', 'bank_count',
+    'statement_files', 'parse_errors', 'comb_count', 'diff_initial', 'diff_final',
+    'pending_count', 'seconds', 'excel', 'json', 'error',
+]
+
+
+# ============================================================================
+# MANIFEST
+# ============================================================================
+
+@dataclass
+class CompanyJob:
+    """One manifest entry: a company's ledger file and statement folder."""
+    company: str
+    ledger: str
+    statements: str
+    tolerance: int = DEFAULT_TOLERANCE
+
+    def statement_files(self) -> List[str]:
+        if not os.path.isdir(self.statements):
+            return []
+        return sorted(
+            os.path.join(self.statements, name) for name in os.listdir(self.statements)
+            if name.lower().endswith(STATEMENT_EXTENSIONS)
+        )
+
+    def fingerprint(self) -> str:
+        """Hash of the entry and of its input files (name, size, mtime)."""
+        digest = hashlib.sha256(json.dumps(asdict(self), sort_keys=True).encode())
+        for path in [self.ledger] + self.statement_files():
+            try:
+                st = os.stat(path)
+                digest.update(f"{path}|{st.st_size}|{st.st_mtime_ns}\n".encode())
+            except OSError:
+                digest.update(f"{path}|missing\n".encode())
+        return digest.hexdigest()
+
+
+def load_manifest(path: str) -> List[CompanyJob]:
+    """Read a JSON or CSV manifest. Raises ValueError on invalid entries."""
+    base = os.path.dirname(os.path.abspath(path))
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            entries = list(csv.DictReader(f))
+    else:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        entries = data.get('companies', []) if isinstance(data, dict) else data
+
+    jobs, seen = [], {}
+    for i, entry in enumerate(entries, 1):
+        missing = [k for k in ('company', 'ledger', 'statements') if not str(entry.get(k) or '').strip()]
+        if missing:
+            raise ValueError(f"Manifest entry {i}: missing {', '.join(missing)}")
+        company = str(entry['company']).strip()
+        # Companies whose output directories would collide (also on
+        # case-insensitive filesystems) are duplicates too
+        dir_name = company_dir_name(company).lower()
+        if dir_name in seen:
+            other = seen[dir_name]
+            detail = "" if other == company else f" (same output directory as {other!r})"
+            raise ValueError(f"Manifest entry {i}: duplicate company {company!r}{detail}")
+        seen[dir_name] = company
+        tolerance = entry.get('tolerance')
+        jobs.append(CompanyJob(
+            company=company,
+            ledger=os.path.join(base, str(entry['ledger']).strip()),
+            statements=os.path.join(base, str(entry['statements']).strip()),
+            tolerance=int(tolerance) if str(tolerance or '').strip() else DEFAULT_TOLERANCE,
+        ))
+    return jobs
+
+
+def company_dir_name(company: str) -> str:
+    """Filesystem-safe directory name for a company."""
+    return re.sub(r'[^\w.-]+', '_', company, flags=re.UNICODE).strip('._') or 'empresa'
+
+
+# ============================================================================
+# JOB LEDGER
+# ============================================================================
+
+class JobLedger:
+    """SQLite record of each company's job state (pending/running/done/failed)."""
+
+    def __init__(self, db_path: str):
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                company TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                started_at TEXT,
+                finished_at TEXT,
+                error TEXT,
+                summary TEXT
+            )"""
+        )
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get(self, company: str) -> Optional[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM jobs WHERE company = ?", (company,)).fetchone()
+
+    def to_run(self, jobs: List[CompanyJob], force: bool = False) -> List[CompanyJob]:
+        """Jobs not yet done with their current inputs (all of them with force)."""
+        if force:
+            return list(jobs)
+        pending = []
+        for job in jobs:
+            row = self.get(job.company)
+            if row is None or row['status'] != 'done' or row['fingerprint'] != job.fingerprint():
+                pending.append(job)
+        return pending
+
+    def mark_running(self, job: CompanyJob) -> None:
+        self.conn.execute(
+            """INSERT INTO jobs (company, fingerprint, status, attempts, started_at)
+               VALUES (?, ?, 'running', 1, ?)
+               ON CONFLICT(company) DO UPDATE SET
+                   fingerprint = excluded.fingerprint, status = 'running',
+                   attempts = attempts + 1, started_at = excluded.started_at,
+                   finished_at = NULL, error = NULL""",
+            (job.company, job.fingerprint(), datetime.now().isoformat()),
+        )
+
+    def mark_finished(self, company: str, summary: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        self.conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, error = ?, summary = ? WHERE company = ?",
+            (
+                'failed' if error else 'done',
+                datetime.now().isoformat(),
+                error,
+                json.dumps(summary, ensure_ascii=False, default=str) if summary is not None else None,
+                company,
+            ),
+        )
+
+    def summary_rows(self, jobs: List[CompanyJob]) -> List[Dict[str, Any]]:
+        """One summary row per manifest company, in manifest order."""
+        rows = []
+        for job in jobs:
+            row = self.get(job.company)
+            summary = json.loads(row['summary']) if row is not None and row['summary'] else {}
+            rows.append({
+                **summary,
+                'company': job.company,
+                'status': row['status'] if row is not None else 'pending',
+                'attempts': row['attempts'] if row is not None else 0,
+                'error': row['error'] if row is not None else None,
+            })
+        return rows
+
+
+# ============================================================================
+# ONE COMPANY (runs in a worker process)
+# ============================================================================
+
+def _parse_ledger(path: str):
+    if path.lower().endswith('.csv'):
+        from src.parsing.sources.ledger_csv import LedgerCSVParser
+        result = LedgerCSVParser().parse(path)
+    else:
+        from src.parsing.sources.ledger_pdf import LedgerParser
+        result = LedgerParser().parse(path)
+    df, company_name = result if isinstance(result, tuple) else (result, None)
+    if df.empty:
+        raise ValueError(f"No valid transactions in ledger {os.path.basename(path)}")
+    df['date'] = pd.to_datetime(df['date'])
+    return df, company_name
+
+
+def _parse_statements(files: List[str]):
+    from src.core.consolidator import TransactionConsolidator
+    from src.parsing.facade import ParserFacade
+
+    all_dfs, errors = [], []
+    for path in files:
+        try:
+            df, _ = ParserFacade.get_parser(path).parse(path)
+        except Exception as e:
+            errors.append(f"{os.path.basename(path)}: {e}")
+            continue
+        if df is None or df.empty:
+            errors.append(f"{os.path.basename(path)}: no transactions found")
+            continue
+        df['source_file'] = os.path.basename(path)
+        all_dfs.append(df)
+
+    if not all_dfs:
+        raise ValueError(f"No valid bank transactions ({len(files)} statement files). Errors: {errors}")
+
+    consolidated = TransactionConsolidator.consolidate(all_dfs)
+    consolidated = consolidated[abs(consolidated['amount']) > 0.009].copy()
+    consolidated['date'] = pd.to_datetime(consolidated['date'])
+    return consolidated, errors
+
+
+def _period_strings(dates: pd.Series):
+    dates = pd.to_datetime(dates)
+    if dates.empty:
+        return None, None
+    return dates.min().strftime('%d/%m/%Y'), dates.max().strftime('%d/%m/%Y')
+
+
+def _replace_atomically(path: str, write) -> None:
+    root, ext = os.path.splitext(path)
+    partial = f"{root}.partial{ext}"
+    write(partial)
+    os.replace(partial, path)
+
+
+def run_company(job: CompanyJob, out_dir: str) -> Dict[str, Any]:
+    """Parse, consolidate, reconcile and export one company. Returns its summary."""
+    from src.core.reconciliation import reconcile_frames
+    from src.exporters.excel_exporter import ExcelExporter
+
+    started = time.perf_counter()
+    ledger_df, company_name = _parse_ledger(job.ledger)
+    files = job.statement_files()
+    bank_df, parse_errors = _parse_statements(files)
+
+    run = reconcile_frames(ledger_df, bank_df, job.tolerance)
+    view = run['view']
+    metrics = run['metrics']
+
+    target = os.path.join(out_dir, company_dir_name(job.company))
+    os.makedirs(target, exist_ok=True)
+    excel_path = os.path.join(target, 'conciliacao.xlsx')
+    json_path = os.path.join(target, 'resultado.json')
+
+    start_str, end_str = _period_strings(view['date'])
+    exporter = ExcelExporter(company_name=company_name or job.company, start_date=start_str, end_date=end_str)
+    _replace_atomically(excel_path, lambda p: exporter.generate_file(view, p))
+
+    json_view = view.copy()
+    json_view['date'] = pd.to_datetime(json_view['date']).dt.strftime('%Y-%m-%d')
+    status_counts = view['status'].value_counts().to_dict() if 'status' in view.columns else {}
+    # Rows left to reconcile ('Conciliado (Comb)' rows are matched too)
+    pending_count = (int(view['status'].astype(str).str.startswith('Apenas').sum())
+                     if 'status' in view.columns else len(view))
+
+    def write_json(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'company': job.company,
+                'company_name': company_name,
+                'metrics': metrics,
+                'status_counts': status_counts,
+                'parse_errors': parse_errors,
+                'rows': json_view.to_dict(orient='records'),
+            }, f, ensure_ascii=False, default=str)
+    _replace_atomically(json_path, write_json)
+
+    return {
+        'company_name': company_name,
+        'ledger_count': metrics['ledger_total'],
+        'bank_count': metrics['bank_total'],
+        'statement_files': len(files),
+        'parse_errors': len(parse_errors),
+        'comb_count': metrics['comb_count'],
+        'diff_initial': round(float(metrics['diff_initial']), 2),
+        'diff_final': round(float(metrics['diff_final']), 2),
+        'pending_count': pending_count,
+        'seconds': round(time.perf_counter() - started, 2),
+        'excel': excel_path,
+        'json': json_path,
+    }
+
+
+# ============================================================================
+# BATCH
+# ============================================================================
+
+def run_batch(
+    jobs: List[CompanyJob],
+    out_dir: str,
+    workers: int = 1,
+    force: bool = False,
+    ledger_path: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Run the jobs still to do in a process pool; returns the summary rows."""
+    os.makedirs(out_dir, exist_ok=True)
+    ledger = JobLedger(ledger_path or os.path.join(out_dir, 'jobs.db'))
+    try:
+        todo = ledger.to_run(jobs, force=force)
+        print(f"{len(jobs)} companies, {len(jobs) - len(todo)} already done, {len(todo)} to run")
+
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {}
+            for job in todo:
+                ledger.mark_running(job)
+                futures[pool.submit(run_company, job, out_dir)] = job
+
+            for done, future in enumerate(as_completed(futures), 1):
+                job = futures[future]
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    ledger.mark_finished(job.company, error=error)
+                    logger.error(f"Batch reconciliation failed: {job.company}", error=error)
+                    print(f"[{done}/{len(todo)}] {job.company}: FAILED - {error}")
+                else:
+                    ledger.mark_finished(job.company, summary=summary)
+                    print(
+                        f"[{done}/{len(todo)}] {job.company}: done in {summary['seconds']}s "
+                        f"({summary['pending_count']} pending, diff {summary['diff_final']:.2f})"
+                    )
+
+        rows = ledger.summary_rows(jobs)
+    finally:
+        ledger.close()
+
+    write_summary(rows, out_dir)
+    return rows
+
+
+def write_summary(rows: List[Dict[str, Any]], out_dir: str) -> None:
+    with open(os.path.join(out_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2, default=str)
+    with open(os.path.join(out_dir, 'summary.csv'), 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, extrasaction='ignore', delimiter=';')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Reconcile many companies from a manifest.")
+    parser.add_argument("manifest", help="JSON or CSV manifest (company, ledger, statements[, tolerance])")
+    parser.add_argument("--out", default=os.path.join("output", "batch"), help="Output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parallel companies")
+    parser.add_argument("--force", action="store_true", help="Re-run companies already done")
+    parser.add_argument("--log-file", default=None, help="JSON log file (default: console only)")
+    args = parser.parse_args(argv)
+
+    # Synchronous logging: worker processes do not inherit the listener thread
+    setup_logging(log_file=args.log_file, async_logging=False)
+
+    try:
+        jobs = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Invalid manifest: {e}", file=sys.stderr)
+        return 2
+
+    rows = run_batch(jobs, args.out, workers=args.workers, force=args.force)
+    failed = [r for r in rows if r['status'] != 'done']
+    print(f"Done: {len(rows) - len(failed)}/{len(rows)} companies. Summary: {os.path.join(args.out, 'summary.csv')}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
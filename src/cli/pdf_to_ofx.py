@@ -0,0 +1,327 @@
+"""
+Bulk PDF -> OFX Conversion
+
+Converts a directory tree or a ZIP of bank statement PDFs without the web
+UI: every PDF runs through ExtractorPipeline in a process pool (one
+pipeline and layout registry per worker), the transactions are grouped per
+account and period, and one OFX per group is written with OFXWriter.
+An audit report (audit.csv / audit.json) lists each file with its
+validation status, balances and the OFX files it went into.
+
+Usage (from the project root):
+    python -m src.cli.pdf_to_ofx extratos/ --out output/ofx --workers 8
+    python -m src.cli.pdf_to_ofx arquivo_2019_2023.zip --period year
+
+The account of a file is the one reported by its parser; statements whose
+parser does not report an account number are grouped by bank and folder.
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from src.common.logging_config import get_logger, setup_logging
+
+logger = get_logger("cli.pdf_to_ofx")
+
+DEFAULT_LAYOUTS_DIR = os.path.join('src', 'parsing', 'layouts')
+PERIODS = {'month': 'M', 'year': 'Y', 'all': None}
+
+AUDIT_FIELDS = [
+    'file', 'status', 'message', 'duplicate_of', 'bank_id', 'bank', 'account', 'layout', 'method',
+    'tx_count', 'balance_start', 'balance_end', 'diff', 'seconds', 'ofx_files',
+]
+
+
+# ============================================================================
+# INPUTS
+# ============================================================================
+
+@dataclass(frozen=True)
+class StatementSource:
+    """A PDF on disk, or a member of a ZIP archive."""
+    path: str
+    member: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.path}:{self.member}" if self.member else self.path
+
+    @property
+    def folder(self) -> str:
+        """Directory of the file inside the input (used when no account is known)."""
+        return os.path.dirname(self.member if self.member else self.path)
+
+    def read(self, root: str = '') -> bytes:
+        if self.member is None:
+            with open(os.path.join(root, self.path), 'rb') as f:
+                return f.read()
+        with zipfile.ZipFile(self.path) as archive:
+            return archive.read(self.member)
+
+
+def find_statements(input_path: str) -> List[StatementSource]:
+    """PDFs under a directory (recursively) or inside a ZIP, sorted by name."""
+    if zipfile.is_zipfile(input_path):
+        with zipfile.ZipFile(input_path) as archive:
+            members = [
+                info.filename for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith('.pdf')
+                and not info.filename.startswith('__MACOSX/')
+                and not os.path.basename(info.filename).startswith('.')
+            ]
+        return [StatementSource(input_path, member) for member in sorted(members)]
+
+    if not os.path.isdir(input_path):
+        raise ValueError(f"{input_path} is neither a directory nor a ZIP file")
+
+    sources = []
+    for root, dirs, files in os.walk(input_path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith('.pdf') and not name.startswith('.'):
+                path = os.path.join(root, name)
+                sources.append(StatementSource(os.path.relpath(path, input_path)))
+    return sources
+
+
+# ============================================================================
+# ONE FILE (runs in a worker process)
+# ============================================================================
+
+_pipeline = None
+_input_root = ''
+
+
+def _init_worker(layouts_dir: str, input_root: str) -> None:
+    """Build the pipeline once per process (layouts compiled on first use)."""
+    global _pipeline, _input_root
+    from src.parsing.config.registry import LayoutRegistry
+    from src.parsing.pipeline import ExtractorPipeline
+
+    registry = LayoutRegistry.shared(layouts_dir)
+    registry.warm_up()
+    _pipeline = ExtractorPipeline(registry)
+    _input_root = input_root
+
+
+def _file_status(result: Dict[str, Any]):
+    """success / warning / error, as in the extractor endpoint's audit."""
+    if result.get('error'):
+        return 'error', result['error']
+    if not result.get('transactions'):
+        return 'error', "Nenhuma transação encontrada."
+    validation = result.get('validation') or {}
+    if validation.get('is_valid') is False:
+        return 'warning', validation.get('msg') or "Saldos não conferem."
+    return 'success', validation.get('msg') or ''
+
+
+def convert_file(source: StatementSource) -> Dict[str, Any]:
+    """Extract one statement. Returns its audit record and transactions."""
+    started = time.perf_counter()
+    file_name = os.path.basename(source.member or source.path)
+    digest = None
+    try:
+        data = source.read(_input_root)
+        digest = hashlib.sha256(data).hexdigest()
+        result = _pipeline.process_file(io.BytesIO(data), file_name)
+    except Exception as e:
+        logger.error(f"Conversion failed: {source.label}", error=str(e), error_type=type(e).__name__)
+        result = {'error': f"{type(e).__name__}: {e}", 'transactions': []}
+
+    account_info = result.get('account_info') or {}
+    balances = result.get('balance_info') or {}
+    validation = result.get('validation') or {}
+    status, message = _file_status(result)
+    return {
+        'file': source.label,
+        'folder': source.folder,
+        'sha256': digest,
+        'status': status,
+        'message': message,
+        'bank_id': str(account_info.get('bank_id') or ''),
+        'branch': str(account_info.get('branch_id') or account_info.get('agency') or ''),
+        'account': str(account_info.get('acct_id') or account_info.get('account') or ''),
+        'layout': result.get('layout'),
+        'method': result.get('method'),
+        'tx_count': len(result.get('transactions', [])),
+        'balance_start': balances.get('start'),
+        'balance_end': balances.get('end'),
+        'diff': validation.get('diff'),
+        'seconds': round(time.perf_counter() - started, 2),
+        'transactions': [t.to_dict() for t in result.get('transactions', [])],
+    }
+
+
+def _convert_all(sources: List[StatementSource], input_root: str, layouts_dir: str, workers: int) -> Iterator[Dict[str, Any]]:
+    """Yield the records as files finish (inline when workers <= 1)."""
+    if workers <= 1:
+        _init_worker(layouts_dir, input_root)
+        for source in sources:
+            yield convert_file(source)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(layouts_dir, input_root)) as pool:
+        futures = [pool.submit(convert_file, source) for source in sources]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+# ============================================================================
+# GROUPING AND OUTPUT
+# ============================================================================
+
+def _slug(value: str) -> str:
+    return re.sub(r'[^\w.-]+', '_', value, flags=re.UNICODE).strip('._')
+
+
+def account_key(record: Dict[str, Any]) -> str:
+    """Output group of a file: bank + account, or bank + folder when unknown."""
+    bank = record['bank_id'] or 'banco'
+    if record['account']:
+        return _slug(f"{bank}_{record['branch']}_{record['account']}" if record['branch'] else f"{bank}_{record['account']}")
+    return _slug(f"{bank}_{record['folder']}") if record['folder'] else _slug(bank)
+
+
+def mark_duplicates(records: List[Dict[str, Any]]) -> None:
+    """Flag files whose content repeats an earlier file (copies across folders)."""
+    first_by_digest = {}
+    for record in records:
+        digest = record.get('sha256')
+        if digest is None:
+            continue
+        if digest in first_by_digest:
+            record['duplicate_of'] = first_by_digest[digest]
+            if record['status'] == 'success':
+                record['status'] = 'warning'
+            record['message'] = f"Arquivo duplicado de {first_by_digest[digest]}; ignorado no OFX."
+        else:
+            first_by_digest[digest] = record['file']
+
+
+def write_ofx_files(records: List[Dict[str, Any]], out_dir: str, period: str = 'month') -> Dict[str, List[str]]:
+    """
+    Write one OFX per account and period. Returns {file label: [ofx paths]}.
+
+    Records marked as duplicates (same content as an earlier file) are skipped.
+    """
+    from src.exporting.ofx import OFXWriter
+
+    frames: Dict[str, List[pd.DataFrame]] = {}
+    accounts: Dict[str, Dict[str, str]] = {}
+    for record in records:
+        if not record['transactions'] or record.get('duplicate_of'):
+            continue
+        key = account_key(record)
+        df = pd.DataFrame(record['transactions'])
+        df['source_file'] = record['file']
+        frames.setdefault(key, []).append(df)
+        accounts.setdefault(key, {'bank_id': record['bank_id'], 'account': record['account']})
+
+    outputs: Dict[str, List[str]] = {}
+    freq = PERIODS[period]
+    for key, dfs in frames.items():
+        merged = pd.concat(dfs, ignore_index=True)
+        merged['date'] = pd.to_datetime(merged['date'])
+        merged = merged.sort_values('date', kind='stable')
+        groups = merged.groupby(merged['date'].dt.to_period(freq)) if freq else [('completo', merged)]
+
+        target = os.path.join(out_dir, key)
+        os.makedirs(target, exist_ok=True)
+        writer = OFXWriter(bank_id=accounts[key]['bank_id'] or "000", acct_id=accounts[key]['account'] or "00000")
+        for label, group in groups:
+            path = os.path.join(target, f"{label}.ofx")
+            partial = f"{path}.partial"
+            with open(partial, 'w', encoding='utf-8') as f:
+                f.writelines(writer.generate_stream(group))
+            os.replace(partial, path)
+            for source_file in group['source_file'].unique():
+                outputs.setdefault(source_file, []).append(os.path.relpath(path, out_dir))
+    return outputs
+
+
+def write_audit(records: List[Dict[str, Any]], outputs: Dict[str, List[str]], out_dir: str) -> List[Dict[str, Any]]:
+    """Write audit.json and audit.csv (one row per input file, input order)."""
+    from src.common.banks import get_bank_name
+
+    rows = []
+    for record in records:
+        row = {k: v for k, v in record.items() if k not in ('transactions', 'folder', 'branch', 'sha256')}
+        row['bank'] = get_bank_name(record['bank_id']) if record['bank_id'] else "Não Detectado"
+        row['ofx_files'] = outputs.get(record['file'], [])
+        rows.append(row)
+
+    with open(os.path.join(out_dir, 'audit.json'), 'w', encoding='utf-8') as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2, default=str)
+    with open(os.path.join(out_dir, 'audit.csv'), 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=AUDIT_FIELDS, extrasaction='ignore', delimiter=';')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, 'ofx_files': ' | '.join(row['ofx_files'])})
+    return rows
+
+
+def convert(
+    input_path: str,
+    out_dir: str,
+    workers: int = 1,
+    period: str = 'month',
+    layouts_dir: str = DEFAULT_LAYOUTS_DIR,
+) -> List[Dict[str, Any]]:
+    """Convert every statement under `input_path`; returns the audit rows."""
+    sources = find_statements(input_path)
+    input_root = input_path if os.path.isdir(input_path) else ''
+    os.makedirs(out_dir, exist_ok=True)
+    print(f"{len(sources)} PDF files found, {workers} workers")
+
+    by_label = {}
+    for done, record in enumerate(_convert_all(sources, input_root, os.path.abspath(layouts_dir), workers), 1):
+        by_label[record['file']] = record
+        print(f"[{done}/{len(sources)}] {record['file']}: {record['status']} ({record['tx_count']} transactions)")
+
+    records = [by_label[source.label] for source in sources]
+    mark_duplicates(records)
+    outputs = write_ofx_files(records, out_dir, period)
+    return write_audit(records, outputs, out_dir)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert bank statement PDFs to OFX in bulk.")
+    parser.add_argument("input", help="Directory (searched recursively) or ZIP file with PDFs")
+    parser.add_argument("--out", default=os.path.join("output", "ofx"), help="Output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parallel files")
+    parser.add_argument("--period", choices=sorted(PERIODS), default="month", help="One OFX per account and period")
+    parser.add_argument("--layouts", default=DEFAULT_LAYOUTS_DIR, help="Layouts directory")
+    parser.add_argument("--log-file", default=None, help="JSON log file (default: console only)")
+    args = parser.parse_args(argv)
+
+    # Synchronous logging: worker processes do not inherit the listener thread
+    setup_logging(log_file=args.log_file, async_logging=False)
+
+    try:
+        rows = convert(args.input, args.out, workers=args.workers, period=args.period, layouts_dir=args.layouts)
+    except (OSError, ValueError, zipfile.BadZipFile) as e:
+        print(f"Invalid input: {e}", file=sys.stderr)
+        return 2
+
+    counts = pd.Series([r['status'] for r in rows], dtype=object).value_counts().to_dict()
+    ofx_count = len({path for r in rows for path in r['ofx_files']})
+    print(f"Done: {counts.get('success', 0)} ok, {counts.get('warning', 0)} warnings, "
+          f"{counts.get('error', 0)} errors; {ofx_count} OFX files. Report: {os.path.join(args.out, 'audit.csv')}")
+    return 1 if counts.get('error') else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,17 @@
 """
 Activity Logger for FastAPI Architecture
 
-Records user activities for auditing and analytics in JSONL format.
-Integrated with structured logging system.
+Records user activities for auditing and analytics in an indexed SQLite store
+(see `src.common.activity_store`). Integrated with structured logging system.
 """
-import json
+import atexit
+import os
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Any, List, Optional, Dict
+from src.common.activity_store import ActivityStore
 from src.common.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -15,16 +19,49 @@ logger = get_logger(__name__)
 # Default log directory relative to project root (assuming we are in src/common)
 LOG_DIR = Path(__file__).parent.parent.parent / "logs" / "activities"
 
+# Buffered entries are written when this many are pending...
+FLUSH_BATCH_SIZE = 200
+# ...or at least this often (seconds)
+FLUSH_INTERVAL = 2.0
+# Entries older than this are deleted (checked once a day)
+RETENTION_DAYS = int(os.getenv("ACTIVITY_RETENTION_DAYS", "730"))
+
 class ActivityLogger:
     """
-    Logs user activities to JSON files.
+    Logs user activities to a SQLite store.
     
-    Logs are stored in logs/activities/session_{date}.jsonl
+    Entries are buffered in memory and written in batches by a background
+    thread, so `log()` does no I/O. The store lives in
+    logs/activities/activities.db; legacy activity_{date}.jsonl files found
+    there are imported once when the store is empty.
     """
     
-    def __init__(self, log_dir: Optional[Path] = None):
+    def __init__(
+        self,
+        log_dir: Optional[Path] = None,
+        db_path: Optional[Path] = None,
+        retention_days: int = RETENTION_DAYS,
+    ):
         self.log_dir = log_dir or LOG_DIR
         self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.store = ActivityStore(db_path or self.log_dir / "activities.db")
+        self.retention_days = retention_days
+        
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._last_retention = 0.0
+        
+        if self.store.count() == 0:
+            legacy = sorted(self.log_dir.glob("activity_*.jsonl"))
+            if legacy:
+                imported = self.store.import_jsonl(legacy)
+                logger.info(f"Imported {imported} legacy activity entries", files=len(legacy))
+        
+        self._thread = threading.Thread(target=self._run, name="activity-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
     
     def log(
         self, 
@@ -58,14 +95,55 @@ class ActivityLogger:
             activity_details=details or {}
         )
         
-        # Use a daily log file for general activities
-        log_file = self.log_dir / f"activity_{datetime.now().strftime('%Y-%m-%d')}.jsonl"
-        
+        # Buffer only; the writer thread persists it
+        with self._lock:
+            self._buffer.append(entry)
+            pending = len(self._buffer)
+        if pending >= FLUSH_BATCH_SIZE:
+            self._wakeup.set()
+    
+    def flush(self) -> int:
+        """Write buffered entries now. Returns how many were written."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
         try:
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            return self.store.insert_many(batch)
         except Exception as e:
-            logger.error(f"Failed to log activity: {e}", exc_info=True)
+            logger.error(f"Failed to log activity: {e}", exc_info=True, dropped=len(batch))
+            return 0
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self.flush()
+            if time.time() - self._last_retention >= 24 * 60 * 60:
+                self._last_retention = time.time()
+                try:
+                    self.store.apply_retention(self.retention_days)
+                except Exception as e:
+                    logger.error(f"Activity retention failed: {e}", exc_info=True)
+    
+    def close(self):
+        """Stop the writer thread and write what is still buffered."""
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+    
+    def query(self, **filters) -> List[Dict[str, Any]]:
+        """
+        Search activities (see ActivityStore.query): user, category, start,
+        end, text, limit, offset. Pending entries are flushed first.
+        """
+        self.flush()
+        return self.store.query(**filters)
+    
+    def count(self, **filters) -> int:
+        self.flush()
+        return self.store.count(**filters)
 
 # Global instance
 _activity_logger = None
@@ -0,0 +1,202 @@
+"""
+Activity Store
+
+SQLite storage for the activity log (see `src.common.activity_log`).
+
+- `activities` rows carry timestamp (ISO text, sorts chronologically), user,
+  category, action and details (JSON), indexed by timestamp, (user,
+  timestamp) and (category, timestamp);
+- `activities_fts` is an FTS5 index over action and details, kept in sync by
+  triggers, for free-text audit searches;
+- writes come in batches (one transaction per flush), and a retention policy
+  deletes old rows and compacts the file.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.common.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS activities (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    user TEXT NOT NULL,
+    category TEXT NOT NULL,
+    action TEXT NOT NULL,
+    details TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_activities_timestamp ON activities(timestamp);
+CREATE INDEX IF NOT EXISTS idx_activities_user ON activities(user, timestamp);
+CREATE INDEX IF NOT EXISTS idx_activities_category ON activities(category, timestamp);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS activities_fts USING fts5(
+    action, details, content='activities', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS activities_ai AFTER INSERT ON activities BEGIN
+    INSERT INTO activities_fts(rowid, action, details) VALUES (new.id, new.action, new.details);
+END;
+CREATE TRIGGER IF NOT EXISTS activities_ad AFTER DELETE ON activities BEGIN
+    INSERT INTO activities_fts(activities_fts, rowid, action, details)
+    VALUES ('delete', old.id, old.action, old.details);
+END;
+"""
+
+TimeBound = Optional[Union[datetime, str]]
+
+
+def _fts_query(text: str) -> str:
+    """Free text -> FTS5 query matching all terms (quoted, so no FTS syntax leaks in)."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+class ActivityStore:
+    """
+    Indexed activity log in a single SQLite file (WAL, one connection per thread).
+    """
+
+    def __init__(self, db_path: Union[str, Path]):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Database created without incremental vacuum: the mode only
+            # takes effect after a full VACUUM
+            conn.execute("VACUUM")
+        conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread (sqlite3 connections are not thread-safe)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            # Before anything creates the file, or auto_vacuum stays off
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -- Writing -------------------------------------------------------------
+
+    def insert_many(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Insert activity entries (timestamp, user, category, action, details) in one transaction."""
+        rows = [
+            (
+                e["timestamp"],
+                e.get("user", "system"),
+                e.get("category", "general"),
+                e["action"],
+                json.dumps(e.get("details") or {}, ensure_ascii=False, default=str),
+            )
+            for e in entries
+        ]
+        if not rows:
+            return 0
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO activities (timestamp, user, category, action, details) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def import_jsonl(self, paths: Iterable[Union[str, Path]]) -> int:
+        """Load legacy activity_*.jsonl files."""
+        imported = 0
+        for path in paths:
+            entries = []
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+            imported += self.insert_many(e for e in entries if "timestamp" in e and "action" in e)
+        return imported
+
+    # -- Queries -------------------------------------------------------------
+
+    @staticmethod
+    def _where(
+        user: Optional[str], category: Optional[str], start: TimeBound, end: TimeBound, text: Optional[str]
+    ) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        if user is not None:
+            clauses.append("user = ?")
+            params.append(user)
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start.isoformat() if isinstance(start, datetime) else start)
+        if end is not None:
+            clauses.append("timestamp < ?")
+            params.append(end.isoformat() if isinstance(end, datetime) else end)
+        if text:
+            clauses.append("id IN (SELECT rowid FROM activities_fts WHERE activities_fts MATCH ?)")
+            params.append(_fts_query(text))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(
+        self,
+        user: Optional[str] = None,
+        category: Optional[str] = None,
+        start: TimeBound = None,
+        end: TimeBound = None,
+        text: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Activities matching all given filters, newest first.
+
+        `start` is inclusive and `end` exclusive; `text` searches action and
+        details (all terms must appear, accents ignored).
+        """
+        where, params = self._where(user, category, start, end, text)
+        rows = self._conn().execute(
+            f"SELECT timestamp, user, category, action, details FROM activities{where} "
+            f"ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        return [{**dict(row), "details": json.loads(row["details"])} for row in rows]
+
+    def count(
+        self,
+        user: Optional[str] = None,
+        category: Optional[str] = None,
+        start: TimeBound = None,
+        end: TimeBound = None,
+        text: Optional[str] = None,
+    ) -> int:
+        where, params = self._where(user, category, start, end, text)
+        return self._conn().execute(f"SELECT COUNT(*) FROM activities{where}", params).fetchone()[0]
+
+    # -- Retention -----------------------------------------------------------
+
+    def apply_retention(self, retention_days: int) -> int:
+        """Delete activities older than `retention_days` and compact the store."""
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        conn = self._conn()
+        deleted = conn.execute("DELETE FROM activities WHERE timestamp < ?", (cutoff,)).rowcount
+        if deleted:
+            # Merge FTS segments and give freed pages back to the filesystem
+            conn.execute("INSERT INTO activities_fts(activities_fts) VALUES ('optimize')")
+            conn.execute("PRAGMA incremental_vacuum")
+            logger.info(f"Activity retention removed {deleted} entries", retention_days=retention_days)
+        return deleted
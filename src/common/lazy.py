@@ -0,0 +1,69 @@
+"""
+Lazy Imports
+
+Deferred loading for modules that pull heavy dependencies (pdfplumber, OCR,
+Gemini, report writers), so importing the API does not load every parser.
+
+Targets are "module:attribute" strings (module may be relative to `package`);
+they are imported on first use and cached.
+"""
+import importlib
+import sys
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional
+
+
+def resolve(target: str, package: Optional[str] = None) -> Any:
+    """Import "module:attribute" (or just "module") and return it."""
+    module_name, _, attribute = target.partition(":")
+    module = importlib.import_module(module_name, package)
+    return getattr(module, attribute) if attribute else module
+
+
+class LazyRegistry(Mapping):
+    """
+    Read-only mapping of keys to import targets, resolved on first lookup.
+
+    Behaves like the plain dict it replaces (`get`, `in`, iteration over
+    keys) without importing the modules behind the other keys.
+    """
+
+    def __init__(self, targets: Dict[str, str], package: Optional[str] = None):
+        self._targets = dict(targets)
+        self._package = package
+        self._loaded: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._loaded:
+            self._loaded[key] = resolve(self._targets[key], self._package)
+        return self._loaded[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._targets
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._targets)
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def load_all(self) -> None:
+        """Import every target now (warm-up)."""
+        for key in self._targets:
+            self[key]
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Callable[[str], Any]:
+    """
+    Module-level `__getattr__` (PEP 562) for a package re-exporting `exports`.
+
+    Usage in a package __init__:
+        __getattr__ = lazy_exports(__name__, {'Name': '.module:Name'})
+    """
+    def __getattr__(name: str) -> Any:
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = resolve(exports[name], package)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    return __getattr__
@@ -1,14 +1,27 @@
 import logging
+import logging.handlers
+import atexit
+import gzip
 import json
+import multiprocessing
 import os
+import queue
+import random
+import shutil
+import threading
+import time
 import uuid
 import datetime
 import traceback
-from typing import Any, Dict, Optional
-from threading import local
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
 
-# Thread-local storage for context (like request_id)
-_context = local()
+# Request context (like request_id). A ContextVar follows the request across
+# awaits and into run_in_threadpool, where a threading.local would not.
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Records are written in batches of up to this many by the background listener
+LOG_BATCH_SIZE = 500
 
 class JSONFormatter(logging.Formatter):
     """
@@ -23,24 +36,292 @@ class JSONFormatter(logging.Formatter):
             "module": record.module,
             "function": record.funcName,
             "line": record.lineno,
-            "request_id": getattr(_context, "request_id", "GLOBAL"),
+            # Captured when the record was queued (see ContextQueueHandler)
+            "request_id": getattr(record, "request_id", None) or _request_id.get() or "GLOBAL",
         }
         
         # Add extra fields if they exist
         if hasattr(record, "extra_fields") and isinstance(record.extra_fields, dict):
             log_data.update(record.extra_fields)
             
-        # Add exception info if present
+        # Add exception info if present (formatted from the record, so it also
+        # works off the thread that raised)
         if record.exc_info:
-            log_data["exception"] = self.formatException(record.exc_info)
-            log_data["stack_trace"] = traceback.format_exc()
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+            log_data["exception"] = "".join(traceback.format_exception_only(*record.exc_info[:2])).strip()
+            log_data["stack_trace"] = record.exc_text
 
         return json.dumps(log_data, ensure_ascii=False)
 
-def setup_logging(log_level: int = logging.INFO, log_file: Optional[str] = "logs/app.log"):
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the records below WARNING for configured loggers.
+
+    Rates are matched by logger name prefix (longest wins), e.g.
+    {"parse.timing": 0.1} keeps ~10% of parse.timing (and children) DEBUG/INFO
+    records. Warnings and errors are never sampled out.
+    """
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = dict(sorted(rates.items(), key=lambda kv: len(kv[0]), reverse=True))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates.items():
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return random.random() < rate
+        return True
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that only snapshots the record on the calling thread.
+
+    The request id and the rendered message are captured here; JSON encoding,
+    exception formatting and I/O happen in the listener thread. The queue is
+    in-process, so exc_info is kept instead of being pre-formatted.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = _request_id.get() or "GLOBAL"
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a request on logging; drop and count instead
+            _dropped_records[0] += 1
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    File handler rotating on size or age, compressing rotated files (.gz).
+
+    Receives whole batches from the listener: one write and one rollover check
+    per batch instead of per record.
+    """
+    def __init__(self, filename: str, max_bytes: int = 0, backup_count: int = 5,
+                 rotate_seconds: float = 0, encoding: str = "utf-8"):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.rotate_seconds = rotate_seconds
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._compress
+        self._opened_at = time.time()
+
+    @staticmethod
+    def _compress(source: str, dest: str) -> None:
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self._opened_at = time.time()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        # Per-record path (synchronous logging)
+        return self._should_rollover(len(self.format(record)) + 1)
+
+    def _should_rollover(self, pending: int) -> bool:
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes > 0 and self.stream.tell() + pending >= self.maxBytes and self.stream.tell() > 0:
+            return True
+        return self.rotate_seconds > 0 and time.time() - self._opened_at >= self.rotate_seconds
+
+    def emit_batch(self, lines: List[str]) -> None:
+        data = "\n".join(lines) + "\n"
+        self.acquire()
+        try:
+            if self._should_rollover(len(data.encode(self.encoding or "utf-8"))):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(data)
+            self.stream.flush()
+        finally:
+            self.release()
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """StreamHandler writing a whole batch with a single write/flush."""
+    def emit_batch(self, lines: List[str]) -> None:
+        self.acquire()
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.flush()
+        finally:
+            self.release()
+
+
+class BatchingQueueListener:
+    """
+    Background thread draining the log queue in batches.
+
+    Blocks for the first record, then takes whatever else is queued (up to
+    LOG_BATCH_SIZE): under load records pile up while the previous batch is
+    written, so batches grow with traffic. Each record is formatted once per
+    handler and the lines are handed over in one call.
+    """
+    _sentinel = None
+
+    def __init__(self, log_queue: queue.Queue, handlers: List[logging.Handler], batch_size: int = LOG_BATCH_SIZE):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._monitor, name="log-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write everything queued so far and stop the thread."""
+        if self._thread is None:
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join()
+        self._thread = None
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Block until the records queued so far have been written."""
+        deadline = time.time() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks and time.time() < deadline:
+                self.queue.all_tasks_done.wait(deadline - time.time())
+
+    def _monitor(self) -> None:
+        while True:
+            record = self.queue.get()
+            batch, stop = [], record is self._sentinel
+            if not stop:
+                batch.append(record)
+            while len(batch) < self.batch_size and not stop:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._sentinel:
+                    stop = True
+                else:
+                    batch.append(record)
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + stop):
+                self.queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch: List[logging.LogRecord]) -> None:
+        for handler in self.handlers:
+            records = [r for r in batch if r.levelno >= handler.level]
+            if not records:
+                continue
+            try:
+                if hasattr(handler, "emit_batch"):
+                    handler.emit_batch([handler.format(r) for r in records])
+                else:
+                    for r in records:
+                        handler.handle(r)
+            except Exception:
+                handler.handleError(records[0])
+
+
+# Active listener (one per process) and records dropped on a full queue
+_listener: Optional[BatchingQueueListener] = None
+_dropped_records = [0]
+
+
+def _parse_sample_rates(value: str) -> Dict[str, float]:
+    """'parse.timing=0.1,api.main=0.5' -> {'parse.timing': 0.1, 'api.main': 0.5}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        try:
+            rates[name.strip()] = float(rate)
+        except ValueError:
+            continue
+    return rates
+
+
+def _process_log_file(log_file: str) -> str:
+    """'logs/app.log' -> 'logs/app.<pid>.log' in a worker (child) process."""
+    if multiprocessing.parent_process() is None:
+        return log_file
+    root, ext = os.path.splitext(log_file)
+    return f"{root}.{os.getpid()}{ext}"
+
+
+# Default of setup_logging(log_file=...): read LOG_FILE when called
+_LOG_FILE_FROM_ENV: Any = object()
+
+
+def _env_number(name: str, default: float, cast: type, invalid: List[str]) -> Any:
+    """Numeric environment variable; `default` (and a note in `invalid`) if it does not parse."""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return cast(default)
+    try:
+        return cast(value)
+    except ValueError:
+        invalid.append(f"{name}={value!r}")
+        return cast(default)
+
+
+def setup_logging(
+    log_level: int = logging.INFO,
+    log_file: Optional[str] = _LOG_FILE_FROM_ENV,
+    async_logging: Optional[bool] = None,
+    max_bytes: Optional[int] = None,
+    backup_count: Optional[int] = None,
+    rotate_seconds: Optional[float] = None,
+    sample_rates: Optional[Dict[str, float]] = None,
+    per_process_file: Optional[bool] = None,
+):
     """
     Configure global logging settings.
+
+    With async_logging (default) the root logger only has a QueueHandler; a
+    background listener writes batches to the console and to a size/time
+    rotated, gzip-compressed JSON file. Per-logger sampling of sub-WARNING
+    records comes from `sample_rates` or LOG_SAMPLE_RATES.
+
+    Arguments left out are read from the environment when this is called:
+    LOG_FILE (default logs/app.log; empty for console only), LOG_ASYNC,
+    LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_SECONDS and API_WORKERS.
+    Numeric values that do not parse fall back to the default with a warning.
+    Pass log_file=None for console only.
+
+    Rotation renames the file, which is only safe with a single writer. With
+    per_process_file (default when API_WORKERS > 1) each worker process
+    writes its own file, suffixed with its pid (logs/app.<pid>.log); the
+    supervisor keeps logs/app.log. Files of stopped workers are not removed.
     """
+    global _listener
+
+    invalid: List[str] = []
+    if log_file is _LOG_FILE_FROM_ENV:
+        log_file = os.getenv("LOG_FILE", "logs/app.log") or None
+    if async_logging is None:
+        async_logging = os.getenv("LOG_ASYNC", "1") != "0"
+    if max_bytes is None:
+        max_bytes = _env_number("LOG_MAX_BYTES", 10 * 1024 * 1024, int, invalid)
+    if backup_count is None:
+        backup_count = _env_number("LOG_BACKUP_COUNT", 5, int, invalid)
+    if rotate_seconds is None:
+        rotate_seconds = _env_number("LOG_ROTATE_SECONDS", 24 * 60 * 60, float, invalid)
+    if per_process_file is None:
+        per_process_file = _env_number("API_WORKERS", 1, int, invalid) > 1
+    queue_size = _env_number("LOG_QUEUE_SIZE", 100000, int, invalid)
+
+    if log_file and per_process_file:
+        log_file = _process_log_file(log_file)
+
     # Create logs directory if it doesn't exist
     if log_file:
         os.makedirs(os.path.dirname(log_file), exist_ok=True)
@@ -48,30 +329,78 @@ def setup_logging(log_level: int = logging.INFO, log_file: Optional[str] = "logs
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
 
-    # Clear existing handlers
+    # Clear existing handlers (and flush a previous listener)
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
     if root_logger.handlers:
+        for handler in root_logger.handlers:
+            handler.close()
         root_logger.handlers.clear()
 
     # Console Handler (Human-readable during dev, but still structured if needed)
-    console_handler = logging.StreamHandler()
+    console_handler = BatchStreamHandler()
     console_handler.setFormatter(JSONFormatter())
-    root_logger.addHandler(console_handler)
+    handlers: List[logging.Handler] = [console_handler]
 
-    # File Handler (JSON)
+    # File Handler (JSON, rotated and compressed)
     if log_file:
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler = CompressingRotatingFileHandler(
+            log_file, max_bytes=max_bytes, backup_count=backup_count, rotate_seconds=rotate_seconds
+        )
         file_handler.setFormatter(JSONFormatter())
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    if sample_rates is None:
+        sample_rates = _parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", ""))
+
+    if async_logging:
+        log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        queue_handler = ContextQueueHandler(log_queue)
+        if sample_rates:
+            queue_handler.addFilter(SamplingFilter(sample_rates))
+        root_logger.addHandler(queue_handler)
+        _listener = BatchingQueueListener(log_queue, handlers)
+        _listener.start()
+    else:
+        for handler in handlers:
+            if sample_rates:
+                handler.addFilter(SamplingFilter(sample_rates))
+            root_logger.addHandler(handler)
 
     logging.info("Logging infrastructure initialized.", extra={"extra_fields": {"status": "ready"}})
+    for setting in invalid:
+        logging.warning(f"Ignoring invalid logging setting {setting}; using the default")
+
+
+def flush_logging(timeout: float = 5.0) -> None:
+    """Wait until queued log records are written (no-op for sync logging)."""
+    if _listener is not None:
+        _listener.flush(timeout)
+
+
+def shutdown_logging() -> None:
+    """Write pending records and stop the background listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def get_dropped_records() -> int:
+    """Records dropped because the log queue was full."""
+    return _dropped_records[0]
 
 def set_request_id(request_id: str):
     """Set the current request ID in context."""
-    _context.request_id = request_id
+    _request_id.set(request_id)
 
 def get_request_id() -> str:
     """Get the current request ID from context."""
-    return getattr(_context, "request_id", str(uuid.uuid4()))
+    return _request_id.get() or str(uuid.uuid4())
 
 class AILoggerAdapter(logging.LoggerAdapter):
     """
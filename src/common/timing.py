@@ -0,0 +1,262 @@
+"""
+Parse Timing Instrumentation
+
+Lightweight timing spans for the parsing stages (layout detection, text
+extraction, regex matching, dedup, DataFrame construction...).
+
+A `StageTimer` is bound to the current context while a file is processed, so
+nested code (`BaseParser.parse_pdf`, `ParserFacade.parse`) adds its spans to
+the same report instead of emitting one log line per stage. When the outermost
+timer finishes, the report is emitted as structured fields through
+`src.common.logging_config` and aggregated per parser class and layout.
+"""
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from src.common.logging_config import get_logger
+from src.common.metrics import PARSE_DURATION, PARSE_THROUGHPUT, TRANSACTIONS_PARSED
+
+logger = get_logger("parse.timing")
+
+# Active timer for the current context (same approach as request_id)
+_active_timer: ContextVar[Optional["StageTimer"]] = ContextVar("stage_timer", default=None)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+class StageTimer:
+    """
+    Collects named timing spans and a per-page breakdown for one parsed file.
+
+    Usage:
+        with StageTimer.activate(file_name="extrato.pdf") as timer:
+            with timer.stage("layout_detection"):
+                ...
+            timer.set_context(parser="BBMonthlyPDFParser", layout="Banco do Brasil")
+    """
+
+    def __init__(self, **context):
+        self.context: Dict[str, Any] = {k: v for k, v in context.items() if v is not None}
+        self.stages: Dict[str, float] = {}
+        self.pages: List[Dict[str, Any]] = []
+        self.tx_count: Optional[int] = None
+        self._start = time.perf_counter()
+
+    @classmethod
+    def current(cls) -> Optional["StageTimer"]:
+        """Return the timer bound to the current context, if any."""
+        return _active_timer.get()
+
+    @classmethod
+    @contextmanager
+    def activate(cls, **context):
+        """
+        Bind a timer to the current context for the duration of the block.
+
+        If a timer is already active, it is reused (its context is enriched)
+        and the outer owner is responsible for emitting the report.
+        """
+        active = cls.current()
+        if active is not None:
+            active.set_context(**{k: v for k, v in context.items() if k not in active.context})
+            yield active
+            return
+
+        timer = cls(**context)
+        token = _active_timer.set(timer)
+        try:
+            yield timer
+        finally:
+            _active_timer.reset(token)
+            timer.finish()
+
+    def set_context(self, **context) -> None:
+        """Attach identifying fields (parser, layout, file_name...)."""
+        self.context.update({k: v for k, v in context.items() if v is not None})
+
+    def set_tx_count(self, count: int) -> None:
+        """
+        Number of transactions produced (the last call wins: outer callers
+        set it after the code they wrap, so their count is the one reported).
+        """
+        self.tx_count = count
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block and accumulate it under `name` (repeated stages add up)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_page(self, page_number: int, tx_count: int = 0, **durations: float) -> None:
+        """Record the breakdown for a single page (durations in seconds)."""
+        entry = {"page": page_number, "tx_count": tx_count}
+        entry.update({f"{name}_ms": _ms(seconds) for name, seconds in durations.items()})
+        self.pages.append(entry)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def report(self) -> Dict[str, Any]:
+        """Structured report (milliseconds) suitable for `extra_fields`."""
+        return {
+            **self.context,
+            "total_ms": _ms(self.elapsed),
+            "tx_count": self.tx_count,
+            "stages_ms": {k: _ms(v) for k, v in self.stages.items()},
+            "pages": self.pages,
+        }
+
+    def finish(self) -> Dict[str, Any]:
+        """Emit the report and feed the aggregated statistics."""
+        report = self.report()
+        parser = self.context.get("parser", "unknown")
+        elapsed = self.elapsed
+        parse_timing_stats.record(
+            parser=parser,
+            layout=self.context.get("layout", "unknown"),
+            total_s=elapsed,
+            stages=self.stages,
+            page_count=len(self.pages),
+        )
+        PARSE_DURATION.observe(elapsed, parser=parser)
+        if self.tx_count:
+            TRANSACTIONS_PARSED.inc(self.tx_count, parser=parser)
+            if elapsed > 0:
+                PARSE_THROUGHPUT.set(round(self.tx_count / elapsed, 2), parser=parser)
+        logger.info(
+            f"Parse timing: {report['total_ms']}ms",
+            parse_timing=report,
+        )
+        return report
+
+
+class _TimedPage:
+    """
+    Proxy around a pdfplumber page that times text and word extraction.
+
+    Bank parsers call `extract_text()` / `extract_words()` directly, so the
+    proxy lets `BaseParser.parse_pdf` split each page into pdfplumber time and
+    parser (regex/matching) time without touching every parser. The default
+    `extract_text()` is cached: routing and the sub-layout extractor both
+    read it. `crop()` / `within_bbox()` return proxies too.
+    """
+
+    def __init__(self, page, owner: "_TimedPage" = None):
+        self._page = page
+        self._text = None
+        self._crops = {}
+        # Cropped regions add their time to the page they were cut from
+        self._owner = owner or self
+        self.text_s = 0.0
+        self.words_s = 0.0
+
+    def extract_text(self, *args, **kwargs):
+        if not args and not kwargs:
+            if self._text is None:
+                self._text = self._timed_text()
+            return self._text
+        return self._timed_text(*args, **kwargs)
+
+    def _timed_text(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._page.extract_text(*args, **kwargs)
+        finally:
+            self._owner.text_s += time.perf_counter() - start
+
+    def extract_words(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._page.extract_words(*args, **kwargs)
+        finally:
+            self._owner.words_s += time.perf_counter() - start
+
+    def crop(self, bbox, *args, **kwargs):
+        return self._region('crop', bbox, *args, **kwargs)
+
+    def within_bbox(self, bbox, *args, **kwargs):
+        return self._region('within_bbox', bbox, *args, **kwargs)
+
+    def _region(self, method, bbox, *args, **kwargs):
+        # Cached, so a region read twice (routing, extraction) is laid out once
+        key = (method, tuple(bbox), args, tuple(sorted(kwargs.items())))
+        if key not in self._crops:
+            self._crops[key] = _TimedPage(getattr(self._page, method)(bbox, *args, **kwargs), self._owner)
+        return self._crops[key]
+
+    def __getattr__(self, name):
+        return getattr(self._page, name)
+
+
+class ParseTimingStats:
+    """
+    Thread-safe aggregation of parse timings per (parser, layout).
+
+    Keeps count, total and max per stage so slow banks can be spotted from a
+    single snapshot instead of scanning every log line.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[tuple, Dict[str, Any]] = {}
+
+    def record(self, parser: str, layout: str, total_s: float, stages: Dict[str, float], page_count: int = 0) -> None:
+        key = (parser, layout)
+        with self._lock:
+            entry = self._stats.setdefault(key, {
+                "count": 0, "pages": 0, "total_s": 0.0, "max_s": 0.0, "stages": {}
+            })
+            entry["count"] += 1
+            entry["pages"] += page_count
+            entry["total_s"] += total_s
+            entry["max_s"] = max(entry["max_s"], total_s)
+            for name, seconds in stages.items():
+                stage = entry["stages"].setdefault(name, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+                stage["count"] += 1
+                stage["total_s"] += seconds
+                stage["max_s"] = max(stage["max_s"], seconds)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Aggregated timings, slowest average first."""
+        with self._lock:
+            rows = []
+            for (parser, layout), entry in self._stats.items():
+                count = entry["count"] or 1
+                rows.append({
+                    "parser": parser,
+                    "layout": layout,
+                    "count": entry["count"],
+                    "pages": entry["pages"],
+                    "avg_ms": _ms(entry["total_s"] / count),
+                    "max_ms": _ms(entry["max_s"]),
+                    "total_ms": _ms(entry["total_s"]),
+                    "stages": {
+                        name: {
+                            "avg_ms": _ms(s["total_s"] / (s["count"] or 1)),
+                            "max_ms": _ms(s["max_s"]),
+                            "total_ms": _ms(s["total_s"]),
+                        }
+                        for name, s in entry["stages"].items()
+                    },
+                })
+        return sorted(rows, key=lambda r: r["avg_ms"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+# Global aggregation instance
+parse_timing_stats = ParseTimingStats()
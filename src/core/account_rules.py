@@ -0,0 +1,244 @@
+"""
+Account Assignment Rules
+
+Per-company rules mapping bank-only transactions to the debit/credit accounts
+and participants of the lançamentos export.
+
+A rule matches on any combination of:
+- description regex (case-insensitive)
+- amount sign ('debit' for outflows, 'credit' for inflows)
+- absolute amount range
+- source bank (substring of `bank_account`)
+
+Rules are evaluated in order and the first match wins. A rule set is compiled
+once into a single regex holding one empty marker group per pattern, so the
+whole description column is scanned in one pass (over distinct descriptions
+only) and the other conditions are NumPy masks over the frame. Patterns that
+cannot share a regex (backreferences, global inline flags, or a combination
+Python rejects, such as a group name used twice) are searched one by one.
+"""
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.common.logging_config import get_logger
+
+logger = get_logger("core.account_rules")
+
+# Fields a rule can assign (same names as the lançamentos edits)
+ASSIGNMENT_FIELDS = (
+    "conta_debito",
+    "participante_debito",
+    "conta_credito",
+    "participante_credito",
+    "documento",
+)
+
+VALID_SIGNS = (None, "debit", "credit")
+
+# Rule patterns are searched case-insensitively, `.` matching newlines too
+PATTERN_FLAGS = re.IGNORECASE | re.DOTALL
+
+# Backreferences are numbered per pattern and would point elsewhere once
+# combined; global flags such as "(?i)" are only valid at the start of a regex
+_SEPARATE_PATTERN = re.compile(r"\\[1-9]|\(\?P=|\(\?[aiLmsux]+\)")
+
+
+@dataclass
+class AccountRule:
+    """
+    One assignment rule.
+
+    Attributes:
+        name: Rule label shown with each assignment
+        pattern: Regex searched in the description (case-insensitive)
+        sign: 'debit' (amount < 0), 'credit' (amount > 0) or None for both
+        min_amount / max_amount: Bounds on the absolute amount (inclusive)
+        bank: Substring of the transaction's bank account (case-insensitive)
+        conta_debito ... documento: Values assigned; None keeps the default
+    """
+    name: str
+    pattern: Optional[str] = None
+    sign: Optional[str] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    bank: Optional[str] = None
+
+    conta_debito: Optional[str] = None
+    participante_debito: Optional[str] = None
+    conta_credito: Optional[str] = None
+    participante_credito: Optional[str] = None
+    documento: Optional[str] = None
+
+
+class AccountRuleSet:
+    """Ordered, compiled rule list applied column-wise to a transactions frame."""
+
+    def __init__(self, rules: List[AccountRule]):
+        self.rules = list(rules)
+        self._validate()
+
+        # One optional marker group per pattern rule: `(?=.*?PATTERN)` is a
+        # lookahead from the start of the text, so every rule gets checked in
+        # a single match() call and the marker group is set when it matches.
+        pattern_cols = [i for i, r in enumerate(self.rules) if r.pattern]
+        self._pattern_cols = [i for i in pattern_cols if not _SEPARATE_PATTERN.search(self.rules[i].pattern)]
+        self._matcher = None
+        if self._pattern_cols:
+            try:
+                self._matcher = re.compile(
+                    "".join(
+                        f"(?:(?=.*?(?:{self.rules[i].pattern}))(?P<_rule{i}>))?"
+                        for i in self._pattern_cols
+                    ),
+                    PATTERN_FLAGS,
+                )
+            except re.error:
+                self._pattern_cols = []
+        # Everything else is searched rule by rule
+        self._separate = [
+            (i, re.compile(self.rules[i].pattern, PATTERN_FLAGS))
+            for i in pattern_cols if i not in self._pattern_cols
+        ]
+
+        self._assignments = pd.DataFrame(
+            [[getattr(r, f) for f in ASSIGNMENT_FIELDS] for r in self.rules],
+            columns=list(ASSIGNMENT_FIELDS),
+            dtype=object,
+        )
+        self._assignments.insert(0, "rule", [r.name for r in self.rules])
+
+    @classmethod
+    def from_dicts(cls, data: List[Dict]) -> "AccountRuleSet":
+        known = {f.name for f in fields(AccountRule)}
+        return cls([AccountRule(**{k: v for k, v in d.items() if k in known}) for d in data])
+
+    def to_dicts(self) -> List[Dict]:
+        return [asdict(r) for r in self.rules]
+
+    def _validate(self) -> None:
+        for rule in self.rules:
+            if rule.sign not in VALID_SIGNS:
+                raise ValueError(f"Rule '{rule.name}': sign must be 'debit', 'credit' or empty")
+            if rule.pattern:
+                try:
+                    re.compile(rule.pattern, PATTERN_FLAGS)
+                except re.error as e:
+                    raise ValueError(f"Rule '{rule.name}': invalid pattern: {e}")
+
+    def _match_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """Boolean (rows x rules) matrix of rules whose conditions hold."""
+        n, k = len(df), len(self.rules)
+        matches = np.ones((n, k), dtype=bool)
+
+        if self._matcher is not None or self._separate:
+            # Scan each distinct description once and broadcast back by code
+            codes, uniques = pd.factorize(df["description"].astype(str))
+            texts = uniques.tolist()
+            # code -1 (missing description) indexes the all-False last row
+            if self._matcher is not None:
+                hits = np.zeros((len(uniques) + 1, len(self._pattern_cols)), dtype=bool)
+                names = [f"_rule{i}" for i in self._pattern_cols]
+                for row, text in enumerate(texts):
+                    found = self._matcher.match(text).groupdict()
+                    hits[row] = [found[name] is not None for name in names]
+                matches[:, self._pattern_cols] = hits[codes]
+            for j, regex in self._separate:
+                hits = np.array([regex.search(text) is not None for text in texts] + [False], dtype=bool)
+                matches[:, j] = hits[codes]
+
+        amounts = df["amount"].astype(float).to_numpy()
+        magnitudes = np.abs(amounts)
+        bank_accounts = (
+            df["bank_account"].fillna("").astype(str).str.upper()
+            if "bank_account" in df.columns else pd.Series("", index=df.index)
+        )
+        bank_masks: Dict[str, np.ndarray] = {}
+
+        for j, rule in enumerate(self.rules):
+            if rule.sign == "debit":
+                matches[:, j] &= amounts < 0
+            elif rule.sign == "credit":
+                matches[:, j] &= amounts > 0
+            if rule.min_amount is not None:
+                matches[:, j] &= magnitudes >= rule.min_amount
+            if rule.max_amount is not None:
+                matches[:, j] &= magnitudes <= rule.max_amount
+            if rule.bank:
+                key = rule.bank.upper()
+                if key not in bank_masks:
+                    bank_masks[key] = bank_accounts.str.contains(key, regex=False).to_numpy()
+                matches[:, j] &= bank_masks[key]
+
+        return matches
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Assignments for the rows matched by some rule.
+
+        Returns a frame indexed like `df` (matched rows only) with the winning
+        rule name and the ASSIGNMENT_FIELDS columns (None where the rule does
+        not set the field).
+        """
+        columns = ["rule"] + list(ASSIGNMENT_FIELDS)
+        if df.empty or not self.rules:
+            return pd.DataFrame(columns=columns)
+
+        matches = self._match_matrix(df)
+        matched = matches.any(axis=1)
+        # argmax returns the first True column: rule order is priority
+        winners = matches.argmax(axis=1)[matched]
+
+        result = self._assignments.iloc[winners]
+        result.index = df.index[matched]
+        return result
+
+
+class AccountRuleRepository:
+    """
+    Stores one JSON rule file per company and caches compiled rule sets.
+    """
+
+    def __init__(self, rules_dir: str = os.getenv("ACCOUNT_RULES_DIR", os.path.join("config", "account_rules"))):
+        self.rules_dir = rules_dir
+        self._cache: Dict[str, tuple] = {}
+
+    def _path(self, company: str) -> str:
+        # Sanitize company name for filename
+        safe_name = "".join(c for c in company if c.isalnum() or c in (' ', '-', '_')).strip()
+        safe_name = safe_name.replace(' ', '_').lower() or "default"
+        return os.path.join(self.rules_dir, f"{safe_name}.json")
+
+    def load(self, company: str) -> AccountRuleSet:
+        """Compiled rules for a company (empty set if none saved)."""
+        path = self._path(company)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return AccountRuleSet([])
+
+        cached = self._cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        rule_set = AccountRuleSet.from_dicts(data.get("rules", []))
+        self._cache[path] = (mtime, rule_set)
+        logger.debug(f"Loaded {len(rule_set.rules)} account rules", company=company)
+        return rule_set
+
+    def save(self, company: str, rule_set: AccountRuleSet) -> None:
+        os.makedirs(self.rules_dir, exist_ok=True)
+        path = self._path(company)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"company": company, "rules": rule_set.to_dicts()}, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._cache.pop(path, None)
+        logger.info(f"Saved {len(rule_set.rules)} account rules", company=company)
@@ -0,0 +1,351 @@
+"""
+Account Suggestion Index
+
+Suggests conta_debito / conta_credito for new bank transactions from the
+postings of finished lançamentos files (LancamentoExporter TXT format).
+
+Descriptions are normalized (accents removed, digit runs collapsed) and turned
+into character n-gram TF-IDF vectors kept in a SciPy CSR matrix, one row per
+distinct description. A batch of new descriptions is vectorized the same way
+and scored with one sparse product; the top-k cosine neighbours vote (weighted
+by similarity) for the account pair they were posted to most often.
+
+The index is incremental: `refresh()` only parses history files that are new
+or changed since the last call, and only descriptions never seen before add
+rows to the matrix. IDF weights and row norms are recomputed from the stored
+counts, which is a few NumPy passes over the non-zeros.
+"""
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.common.logging_config import get_logger
+
+logger = get_logger("core.account_suggestions")
+
+NGRAM_SIZE = 3
+DEFAULT_TOP_K = 5
+DEFAULT_MIN_SIMILARITY = 0.35
+
+# N-grams present in more than this share of descriptions carry almost no
+# signal but make the score matrix dense; they are dropped once the index
+# has enough rows for the share to mean something
+MAX_DOC_FREQ = 0.5
+MIN_ROWS_FOR_PRUNING = 100
+
+# Query rows scored per sparse product (bounds the score matrix size)
+QUERY_CHUNK_SIZE = 256
+
+_DIGITS = re.compile(r"\d+")
+_SPACES = re.compile(r"\s+")
+_AMOUNT = re.compile(r"-?\d+\.\d{2}$")
+
+
+def normalize_description(text: str) -> str:
+    """Uppercase, strip accents and collapse numbers (doc ids, dates, values) to '#'."""
+    text = unicodedata.normalize("NFD", str(text).upper())
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    text = _DIGITS.sub("#", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def _ngrams(text: str) -> List[str]:
+    padded = f" {text} "
+    return [padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)]
+
+
+def parse_lancamento_lines(content: str) -> pd.DataFrame:
+    """
+    Postings (description, conta_debito, conta_credito) from a lançamentos file.
+
+    Accepts the current layout
+        n,data,conta_debito,part_debito,conta_credito,part_credito,valor,,historico,DCTO,,documento
+    and the older one without participant columns
+        n,data,conta_debito,conta_credito,valor,,historico,DCTO,,documento
+    Historico may itself contain commas.
+    """
+    rows = []
+    for line in content.splitlines():
+        fields = line.split(",")
+        if len(fields) < 10 or fields[-3] != "DCTO":
+            continue
+        if _AMOUNT.match(fields[4]) and fields[5] == "":
+            debit, credit, head = fields[2], fields[3], 6
+        elif len(fields) >= 12 and _AMOUNT.match(fields[6]) and fields[7] == "":
+            debit, credit, head = fields[2], fields[4], 8
+        else:
+            continue
+        rows.append((",".join(fields[head:-3]), debit.strip(), credit.strip()))
+    return pd.DataFrame(rows, columns=["description", "conta_debito", "conta_credito"])
+
+
+def read_lancamento_file(path: str) -> pd.DataFrame:
+    with open(path, "rb") as f:
+        raw = f.read()
+    # Files written by the app are UTF-8; older exports are Windows-1252
+    try:
+        content = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        content = raw.decode("cp1252", errors="replace")
+    return parse_lancamento_lines(content)
+
+
+class AccountSuggestionIndex:
+    """
+    Character n-gram TF-IDF index over historical postings of one company.
+    """
+
+    def __init__(
+        self,
+        history_dir: str,
+        top_k: int = DEFAULT_TOP_K,
+        min_similarity: float = DEFAULT_MIN_SIMILARITY,
+    ):
+        self.history_dir = history_dir
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+
+        self._lock = threading.Lock()
+        self._vocab: Dict[str, int] = {}
+        self._rows: Dict[str, int] = {}  # normalized description -> row
+        self._descriptions: List[str] = []  # row -> original description
+        self._row_indices: List[np.ndarray] = []
+        self._row_counts: List[np.ndarray] = []
+        self._postings: Dict[str, pd.DataFrame] = {}  # source -> (row, debit, credit)
+        self._file_mtimes: Dict[str, float] = {}
+
+        self._dirty = True
+        self._matrix = None  # scipy.sparse.csr_matrix, built by _finalize
+        self._idf: Optional[np.ndarray] = None
+        self._active_rows = np.array([], dtype=np.int64)
+        self._best = pd.DataFrame(columns=["conta_debito", "conta_credito"])
+
+    # -- Building ------------------------------------------------------------
+
+    def refresh(self) -> int:
+        """Load history files that are new or changed; returns how many."""
+        if not os.path.isdir(self.history_dir):
+            return 0
+
+        loaded = 0
+        with self._lock:
+            paths = [
+                os.path.join(self.history_dir, fname)
+                for fname in sorted(os.listdir(self.history_dir))
+                if fname.lower().endswith(".txt")
+            ]
+            # Postings of deleted files stop voting
+            for path in set(self._file_mtimes) - set(paths):
+                del self._file_mtimes[path]
+                self._postings.pop(path, None)
+                self._dirty = True
+
+            for path in paths:
+                fname = os.path.basename(path)
+                try:
+                    mtime = os.path.getmtime(path)
+                    if self._file_mtimes.get(path) == mtime:
+                        continue
+                    postings = read_lancamento_file(path)
+                except OSError as e:
+                    logger.warning(f"Could not read history file {fname}: {e}")
+                    continue
+                self._add_postings(postings, source=path)
+                self._file_mtimes[path] = mtime
+                loaded += 1
+
+        if loaded:
+            logger.info(f"Loaded {loaded} lançamentos files into suggestion index", history_dir=self.history_dir)
+        return loaded
+
+    def add_postings(self, postings: pd.DataFrame, source: str) -> None:
+        """Add (or replace) the postings of one source (description, conta_debito, conta_credito)."""
+        with self._lock:
+            self._add_postings(postings, source)
+
+    def _add_postings(self, postings: pd.DataFrame, source: str) -> None:
+        rows = [self._row_for(desc) for desc in postings["description"].tolist()]
+        self._postings[source] = pd.DataFrame({
+            "row": np.asarray(rows, dtype=np.int64),
+            "conta_debito": postings["conta_debito"].to_numpy(dtype=object),
+            "conta_credito": postings["conta_credito"].to_numpy(dtype=object),
+        })
+        self._dirty = True
+
+    def _row_for(self, description: str) -> int:
+        key = normalize_description(description)
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._descriptions)
+            self._rows[key] = row
+            self._descriptions.append(description)
+            indices, counts = self._count_ngrams(key, grow=True)
+            self._row_indices.append(indices)
+            self._row_counts.append(counts)
+        return row
+
+    def _count_ngrams(self, normalized: str, grow: bool):
+        counts: Dict[int, int] = {}
+        for gram in _ngrams(normalized):
+            col = self._vocab.get(gram)
+            if col is None:
+                if not grow:
+                    continue
+                col = self._vocab[gram] = len(self._vocab)
+            counts[col] = counts.get(col, 0) + 1
+        return np.fromiter(counts.keys(), np.int64, len(counts)), np.fromiter(counts.values(), np.float64, len(counts))
+
+    def _finalize(self) -> None:
+        """Recompute IDF, row norms and the winning account pair per row."""
+        import scipy.sparse as sp  # deferred: only needed once history exists
+
+        n_rows, n_cols = len(self._descriptions), len(self._vocab)
+        if not self._postings or n_rows == 0:
+            self._matrix = None
+            self._dirty = False
+            return
+
+        lengths = np.fromiter((len(i) for i in self._row_indices), np.int64, n_rows)
+        indices = np.concatenate(self._row_indices)
+        counts = np.concatenate(self._row_counts)
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+
+        # Smoothed IDF (same formula as scikit-learn's TfidfVectorizer)
+        doc_freq = np.bincount(indices, minlength=n_cols)
+        self._idf = np.log((1 + n_rows) / (1 + doc_freq)) + 1.0
+        if n_rows >= MIN_ROWS_FOR_PRUNING:
+            self._idf[doc_freq > MAX_DOC_FREQ * n_rows] = 0.0
+        matrix = sp.csr_matrix((counts * self._idf[indices], indices, indptr), shape=(n_rows, n_cols))
+        matrix.eliminate_zeros()
+
+        # Most frequent account pair per description row
+        postings = pd.concat(self._postings.values(), ignore_index=True)
+        votes = postings.groupby(["row", "conta_debito", "conta_credito"]).size().rename("votes").reset_index()
+        best = votes.sort_values(["row", "votes"], ascending=[True, False], kind="stable").drop_duplicates("row")
+
+        # Only rows still backed by postings take part in the lookup
+        self._active_rows = best["row"].to_numpy()
+        self._best = best.set_index("row")[["conta_debito", "conta_credito"]]
+        # Stored transposed (features x rows) for the query @ matrix products
+        self._matrix = self._normalize_rows(matrix[self._active_rows]).T.tocsr()
+        self._dirty = False
+
+    @staticmethod
+    def _normalize_rows(matrix):
+        import scipy.sparse as sp
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sp.csr_matrix(sp.diags(1.0 / norms) @ matrix)
+
+    # -- Lookup --------------------------------------------------------------
+
+    def _top_k(self, scores, offset: int):
+        """(query, column, similarity) of the top-k scores per row above the threshold."""
+        scores = scores.tocoo()
+        keep = scores.data >= self.min_similarity
+        q, col, sim = scores.row[keep] + offset, scores.col[keep], scores.data[keep]
+        # Sort by (query, -score) and rank within each query
+        order = np.lexsort((-sim, q))
+        q, col, sim = q[order], col[order], sim[order]
+        top = (np.arange(len(q)) - np.searchsorted(q, q, side="left")) < self.top_k
+        return q[top], col[top], sim[top]
+
+    def suggest(self, descriptions: Sequence[str]) -> pd.DataFrame:
+        """
+        Suggested accounts for a batch of descriptions.
+
+        Returns a frame aligned with the input (positional index) with
+        conta_debito, conta_credito, similarity and matched_description;
+        rows without a neighbour above `min_similarity` are left out.
+        """
+        import scipy.sparse as sp
+
+        columns = ["conta_debito", "conta_credito", "similarity", "matched_description"]
+        with self._lock:
+            if self._dirty:
+                self._finalize()
+            if self._matrix is None or not len(descriptions):
+                return pd.DataFrame(columns=columns)
+
+            # Vectorize each distinct normalized description once
+            normalized = [normalize_description(d) for d in descriptions]
+            codes, uniques = pd.factorize(pd.Series(normalized, dtype=object))
+            parts = [self._count_ngrams(text, grow=False) for text in uniques]
+            lengths = np.fromiter((len(p[0]) for p in parts), np.int64, len(parts))
+            indices = np.concatenate([p[0] for p in parts]) if parts else np.array([], dtype=np.int64)
+            counts = np.concatenate([p[1] for p in parts]) if parts else np.array([])
+            queries = sp.csr_matrix(
+                (counts * self._idf[indices], indices, np.concatenate([[0], np.cumsum(lengths)])),
+                shape=(len(uniques), self._matrix.shape[0]),
+            )
+            queries.eliminate_zeros()
+            matrix, active_rows, best = self._matrix, self._active_rows, self._best
+
+        queries = self._normalize_rows(queries)
+        found = [self._top_k(queries[start:start + QUERY_CHUNK_SIZE] @ matrix, start)
+                 for start in range(0, queries.shape[0], QUERY_CHUNK_SIZE)]
+        q = np.concatenate([f[0] for f in found])
+        col = np.concatenate([f[1] for f in found])
+        sim = np.concatenate([f[2] for f in found])
+        neighbours = pd.DataFrame({"query": q, "row": active_rows[col], "similarity": sim})
+        if neighbours.empty:
+            return pd.DataFrame(columns=columns)
+
+        # Similarity-weighted vote for the neighbours' account pairs
+        neighbours = neighbours.join(best, on="row")
+        pairs = neighbours.groupby(["query", "conta_debito", "conta_credito"], sort=False).agg(
+            score=("similarity", "sum"), similarity=("similarity", "max"), row=("row", "first")
+        ).reset_index()
+        winners = pairs.sort_values(["query", "score"], ascending=[True, False], kind="stable").drop_duplicates("query")
+        winners["matched_description"] = [self._descriptions[r] for r in winners["row"].tolist()]
+        winners = winners.set_index("query")[columns]
+
+        # Broadcast back from distinct descriptions to input positions
+        positions = np.flatnonzero(np.isin(codes, winners.index.to_numpy()))
+        result = winners.loc[codes[positions]]
+        result.index = positions
+        return result
+
+
+class AccountSuggestionRepository:
+    """
+    One suggestion index per company, over `<history_dir>/<company>/*.txt`.
+
+    Generated exports are recorded here, so the next lookup picks them up
+    through the incremental refresh.
+    """
+
+    def __init__(self, history_dir: str = os.getenv("LANCAMENTO_HISTORY_DIR", os.path.join("data", "history"))):
+        self.history_dir = history_dir
+        self._indexes: Dict[str, AccountSuggestionIndex] = {}
+        self._lock = threading.Lock()
+
+    def _company_dir(self, company: str) -> str:
+        # Sanitize company name for directory name
+        safe_name = "".join(c for c in company if c.isalnum() or c in (' ', '-', '_')).strip()
+        return os.path.join(self.history_dir, safe_name.replace(' ', '_').lower() or "default")
+
+    def get(self, company: str) -> AccountSuggestionIndex:
+        """Refreshed index for a company."""
+        company_dir = self._company_dir(company)
+        with self._lock:
+            index = self._indexes.get(company_dir)
+            if index is None:
+                index = self._indexes[company_dir] = AccountSuggestionIndex(company_dir)
+        index.refresh()
+        return index
+
+    def record_export(self, company: str, filename: str, content: str) -> str:
+        """Store a generated lançamentos file in the company's history."""
+        company_dir = self._company_dir(company)
+        os.makedirs(company_dir, exist_ok=True)
+        path = os.path.join(company_dir, os.path.basename(filename))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
@@ -0,0 +1,74 @@
+"""
+Reconciliation Run
+
+One full reconciliation of a ledger against bank transactions:
+period filter -> exact matching (Reconciler) -> combinatorial matching
+(CombinatorialMatcher) -> unified view. Shared by the /api/reconcile
+endpoint and the batch CLI (`src.cli.batch_reconcile`).
+"""
+from typing import Any, Dict
+
+import pandas as pd
+
+from src.common.logging_config import get_logger
+from src.core.matcher import CombinatorialMatcher
+from src.core.reconciler import Reconciler
+from src.ui.unified_view import UnifiedViewController
+
+logger = get_logger(__name__)
+
+
+def reconcile_frames(ledger_df: pd.DataFrame, bank_df: pd.DataFrame, tolerance: int = 3) -> Dict[str, Any]:
+    """
+    Reconcile `ledger_df` against the bank transactions inside its period.
+
+    Returns matched_l, matched_b, comb_matches, remaining_l, remaining_b and
+    view (the unified DataFrame), plus bank_filtered and summary metrics.
+    """
+    # 1. Filter Bank by Ledger Period
+    start_date = ledger_df['date'].min()
+    end_date = ledger_df['date'].max()
+
+    bank_filtered = bank_df[
+        (bank_df['date'] >= start_date) &
+        (bank_df['date'] <= end_date)
+    ].copy()
+
+    logger.info("Reconciliation started.", ledger_range=(str(start_date), str(end_date)), bank_tx_count=len(bank_filtered))
+
+    # 2. Reconcile
+    reconciler = Reconciler()
+    matched_l, matched_b, unmatched_l, unmatched_b = reconciler.reconcile(ledger_df, bank_filtered, date_tolerance=tolerance)
+
+    logger.info("Exact matching completed.", matched_count=len(matched_l), unmatched_ledger=len(unmatched_l))
+
+    # 3. Combinatorial
+    matcher = CombinatorialMatcher()
+    comb_matches, remaining_l, remaining_b = matcher.find_matches(
+        unmatched_l, unmatched_b, tolerance_days=tolerance
+    )
+
+    logger.info("Combinatorial matching completed.", comb_matches=len(comb_matches), remaining_ledger=len(remaining_l))
+
+    # 4. Build Unified View
+    uv = UnifiedViewController()
+    df_view = uv.build_view_data(matched_l, matched_b, comb_matches, remaining_l, remaining_b)
+
+    metrics = {
+        "ledger_total": int(len(ledger_df)),
+        "bank_total": int(len(bank_filtered)),
+        "diff_initial": abs(unmatched_l['amount'].sum() - unmatched_b['amount'].sum()),
+        "diff_final": abs(remaining_l['amount'].sum() - remaining_b['amount'].sum()),
+        "comb_count": len(comb_matches)
+    }
+
+    return {
+        'matched_l': matched_l,
+        'matched_b': matched_b,
+        'comb_matches': comb_matches,
+        'remaining_l': remaining_l,
+        'remaining_b': remaining_b,
+        'view': df_view,
+        'bank_filtered': bank_filtered,
+        'metrics': metrics,
+    }
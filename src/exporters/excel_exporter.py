@@ -2,11 +2,19 @@
 Módulo de exportação Excel moderno e profissional.
 Gera relatórios de conciliação com formatação avançada, gráficos e múltiplas abas.
 """
+import os
+import tempfile
 from io import BytesIO
 from datetime import datetime
 import pandas as pd
 from xlsxwriter.utility import xl_range
 
+# Tamanho dos blocos enviados ao cliente no modo streaming
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Colunas lidas de cada transação
+ROW_FIELDS = ('date', 'source', 'description', 'amount', 'status', 'group_id')
+
 
 class ExcelExporter:
     """Exportador Excel moderno com formatação profissional."""
@@ -144,6 +152,61 @@ class ExcelExporter:
             'align': 'center',
         })
         
+        # Moeda zebrada: uma combinação por (linha par?, valor negativo?),
+        # criada uma única vez em vez de um formato novo por linha
+        self.formats['currency_zebra'] = {}
+        for even_row in (True, False):
+            for negative in (False, True):
+                self.formats['currency_zebra'][(even_row, negative)] = self.workbook.add_format({
+                    'num_format': 'R$ #,##0.00',
+                    'border': 1,
+                    'border_color': '#e2e8f0',
+                    'font_color': self.COLORS['negative'] if negative else self.COLORS['positive'],
+                    'bold': True,
+                    'bg_color': self.COLORS['zebra_light'] if even_row else self.COLORS['zebra_dark'],
+                })
+        
+        # Cabeçalho de cada aba de dados, na cor do status
+        self.formats['sheet_header'] = {}
+        for key in ('conciliado', 'apenas_banco', 'apenas_diario'):
+            self.formats['sheet_header'][self.COLORS[key]] = self.workbook.add_format({
+                'bold': True,
+                'font_color': '#ffffff',
+                'bg_color': self.COLORS[key],
+                'border': 1,
+                'align': 'center',
+                'valign': 'vcenter',
+                'font_size': 11,
+            })
+        
+    @staticmethod
+    def _partition_by_status(rows_data):
+        """
+        Separa as transações por status em uma única passada.
+        
+        Aceita lista de dicionários ou DataFrame (partes também DataFrames).
+        
+        Returns:
+            Tupla (conciliados, apenas_banco, apenas_diario)
+        """
+        if isinstance(rows_data, pd.DataFrame):
+            status = rows_data['status'].astype(str)
+            return (
+                rows_data[status.str.contains('Conciliado', regex=False)],
+                rows_data[status == 'Apenas no Banco'],
+                rows_data[status == 'Apenas no Diário'],
+            )
+        conciliados, apenas_banco, apenas_diario = [], [], []
+        for r in rows_data:
+            status = r.get('status', '')
+            if 'Conciliado' in status:
+                conciliados.append(r)
+            elif status == 'Apenas no Banco':
+                apenas_banco.append(r)
+            elif status == 'Apenas no Diário':
+                apenas_diario.append(r)
+        return conciliados, apenas_banco, apenas_diario
+    
     def _create_summary_sheet(self, rows_data, summary_metrics):
         """
         Cria aba de resumo com métricas e gráfico.
@@ -179,11 +242,11 @@ class ExcelExporter:
         sheet.write(row, 1, "Valor", self.formats['header'])
         row += 1
         
-        # Contagens por status
-        conciliados = len([r for r in rows_data if 'Conciliado' in r.get('status', '')])
-        apenas_banco = len([r for r in rows_data if r.get('status') == 'Apenas no Banco'])
-        apenas_diario = len([r for r in rows_data if r.get('status') == 'Apenas no Diário'])
-        total = len(rows_data)
+        # Contagens por status (já particionadas em generate)
+        conciliados = summary_metrics['conciliados']
+        apenas_banco = summary_metrics['apenas_banco']
+        apenas_diario = summary_metrics['apenas_diario']
+        total = summary_metrics['total']
         
         metrics = [
             ("Total de Transações", total),
@@ -237,13 +300,20 @@ class ExcelExporter:
             # Inserir gráfico
             sheet.insert_chart('D2', chart, {'x_scale': 1.5, 'y_scale': 1.5})
     
+    @staticmethod
+    def _iter_records(frame):
+        """Linhas de um DataFrame como dicionários, uma de cada vez (sem to_dict)."""
+        columns = [c for c in ROW_FIELDS if c in frame.columns]
+        for values in frame[columns].itertuples(index=False, name=None):
+            yield dict(zip(columns, values))
+    
     def _create_data_sheet(self, sheet_name, rows_data, header_color):
         """
         Cria aba com dados de transações.
         
         Args:
             sheet_name: Nome da aba
-            rows_data: Lista de dicionários com os dados
+            rows_data: Lista de dicionários ou DataFrame com os dados
             header_color: Cor do cabeçalho
         """
         sheet = self.workbook.add_worksheet(sheet_name)
@@ -260,79 +330,52 @@ class ExcelExporter:
         sheet.freeze_panes(1, 0)
         
         # Cabeçalho customizado com cor
-        header_format = self.workbook.add_format({
-            'bold': True,
-            'font_color': '#ffffff',
-            'bg_color': header_color,
-            'border': 1,
-            'align': 'center',
-            'valign': 'vcenter',
-            'font_size': 11,
-        })
+        header_format = self.formats['sheet_header'].get(header_color) or self.formats['header']
         
         headers = ['Data', 'Origem', 'Descrição', 'Valor', 'Status', 'Grupo']
         for col, header in enumerate(headers):
             sheet.write(0, col, header, header_format)
         
+        # Formatos resolvidos fora do laço (linhas escritas em ordem, compatível com constant_memory)
+        zebra = {True: self.formats['cell_zebra_light'], False: self.formats['cell_zebra_dark']}
+        currency = self.formats['currency_zebra']
+        date_format = self.formats['date']
+        write, write_string, write_number = sheet.write, sheet.write_string, sheet.write_number
+        
+        records = self._iter_records(rows_data) if isinstance(rows_data, pd.DataFrame) else rows_data
+        
         # Dados
-        for row_idx, row_data in enumerate(rows_data, start=1):
-            # Determinar formato zebrado
-            cell_format = self.formats['cell_zebra_light'] if row_idx % 2 == 0 else self.formats['cell_zebra_dark']
+        for row_idx, row_data in enumerate(records, start=1):
+            even_row = row_idx % 2 == 0
+            cell_format = zebra[even_row]
             
             # Data
             date_val = row_data.get('date', '')
             if isinstance(date_val, (datetime, pd.Timestamp)):
-                sheet.write_datetime(row_idx, 0, date_val, self.formats['date'])
+                if pd.isna(date_val):
+                    write_string(row_idx, 0, '', cell_format)
+                else:
+                    sheet.write_datetime(row_idx, 0, date_val, date_format)
             else:
-                sheet.write(row_idx, 0, date_val, cell_format)
-            
-            # Origem
-            sheet.write(row_idx, 1, row_data.get('source', ''), cell_format)
+                write(row_idx, 0, date_val, cell_format)
             
-            # Descrição
-            sheet.write(row_idx, 2, row_data.get('description', ''), cell_format)
+            # Origem / Descrição (write_string evita o despacho por tipo de write)
+            write_string(row_idx, 1, str(row_data.get('source') or ''), cell_format)
+            write_string(row_idx, 2, str(row_data.get('description') or ''), cell_format)
             
-            # Valor - com formatação condicional
+            # Valor - com formatação condicional (cor pelo sinal, fundo zebrado)
             amount = row_data.get('amount', 0)
-            if amount >= 0:
-                fmt = self.formats['currency_positive']
-            else:
-                fmt = self.formats['currency_negative']
-            
-            # Aplicar zebrado ao formato de moeda
-            if row_idx % 2 == 0:
-                fmt = self.workbook.add_format({
-                    'num_format': 'R$ #,##0.00',
-                    'border': 1,
-                    'border_color': '#e2e8f0',
-                    'font_color': self.COLORS['positive'] if amount >= 0 else self.COLORS['negative'],
-                    'bold': True,
-                    'bg_color': self.COLORS['zebra_light'],
-                })
-            else:
-                fmt = self.workbook.add_format({
-                    'num_format': 'R$ #,##0.00',
-                    'border': 1,
-                    'border_color': '#e2e8f0',
-                    'font_color': self.COLORS['positive'] if amount >= 0 else self.COLORS['negative'],
-                    'bold': True,
-                    'bg_color': self.COLORS['zebra_dark'],
-                })
-            
-            sheet.write_number(row_idx, 3, amount, fmt)
+            write_number(row_idx, 3, amount, currency[(even_row, amount < 0)])
             
             # Status
-            sheet.write(row_idx, 4, row_data.get('status', ''), cell_format)
+            write_string(row_idx, 4, str(row_data.get('status') or ''), cell_format)
             
             # Grupo
             group_id = row_data.get('group_id', '-1')
-            if group_id != '-1':
-                sheet.write(row_idx, 5, group_id, cell_format)
-            else:
-                sheet.write(row_idx, 5, '', cell_format)
+            write(row_idx, 5, group_id if group_id != '-1' else '', cell_format)
         
         # Adicionar linha de total se houver dados
-        if rows_data:
+        if len(rows_data):
             total_row = len(rows_data) + 1
             sheet.write(total_row, 2, 'TOTAL:', self.formats['total'])
             
@@ -340,23 +383,12 @@ class ExcelExporter:
             sum_range = xl_range(1, 3, len(rows_data), 3)
             sheet.write_formula(total_row, 3, f'=SUM({sum_range})', self.formats['total'])
     
-    def generate(self, rows_data):
-        """
-        Gera o arquivo Excel completo.
-        
-        Args:
-            rows_data: Lista de dicionários com todas as transações
-            
-        Returns:
-            BytesIO buffer com o conteúdo Excel
-        """
-        self.workbook = pd.ExcelWriter(self.buffer, engine='xlsxwriter').book
+    def _write_workbook(self, rows_data):
+        """Cria formatos e abas no workbook aberto e o fecha."""
         self._create_formats()
         
         # Separar dados por status
-        conciliados = [r for r in rows_data if 'Conciliado' in r.get('status', '')]
-        apenas_banco = [r for r in rows_data if r.get('status') == 'Apenas no Banco']
-        apenas_diario = [r for r in rows_data if r.get('status') == 'Apenas no Diário']
+        conciliados, apenas_banco, apenas_diario = self._partition_by_status(rows_data)
         
         # Criar abas
         summary_metrics = {
@@ -373,6 +405,101 @@ class ExcelExporter:
         
         # Fechar workbook
         self.workbook.close()
+    
+    def generate(self, rows_data):
+        """
+        Gera o arquivo Excel completo.
+        
+        Args:
+            rows_data: Lista de dicionários com todas as transações
+            
+        Returns:
+            BytesIO buffer com o conteúdo Excel
+        """
+        self.workbook = pd.ExcelWriter(self.buffer, engine='xlsxwriter').book
+        self._write_workbook(rows_data)
         self.buffer.seek(0)
         
         return self.buffer.getvalue()
+    
+    def generate_file(self, rows_data, path=None):
+        """
+        Gera o Excel em disco no modo constant_memory do xlsxwriter.
+        
+        Cada linha é descarregada no arquivo temporário da aba assim que a
+        próxima começa, então a memória fica estável mesmo com centenas de
+        milhares de transações.
+        
+        Args:
+            rows_data: Lista de dicionários ou DataFrame com todas as
+                transações (o DataFrame é lido linha a linha, sem to_dict)
+            path: Caminho de saída (padrão: arquivo temporário)
+            
+        Returns:
+            Caminho do arquivo .xlsx gerado
+        
+        Se a escrita falhar, os arquivos temporários (o .xlsx criado aqui e
+        as linhas das abas) são removidos; um `path` informado pelo chamador
+        fica a cargo dele.
+        """
+        temporary = path is None
+        if temporary:
+            fd, path = tempfile.mkstemp(suffix='.xlsx', prefix='conciliacao_')
+            os.close(fd)
+        
+        self.workbook = None
+        try:
+            self.workbook = pd.ExcelWriter(
+                path, engine='xlsxwriter',
+                engine_kwargs={'options': {'constant_memory': True, 'strings_to_urls': False}}
+            ).book
+            self._write_workbook(rows_data)
+        except BaseException:
+            self._discard_row_data()
+            if temporary:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            raise
+        return path
+    
+    def _discard_row_data(self):
+        """Remove os arquivos de linhas das abas (constant_memory) de um workbook não fechado."""
+        if self.workbook is None:
+            return
+        for sheet in self.workbook.worksheets():
+            filename = getattr(sheet, 'row_data_filename', None)
+            if not filename:
+                continue
+            if sheet.row_data_fh is not None:
+                sheet.row_data_fh.close()
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+    
+    def generate_stream(self, rows_data, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Gera o Excel em modo streaming e devolve um iterador de blocos de bytes.
+        
+        O arquivo temporário é removido quando o iterador termina ou é fechado
+        (ex.: cliente desconectou), ideal para StreamingResponse.
+        """
+        path = self.generate_file(rows_data)
+        return self._iter_file(path, chunk_size)
+    
+    @staticmethod
+    def _iter_file(path, chunk_size):
+        try:
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
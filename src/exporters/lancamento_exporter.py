@@ -88,6 +88,52 @@ class LancamentoExporter:
         
         return '\n'.join(linhas)
     
+    def export_frame(self, df: pd.DataFrame) -> str:
+        """
+        Exporta um DataFrame de transações para formato TXT (versão vetorizada de export_transactions).
+        
+        Mesmas regras de format_transaction, aplicadas por coluna: datas ISO
+        (YYYY-MM-DD) viram DD/MM/YYYY, outras ficam como estão; valores com 2
+        casas; participantes e documento vazios viram "".
+        
+        Args:
+            df: DataFrame com colunas date, amount, description, conta_debito,
+                participante_debito, conta_credito, participante_credito, documento
+            
+        Returns:
+            String com conteúdo do arquivo formatado
+        """
+        if df.empty:
+            return ""
+        
+        # Formatar data para DD/MM/YYYY
+        dates = df['date']
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            datas = dates.dt.strftime('%d/%m/%Y')
+        else:
+            parsed = pd.to_datetime(dates, format='%Y-%m-%d', errors='coerce')
+            datas = parsed.dt.strftime('%d/%m/%Y').where(parsed.notna(), dates.astype(str))
+        
+        def text(col, default=''):
+            values = df[col] if col in df.columns else pd.Series(default, index=df.index)
+            return values.where(values.notna() & (values != ''), '').astype(str)
+        
+        linhas = [
+            f"{numero},{data},{cd},{pd_},{cc},{pc},{valor:.2f},,{historico},DCTO,,{documento}"
+            for numero, data, cd, pd_, cc, pc, valor, historico, documento in zip(
+                range(1, len(df) + 1),
+                datas.tolist(),
+                df['conta_debito'].tolist(),
+                text('participante_debito').tolist(),
+                df['conta_credito'].tolist(),
+                text('participante_credito').tolist(),
+                df['amount'].astype(float).tolist(),
+                df['description'].tolist(),
+                text('documento').tolist(),
+            )
+        ]
+        return '\n'.join(linhas)
+    
     def generate_filename(self, company_name: str, month: int, year: int, bank: str) -> str:
         """Gera nome do arquivo no formato: lancamento_EMPRESA_MMYYYY BANCO.txt"""
         # Limpar nome da empresa (remover caracteres especiais)
@@ -12,9 +12,24 @@ from reportlab.graphics.shapes import Drawing, Rect, String
 from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics import renderPDF
 from io import BytesIO
+import tempfile
 import pandas as pd
 from datetime import datetime
 
+# Linhas exibidas por tabela no modo resumido (padrão)
+PREVIEW_ROWS = 50
+
+# Linhas por tabela no relatório completo: cabe em uma página A4, então o
+# ReportLab não precisa dividir tabelas gigantes (custo quadrático).
+# Par para a zebra continuar alternando entre blocos.
+FULL_REPORT_ROWS_PER_TABLE = 30
+
+# Tamanho dos blocos enviados ao cliente no modo streaming
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Troca separadores para o formato brasileiro: 1,234.56 -> 1.234,56
+_BR_NUMBER = str.maketrans(',.', '.,')
+
 
 class PDFReportExporter:
     """Exportador PDF moderno com design profissional."""
@@ -45,6 +60,7 @@ class PDFReportExporter:
         self.end_date = end_date
         self.buffer = BytesIO()
         self.elements = []
+        self._table_styles = {}
         self.styles = getSampleStyleSheet()
         self._setup_styles()
 
@@ -135,16 +151,28 @@ class PDFReportExporter:
         
         Args:
             summary_metrics: Dicionário com métricas calculadas
-            rows_data: Lista com todas as transações
+            rows_data: Lista ou DataFrame com todas as transações
         """
         self.elements.append(Paragraph("Resumo Executivo", self.styles['CustomSectionHeader']))
         self.elements.append(Spacer(1, 10))
         
-        # Calcular métricas
+        # Calcular métricas (uma única passada)
         total = len(rows_data)
-        conciliados = len([r for r in rows_data if 'Conciliado' in r.get('status', '')])
-        apenas_banco = len([r for r in rows_data if r.get('status') == 'Apenas no Banco'])
-        apenas_diario = len([r for r in rows_data if r.get('status') == 'Apenas no Diário'])
+        conciliados = apenas_banco = apenas_diario = 0
+        if isinstance(rows_data, pd.DataFrame):
+            status = rows_data['status'].astype(str)
+            conciliados = int(status.str.contains('Conciliado', regex=False).sum())
+            apenas_banco = int((status == 'Apenas no Banco').sum())
+            apenas_diario = int((status == 'Apenas no Diário').sum())
+            rows_data = ()
+        for r in rows_data:
+            status = r.get('status', '')
+            if 'Conciliado' in status:
+                conciliados += 1
+            elif status == 'Apenas no Banco':
+                apenas_banco += 1
+            elif status == 'Apenas no Diário':
+                apenas_diario += 1
         taxa_conciliacao = (conciliados / total * 100) if total > 0 else 0
         
         # Cards de métricas em linha
@@ -182,7 +210,81 @@ class PDFReportExporter:
         self.elements.append(Paragraph(taxa_text, taxa_style))
         self.elements.append(Spacer(1, 25))
 
-    def _create_discrepancy_table(self, df, title, color_theme):
+    def _table_style(self, color_theme):
+        """
+        TableStyle compartilhado por todas as tabelas de uma mesma cor.
+        
+        A zebra usa ROWBACKGROUNDS (um único comando) em vez de um
+        BACKGROUND por linha.
+        """
+        key = color_theme.hexval()
+        if key not in self._table_styles:
+            self._table_styles[key] = TableStyle([
+                # Cabeçalho
+                ('BACKGROUND', (0, 0), (-1, 0), color_theme),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+                ('TOPPADDING', (0, 0), (-1, 0), 10),
+                
+                # Dados
+                ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # Data centralizada
+                ('ALIGN', (1, 1), (1, -1), 'LEFT'),    # Descrição à esquerda
+                ('ALIGN', (2, 1), (2, -1), 'RIGHT'),   # Valor à direita
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 1), (-1, -1), 8),
+                ('TEXTCOLOR', (0, 1), (-1, -1), self.COLORS['text']),
+                
+                # Zebra striping (linhas pares destacadas)
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, self.COLORS['light']]),
+                
+                # Bordas
+                ('GRID', (0, 0), (-1, -1), 0.5, self.COLORS['border']),
+                ('BOX', (0, 0), (-1, -1), 1.5, color_theme),
+                
+                # Padding
+                ('TOPPADDING', (0, 1), (-1, -1), 6),
+                ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+                ('LEFTPADDING', (0, 0), (-1, -1), 8),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+                
+                # Valign
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ])
+        return self._table_styles[key]
+
+    @staticmethod
+    def _format_display_rows(df):
+        """
+        Formata data, descrição e valor de todas as linhas de forma vetorizada.
+        
+        Returns:
+            Lista de linhas [data, descrição, valor] prontas para a Table
+        """
+        dates = df['date']
+        # Datas ausentes (NaT/None) ficam em branco
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            d_str = dates.dt.strftime('%d/%m/%Y').fillna('')
+        else:
+            d_str = dates.map(
+                lambda d: '' if pd.isna(d) else
+                d.strftime('%d/%m/%Y') if isinstance(d, (datetime, pd.Timestamp)) else str(d)
+            )
+        
+        # Valor no formato brasileiro (1.234,56)
+        amounts = df['amount'].astype(float).map('{:,.2f}'.format).str.translate(_BR_NUMBER)
+        
+        # Truncar descrição
+        full_desc = df['description'].astype(str)
+        desc = full_desc.str.slice(0, 55)
+        truncated = full_desc.str.len() > 55
+        desc[truncated] = desc[truncated] + '...'
+        
+        return [list(row) for row in zip(d_str, desc, amounts)]
+
+    def _create_discrepancy_table(self, df, title, color_theme, full_report=False):
         """
         Cria tabela detalhada de discrepâncias com design moderno.
         
@@ -190,6 +292,8 @@ class PDFReportExporter:
             df: DataFrame com as transações
             title: Título da seção
             color_theme: Cor do tema
+            full_report: Se True, lista todas as linhas em tabelas do tamanho
+                de uma página; caso contrário mostra as primeiras 50
         """
         if df.empty:
             self.elements.append(Paragraph(title, self.styles['CustomSectionHeader']))
@@ -205,76 +309,22 @@ class PDFReportExporter:
         self.elements.append(Spacer(1, 8))
         
         # Preparar dados
-        display_data = [['Data', 'Descrição', 'Valor (R$)']]
-        
-        for _, row in df.head(50).iterrows():  # Limitar a 50 linhas por tabela
-            # Formatar data
-            d = row['date']
-            if isinstance(d, (datetime, pd.Timestamp)):
-                d_str = d.strftime('%d/%m/%Y')
-            else:
-                d_str = str(d)
-            
-            # Formatar valor
-            amt = f"{row['amount']:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-            
-            # Truncar descrição
-            desc = str(row['description'])[:55]
-            if len(str(row['description'])) > 55:
-                desc += '...'
-            
-            display_data.append([d_str, desc, amt])
-        
-        # Criar tabela
-        t = Table(display_data, colWidths=[2.5*cm, 10*cm, 3*cm])
-        
-        # Estilo moderno com zebra striping
-        table_style = [
-            # Cabeçalho
-            ('BACKGROUND', (0, 0), (-1, 0), color_theme),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-            ('TOPPADDING', (0, 0), (-1, 0), 10),
-            
-            # Dados
-            ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # Data centralizada
-            ('ALIGN', (1, 1), (1, -1), 'LEFT'),    # Descrição à esquerda
-            ('ALIGN', (2, 1), (2, -1), 'RIGHT'),   # Valor à direita
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('TEXTCOLOR', (0, 1), (-1, -1), self.COLORS['text']),
-            
-            # Bordas
-            ('GRID', (0, 0), (-1, -1), 0.5, self.COLORS['border']),
-            ('BOX', (0, 0), (-1, -1), 1.5, color_theme),
-            
-            # Padding
-            ('TOPPADDING', (0, 1), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-            ('LEFTPADDING', (0, 0), (-1, -1), 8),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-            
-            # Valign
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]
-        
-        # Adicionar zebra striping
-        for i in range(1, len(display_data)):
-            if i % 2 == 0:
-                table_style.append(('BACKGROUND', (0, i), (-1, i), self.COLORS['light']))
+        header = ['Data', 'Descrição', 'Valor (R$)']
+        rows = self._format_display_rows(df if full_report else df.head(PREVIEW_ROWS))
+        chunk_size = FULL_REPORT_ROWS_PER_TABLE if full_report else len(rows)
+        style = self._table_style(color_theme)
         
-        t.setStyle(TableStyle(table_style))
-        
-        self.elements.append(t)
+        # Uma Table por bloco, todas com o mesmo estilo e cabeçalho repetido
+        for start in range(0, len(rows), chunk_size):
+            t = Table([header] + rows[start:start + chunk_size], colWidths=[2.5*cm, 10*cm, 3*cm], repeatRows=1)
+            t.setStyle(style)
+            self.elements.append(t)
         
         # Mostrar contagem se houver mais registros
-        if len(df) > 50:
+        if not full_report and len(df) > PREVIEW_ROWS:
             self.elements.append(Spacer(1, 8))
             self.elements.append(Paragraph(
-                f"<i>Mostrando 50 de {len(df)} registros. Exporte para Excel para ver todos.</i>",
+                f"<i>Mostrando {PREVIEW_ROWS} de {len(df)} registros. Exporte para Excel ou gere o relatório completo para ver todos.</i>",
                 self.styles['CustomBodyText']
             ))
         
@@ -296,19 +346,8 @@ class PDFReportExporter:
         
         canvas.restoreState()
 
-    def generate(self, summary_metrics, df_unmatched_bank, df_unmatched_ledger, all_rows=None):
-        """
-        Gera o relatório PDF completo.
-        
-        Args:
-            summary_metrics: Dicionário com métricas de resumo
-            df_unmatched_bank: DataFrame com transações apenas no banco
-            df_unmatched_ledger: DataFrame com transações apenas no diário
-            all_rows: Lista de todas as transações (opcional)
-            
-        Returns:
-            bytes do PDF gerado
-        """
+    def _build(self, output, summary_metrics, df_unmatched_bank, df_unmatched_ledger, all_rows=None, full_report=False):
+        """Monta os elementos do relatório e renderiza o PDF em `output`."""
         # Cabeçalho do relatório
         self.elements.append(Paragraph(
             f"Relatório de Conciliação Bancária",
@@ -330,25 +369,27 @@ class PDFReportExporter:
         self.elements.append(Spacer(1, 20))
         
         # Seção de resumo (se temos dados de all_rows)
-        if all_rows:
+        if all_rows is not None and len(all_rows):
             self._create_summary_section(summary_metrics, all_rows)
         
         # Discrepâncias
         self._create_discrepancy_table(
             df_unmatched_bank,
             "Transações Apenas no Banco",
-            self.COLORS['apenas_banco']
+            self.COLORS['apenas_banco'],
+            full_report=full_report
         )
         
         self._create_discrepancy_table(
             df_unmatched_ledger,
             "Transações Apenas no Diário",
-            self.COLORS['apenas_diario']
+            self.COLORS['apenas_diario'],
+            full_report=full_report
         )
         
         # Construir PDF
         doc = SimpleDocTemplate(
-            self.buffer,
+            output,
             pagesize=A4,
             rightMargin=2*cm,
             leftMargin=2*cm,
@@ -358,6 +399,61 @@ class PDFReportExporter:
         )
         
         doc.build(self.elements, onFirstPage=self._add_header_footer, onLaterPages=self._add_header_footer)
+
+    def generate(self, summary_metrics, df_unmatched_bank, df_unmatched_ledger, all_rows=None, full_report=False):
+        """
+        Gera o relatório PDF completo.
+        
+        Args:
+            summary_metrics: Dicionário com métricas de resumo
+            df_unmatched_bank: DataFrame com transações apenas no banco
+            df_unmatched_ledger: DataFrame com transações apenas no diário
+            all_rows: Lista ou DataFrame de todas as transações (opcional)
+            full_report: Lista todas as discrepâncias em vez das primeiras 50
+            
+        Returns:
+            bytes do PDF gerado
+        """
+        self._build(self.buffer, summary_metrics, df_unmatched_bank, df_unmatched_ledger, all_rows, full_report)
         
         self.buffer.seek(0)
         return self.buffer.getvalue()
+
+    def generate_file(self, path, summary_metrics, df_unmatched_bank, df_unmatched_ledger, all_rows=None,
+                      full_report=False):
+        """
+        Gera o relatório diretamente em um arquivo no disco.
+        
+        Returns:
+            Caminho do arquivo gerado
+        """
+        self._build(path, summary_metrics, df_unmatched_bank, df_unmatched_ledger, all_rows, full_report)
+        return path
+
+    def generate_stream(self, summary_metrics, df_unmatched_bank, df_unmatched_ledger, all_rows=None,
+                        full_report=False, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Gera o relatório em um arquivo temporário e devolve um iterador de blocos de bytes.
+        
+        O ReportLab mantém o documento inteiro em memória até gravá-lo no
+        final do build; o arquivo temporário só evita a cópia extra dos bytes
+        (BytesIO + getvalue) e permite enviar o PDF em blocos, ideal para
+        StreamingResponse.
+        """
+        output = tempfile.TemporaryFile()
+        try:
+            self._build(output, summary_metrics, df_unmatched_bank, df_unmatched_ledger, all_rows, full_report)
+        except Exception:
+            output.close()
+            raise
+        output.seek(0)
+        return self._iter_file(output, chunk_size)
+
+    @staticmethod
+    def _iter_file(output, chunk_size):
+        with output:
+            while True:
+                chunk = output.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
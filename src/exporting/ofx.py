@@ -1,21 +1,91 @@
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Union
 import hashlib
+import numpy as np
+import pandas as pd
 from src.common.models import UnifiedTransaction
 
+# Transactions formatted per yielded body chunk
+DEFAULT_CHUNK_SIZE = 5000
+
+VALID_TRN_TYPES = ['DEBIT', 'CREDIT', 'OTHER', 'PAYMENT', 'DEP']
+
+# SGML text content: escape markup characters and keep values on one line
+_SGML_ESCAPE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '\r': ' ', '\n': ' '})
+
+_DATE_SEPARATORS = str.maketrans('', '', '-T:')
+
+Transactions = Union[pd.DataFrame, List[UnifiedTransaction], List[Dict[str, Any]]]
+
+
 class OFXWriter:
     def __init__(self, bank_id: str = "000", acct_id: str = "00000", currency: str = "BRL"):
         self.bank_id = bank_id
         self.acct_id = acct_id
         self.currency = currency
 
-    def generate(self, transactions: List[UnifiedTransaction]) -> str:
+    def generate(self, transactions: Transactions) -> str:
         """
         Generates a complete OFX string from UnifiedTransactions.
         """
-        header = self._build_header()
-        body = self._build_body(transactions)
-        return header + body
+        return "".join(self.generate_stream(transactions))
+
+    def generate_stream(self, transactions: Transactions, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        """
+        Yields the OFX document as header, body chunks and footer.
+
+        Transactions are converted once to a columnar batch and formatted
+        `chunk_size` rows at a time (dates, types and amounts column-wise), so
+        a StreamingResponse can send 100k+ lines without building one giant string.
+        """
+        batch = self.to_batch(transactions)
+        now_str = datetime.now().strftime("%Y%m%d%H%M%S")
+
+        yield self._build_header()
+        yield self._build_body_start(batch, now_str)
+        for start in range(0, len(batch), chunk_size):
+            yield "\n" + self._build_transactions(batch.iloc[start:start + chunk_size])
+        yield self._build_body_end(now_str)
+
+    @staticmethod
+    def to_batch(transactions: Transactions) -> pd.DataFrame:
+        """
+        Columnar batch (date, amount, memo, type, doc_id, fitid) from a DataFrame,
+        UnifiedTransactions or dicts.
+        """
+        if isinstance(transactions, pd.DataFrame):
+            df = transactions
+        elif transactions and isinstance(transactions[0], UnifiedTransaction):
+            df = pd.DataFrame([t.to_dict() for t in transactions])
+        else:
+            df = pd.DataFrame(list(transactions))
+
+        n = len(df)
+        empty = pd.Series([""] * n, index=df.index, dtype=object)
+
+        memo = df['memo'] if 'memo' in df.columns else empty
+        if 'description' in df.columns:
+            memo = memo.where(memo.notna(), df['description'])
+
+        def text(col):
+            return df[col].fillna("").astype(str) if col in df.columns else empty
+
+        return pd.DataFrame({
+            'date': pd.to_datetime(df['date']) if n else pd.Series([], dtype='datetime64[ns]'),
+            'amount': df['amount'].astype(float) if n else pd.Series([], dtype=float),
+            'memo': memo.fillna("").astype(str),
+            'type': df['type'].fillna('OTHER').astype(str) if 'type' in df.columns else empty.replace("", "OTHER"),
+            'doc_id': text('doc_id'),
+            'fitid': text('fitid'),
+        }, index=df.index)
+
+    @staticmethod
+    def _format_dates(dates: pd.Series) -> List[str]:
+        """YYYYMMDDHHMMSS for a whole column (NumPy ISO formatting, ~6x faster than .dt.strftime)."""
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        iso = np.datetime_as_string(dates.to_numpy().astype('datetime64[s]'), unit='s')
+        return [d.translate(_DATE_SEPARATORS) for d in iso.tolist()]
 
     def _build_header(self) -> str:
         return """OFXHEADER:100
@@ -29,16 +99,16 @@ OLDFILEUID:NONE
 NEWFILEUID:NONE
 """
 
-    def _build_body(self, transactions: List[UnifiedTransaction]) -> str:
-        now_str = datetime.now().strftime("%Y%m%d%H%M%S")
-        
-        # Calculate Aggregates
-        start_date = min(t.date for t in transactions) if transactions else datetime.now()
-        end_date = max(t.date for t in transactions) if transactions else datetime.now()
-        
+    def _build_body_start(self, batch: pd.DataFrame, now_str: str) -> str:
+        # Calculate Aggregates (vectorized min/max over the date column)
+        if len(batch):
+            start_date, end_date = batch['date'].min(), batch['date'].max()
+        else:
+            start_date = end_date = datetime.now()
+
         start_str = start_date.strftime("%Y%m%d000000")
         end_str = end_date.strftime("%Y%m%d235959")
-        
+
         out = []
         out.append("<OFX>")
         out.append("  <SIGNONMSGSRSV1>")
@@ -68,10 +138,11 @@ NEWFILEUID:NONE
         out.append("        <BANKTRANLIST>")
         out.append(f"          <DTSTART>{start_str}</DTSTART>")
         out.append(f"          <DTEND>{end_str}</DTEND>")
-        
-        for txn in transactions:
-            out.append(self._build_transaction(txn))
-            
+
+        return "\n".join(out)
+
+    def _build_body_end(self, now_str: str) -> str:
+        out = [""]
         out.append("        </BANKTRANLIST>")
         out.append("        <LEDGERBAL>")
         out.append(f"          <BALAMT>0.00</BALAMT>")
@@ -81,35 +152,39 @@ NEWFILEUID:NONE
         out.append("    </STMTTRNRS>")
         out.append("  </BANKMSGSRSV1>")
         out.append("</OFX>")
-        
+
         return "\n".join(out)
 
-    def _build_transaction(self, txn: UnifiedTransaction) -> str:
-        date_str = txn.date.strftime("%Y%m%d%H%M%S")
-        
-        # Ensure proper type
-        trn_type = txn.type.upper()
-        if trn_type not in ['DEBIT', 'CREDIT', 'OTHER', 'PAYMENT', 'DEP']:
-             # Fallback based on amount
-             trn_type = 'DEBIT' if txn.amount < 0 else 'CREDIT'
-        
-        # Ensure FITID
-        fitid = txn.fitid
-        if not fitid:
-            # Generate deterministic FITID
-            # Hash of date + amount + memo to ensure uniqueness but consistency
-            raw = f"{date_str}{txn.amount}{txn.memo}"
-            fitid = hashlib.md5(raw.encode('utf-8')).hexdigest()
-
-        # Check Number / Doc ID
-        check_num_tag = ""
-        if txn.doc_id:
-            check_num_tag = f"          <CHECKNUM>{txn.doc_id}</CHECKNUM>\n"
-
-        return f"""          <STMTTRN>
-            <TRNTYPE>{trn_type}</TRNTYPE>
-            <DTPOSTED>{date_str}</DTPOSTED>
-            <TRNAMT>{txn.amount:.2f}</TRNAMT>
-            <FITID>{fitid}</FITID>
-{check_num_tag}            <MEMO>{txn.memo}</MEMO>
-          </STMTTRN>"""
+    def _build_transactions(self, batch: pd.DataFrame) -> str:
+        """Formats a chunk of STMTTRN blocks from the batch columns."""
+        date_str = self._format_dates(batch['date'])
+        amounts = batch['amount'].to_numpy()
+
+        # Ensure proper type (fallback based on amount)
+        upper = batch['type'].str.upper().to_numpy(dtype=object)
+        trn_type = np.where(
+            np.isin(upper, VALID_TRN_TYPES), upper, np.where(amounts < 0, 'DEBIT', 'CREDIT')
+        ).tolist()
+
+        memos = batch['memo'].tolist()
+        doc_ids = batch['doc_id'].tolist()
+        amounts = amounts.tolist()
+
+        # Ensure FITID: deterministic hash of date + amount + memo when missing
+        fitids = [
+            f or hashlib.md5(f"{d}{a}{m}".encode('utf-8')).hexdigest()
+            for f, d, a, m in zip(batch['fitid'].tolist(), date_str, amounts, memos)
+        ]
+
+        blocks = []
+        for t, d, a, f, c, m in zip(trn_type, date_str, amounts, fitids, doc_ids, memos):
+            # Check Number / Doc ID
+            check_num_tag = f"          <CHECKNUM>{c.translate(_SGML_ESCAPE)}</CHECKNUM>\n" if c else ""
+            blocks.append(f"""          <STMTTRN>
+            <TRNTYPE>{t}</TRNTYPE>
+            <DTPOSTED>{d}</DTPOSTED>
+            <TRNAMT>{a:.2f}</TRNAMT>
+            <FITID>{f.translate(_SGML_ESCAPE)}</FITID>
+{check_num_tag}            <MEMO>{m.translate(_SGML_ESCAPE)}</MEMO>
+          </STMTTRN>""")
+        return "\n".join(blocks)
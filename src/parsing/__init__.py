@@ -12,27 +12,31 @@ This module consolidates all parsing functionality:
 from .base import BaseParser, BaseExtractor
 
 # Configuration
-from .config.layout import BankLayout, ColumnDef
+from .config.layout import BankLayout, ColumnDef, SubLayout
 from .config.registry import LayoutRegistry
 
-# Banks
-from .banks.bb import BBMonthlyPDFParser
-from .banks.itau import ItauPDFParser
-from .banks.stone import StonePDFParser
+# Everything below is imported on first access (see src.common.lazy): the
+# parsers pull pdfplumber, pypdf, ofxparse, OCR and Gemini dependencies.
+from src.common.lazy import lazy_exports
 
-# Sources
-from .sources.ofx import OfxParser
-from .sources.ledger_pdf import LedgerParser
-from .sources.ledger_csv import LedgerCSVParser
-
-# Extractors
-from .extractors.generic import GenericPDFExtractor
-from .extractors.ocr import OCRExtractor
-from .extractors.ai_generation import GeminiLayoutGenerator
-
-# Pipeline & Factory
-from .pipeline import ExtractorPipeline
-from .facade import ParserFacade
+__getattr__ = lazy_exports(__name__, {
+    # Banks
+    'BBMonthlyPDFParser': '.banks.bb:BBMonthlyPDFParser',
+    'ItauPDFParser': '.banks.itau:ItauPDFParser',
+    'StonePDFParser': '.banks.stone:StonePDFParser',
+    # Sources
+    'OfxParser': '.sources.ofx:OfxParser',
+    'LedgerParser': '.sources.ledger_pdf:LedgerParser',
+    'LedgerCSVParser': '.sources.ledger_csv:LedgerCSVParser',
+    # Extractors
+    'GenericPDFExtractor': '.extractors.generic:GenericPDFExtractor',
+    'OCRExtractor': '.extractors.ocr:OCRExtractor',
+    'GeminiLayoutGenerator': '.extractors.ai_generation:GeminiLayoutGenerator',
+    'LayoutInferencer': '.extractors.layout_inference:LayoutInferencer',
+    # Pipeline & Factory
+    'ExtractorPipeline': '.pipeline:ExtractorPipeline',
+    'ParserFacade': '.facade:ParserFacade',
+})
 
 __all__ = [
     # Base
@@ -41,6 +45,7 @@ __all__ = [
     # Config
     'BankLayout',
     'ColumnDef', 
+    'SubLayout',
     'LayoutRegistry',
     # Banks
     'BBPdfParser',
@@ -54,6 +59,7 @@ __all__ = [
     'GenericPDFExtractor',
     'OCRExtractor',
     'GeminiLayoutGenerator',
+    'LayoutInferencer',
     # Pipeline
     'ExtractorPipeline',
     'ParserFacade',
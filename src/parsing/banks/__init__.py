@@ -1,25 +1,32 @@
-from .bb import BBMonthlyPDFParser
-from .stone import StonePDFParser
-from .cef import CEFPdfParser
-from .sicredi import SicrediPDFParser
-from .santander import SantanderPDFParser
-from .itau import ItauPDFParser
-from .bradesco import BradescoPDFParser
-from .sicoob import SicoobPDFParser
-from .cresol import CresolParser
+from src.common.lazy import LazyRegistry, lazy_exports
 
-PARSERS = {
-    '001': BBMonthlyPDFParser,
-    'STONE': StonePDFParser,
-    '104': CEFPdfParser,
-    '748': SicrediPDFParser,
-    '033': SantanderPDFParser,
-    '341': ItauPDFParser,
-    '237': BradescoPDFParser,
-    '756': SicoobPDFParser,
-    'CRESOL': CresolParser
+_CLASSES = {
+    'BBMonthlyPDFParser': '.bb:BBMonthlyPDFParser',
+    'StonePDFParser': '.stone:StonePDFParser',
+    'CEFPdfParser': '.cef:CEFPdfParser',
+    'SicrediPDFParser': '.sicredi:SicrediPDFParser',
+    'SantanderPDFParser': '.santander:SantanderPDFParser',
+    'ItauPDFParser': '.itau:ItauPDFParser',
+    'BradescoPDFParser': '.bradesco:BradescoPDFParser',
+    'SicoobPDFParser': '.sicoob:SicoobPDFParser',
+    'CresolParser': '.cresol:CresolParser',
 }
 
+# Parser modules are only imported when their bank is detected
+PARSERS = LazyRegistry({
+    '001': _CLASSES['BBMonthlyPDFParser'],
+    'STONE': _CLASSES['StonePDFParser'],
+    '104': _CLASSES['CEFPdfParser'],
+    '748': _CLASSES['SicrediPDFParser'],
+    '033': _CLASSES['SantanderPDFParser'],
+    '341': _CLASSES['ItauPDFParser'],
+    '237': _CLASSES['BradescoPDFParser'],
+    '756': _CLASSES['SicoobPDFParser'],
+    'CRESOL': _CLASSES['CresolParser']
+}, package=__name__)
+
+__getattr__ = lazy_exports(__name__, _CLASSES)
+
 __all__ = [
     'BBMonthlyPDFParser', 
     'StonePDFParser', 
@@ -2,6 +2,7 @@ import pandas as pd
 import pdfplumber
 import logging
 from ..base import BaseParser
+from ..config.layout import SubLayout
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +12,27 @@ from datetime import datetime
 class BBMonthlyPDFParser(BaseParser):
     bank_name = 'Banco do Brasil'
 
+    # BB layouts in order of specificity. Routed on the first page and kept
+    # for the rest of the document (pages are re-routed while on the
+    # simplified default, e.g. after a cover page).
+    SUB_LAYOUTS = (
+        SubLayout('g331', markers=('G331',)),
+        # Mod. 0.51 (dot dates)
+        SubLayout('dot_date', markers=(r'\d{2}\.\d{2}\.\d{4}',)),
+        # Full format with agência/lote codes:
+        # "05/03/2025 3935 99020870 Transferência... 5.186,00 C", within the
+        # first 30 lines of the page
+        SubLayout('full', markers=(r'\d{2}/\d{2}/\d{4}\s+\d{4}\s+\d{8}',), max_lines=30),
+        # Simplified: "02/01/2025 Dep dinheiro ATM", value on same or next line
+        SubLayout('simplified'),
+    )
+    EXTRACTORS = {
+        'g331': '_extract_g331',
+        'dot_date': '_extract_dot_date_layout',
+        'full': '_extract_full_format',
+        'simplified': '_extract_simplified_format',
+    }
+
     def parse(self, file_path_or_buffer) -> tuple[pd.DataFrame, dict]:
         df, metadata = self.parse_pdf(file_path_or_buffer)
         
@@ -91,30 +113,9 @@ class BBMonthlyPDFParser(BaseParser):
         return df
 
     def extract_page(self, page):
-        text = page.extract_text() or ""
-        
-        # Try different BB layouts in order of specificity
-        if "G331" in text:
-            return self._extract_g331(page)
-        
-        # Check for the Mod. 0.51 layout (dot dates)
-        if self._is_dot_date_layout(text):
-            return self._extract_dot_date_layout(page)
-
-        # Check if this is the full format (with agência/lote codes)
-        # Sample line: "05/03/2025 3935 99020870 Transferência... 5.186,00 C"
-        if self._has_full_format(text):
-            return self._extract_full_format(page)
-        
-        # Otherwise try simplified format
-        # Sample line: "02/01/2025 Dep dinheiro ATM"
-        # Valor may be on same line or next line
-        return self._extract_simplified_format(page)
+        # Sub-layout decided once per document (see SUB_LAYOUTS)
+        return getattr(self, self.EXTRACTORS[self.sub_layout(page)])(self.page_region(page))
     
-    def _is_dot_date_layout(self, text):
-        """Check if the text corresponds to the layout with dot-separated dates."""
-        return bool(re.search(r'\d{2}\.\d{2}\.\d{4}', text))
-
     def _extract_dot_date_layout(self, page):
         """
         Extract transactions from the 'Mod. 0.51' layout (DD.MM.YYYY dates).
@@ -227,17 +228,6 @@ class BBMonthlyPDFParser(BaseParser):
 
         return rows, bal_start, bal_end
 
-    def _has_full_format(self, text):
-        """Check if text contains full format transactions (with agência/lote)."""
-        lines = text.split('\n')
-        import re
-        # Look for pattern: DATE + 4-digit-code + 8-digit-code
-        full_pattern = re.compile(r'\d{2}/\d{2}/\d{4}\s+\d{4}\s+\d{8}')
-        for line in lines[:30]:  # Check first 30 lines
-            if full_pattern.search(line):
-                return True
-        return False
-    
     def _extract_full_format(self, page):
         """Extract from BB format with agência/lote codes."""
         rows = []
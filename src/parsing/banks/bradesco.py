@@ -2,6 +2,7 @@ import pandas as pd
 import pdfplumber
 import logging
 from ..base import BaseParser
+from ..extractors.word_geometry import ColumnBands, page_lines
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +12,10 @@ from datetime import datetime
 class BradescoPDFParser(BaseParser):
     bank_name = 'Bradesco'
 
+    # Columns by x0: Credit (330-410), Debit (410-505) and Balance (>510) are
+    # told apart per amount, see `extract_page`
+    COLUMNS = ColumnBands(date=(None, 100), memo=(95, 330))
+
     def parse(self, file_path_or_buffer) -> tuple[pd.DataFrame, dict]:
         self.current_date = None
         return self.parse_pdf(file_path_or_buffer)
@@ -58,18 +63,10 @@ class BradescoPDFParser(BaseParser):
         if start_bal_match:
             bal_start = self._parse_br_amount(start_bal_match.group(2))
         
-        words = page.extract_words()
-        lines_data = {}
-        for w in words:
-            top = int(w['top'] // 2) * 2
-            lines_data.setdefault(top, []).append(w)
-            
         current_tx = None
         
-        sorted_tops = sorted(lines_data.keys())
-        for top in sorted_tops:
-            line_words = sorted(lines_data[top], key=lambda x: x['x0'])
-            line_text = " ".join([w['text'] for w in line_words]).strip()
+        for line in page_lines(self.page_region(page), self.COLUMNS):
+            line_text = line.text.strip()
             
             # Skip noise and summary lines
             upper_text = line_text.upper()
@@ -77,23 +74,21 @@ class BradescoPDFParser(BaseParser):
                 continue
                 
             # If we hit a TOTAL line WITH a balance, this usually marks the end of the CC section
-            if "TOTAL" in upper_text and any(w['x0'] > 510 for w in line_words):
+            if "TOTAL" in upper_text and any(x0 > 510 for x0 in line.x0):
                 if current_tx and current_tx['date']:
                     rows.append(current_tx)
                 current_tx = None
                 
                 nums_footer = []
-                for w in line_words:
-                    txt = w['text']
-                    if re.match(r"^-?[\d\.,]+$", txt) and len(txt) > 2 and w['x0'] > 510:
+                for txt, x0 in line:
+                    if re.match(r"^-?[\d\.,]+$", txt) and len(txt) > 2 and x0 > 510:
                         nums_footer.append(self._parse_br_amount(txt))
                 if nums_footer:
                     bal_end = nums_footer[-1]
                 break # Stop processing this page after footer/summary
                 
             # 1. Detect Date at the start of the line
-            dt_words = [w['text'] for w in line_words if w['x0'] < 100]
-            dt_s = "".join(dt_words)
+            dt_s = line.column('date', "")
             if re.match(r"\d{2}/\d{2}/\d{4}", dt_s):
                 try:
                     self.current_date = datetime.strptime(dt_s, "%d/%m/%Y").date()
@@ -102,18 +97,16 @@ class BradescoPDFParser(BaseParser):
             # 2. Extract numeric values and their potential roles
             # Bradesco Columns: Credit (330-410), Debit (410-505), Balance (>510)
             nums = [] # (value, x0, original_text)
-            for w in line_words:
-                txt = w['text']
-                if re.match(r"^-?[\d\.,]+$", txt) and len(txt) > 2 and w['x0'] > 320:
-                    nums.append((self._parse_br_amount(txt), w['x0'], txt))
+            for txt, x0 in line:
+                if re.match(r"^-?[\d\.,]+$", txt) and len(txt) > 2 and x0 > 320:
+                    nums.append((self._parse_br_amount(txt), x0, txt))
             
             # 3. Decision Logic
             is_money_line = any(330 < n[1] < 505 for n in nums)
             is_balance_only = not is_money_line and any(n[1] > 510 for n in nums)
             
             # Description parts (always in the middle)
-            desc_parts = [w['text'] for w in line_words if 95 < w['x0'] < 330]
-            desc_line = " ".join(desc_parts).strip()
+            desc_line = line.column('memo').strip()
             
             if is_money_line:
                 # This physical line contains an amount or a balance (or both)
@@ -22,7 +22,7 @@ class CEFPdfParser(BaseParser):
         bal_start = None
         bal_end = None
         
-        text = page.extract_text() or ""
+        text = self.page_region(page).extract_text() or ""
         lines = text.split('\n')
         
         # Regex for CEF transaction lines
@@ -1,4 +1,3 @@
-import re
 from typing import Dict, Any, List
 from ..extractors.generic import GenericPDFExtractor
 from ..config.layout import BankLayout
@@ -19,17 +18,17 @@ class CresolParser(GenericPDFExtractor):
         lines = text.split('\n')
         previous_line = ""
         discarded = []
-        
-        # Regex patterns
-        line_regex = re.compile(self.layout.line_pattern)
+        balance_info = {'start': None, 'end': None}
         
         for line in lines:
             line = line.strip()
             if not line:
                 continue
                 
-            # Check for transaction match
-            match = line_regex.match(line)
+            # Transaction and balance rules in one pass (see config.grammar)
+            classes = self.grammar.classify(line)
+            self._update_balances(balance_info, classes)
+            match = classes.get('transaction')
             if match:
                 data = self._parse_match(match)
                 
@@ -52,7 +51,6 @@ class CresolParser(GenericPDFExtractor):
                 # LINE 2: 30/09/2025 ...
                 previous_line = line
         
-        balance_info = self._scan_for_balances(text)
         validation = self._validate_consistency(transactions, balance_info)
         
         return {
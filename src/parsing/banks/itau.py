@@ -4,24 +4,44 @@ import logging
 import re
 from datetime import datetime
 from ..base import BaseParser
+from ..config.layout import SignRule, SubLayout
+from ..config.postprocess import SignRules
+from ..extractors.word_geometry import ColumnBands, page_lines
 
 logger = logging.getLogger(__name__)
 
 class ItauPDFParser(BaseParser):
     bank_name = 'Itau'
 
+    SUB_LAYOUTS = (
+        SubLayout('sagrado', markers=('Saldo total', 'Lançamentos do período')),
+        # Default to smart extraction for other Itau layouts
+        SubLayout('smart'),
+    )
+    EXTRACTORS = {
+        'sagrado': '_extract_sagrado',
+        'smart': 'extract_transactions_smart',
+    }
+    # Sagrado columns by x0: Data (~35), Lançamentos (~100-250), Razão Social (~280),
+    # CNPJ (~360), Valor (~480), Saldo (~520)
+    SAGRADO_COLUMNS = ColumnBands(date=(None, 100), memo=(100, 450), amount=(450, 518), balance=(518, None))
+    # Sagrado memos without a minus: credit keywords win; unknown ones stay
+    # positive (safer to let reconciliation flag them)
+    SAGRADO_SIGN_RULES = SignRules([
+        SignRule(['PIX QR', 'CREDITO', 'RECEBIDO', 'ESTORNO', 'RESGATE', 'DEP.', 'RENDIMENTO'], 'credit'),
+        SignRule([
+            'PIX ENVIADO', 'DEBITO', 'PAGTO', 'TARIFA', 'MANUT', 'DOC/TED',
+            'CP MAESTRO', 'EST SHOP', 'SISPAG', 'PAG.', 'CH COMPENSADO',
+            'DÉBITO', 'TRANSFERENCIA E', 'PGTO', 'IOF', 'JUROS',
+        ], 'debit'),
+    ])
+
     def parse(self, file_path_or_buffer) -> tuple[pd.DataFrame, dict]:
         return self.parse_pdf(file_path_or_buffer)
 
     def extract_page(self, page):
-        text = page.extract_text() or ""
-        
-        # Sub-layout: Sagrado / Modern
-        if "Saldo total" in text and "Lançamentos do período" in text:
-            return self._extract_sagrado(page)
-            
-        # Default to smart extraction for other Itau layouts
-        return self.extract_transactions_smart(page)
+        # Sub-layout (Sagrado / Modern) decided once per document
+        return getattr(self, self.EXTRACTORS[self.sub_layout(page)])(self.page_region(page))
 
     def _extract_sagrado(self, page):
         """
@@ -39,66 +59,28 @@ class ItauPDFParser(BaseParser):
             bal_start = self._parse_br_amount(start_bal_match.group(2))
 
         # Use coordinate-based extraction to separate columns
-        words = page.extract_words()
-        lines = {}
-        for w in words:
-            # Group words by Y coordinate with some tolerance
-            top = int(w['top'] // 2) * 2
-            if top not in lines: lines[top] = []
-            lines[top].append(w)
-            
         seen_lines = set()
 
-        for top in sorted(lines.keys()):
-            line_words = sorted(lines[top], key=lambda x: x['x0'])
-            line_text = " ".join([w['text'] for w in line_words])
-            
+        for line in page_lines(page, self.SAGRADO_COLUMNS):
             # Anti-duplication by content + y
-            content_key = f"{top}_{line_text}"
+            content_key = (int(line.top), line.text)
             if content_key in seen_lines: continue
             seen_lines.add(content_key)
 
-            # Identify columns by x0
-            # Data (~35), Lançamentos (~100-250), Razão Social (~280), CNPJ (~360), Valor (~480), Saldo (~520)
-            dt_words = [w['text'] for w in line_words if w['x0'] < 100]
-            val_words = [w['text'] for w in line_words if 450 < w['x0'] < 518]
-            bal_words = [w['text'] for w in line_words if w['x0'] >= 518]
-            desc_words = [w['text'] for w in line_words if 100 <= w['x0'] <= 450]
-            
-            dt_s = "".join(dt_words)
+            dt_s = line.column('date', "")
             if not re.search(r"\d{2}/\d{2}/\d{4}", dt_s): continue
             
-            memo = " ".join(desc_words).strip()
+            memo = line.column('memo').strip()
             if "SALDO ANTERIOR" in memo.upper(): continue
             
-            val_s = "".join(val_words)
-            bal_s = "".join(bal_words)
+            val_s = line.column('amount', "")
+            bal_s = line.column('balance', "")
             
             if val_s:
                 amount = self._parse_br_amount(val_s)
-                # Sign detection by keywords in memo
-                memo_up = memo.upper()
-                
-                # Positive markers
-                pos_keys = ['PIX QR', 'CREDITO', 'RECEBIDO', 'ESTORNO', 'RESGATE', 'DEP.', 'RENDIMENTO']
-                # Negative markers
-                neg_keys = [
-                    'PIX ENVIADO', 'DEBITO', 'PAGTO', 'TARIFA', 'MANUT', 'DOC/TED', 
-                    'CP MAESTRO', 'EST SHOP', 'SISPAG', 'PAG.', 'CH COMPENSADO', 
-                    'DÉBITO', 'TRANSFERENCIA E', 'PGTO', 'IOF', 'JUROS'
-                ]
-
+                # Explicit minus; memo keywords decide the others (SAGRADO_SIGN_RULES)
                 if "-" in val_s: 
                     amount = -abs(amount)
-                elif any(k in memo_up for k in pos_keys):
-                    amount = abs(amount)
-                elif any(k in memo_up for k in neg_keys):
-                    amount = -abs(amount)
-                else:
-                    # Default for unknown: If it's Itau Sagrado, usually payments have '-' in val_s
-                    # but some might not. Let's assume negative if not matched as positive?
-                    # No, safer to stay positive and let reconciliation fail/check.
-                    pass
 
                 try:
                     dt = datetime.strptime(dt_s[:10], "%d/%m/%Y").date()
@@ -116,5 +98,8 @@ class ItauPDFParser(BaseParser):
 
         if not rows:
             return self.extract_transactions_smart(page)
-            
+        
+        amounts = self.SAGRADO_SIGN_RULES.apply([r['amount'] for r in rows], [r['description'] for r in rows])
+        for row, amount in zip(rows, amounts.tolist()):
+            row['amount'] = amount
         return rows, bal_start, bal_end
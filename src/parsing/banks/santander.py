@@ -22,7 +22,7 @@ class SantanderPDFParser(BaseParser):
         bal_start = None
         bal_end = None
         
-        text = page.extract_text() or ""
+        text = self.page_region(page).extract_text() or ""
         lines = text.split('\n')
         
         # 01/12/2025 Saldo do dia Cc + ContaMax principal R$ 4.376,19
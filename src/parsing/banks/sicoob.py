@@ -2,6 +2,7 @@ import pandas as pd
 import pdfplumber
 import logging
 from ..base import BaseParser
+from ..extractors.word_geometry import ColumnBands, page_lines
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +12,9 @@ from datetime import datetime
 class SicoobPDFParser(BaseParser):
     bank_name = 'Sicoob'
 
+    # Columns by x0; the date sits at ~50 or ~171 and overlaps the description
+    COLUMNS = ColumnBands(date=(None, 200), memo=(95, 430))
+
     def __init__(self):
         super().__init__()
         self.current_date = None
@@ -57,18 +61,10 @@ class SicoobPDFParser(BaseParser):
             bal_start = self._parse_sicoob_amount(start_match.group(1) + start_match.group(2))
 
         # 2. Page processing
-        words = page.extract_words()
-        lines_data = {}
-        for w in words:
-            top = int(w['top'] // 2) * 2
-            lines_data.setdefault(top, []).append(w)
-            
         current_tx = None
-        sorted_tops = sorted(lines_data.keys())
         
-        for top in sorted_tops:
-            line_words = sorted(lines_data[top], key=lambda x: x['x0'])
-            line_text = " ".join([w['text'] for w in line_words]).strip()
+        for line in page_lines(self.page_region(page), self.COLUMNS):
+            line_text = line.text.strip()
             upper_text = line_text.upper()
             
             # 1. Skip strictly structural lines
@@ -91,8 +87,7 @@ class SicoobPDFParser(BaseParser):
                 continue
 
             # 3. Detect Date at x0 < 100 or x0 ~ 171
-            dt_words = [w['text'] for w in line_words if w['x0'] < 200]
-            dt_s = "".join(dt_words)
+            dt_s = line.column('date', "")
             if re.match(r"\d{2}/\d{2}/\d{4}", dt_s):
                 try:
                     self.current_date = datetime.strptime(dt_s[:10], "%d/%m/%Y").date()
@@ -100,10 +95,9 @@ class SicoobPDFParser(BaseParser):
 
             # 4. Detect Money Tokens
             nums = []
-            for w in line_words:
-                txt = w['text']
+            for txt, x0 in line:
                 if re.search(r"[\d\.,]+[CD\*]$", txt):
-                    nums.append((self._parse_sicoob_amount(txt), w['x0'], txt))
+                    nums.append((self._parse_sicoob_amount(txt), x0, txt))
             
             # 5. Identify Roles
             # Amount column is widely spaced. SISBR ~438, Standard ~515.
@@ -111,8 +105,7 @@ class SicoobPDFParser(BaseParser):
             is_money_line = any(300 < n[1] < 530 for n in nums)
             
             # Description parts (between date and amount)
-            desc_parts = [w['text'] for w in line_words if 95 < w['x0'] < 430]
-            desc_line = " ".join(desc_parts).strip()
+            desc_line = line.column('memo').strip()
             # Clean date from description
             desc_line = re.sub(r"^\d{2}/\d{2}/\d{4}\s*", "", desc_line)
             
@@ -2,6 +2,8 @@ import pandas as pd
 import pdfplumber
 import logging
 from ..base import BaseParser
+from ..config.layout import SubLayout
+from ..extractors.word_geometry import ColumnBands, page_lines
 
 logger = logging.getLogger(__name__)
 
@@ -11,18 +13,27 @@ from datetime import datetime
 class SicrediPDFParser(BaseParser):
     bank_name = 'Sicredi'
 
+    SUB_LAYOUTS = (
+        SubLayout('associado', markers=('Associado:', 'Cooperativa:')),
+        SubLayout('standard', markers=('COOP CRED',)),
+        SubLayout('smart'),
+    )
+    EXTRACTORS = {
+        'associado': '_extract_associado',
+        'standard': '_extract_standard',
+        'smart': 'extract_transactions_smart',
+    }
+    # COOP CRED columns by x0: Debit (~370), Credit (~452), Balance (~529)
+    STANDARD_COLUMNS = ColumnBands(
+        date=(None, 100), memo=(150, 330), debit=(330, 410), credit=(410, 490), balance=(490, None),
+    )
+
     def parse(self, file_path_or_buffer) -> tuple[pd.DataFrame, dict]:
         return self.parse_pdf(file_path_or_buffer)
 
     def extract_page(self, page):
-        text = page.extract_text() or ""
-        
-        if "Associado:" in text and "Cooperativa:" in text:
-            return self._extract_associado(page)
-        elif "COOP CRED" in text:
-            return self._extract_standard(page)
-            
-        return self.extract_transactions_smart(page)
+        # Sub-layout decided once per document (see SUB_LAYOUTS)
+        return getattr(self, self.EXTRACTORS[self.sub_layout(page)])(self.page_region(page))
 
     def _extract_standard(self, page):
         """
@@ -39,32 +50,15 @@ class SicrediPDFParser(BaseParser):
         if start_bal_match:
             bal_start = self._parse_br_amount(start_bal_match.group(1))
 
-        words = page.extract_words()
-        lines = {}
-        for w in words:
-            top = int(w['top'] // 2) * 2
-            if top not in lines: lines[top] = []
-            lines[top].append(w)
-            
-        for top in sorted(lines.keys()):
-            line_words = sorted(lines[top], key=lambda x: x['x0'])
-            
+        for line in page_lines(page, self.STANDARD_COLUMNS):
             # Find date
-            dt_words = [w['text'] for w in line_words if w['x0'] < 100]
-            dt_s = "".join(dt_words)
+            dt_s = line.column('date', "")
             if not re.match(r"\d{2}/\d{2}/\d{4}", dt_s): continue
             
-            # Identify columns
-            # Debit: ~330-410, Credit: ~410-490, Balance: ~490-600
-            deb_words = [w['text'] for w in line_words if 330 < w['x0'] < 410]
-            cre_words = [w['text'] for w in line_words if 410 <= w['x0'] < 490]
-            bal_words = [w['text'] for w in line_words if w['x0'] >= 490]
-            desc_words = [w['text'] for w in line_words if 150 <= w['x0'] < 330]
-            
-            memo = " ".join(desc_words).strip()
-            val_deb = "".join(deb_words)
-            val_cre = "".join(cre_words)
-            bal_s = "".join(bal_words)
+            memo = line.column('memo').strip()
+            val_deb = line.column('debit', "")
+            val_cre = line.column('credit', "")
+            bal_s = line.column('balance', "")
             
             amount = 0.0
             if val_cre:
@@ -2,6 +2,8 @@ import pandas as pd
 import pdfplumber
 import logging
 from ..base import BaseParser
+from ..config.layout import PostProcessing
+from ..config.postprocess import PostProcessor
 
 logger = logging.getLogger(__name__)
 
@@ -49,28 +51,16 @@ class StonePDFParser(BaseParser):
     """
     bank_name = 'Stone'
 
+    # Strictly filter out 'Tarifa' entries as requested by the user
+    POST_PROCESSING = PostProcessor(PostProcessing(exclude_patterns=['tarifa']))
+
     def parse(self, file_path_or_buffer) -> tuple[pd.DataFrame, dict]:
+        # 'Tarifa' entries are already filtered out (POST_PROCESSING)
         df, metadata = self.parse_pdf(file_path_or_buffer)
         
-        # Strictly filter out 'Tarifa' entries as requested by the user.
-        if not df.empty:
-            # Create a mask for rows to keep
-            keep_mask = pd.Series(True, index=df.index)
-            
-            for i in range(len(df)):
-                row = df.iloc[i]
-                desc_lower = str(row['description']).lower()
-                
-                # Filter out any entry containing 'tarifa'
-                if 'tarifa' in desc_lower:
-                    keep_mask.iloc[i] = False
-            
-            # Apply filter
-            df = df[keep_mask].copy()
-            
-            # Drop the helper balance column if it exists
-            if 'balance' in df.columns:
-                df = df.drop(columns=['balance'])
+        # Drop the helper balance column if it exists
+        if not df.empty and 'balance' in df.columns:
+            df = df.drop(columns=['balance'])
         
         # Swap start/end balances and reverse rows for standard reconciliation (Oldest -> Newest)
         if not df.empty:
@@ -102,7 +92,7 @@ class StonePDFParser(BaseParser):
         bal_start = None
         bal_end = None
         
-        text = page.extract_text() or ""
+        text = self.page_region(page).extract_text() or ""
         lines = [line.strip() for line in text.split('\n') if line.strip()]
         
         # Full transaction parsing patterns (robust against IDs/CPF/CNPJ in middle)
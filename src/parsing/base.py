@@ -6,10 +6,16 @@ Provides unified base classes for both:
 - Extractors (for PDF conversion - returns Dict)
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
 from src.common.logging_config import get_logger
+from src.common.timing import StageTimer, _TimedPage
+from .config.grammar import LineGrammar, LineRule
+from .config.layout import SignRule
+from .config.postprocess import PostProcessor, SignRules
+from .extractors.word_geometry import crop_region, page_lines
 import pandas as pd
 import re
+import time
 from datetime import datetime
 
 logger = get_logger(__name__)
@@ -24,6 +30,60 @@ class BaseParser(ABC):
         Tuple[DataFrame, Dict]: (transactions_df, metadata)
     """
     
+    # Ordered sub-layouts (SubLayout) dispatched by `sub_layout`; the default
+    # (no markers) goes last
+    SUB_LAYOUTS: tuple = ()
+    
+    # Page regions (x0, top, x1, bottom) read instead of the whole page, by
+    # name ("transactions", ...); sub-layouts add their own (SubLayout.regions)
+    REGIONS: dict = {}
+    
+    # Exclusions, sign rules and description clean-up applied to the parsed
+    # frame (see config.postprocess); parsers override it with their own
+    POST_PROCESSING = PostProcessor()
+    
+    # Keyword signs of `extract_transactions_smart` lines without an explicit
+    # minus or "D" (debit keywords win)
+    SMART_SIGN_RULES = SignRules([
+        SignRule(['DEBITO', 'PAGTO', 'ENVIADO', 'SAQU', 'TARIFA', 'PIX -', 'PGTO', 'RESGATE'], 'debit'),
+        SignRule(['CREDITO', 'RECEBIDO', 'ESTORN', 'DEPOSITO', 'PIX +', 'APLICA'], 'credit'),
+    ])
+    
+    # Line classes for `should_ignore_line` (balances, totals, zero amounts);
+    # parsers override it with their own rules
+    LINE_GRAMMAR = LineGrammar([
+        LineRule('ignore', r"(?i:SALDO|TOTAL|ANTERIOR|S A L D O|TRANSPORTADO|BLOQUEADO)|\b0[,.]00\s*[DC]?\b",
+                 anchored=False),
+    ])
+    
+    def sub_layout(self, page) -> Optional[str]:
+        """
+        Name of the sub-layout for `page`, decided once per document.
+        
+        The first page is routed through `LayoutRegistry.route`; later pages
+        reuse the route. Only while the default sub-layout is in use (e.g. a
+        cover page without transaction lines) are later pages routed again.
+        """
+        route = getattr(self, '_route', None)
+        if route is None or not route.markers:
+            from .config.registry import LayoutRegistry
+            route = LayoutRegistry.route(type(self), page.extract_text() or "")
+            self._route = route
+        return route.name if route else None
+    
+    def page_region(self, page, name: str = 'transactions'):
+        """
+        `page` cropped to region `name` of the parser or of the current
+        sub-layout (call after `sub_layout`), or the whole page if neither
+        declares it.
+        
+        Text and words outside the region (headers, ads, summary boxes) are
+        never laid out by pdfplumber nor filtered line by line.
+        """
+        route = getattr(self, '_route', None)
+        region = route.regions.get(name) if route and route.regions else None
+        return crop_region(page, region or self.REGIONS.get(name))
+    
     def parse_pdf(self, file_path_or_buffer) -> tuple[pd.DataFrame, dict]:
         """
         Template method for processing a PDF file.
@@ -33,49 +93,74 @@ class BaseParser(ABC):
         all_txns = []
         bal_start = None
         bal_end = None
+        self._route = None
         
-        try:
-            with pdfplumber.open(file_path_or_buffer) as pdf:
-                for i, page in enumerate(pdf.pages):
-                    txns, b_s, b_e = self.extract_page(page)
-                    all_txns.extend(txns)
-                    
-                    # Store the VERY FIRST balance found as bal_start
-                    if bal_start is None and b_s is not None:
-                        bal_start = b_s
-                        logger.debug(f"Found bal_start: {bal_start}", page=i+1)
+        with StageTimer.activate(parser=self.__class__.__name__, layout=getattr(self, 'bank_name', None)) as timer:
+            try:
+                open_start = time.perf_counter()
+                with pdfplumber.open(file_path_or_buffer) as pdf:
+                    timer.add("pdf_open", time.perf_counter() - open_start)
+                    for i, page in enumerate(pdf.pages):
+                        timed_page = _TimedPage(page)
+                        page_start = time.perf_counter()
+                        txns, b_s, b_e = self.extract_page(timed_page)
+                        page_total = time.perf_counter() - page_start
                         
-                    if b_e is not None:
-                        bal_end = b_e
-                        logger.debug(f"Updated bal_end: {bal_end}", page=i+1)
-        except Exception as e:
-            logger.error(f"Parse Error in {self.__class__.__name__}: {e}", exc_info=True, parser=self.__class__.__name__)
-            
-        # Balance-Aware Deduplication
-        deduped = []
-        seen_keys = {}
-        
-        for tx in all_txns:
-            desc_val = str(tx['description']).strip()
-            balance_val = tx.get('balance', tx.get('bal_row'))
-            key = (tx['date'], tx['amount'], balance_val, desc_val)
-            
-            if key in seen_keys:
-                existing = seen_keys[key]
-                if desc_val and desc_val not in existing['description']:
-                    existing['description'] += " | " + desc_val
-            else:
-                seen_keys[key] = tx
-                deduped.append(tx)
-        
-        # Add a unique sequence ID to each transaction within this file
-        # to prevent them from being collapsed during consolidation if they are identical.
-        for i, tx in enumerate(deduped):
-            tx['internal_id'] = i
+                        timer.add("page_text", timed_page.text_s)
+                        timer.add("page_words", timed_page.words_s)
+                        timer.add("page_parse", page_total - timed_page.text_s - timed_page.words_s)
+                        timer.add_page(
+                            i + 1,
+                            tx_count=len(txns),
+                            total=page_total,
+                            text=timed_page.text_s,
+                            words=timed_page.words_s,
+                            parse=page_total - timed_page.text_s - timed_page.words_s,
+                        )
+                        all_txns.extend(txns)
+                        
+                        # Store the VERY FIRST balance found as bal_start
+                        if bal_start is None and b_s is not None:
+                            bal_start = b_s
+                            logger.debug(f"Found bal_start: {bal_start}", page=i+1)
+                            
+                        if b_e is not None:
+                            bal_end = b_e
+                            logger.debug(f"Updated bal_end: {bal_end}", page=i+1)
+            except Exception as e:
+                logger.error(f"Parse Error in {self.__class__.__name__}: {e}", exc_info=True, parser=self.__class__.__name__)
+                
+            # Balance-Aware Deduplication
+            with timer.stage("dedup"):
+                deduped = []
+                seen_keys = {}
+                
+                for tx in all_txns:
+                    desc_val = str(tx['description']).strip()
+                    balance_val = tx.get('balance', tx.get('bal_row'))
+                    key = (tx['date'], tx['amount'], balance_val, desc_val)
+                    
+                    if key in seen_keys:
+                        existing = seen_keys[key]
+                        if desc_val and desc_val not in existing['description']:
+                            existing['description'] += " | " + desc_val
+                    else:
+                        seen_keys[key] = tx
+                        deduped.append(tx)
+                
+                # Add a unique sequence ID to each transaction within this file
+                # to prevent them from being collapsed during consolidation if they are identical.
+                for i, tx in enumerate(deduped):
+                    tx['internal_id'] = i
 
-        df = pd.DataFrame(deduped)
-        if not df.empty:
-            df = df.drop_duplicates().reset_index(drop=True)
+            with timer.stage("dataframe"):
+                df = pd.DataFrame(deduped)
+                if not df.empty:
+                    df = df.drop_duplicates().reset_index(drop=True)
+            if self.POST_PROCESSING and not df.empty:
+                with timer.stage("post_processing"):
+                    df = self.POST_PROCESSING.apply(df).reset_index(drop=True)
+            timer.set_tx_count(len(df))
             
         metadata = {
             'bank': getattr(self, 'bank_name', 'Unknown Bank'),
@@ -89,7 +174,7 @@ class BaseParser(ABC):
         Extracts transactions and balances from a single page.
         Defaults to extract_transactions_smart but can be overridden.
         """
-        return self.extract_transactions_smart(page)
+        return self.extract_transactions_smart(self.page_region(page))
     
     def extract_transactions_smart(self, page_or_text) -> Tuple[list, float, float]:
         """
@@ -101,14 +186,10 @@ class BaseParser(ABC):
             return [], None, None
 
         # If it's a pdfplumber page
-        words = page_or_text.extract_words()
-        lines = {}
-        for w in words:
-            top = int(w['top'] // 2) * 2 # Group by 2px tolerance
-            if top not in lines: lines[top] = []
-            lines[top].append(w)
-            
+        lines = page_lines(page_or_text)
+
         txns = []
+        sign_texts = []
         desc_buffer = []
         bal_first = None
         bal_last = None
@@ -126,9 +207,8 @@ class BaseParser(ABC):
             'JUL': 7, 'AGO': 8, 'SET': 9, 'OUT': 10, 'NOV': 11, 'DEZ': 12
         }
 
-        for top in sorted(lines.keys()):
-            line_words = sorted(lines[top], key=lambda x: x['x0'])
-            text = " ".join([w['text'] for w in line_words])
+        for line in lines:
+            text = line.text
             
             # Find all potential amounts on the line
             matches = list(amt_pattern.finditer(text))
@@ -201,22 +281,23 @@ class BaseParser(ABC):
                 val_s, dc = amt_match.groups()
                 amount = self._parse_br_amount(val_s)
                 
-                # Determine sign
-                keywords_up = text.upper()
-                if "-" in val_s or dc == 'D' or any(k in keywords_up for k in ['DEBITO', 'PAGTO', 'ENVIADO', 'SAQU', 'TARIFA', 'PIX -', 'PGTO', 'RESGATE']):
+                # Explicit sign; keywords decide the others (SMART_SIGN_RULES, per page)
+                if "-" in val_s or dc == 'D':
                     amount = -abs(amount)
-                elif dc == 'C' or any(k in keywords_up for k in ['CREDITO', 'RECEBIDO', 'ESTORN', 'DEPOSITO', 'PIX +', 'APLICA']):
-                    amount = abs(amount)
                 
                 if amount != 0:
                     description = " ".join(desc_buffer).strip()
                     if not description: description = text
                     txns.append({'date': dt, 'amount': amount, 'description': description, 'source': 'Bank'})
+                    sign_texts.append(text)
                     desc_buffer = []
             else:
                 desc_buffer.append(text)
                 
         if txns:
+            amounts = self.SMART_SIGN_RULES.apply([t['amount'] for t in txns], sign_texts)
+            for tx, amount in zip(txns, amounts.tolist()):
+                tx['amount'] = amount
             logger.debug(f"Smart extraction found transactions.", count=len(txns), page_sample=full_page_text[:100] if 'full_page_text' in locals() else "N/A")
         return txns, bal_first, bal_last
 
@@ -224,29 +305,13 @@ class BaseParser(ABC):
         """
         Checks if a line should be ignored based on common keywords
         indicating balances, totals, or headers.
+        
+        Lines with an explicit zero amount ("0,00", "0.00 D") are ignored
+        too: they are zero-value transactions or balances.
         """
         if not line:
             return True
-            
-        keywords = ["SALDO", "TOTAL", "ANTERIOR", "S A L D O", "TRANSPORTADO", "BLOQUEADO"]
-        upper_line = line.upper()
-        
-        for k in keywords:
-            if k in upper_line:
-                return True
-
-        # Check for explicitly zero amounts like "0,00" or "0.00" standing alone or at end
-        # This is a heuristic. A better approach is to rely on parsed amount, but we are filtering LINES here.
-        # If the line contains "0,00" or "0.00", it might be a zero value transaction or balance.
-        # However, checking "0,00" might be risky if it appears in ID.
-        # User requested: "ignorar o valor zero". Ideally this happens AFTER parsing the amount.
-        # But if we want to filter the LINE, we look for 0,00 D or 0,00 C patterns often found in statements.
-        
-        # Regex for 0,00 value
-        if re.search(r"\b0,00\s*[DC]?\b", line) or re.search(r"\b0\.00\s*[DC]?\b", line):
-             return True
-                
-        return False
+        return 'ignore' in self.LINE_GRAMMAR.classify(line)
 
     @abstractmethod
     def parse(self, file_path_or_buffer) -> tuple[pd.DataFrame, dict]:
@@ -1,5 +1,9 @@
 # Configuration submodule
-from .layout import BankLayout, ColumnDef
+from .layout import BankLayout, ColumnDef, PostProcessing, SignRule, SubLayout
+from .grammar import LineGrammar, LineRule
+from .postprocess import PostProcessor, SignRules
+from .pattern_safety import UnsafePatternError, check_pattern, compile_pattern
 from .registry import LayoutRegistry
 
-__all__ = ['BankLayout', 'ColumnDef', 'LayoutRegistry']
+__all__ = ['BankLayout', 'ColumnDef', 'SubLayout', 'LayoutRegistry', 'LineGrammar', 'LineRule',
+           'PostProcessing', 'PostProcessor', 'SignRule', 'SignRules', 'UnsafePatternError', 'check_pattern', 'compile_pattern']
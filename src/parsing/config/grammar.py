@@ -0,0 +1,290 @@
+"""
+Line Grammar
+
+Classifies statement lines in a single pass. All rules (transaction, balance,
+header/footer, ...) are compiled into one regex, so a single `match` call per
+line tells every rule that applies and keeps each rule's own capture groups:
+
+    (?:(?=(.*?(?:BALANCE)))|)...(?:(TRANSACTION)|(.*?(?:HEADER|FOOTER))|)
+
+Independent rules are optional lookaheads, tried on every line (a "SALDO DO
+DIA" line can be both a transaction candidate and a balance). Exclusive rules
+form one ordered alternation: the first that matches wins and the rest are
+not tried (header/footer keywords are only looked for on non-transaction
+lines). Keyword lists are compiled as a prefix trie (`keyword_pattern`).
+
+Patterns routed to RE2 by `pattern_safety` cannot join a Python regex;
+grammars holding one fall back to matching rule by rule.
+"""
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Sequence, Tuple
+
+from .pattern_safety import TrackedPattern, compile_pattern
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants, sre_parse
+
+# Header/footer lines that are never part of a transaction memo
+HEADER_FOOTER_KEYWORDS = (
+    "EXTRATO", "SALDO", "PAGE", "PÁGINA", "CONTINUA",
+    "PERIODO:", "PAG.:", "DATA DOCUMENTO",
+    "COOP CRED", "POUP E INVEST", "AGENCIA:", "CONTA:",
+    "TOTAL", "SUJEITO", "AUTENTICAÇÃO", "OUVIDORIA",
+    "SAC", "ALÔ", "DEFICIT", "SUPERAVIT",
+    "TRANSPORTE", "TRANSPORT",
+    "LANCAMENTOS", "DATA HISTORICO",
+    "====", "-----", "_____", "**/**/****",
+)
+# Blank or shorter than 3 characters, or a "..." filler
+_FILLER_LINE = r"\s*(?:\S\S?)?\s*$|\s*\.\.\."
+
+# Larger first-character sets are not worth a skip class
+MAX_SKIP_CHARS = 16
+
+# Backreferences are numbered per pattern and would point elsewhere once combined
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+@dataclass(frozen=True)
+class LineRule:
+    """
+    One line class of a grammar.
+
+    Attributes:
+        kind: Class name reported for matching lines ("transaction", "ignore", ...)
+        pattern: Regex; its groups are numbered from 1 as if it ran alone
+        anchored: Match at the start of the line (`re.match`); False matches
+            anywhere (`re.search`)
+        ignorecase: Case-insensitive rule
+        exclusive: Only tried when no earlier exclusive rule matched
+    """
+    kind: str
+    pattern: str
+    anchored: bool = True
+    ignorecase: bool = False
+    exclusive: bool = False
+
+    @property
+    def flags(self) -> int:
+        return re.IGNORECASE if self.ignorecase else 0
+
+
+class RuleMatch:
+    """
+    Groups of one rule on one line (the `group`/`groups` API of `re.Match`).
+
+    Groups are numbered as in the rule's own pattern; group 0 of a rule that
+    is not anchored may include the text before its match.
+    """
+
+    __slots__ = ('kind', '_values')
+
+    def __init__(self, kind: str, values: Tuple[Optional[str], ...]):
+        self.kind = kind
+        self._values = values
+
+    def group(self, index: int = 0) -> Optional[str]:
+        return self._values[index]
+
+    def groups(self) -> Tuple[Optional[str], ...]:
+        return self._values[1:]
+
+    def __repr__(self) -> str:
+        return f"RuleMatch({self.kind!r}, {self._values[0]!r})"
+
+
+class LineGrammar:
+    """
+    Compiled set of `LineRule`s.
+
+    `classify(line)` returns {kind: RuleMatch} for every rule that applies
+    (the first rule wins when two share a kind); `scan(text)` does it for
+    every line of a text.
+    """
+
+    def __init__(self, rules: Sequence[LineRule], layout: str = ""):
+        self.rules = list(rules)
+        compiled = [compile_pattern(r.pattern, r.flags, layout, r.kind) for r in self.rules]
+
+        self._combined: Optional[TrackedPattern] = None
+        self._spans: List[Tuple[str, int, int]] = []
+        self._sequential: List[Tuple[LineRule, Callable]] = []
+        if all(c.engine == "re" for c in compiled) and not any(_BACKREFERENCE.search(r.pattern) for r in self.rules):
+            try:
+                self._combined = self._combine(layout)
+            except re.error:
+                self._combined = None
+        if self._combined is None:
+            self._sequential = [(r, c.match if r.anchored else c.search) for r, c in zip(self.rules, compiled)]
+
+    @staticmethod
+    def _rule_regex(rule: LineRule) -> str:
+        if rule.anchored:
+            return rule.pattern
+        chars = first_chars(rule.pattern, rule.flags)
+        prefix = skip_to(chars) if chars and len(chars) <= MAX_SKIP_CHARS else ".*?"
+        return f"{prefix}(?:{rule.pattern})"
+
+    def _combine(self, layout: str) -> TrackedPattern:
+        independent = [r for r in self.rules if not r.exclusive]
+        exclusive = [r for r in self.rules if r.exclusive]
+        parts, branches, group = [], [], 0
+        for rule in independent + exclusive:
+            body = self._rule_regex(rule)
+            if rule.ignorecase:
+                body = f"(?i:{body})"
+            inner = re.compile(rule.pattern, rule.flags).groups
+            group += 1
+            self._spans.append((rule.kind, group, group + inner))
+            if rule.exclusive:
+                branches.append(f"({body})")
+            else:
+                parts.append(f"(?:(?=({body}))|)")
+            group += inner
+        if branches:
+            parts.append(f"(?:{'|'.join(branches)}|)")
+        self._lookup = [(kind, start - 1, end) for kind, start, end in reversed(self._spans)]
+        regex = re.compile("".join(parts))
+        # Components were fuzzed one by one; the lookaheads do not interact
+        return TrackedPattern(regex, "re", layout, "grammar")
+
+    def classify(self, line: str) -> Dict[str, RuleMatch]:
+        """Every rule kind that applies to `line`, with its groups."""
+        if self._combined is not None:
+            return self._classes(self._combined.match(line))
+        found: Dict[str, RuleMatch] = {}
+        exclusive_found = False
+        for rule, matcher in self._sequential:
+            if rule.kind in found or (rule.exclusive and exclusive_found):
+                continue
+            match = matcher(line)
+            if match:
+                found[rule.kind] = RuleMatch(rule.kind, (match.group(0),) + match.groups())
+                exclusive_found = exclusive_found or rule.exclusive
+        return found
+
+    def _classes(self, match) -> Dict[str, RuleMatch]:
+        if match.lastindex is None:
+            return {}
+        values = match.groups()
+        # Spans are reversed: the first rule of a kind is assigned last and wins
+        return {kind: RuleMatch(kind, values[start:end]) for kind, start, end in self._lookup
+                if values[start] is not None}
+
+    def scan(self, text: str) -> Iterator[Tuple[str, Dict[str, RuleMatch]]]:
+        """(line, classes) for each line of `text`."""
+        lines = text.split('\n')
+        if self._combined is None:
+            for line in lines:
+                yield line, self.classify(line)
+            self.flush()
+            return
+        for line, match in zip(lines, self._combined.match_lines(lines)):
+            yield line, self._classes(match)
+
+    def flush(self) -> None:
+        """Publish pending match-cost counters (see `TrackedPattern.flush`)."""
+        if self._combined is not None:
+            self._combined.flush()
+        for _, matcher in self._sequential:
+            matcher.__self__.flush()
+
+    @classmethod
+    def from_layout(cls, layout) -> "LineGrammar":
+        """
+        Grammar of a BankLayout: "transaction" (`line_pattern`),
+        "balance_start"/"balance_end" (searched, case-insensitive) and
+        "ignore" (header/footer lines, plus the layout's `ignore_patterns`).
+        """
+        rules = [LineRule("transaction", layout.line_pattern, exclusive=True)]
+        for kind in ("balance_start", "balance_end"):
+            pattern = getattr(layout, f"{kind}_pattern")
+            if pattern:
+                rules.append(LineRule(kind, pattern, anchored=False, ignorecase=True))
+        rules.append(header_footer_rule(getattr(layout, 'ignore_patterns', ())))
+        return cls(rules, layout.name)
+
+
+def keyword_pattern(keywords: Sequence[str], search: bool = False) -> str:
+    """
+    Alternation of literal `keywords` as a prefix trie.
+
+    `re` tries alternatives one by one; sharing prefixes ("SALDO",
+    "SALDO ANTERIOR") lets it reject most positions after one character.
+    With `search`, the pattern also consumes the text before the first
+    keyword (for anchored rules), jumping over characters that cannot
+    start one instead of retrying the trie at every position.
+    """
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node: dict) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if '' in node else body
+
+    if not search:
+        return emit(trie)
+    return skip_to(frozenset(trie)) + emit(trie)
+
+
+def skip_to(chars: FrozenSet[str]) -> str:
+    """
+    Lazy prefix up to a position holding one of `chars`.
+
+    Equivalent to `.*?` in front of a pattern that can only start with
+    `chars`, but runs of other characters are crossed in one step instead
+    of retrying the pattern at each of them (what `re.search` does itself
+    for literal prefixes, and loses inside a combined regex).
+    """
+    chars_class = re.escape("".join(sorted(chars)))
+    return f"[^{chars_class}]*+(?:[{chars_class}][^{chars_class}]*+)*?"
+
+
+def first_chars(pattern: str, flags: int = 0) -> Optional[FrozenSet[str]]:
+    """Characters a match of `pattern` can start with, or None if unbounded."""
+    try:
+        return _first_chars(sre_parse.parse(pattern, flags))
+    except Exception:
+        return None
+
+
+def _first_chars(items) -> Optional[FrozenSet[str]]:
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            return frozenset(chr(av))
+        if op is sre_constants.SUBPATTERN:
+            return _first_chars(av[-1])
+        if op is sre_constants.BRANCH:
+            branches = [_first_chars(branch) for branch in av[1]]
+            return None if None in branches else frozenset().union(*branches)
+        if op is sre_constants.IN:
+            chars = set()
+            for item_op, item in av:
+                if item_op is sre_constants.LITERAL:
+                    chars.add(chr(item))
+                elif item_op is sre_constants.RANGE and item[1] - item[0] < MAX_SKIP_CHARS:
+                    chars.update(chr(c) for c in range(item[0], item[1] + 1))
+                else:
+                    return None
+            return frozenset(chars)
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            return _first_chars(av[2])
+        return None
+    return None
+
+
+def header_footer_rule(extra_patterns: Sequence[str] = ()) -> LineRule:
+    """"ignore" rule: filler lines, header/footer keywords and `extra_patterns`."""
+    alternatives = [_FILLER_LINE, keyword_pattern(HEADER_FOOTER_KEYWORDS, search=True)]
+    alternatives += [f".*?(?:{p})" for p in extra_patterns]
+    return LineRule("ignore", "|".join(alternatives), ignorecase=True, exclusive=True)
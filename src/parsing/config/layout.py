@@ -4,7 +4,10 @@ Bank Layout Configuration
 Defines dataclasses for configuring bank-specific PDF parsing rules.
 """
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+
+# Page area as (x0, top, x1, bottom) in PDF points; None stands for the page edge
+Region = Tuple[Optional[float], Optional[float], Optional[float], Optional[float]]
 
 
 @dataclass
@@ -20,6 +23,37 @@ class ColumnDef:
     match_group: Optional[int] = None
 
 
+@dataclass
+class SignRule:
+    """
+    Keyword sign rule of a post-processing stage.
+    
+    Attributes:
+        keywords: Substrings looked for in the description (case-insensitive)
+        sign: 'debit' or 'credit'
+    """
+    keywords: List[str]
+    sign: str = 'debit'
+
+
+@dataclass
+class PostProcessing:
+    """
+    Declarative clean-up of the parsed transactions (see config.postprocess).
+    
+    Attributes:
+        exclude_patterns: Regexes; rows whose description matches are dropped
+        sign_rules: First rule with a keyword in the description sets the sign
+            of positive amounts (explicitly negative amounts are kept)
+        cleanup_patterns: Regexes removed from descriptions
+        drop_balance_rows: Drop rows whose description is a balance ("SALDO")
+    """
+    exclude_patterns: List[str] = field(default_factory=list)
+    sign_rules: List[SignRule] = field(default_factory=list)
+    cleanup_patterns: List[str] = field(default_factory=list)
+    drop_balance_rows: bool = False
+
+
 @dataclass
 class BankLayout:
     """
@@ -53,3 +87,39 @@ class BankLayout:
     # Balance Verification Patterns
     balance_start_pattern: Optional[str] = None 
     balance_end_pattern: Optional[str] = None
+    
+    # Header/footer regexes never appended to a memo (searched case-insensitively,
+    # on top of the default blocklist; see config.grammar)
+    ignore_patterns: List[str] = field(default_factory=list)
+
+    # Page regions read instead of the whole page: "transactions" (the table),
+    # "header" (account metadata, first page) and "balance" (balance box)
+    regions: Dict[str, Region] = field(default_factory=dict)
+
+    # Exclusions, sign rules and description clean-up applied to the
+    # transactions after extraction
+    post_processing: PostProcessing = field(default_factory=PostProcessing)
+
+    # Built by LayoutInferencer: always read by GenericPDFExtractor, never by
+    # the specialized parser of `bank_id`
+    inferred: bool = False
+
+
+@dataclass(frozen=True)
+class SubLayout:
+    """
+    One sub-layout of a specialized parser (e.g. BB "G331" or "Mod. 0.51").
+
+    Attributes:
+        name: Route name, resolved by the parser to its extraction method
+        markers: Regexes that must all occur in the page text; a sub-layout
+            without markers is the parser's default
+        max_lines: Look for the markers only in the first `max_lines` lines
+            of the page (0: the whole page)
+        regions: Page regions of this sub-layout, as in BankLayout.regions
+            (see BaseParser.page_region)
+    """
+    name: str
+    markers: Tuple[str, ...] = ()
+    max_lines: int = 0
+    regions: Dict[str, Region] = field(default_factory=dict, hash=False, compare=False)
@@ -0,0 +1,356 @@
+"""
+Layout Pattern Safety
+
+Layout regexes (`line_pattern`, `balance_start_pattern`, `balance_end_pattern`)
+come from JSON files, some of them written by layout inference, and run
+against every line of every statement. Python's `re` backtracks, so a pattern
+with nested or overlapping quantifiers can take exponential time on a line
+that almost matches.
+
+`check_pattern` fuzzes a pattern before it is used: adversarial lines built
+from the pattern's own characters (long runs that nearly match, then fail)
+and sample statement lines, at growing lengths under a per-probe time budget.
+Exponential blow-up already shows between two short lengths, so no probe can
+pin the process; polynomial blow-up shows at the longest length.
+
+Verdicts are wall-clock timings, so a busy worker can make a safe pattern
+look slow: an unsafe verdict is re-checked once with a larger budget, and
+only safe verdicts are cached.
+
+`compile_pattern` returns a `TrackedPattern`: the `re` pattern when it passes,
+the linear-time RE2 engine (optional `google-re2` package) when it fails and
+RE2 is installed, and raises `UnsafePatternError` otherwise. Layouts loaded
+from the layouts directory are kept instead (`validate_layout(keep_unsafe=True)`):
+their unsafe patterns run on `re`, with the slow-line warning below. Match
+time is counted per layout pattern at runtime.
+"""
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set, Tuple
+
+from src.common.metrics import registry as metrics
+
+logger = logging.getLogger(__name__)
+
+# Longest single probe accepted, in seconds
+PROBE_BUDGET = 0.25
+
+# Probe lengths: small steps first (exponential growth is caught before a probe
+# gets expensive), then up to the longest statement line pdfplumber produces.
+# Polynomial patterns such as `\s+(.+?)\s+` (common in layouts) take tens of
+# milliseconds there and pass; catastrophic ones blow the budget.
+SHORT_LENGTHS = tuple(range(4, 34, 2))
+LONG_LENGTHS = (64, 128, 200)
+
+# Short probes faster than this are too noisy to compare
+GROWTH_FLOOR = 0.001
+
+# Budget and growth floor multiplier for re-checking an unsafe verdict
+RECHECK_FACTOR = 4
+
+# Characters every probe family is built from, plus the pattern's own literals
+BASE_CHARS = ("0", "a", "A", " ", ".", ",", "/", "-", ":")
+PAIR_CHARS = ("0", "a", " ", ".", ",")
+PROBE_PREFIXES = ("", "01/01/2024 ", "01/01 ")
+PROBE_TAIL = "!"
+MAX_LITERAL_CHARS = 12
+_META_CHARS = set("()[]{}?*+|^$\\")
+
+SAMPLE_LINES = (
+    "01/01/2024 PIX RECEBIDO FULANO DE TAL 1.234,56 C 10.000,00",
+    "02/01/2024 PAGAMENTO BOLETO 12345678 -80,50",
+    "03/01 TARIFA PACOTE SERVICOS 10,00 D",
+    "SALDO ANTERIOR 1.000,00",
+    "SALDO FINAL 3.559,50",
+    "04/01/24 Compra cartao Padaria -1,234.56",
+)
+
+PATTERN_MATCH_SECONDS = metrics.counter(
+    "auditor_layout_pattern_seconds_total",
+    "Time spent matching layout patterns against statement lines",
+    ("layout", "pattern", "engine"),
+)
+PATTERN_MATCHES = metrics.counter(
+    "auditor_layout_pattern_lines_total",
+    "Statement lines matched against layout patterns",
+    ("layout", "pattern", "engine"),
+)
+PATTERN_CHECKS = metrics.counter(
+    "auditor_layout_pattern_checks_total",
+    "Layout pattern safety checks by outcome",
+    ("result",),
+)
+
+
+class UnsafePatternError(ValueError):
+    """A layout pattern backtracks catastrophically and no linear-time engine is available."""
+
+
+@dataclass(frozen=True)
+class PatternCheck:
+    """Outcome of fuzzing one pattern."""
+    safe: bool
+    worst_seconds: float
+    worst_probe: str = ""
+
+
+# Safe verdicts only (an unsafe one may be load noise, see check_pattern)
+_checks: Dict[Tuple[str, int], PatternCheck] = {}
+# Unsafe patterns of loaded layouts allowed to run on `re` (see validate_layout)
+_kept_unsafe: Set[Tuple[str, int]] = set()
+_checks_lock = threading.Lock()
+
+
+def _probe_chars(pattern: str) -> Tuple[str, ...]:
+    """Base characters plus the pattern's first literal characters (escapes skipped)."""
+    literals = [c for i, c in enumerate(pattern)
+                if c not in _META_CHARS and c.isprintable() and not pattern[i - 1:i] == "\\"]
+    literals = [c for c in dict.fromkeys(literals) if c not in BASE_CHARS][:MAX_LITERAL_CHARS]
+    return BASE_CHARS + tuple(literals)
+
+
+def _probe_families(pattern: str, samples: Iterable[str]) -> Iterable[List[Tuple[str, bool]]]:
+    """Adversarial lines as (probe, short) lists, shortest first within each family."""
+    units = list(_probe_chars(pattern))
+    units += [a + b for a in PAIR_CHARS for b in PAIR_CHARS if a != b]
+    prefixes = list(PROBE_PREFIXES)
+    lines = list(samples)
+    # A sample's leading token (usually its date) gets probes past the anchor
+    prefixes += [line.split(" ", 1)[0] + " " for line in lines if " " in line]
+    shapes = {re.sub(r"\d", "0", p): p for p in reversed(prefixes)}
+    for prefix in dict.fromkeys(shapes[re.sub(r"\d", "0", p)] for p in prefixes):
+        for unit in units:
+            yield [(prefix + unit * (length // len(unit)) + PROBE_TAIL, length in SHORT_LENGTHS)
+                   for length in SHORT_LENGTHS + LONG_LENGTHS]
+    for line in lines:
+        # Repeated bodies of real lines: the memo/amount section, many times over
+        body = line.split(" ", 1)[-1]
+        yield [(line + (" " + body) * (length // (len(body) + 1)) + PROBE_TAIL, False)
+               for length in LONG_LENGTHS]
+
+
+def _time_probe(regex, probe: str) -> float:
+    start = time.perf_counter()
+    regex.search(probe)
+    return time.perf_counter() - start
+
+
+def _too_slow(elapsed: float, previous: float, short: bool, budget: float, floor: float) -> bool:
+    exploding = short and previous > floor and elapsed > 2 * previous
+    return elapsed > budget or exploding
+
+
+def _fuzz(regex, pattern: str, samples: Iterable[str], budget: float, floor: float) -> PatternCheck:
+    worst, worst_probe = 0.0, ""
+    for family in _probe_families(pattern, samples):
+        previous = 0.0
+        for probe, short in family:
+            elapsed = _time_probe(regex, probe)
+            if _too_slow(elapsed, previous, short, budget, floor):
+                elapsed = min(elapsed, _time_probe(regex, probe))
+            if elapsed > worst:
+                worst, worst_probe = elapsed, probe
+            if _too_slow(elapsed, previous, short, budget, floor):
+                return PatternCheck(False, worst, worst_probe)
+            previous = elapsed
+    return PatternCheck(True, worst, worst_probe)
+
+
+def check_pattern(pattern: str, flags: int = 0, samples: Iterable[str] = SAMPLE_LINES,
+                  budget: float = PROBE_BUDGET) -> PatternCheck:
+    """
+    Fuzz `pattern` with adversarial and sample lines (cached per pattern).
+
+    A pattern is unsafe when a probe exceeds `budget`, or when a short probe
+    doubles the time of the previous one (two characters shorter): that is
+    exponential growth, caught before a longer probe could hang. Suspicious
+    timings are measured twice (a GC pause is not a verdict), and an unsafe
+    verdict is re-checked once with `RECHECK_FACTOR` times the budget and
+    growth floor (a busy machine is not one either). Unsafe verdicts are not
+    cached, so a later check can still pass.
+
+    Raises:
+        re.error: If the pattern does not compile
+    """
+    key = (pattern, flags)
+    cached = _checks.get(key)
+    if cached is not None:
+        return cached
+
+    regex = re.compile(pattern, flags)
+    samples = list(samples)
+    result = _fuzz(regex, pattern, samples, budget, GROWTH_FLOOR)
+    if not result.safe:
+        result = _fuzz(regex, pattern, samples, budget * RECHECK_FACTOR, GROWTH_FLOOR * RECHECK_FACTOR)
+
+    PATTERN_CHECKS.inc(result="safe" if result.safe else "unsafe")
+    if result.safe:
+        with _checks_lock:
+            _checks[key] = result
+    return result
+
+
+def _re2():
+    """The RE2 bindings (`google-re2`), or None when not installed."""
+    try:
+        import re2
+    except ImportError:
+        return None
+    return re2
+
+
+class TrackedPattern:
+    """
+    Compiled layout pattern that counts its match time.
+
+    Exposes the `match`/`search` subset of a compiled `re` pattern used by
+    the extractors; `engine` is "re" or "re2". Costs are summed locally and
+    published to the metrics every `FLUSH_EVERY` lines or on `flush()`, so
+    the per-line overhead stays two clock reads.
+    """
+
+    FLUSH_EVERY = 1000
+
+    def __init__(self, regex, engine: str, layout: str, name: str):
+        self.regex = regex
+        self.engine = engine
+        self.pattern = regex.pattern
+        self._labels = {'layout': layout, 'pattern': name, 'engine': engine}
+        self._seconds = 0.0
+        self._lines = 0
+
+    def match(self, line: str):
+        start = time.perf_counter()
+        try:
+            return self.regex.match(line)
+        finally:
+            self._record(time.perf_counter() - start)
+
+    def search(self, line: str):
+        start = time.perf_counter()
+        try:
+            return self.regex.search(line)
+        finally:
+            self._record(time.perf_counter() - start)
+
+    def match_lines(self, lines: List[str]) -> list:
+        """`match` for every line, timed and published as one batch."""
+        start = time.perf_counter()
+        matches = [self.regex.match(line) for line in lines]
+        self._seconds += time.perf_counter() - start
+        self._lines += len(lines)
+        self.flush()
+        return matches
+
+    def _record(self, elapsed: float) -> None:
+        self._seconds += elapsed
+        self._lines += 1
+        if elapsed > PROBE_BUDGET:
+            logger.warning(
+                f"Slow layout pattern: {self._labels['layout']} {self._labels['pattern']} "
+                f"took {elapsed * 1000:.0f} ms on one line"
+            )
+        if self._lines >= self.FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        """Publish the time and lines counted since the last flush."""
+        seconds, lines = self._seconds, self._lines
+        self._seconds, self._lines = 0.0, 0
+        if lines:
+            PATTERN_MATCH_SECONDS.inc(seconds, **self._labels)
+            PATTERN_MATCHES.inc(lines, **self._labels)
+
+
+def compile_pattern(pattern: str, flags: int = 0, layout: str = "", name: str = "line") -> TrackedPattern:
+    """
+    Compile a layout pattern on the safest available engine.
+
+    Args:
+        pattern: Regex from the layout configuration
+        flags: `re` flags (only IGNORECASE is carried over to RE2)
+        layout: Layout name, for metrics and logs
+        name: Which layout pattern this is ("line", "balance_start", ...)
+
+    Raises:
+        re.error: If the pattern does not compile
+        UnsafePatternError: If it backtracks catastrophically and RE2 is
+            not installed (or does not support its syntax), unless the
+            pattern was kept by `validate_layout(keep_unsafe=True)`
+    """
+    if (pattern, flags) in _kept_unsafe:
+        # Already reported when its layout was loaded: no second fuzzing
+        regex = _re2_compile(pattern, flags)
+        if regex is not None:
+            return TrackedPattern(regex, "re2", layout, name)
+        return TrackedPattern(re.compile(pattern, flags), "re", layout, name)
+
+    check = check_pattern(pattern, flags)
+    if check.safe:
+        return TrackedPattern(re.compile(pattern, flags), "re", layout, name)
+
+    detail = f"{layout} {name} pattern took {check.worst_seconds * 1000:.0f} ms on a {len(check.worst_probe)}-char line"
+    re2 = _re2()
+    if re2 is None:
+        raise UnsafePatternError(f"Catastrophic backtracking: {detail} (install google-re2 for linear-time matching)")
+    try:
+        regex = re2.compile(("(?i)" if flags & re.IGNORECASE else "") + pattern)
+    except Exception as e:
+        raise UnsafePatternError(f"Catastrophic backtracking: {detail}; RE2 cannot compile it: {e}") from e
+    logger.warning(f"Catastrophic backtracking: {detail}; matching with RE2")
+    return TrackedPattern(regex, "re2", layout, name)
+
+
+def _re2_compile(pattern: str, flags: int):
+    """The pattern on RE2, or None when RE2 is missing or rejects its syntax."""
+    re2 = _re2()
+    if re2 is None:
+        return None
+    try:
+        return re2.compile(("(?i)" if flags & re.IGNORECASE else "") + pattern)
+    except Exception:
+        return None
+
+
+def layout_patterns(layout) -> Iterable[Tuple[str, str, int]]:
+    """(name, pattern, flags) of every regex a BankLayout defines."""
+    yield "line", layout.line_pattern, 0
+    for name in ("balance_start", "balance_end"):
+        pattern = getattr(layout, f"{name}_pattern")
+        if pattern:
+            yield name, pattern, re.IGNORECASE
+    for pattern in getattr(layout, 'ignore_patterns', ()):
+        yield "ignore", pattern, re.IGNORECASE
+    post = getattr(layout, 'post_processing', None)
+    for name in ("exclude", "cleanup"):
+        for pattern in getattr(post, f"{name}_patterns", ()):
+            yield name, pattern, re.IGNORECASE
+
+
+def validate_layout(layout, keep_unsafe: bool = False) -> None:
+    """
+    Compile and fuzz every pattern of `layout`.
+
+    With `keep_unsafe`, a pattern that is unsafe and cannot run on RE2 is
+    logged as an error and kept on `re` (with the runtime slow-line warning)
+    instead of raising; the registry uses it so a layout shipped with the
+    application is never dropped.
+
+    Raises:
+        re.error: If a pattern does not compile
+        UnsafePatternError: If a pattern is unsafe and cannot run on RE2
+            (and `keep_unsafe` is False)
+    """
+    for name, pattern, flags in layout_patterns(layout):
+        try:
+            compile_pattern(pattern, flags, layout.name, name)
+        except UnsafePatternError as e:
+            if not keep_unsafe:
+                raise
+            logger.error(f"{e}; keeping layout {layout.name} on re, slow lines will be logged")
+            PATTERN_CHECKS.inc(result="kept_unsafe")
+            with _checks_lock:
+                _kept_unsafe.add((pattern, flags))
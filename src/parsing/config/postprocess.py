@@ -0,0 +1,142 @@
+"""
+Post-extraction Processing
+
+Applies a `PostProcessing` declaration (per layout, `BankLayout.post_processing`,
+or per parser, `BaseParser.POST_PROCESSING`) to the parsed transactions:
+
+1. Rows whose description matches an exclude pattern (or a balance line, with
+   `drop_balance_rows`) are dropped.
+2. Sign rules: the first rule with a keyword in the description makes a
+   positive amount a debit or a credit. Amounts already negative (explicit
+   minus or debit marker) are kept.
+3. Cleanup patterns are removed from the descriptions.
+
+Rules are compiled once. A frame is processed column-wise: pandas string
+ops for the patterns, and the keyword rules compiled into one regex with a
+marker group per rule, scanned once per distinct description (as in
+`core.account_rules`).
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .grammar import keyword_pattern
+from .layout import PostProcessing, SignRule
+
+# Descriptions of balance rows (`drop_balance_rows`)
+BALANCE_ROW_PATTERN = r"\bSALDO\b|S A L D O"
+
+VALID_SIGNS = ('debit', 'credit')
+
+
+def _union(patterns: Sequence[str]) -> Optional[re.Pattern]:
+    """Case-insensitive alternation of `patterns`, or None if empty."""
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+class SignRules:
+    """Ordered, compiled keyword sign rules (the first matching rule wins)."""
+
+    def __init__(self, rules: Sequence[SignRule]):
+        self.rules = list(rules)
+        for rule in self.rules:
+            if rule.sign not in VALID_SIGNS:
+                raise ValueError(f"Sign rule {rule.keywords}: sign must be 'debit' or 'credit'")
+            if not rule.keywords:
+                raise ValueError("Sign rule without keywords")
+        self._signs = np.array([-1.0 if r.sign == 'debit' else 1.0 for r in self.rules])
+        # Each rule is a lookahead from the start of the text (keyword trie with
+        # its skip prefix), so every rule is checked in one match() call and
+        # its marker group is set
+        self._matcher = None
+        if self.rules:
+            self._matcher = re.compile(
+                "".join(f"(?:(?={keyword_pattern(r.keywords, search=True)})(?P<_rule{i}>))?"
+                        for i, r in enumerate(self.rules)),
+                re.IGNORECASE | re.DOTALL,
+            )
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def signs(self, texts: Sequence[str]) -> np.ndarray:
+        """-1 (debit), 1 (credit) or 0 (no rule) per text."""
+        if self._matcher is None or not len(texts):
+            return np.zeros(len(texts))
+        codes, uniques = pd.factorize(pd.Series(texts, dtype=object).fillna("").astype(str))
+        names = [f"_rule{i}" for i in range(len(self.rules))]
+        hits = np.zeros((len(uniques), len(self.rules)), dtype=bool)
+        for row, text in enumerate(uniques.tolist()):
+            found = self._matcher.match(text).groupdict()
+            hits[row] = [found[name] is not None for name in names]
+        hits = hits[codes]
+        # argmax returns the first True column: rule order is priority
+        return np.where(hits.any(axis=1), self._signs[hits.argmax(axis=1)], 0.0)
+
+    def apply(self, amounts: Sequence[float], texts: Sequence[str]) -> np.ndarray:
+        """`amounts` with the rule signs applied to the positive ones."""
+        amounts = np.asarray(amounts, dtype=float)
+        signs = self.signs(texts)
+        return np.where((amounts > 0) & (signs != 0), signs * amounts, amounts)
+
+
+class PostProcessor:
+    """Compiled `PostProcessing` stage."""
+
+    def __init__(self, spec: Optional[PostProcessing] = None):
+        self.spec = spec or PostProcessing()
+        self.signs = SignRules(self.spec.sign_rules)
+        balance = [BALANCE_ROW_PATTERN] if self.spec.drop_balance_rows else []
+        self._exclude = _union(list(self.spec.exclude_patterns) + balance)
+        self._cleanup = _union(self.spec.cleanup_patterns)
+
+    def __bool__(self) -> bool:
+        return bool(self._exclude or self.signs or self._cleanup)
+
+    def _process(self, texts: pd.Series, amounts: np.ndarray) -> Tuple[np.ndarray, pd.Series, np.ndarray]:
+        """(rows kept, cleaned descriptions, signed amounts)."""
+        texts = texts.fillna("").astype(str)
+        keep = np.ones(len(texts), dtype=bool)
+        if self._exclude is not None:
+            keep = ~texts.str.contains(self._exclude).to_numpy(dtype=bool)
+        if self.signs:
+            amounts = self.signs.apply(amounts, texts)
+        if self._cleanup is not None:
+            texts = texts.str.replace(self._cleanup, " ", regex=True).str.replace(r"\s+", " ", regex=True).str.strip()
+        return keep, texts, amounts
+
+    def apply(self, df: pd.DataFrame, text_column: str = 'description', amount_column: str = 'amount') -> pd.DataFrame:
+        """Processed copy of a transactions frame (index kept)."""
+        if df.empty or not self:
+            return df
+        keep, texts, amounts = self._process(df[text_column], df[amount_column].to_numpy(dtype=float))
+        df = df.copy()
+        if self.signs:
+            df[amount_column] = amounts
+        if self._cleanup is not None:
+            df[text_column] = texts.to_numpy()
+        return df[keep]
+
+    def apply_records(self, records: List[Dict], text_column: str = 'description',
+                      amount_column: str = 'amount') -> List[Dict]:
+        """`apply` for a list of transaction dicts (updated in place)."""
+        if not records or not self:
+            return records
+        keep, texts, amounts = self._process(
+            pd.Series([r.get(text_column) for r in records], dtype=object),
+            np.array([r.get(amount_column, 0.0) for r in records], dtype=float),
+        )
+        result = []
+        for record, kept, text, amount in zip(records, keep.tolist(), texts.tolist(), amounts.tolist()):
+            if not kept:
+                continue
+            if self.signs and amount_column in record:
+                record[amount_column] = amount
+            if self._cleanup is not None:
+                record[text_column] = text
+            result.append(record)
+        return result
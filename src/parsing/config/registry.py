@@ -2,15 +2,83 @@
 Layout Registry
 
 Manages loading and detection of bank layouts from JSON configuration files.
+
+Layouts inferred from unknown statements are kept apart, in memory only:
+they are tried after every layout on disk and written to the layouts
+directory only when confirmed (`confirm_inferred`).
 """
 import os
+import re
 import json
 import logging
-from typing import List, Optional
-from .layout import BankLayout, ColumnDef
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Dict, FrozenSet, List, Optional, Sequence
+from .layout import BankLayout, ColumnDef, PostProcessing, SignRule, SubLayout
+from .pattern_safety import UnsafePatternError, compile_pattern, layout_patterns, validate_layout
 
 logger = logging.getLogger(__name__)
 
+# Unconfirmed inferred layouts kept per registry (least recently detected dropped first)
+MAX_INFERRED_LAYOUTS = 64
+
+
+class SubLayoutRoutes:
+    """
+    Route table of one parser's sub-layouts.
+
+    All markers are compiled into a single alternation, so one scan of the
+    page text yields its structural fingerprint: the set of markers present.
+    Markers of sub-layouts with `max_lines` are looked up again in the head
+    of the page (only when the whole page has them) and enter the
+    fingerprint as (marker, max_lines). Fingerprints map to a sub-layout
+    through a lookup table filled on first sight. Markers must not overlap
+    each other, since the scan consumes each match.
+    """
+
+    def __init__(self, sub_layouts: Sequence[SubLayout]):
+        self.sub_layouts = list(sub_layouts)
+        markers = list(dict.fromkeys(m for sub in self.sub_layouts for m in sub.markers))
+        self._groups = {marker: f"m{i}" for i, marker in enumerate(markers)}
+        self._scanner = re.compile("|".join(f"(?P<m{i}>{m})" for i, m in enumerate(markers))) if markers else None
+        self._windows = sorted({s.max_lines for s in self.sub_layouts if s.max_lines and s.markers})
+        self._table: Dict[FrozenSet, Optional[SubLayout]] = {}
+
+    def _scan(self, text: str) -> set:
+        found = set()
+        for match in self._scanner.finditer(text):
+            found.add(match.lastgroup)
+            if len(found) == len(self._groups):
+                break
+        return found
+
+    def fingerprint(self, text: str) -> FrozenSet:
+        """Marker groups present in `text` (single pass, stops once all are seen)."""
+        if self._scanner is None:
+            return frozenset()
+        found = self._scan(text)
+        if found:
+            for max_lines in self._windows:
+                head = "\n".join(text.split("\n", max_lines)[:max_lines])
+                found.update((group, max_lines) for group in self._scan(head))
+        return frozenset(found)
+
+    def _matches(self, sub: SubLayout, fingerprint: FrozenSet) -> bool:
+        if sub.max_lines:
+            return all((self._groups[m], sub.max_lines) in fingerprint for m in sub.markers)
+        return all(self._groups[m] in fingerprint for m in sub.markers)
+
+    def route(self, text: str) -> Optional[SubLayout]:
+        """First sub-layout whose markers all occur in `text` (or in its first `max_lines`)."""
+        fingerprint = self.fingerprint(text)
+        try:
+            return self._table[fingerprint]
+        except KeyError:
+            sub = next((s for s in self.sub_layouts if self._matches(s, fingerprint)), None)
+            self._table[fingerprint] = sub
+            return sub
+
 
 class LayoutRegistry:
     """
@@ -20,6 +88,13 @@ class LayoutRegistry:
     automatic detection based on PDF text content.
     """
     
+    # Shared instances per layouts directory (see `shared`)
+    _shared: Dict[str, "LayoutRegistry"] = {}
+    _shared_lock = threading.Lock()
+    
+    # Sub-layout route tables per parser class (see `route`)
+    _routes: Dict[type, SubLayoutRoutes] = {}
+    
     def __init__(self, layouts_dir: str):
         """
         Initialize registry with path to layouts directory.
@@ -29,24 +104,71 @@ class LayoutRegistry:
         """
         self.layouts_dir = layouts_dir
         self.layouts: List[BankLayout] = []
+        self._inferred: "OrderedDict[str, BankLayout]" = OrderedDict()
+        self._inferred_lock = threading.Lock()
         self._load_layouts()
 
+    @classmethod
+    def shared(cls, layouts_dir: str) -> "LayoutRegistry":
+        """
+        Registry for `layouts_dir` loaded once per process.
+        
+        Layouts saved through any instance are reloaded in place, so every
+        caller sees them; use the constructor for a private copy.
+        """
+        key = os.path.abspath(layouts_dir)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(key)
+            return cls._shared[key]
+
+    @classmethod
+    def route(cls, parser_cls: type, text: str) -> Optional[SubLayout]:
+        """
+        Sub-layout of `parser_cls` (from its `SUB_LAYOUTS`) for a page's text.
+        
+        Parsers call this once per document (see `BaseParser.sub_layout`),
+        so pages are dispatched without re-probing their text.
+        """
+        routes = cls._routes.get(parser_cls)
+        if routes is None:
+            with cls._shared_lock:
+                routes = cls._routes.setdefault(parser_cls, SubLayoutRoutes(getattr(parser_cls, 'SUB_LAYOUTS', ())))
+        return routes.route(text)
+
+    def warm_up(self) -> None:
+        """Compile and fuzz every layout pattern now (checks are cached for the extractors)."""
+        for layout in self.layouts:
+            try:
+                for name, pattern, flags in layout_patterns(layout):
+                    compile_pattern(pattern, flags, layout.name, name)
+            except (re.error, UnsafePatternError) as e:
+                logger.error(f"Invalid pattern in layout {layout.name}: {e}")
+
     def _load_layouts(self) -> None:
         """Scans the directory and loads all .json layouts."""
         if not os.path.exists(self.layouts_dir):
             logger.warning(f"Layouts directory not found: {self.layouts_dir}")
             return
 
+        # Built aside and swapped in, so a reload never exposes a partial list
+        layouts = []
         for fname in os.listdir(self.layouts_dir):
             if fname.endswith(".json"):
                 fpath = os.path.join(self.layouts_dir, fname)
                 try:
                     with open(fpath, 'r', encoding='utf-8') as f:
                         data = json.load(f)
-                        self.layouts.append(self._parse_layout(data))
-                        logger.debug(f"Loaded layout: {fname}")
+                    layout = self._parse_layout(data)
+                    # Fuzzed once per pattern. A layout on disk is never dropped for
+                    # a slow verdict: without RE2 its unsafe patterns stay on `re`
+                    # and are logged as errors (save_layout refuses new ones)
+                    validate_layout(layout, keep_unsafe=True)
+                    layouts.append(layout)
+                    logger.debug(f"Loaded layout: {fname}")
                 except Exception as e:
                     logger.error(f"Error loading layout {fname}: {e}")
+        self.layouts = layouts
 
     def _parse_layout(self, data: dict) -> BankLayout:
         """Converts dict to BankLayout object."""
@@ -56,6 +178,11 @@ class LayoutRegistry:
         layout_data = data.copy()
         if 'columns' in layout_data:
             del layout_data['columns']
+        
+        if isinstance(layout_data.get('post_processing'), dict):
+            post = dict(layout_data['post_processing'])
+            post['sign_rules'] = [SignRule(**r) for r in post.get('sign_rules', [])]
+            layout_data['post_processing'] = PostProcessing(**post)
             
         return BankLayout(columns=columns, **layout_data)
 
@@ -78,14 +205,59 @@ class LayoutRegistry:
             if all(normalize(k) in norm_text for k in layout.keywords):
                 logger.debug(f"Matches layout: {layout.name}")
                 return layout
+        
+        # Unconfirmed inferred layouts never win over a layout on disk
+        with self._inferred_lock:
+            inferred = list(self._inferred.values())
+        for layout in inferred:
+            if all(normalize(k) in norm_text for k in layout.keywords):
+                logger.debug(f"Matches inferred layout: {layout.name}")
+                with self._inferred_lock:
+                    if layout.name in self._inferred:
+                        self._inferred.move_to_end(layout.name)
+                return layout
         return None
     
     def get_by_name(self, name: str) -> Optional[BankLayout]:
-        """Get layout by name."""
+        """Get layout by name (layouts on disk first, then inferred ones)."""
         for layout in self.layouts:
             if layout.name == name:
                 return layout
-        return None
+        with self._inferred_lock:
+            return self._inferred.get(name)
+    
+    def add_inferred(self, layout: BankLayout) -> None:
+        """
+        Keep an inferred layout in memory, detected after every layout on disk.
+        
+        It reaches the layouts directory only through `confirm_inferred`, so
+        one odd first page never adds a permanent layout.
+        """
+        with self._inferred_lock:
+            self._inferred[layout.name] = layout
+            self._inferred.move_to_end(layout.name)
+            while len(self._inferred) > MAX_INFERRED_LAYOUTS:
+                self._inferred.popitem(last=False)
+    
+    def list_inferred(self) -> List[str]:
+        """Names of the unconfirmed inferred layouts."""
+        with self._inferred_lock:
+            return list(self._inferred)
+    
+    def confirm_inferred(self, name: str) -> bool:
+        """
+        Save a reviewed inferred layout to the layouts directory.
+        
+        Returns:
+            bool: True if saved (False for an unknown name or a failed save)
+        """
+        with self._inferred_lock:
+            layout = self._inferred.get(name)
+        if layout is None or not self.save_layout(asdict(layout)):
+            return False
+        with self._inferred_lock:
+            self._inferred.pop(name, None)
+        return True
     
     def list_layouts(self) -> List[str]:
         """List all available layout names."""
@@ -100,9 +272,11 @@ class LayoutRegistry:
             filename: Optional filename. If None, generated from bank name.
             
         Returns:
-            bool: True if saved successfully
+            bool: True if saved successfully (False for invalid or unsafe patterns)
         """
         try:
+            validate_layout(self._parse_layout(layout_data))
+
             if not filename:
                 # Sanitize name for filename
                 safe_name = "".join(c for c in layout_data.get('name', 'unknown') if c.isalnum() or c in (' ', '-', '_')).strip()
@@ -116,7 +290,6 @@ class LayoutRegistry:
                 json.dump(layout_data, f, indent=4, ensure_ascii=False)
                 
             # Reload layouts to include the new one
-            self.layouts = []
             self._load_layouts()
             
             logger.info(f"Saved new layout to {fpath}")
@@ -1,6 +1,13 @@
-# Extractors
-from .generic import GenericPDFExtractor
-from .ocr import OCRExtractor
-from .ai_generation import GeminiLayoutGenerator
+# Extractors (imported on first access)
+from src.common.lazy import lazy_exports
 
-__all__ = ['GenericPDFExtractor', 'OCRExtractor', 'GeminiLayoutGenerator']
+__getattr__ = lazy_exports(__name__, {
+    'GenericPDFExtractor': '.generic:GenericPDFExtractor',
+    'OCRExtractor': '.ocr:OCRExtractor',
+    'GeminiLayoutGenerator': '.ai_generation:GeminiLayoutGenerator',
+    'LayoutInferencer': '.layout_inference:LayoutInferencer',
+    'PageWords': '.word_geometry:PageWords',
+    'ColumnBands': '.word_geometry:ColumnBands',
+})
+
+__all__ = ['GenericPDFExtractor', 'OCRExtractor', 'GeminiLayoutGenerator', 'LayoutInferencer', 'PageWords', 'ColumnBands']
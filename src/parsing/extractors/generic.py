@@ -4,15 +4,26 @@ Generic PDF Extractor
 Extracts transactions from PDFs using regex patterns defined in BankLayout configurations.
 """
 import re
+import time
 import logging
 import pdfplumber
 from datetime import datetime
 from typing import Dict, Any, List
 from ..base import BaseExtractor
 from ..config.layout import BankLayout
+from ..config.grammar import LineGrammar
+from ..config.postprocess import PostProcessor
+from .word_geometry import crop_region
+from src.common.timing import StageTimer
 
 logger = logging.getLogger(__name__)
 
+# Account metadata in the "header" region of a layout
+ACCOUNT_PATTERNS = {
+    'branch_id': re.compile(r"Ag(?:[êe]ncia|\.)?\s*:?\s*(\d{3,5}(?:-\w)?)\b", re.IGNORECASE),
+    'acct_id': re.compile(r"(?:Conta(?:\s+Corrente)?|C/C|CC)\s*:?\s*(\d[\d.]*-?\w?)\b", re.IGNORECASE),
+}
+
 
 class GenericPDFExtractor(BaseExtractor):
     """
@@ -30,7 +41,10 @@ class GenericPDFExtractor(BaseExtractor):
             layout: BankLayout configuration with regex patterns
         """
         self.layout = layout
-        self.line_regex = re.compile(self.layout.line_pattern)
+        # Transaction, balance and header/footer rules, classified in one pass;
+        # patterns are fuzzed and timed per line (see config.pattern_safety)
+        self.grammar = LineGrammar.from_layout(layout)
+        self.post_processing = PostProcessor(layout.post_processing)
 
     def identify(self, pdf_text: str) -> bool:
         """Check if this extractor can handle the PDF based on keywords."""
@@ -46,14 +60,33 @@ class GenericPDFExtractor(BaseExtractor):
         Returns:
             Dict with transactions, account_info, balance_info, validation
         """
-        full_text = ""
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                t = page.extract_text()
-                if t:
-                    full_text += t + "\n"
-        
-        return self.extract_from_text(full_text)
+        regions = self.layout.regions
+        with StageTimer.activate(parser=self.__class__.__name__, layout=self.layout.name) as timer:
+            full_text = ""
+            header_text = ""
+            balance_text = ""
+            with pdfplumber.open(file_path) as pdf:
+                for i, page in enumerate(pdf.pages):
+                    page_start = time.perf_counter()
+                    t = crop_region(page, regions.get('transactions')).extract_text()
+                    if i == 0 and 'header' in regions:
+                        header_text = crop_region(page, regions['header']).extract_text() or ""
+                    if 'balance' in regions:
+                        balance_text += (crop_region(page, regions['balance']).extract_text() or "") + "\n"
+                    page_text_s = time.perf_counter() - page_start
+                    timer.add("page_text", page_text_s)
+                    timer.add_page(i + 1, text=page_text_s)
+                    if t:
+                        full_text += t + "\n"
+            
+            with timer.stage("line_matching"):
+                data = self.extract_from_text(full_text)
+                if header_text:
+                    data['account_info'].update(self._scan_account_info(header_text))
+                if balance_text:
+                    self._merge_balances(data, self._scan_for_balances(balance_text))
+            timer.set_tx_count(len(data['transactions']))
+            return data
 
     def extract_from_text(self, text: str) -> Dict[str, Any]:
         """
@@ -73,14 +106,22 @@ class GenericPDFExtractor(BaseExtractor):
         }
         
         current_transaction = None
-        lines = text.split('\n')
         discarded_candidates = []
+        balance_info = {'start': None, 'end': None}
+
+        for line, classes in self.grammar.scan(text):
+            self._update_balances(balance_info, classes)
 
-        for line in lines:
             # Try to find start of transaction
-            match = self.line_regex.match(line)
+            match = classes.get('transaction')
             if match:
-                data = self._parse_match(match)
+                try:
+                    data = self._parse_match(match)
+                except ValueError as e:
+                    # Shaped like a transaction but a field does not parse (an
+                    # invalid date from OCR noise); inferred layouts tolerate a few
+                    logger.debug(f"Skipping unparseable transaction line: {e}")
+                    continue
                 
                 # Check blocklist
                 memo_lower = data.get('memo', '').lower()
@@ -106,9 +147,9 @@ class GenericPDFExtractor(BaseExtractor):
                             transactions.append(current_transaction)
                     current_transaction = data
             
-            # Multiline memo handling
+            # Multiline memo handling (header/footer lines are never part of a memo)
             elif current_transaction:
-                if self._is_continuation_line(line):
+                if 'ignore' not in classes:
                     current_transaction['memo'] += " " + line.strip()
     
         # Append last transaction
@@ -116,8 +157,12 @@ class GenericPDFExtractor(BaseExtractor):
             if abs(current_transaction.get('amount', 0)) > 0.001:
                 transactions.append(current_transaction)
         
+        if self.post_processing:
+            transactions = self.post_processing.apply_records(transactions, text_column='memo')
+            for t in transactions:
+                t['type'] = 'DEBIT' if t.get('amount', 0) < 0 else 'CREDIT'
+        
         # Balance verification
-        balance_info = self._scan_for_balances(text)
         validation = self._validate_consistency(transactions, balance_info)
                  
         return {
@@ -131,32 +176,40 @@ class GenericPDFExtractor(BaseExtractor):
     def _scan_for_balances(self, text: str) -> Dict[str, Any]:
         """Scan for start and end balance patterns."""
         info = {'start': None, 'end': None}
-        if not self.layout.balance_start_pattern and not self.layout.balance_end_pattern:
-            return info
-            
-        lines = text.split('\n')
-        for line in lines:
-            # Check Start
-            if self.layout.balance_start_pattern and not info['start']:
-                m = re.search(self.layout.balance_start_pattern, line, re.IGNORECASE)
-                if m:
-                    try:
-                        val = self._parse_amount(m.group(2))
-                        info['start'] = val
-                    except: 
-                        pass
-            
-            # Check End
-            if self.layout.balance_end_pattern:
-                m = re.search(self.layout.balance_end_pattern, line, re.IGNORECASE)
-                if m:
-                    try:
-                        val = self._parse_amount(m.group(2))
-                        info['end'] = val
-                    except: 
-                        pass
+        for _, classes in self.grammar.scan(text):
+            self._update_balances(info, classes)
+        return info
+
+    def _scan_account_info(self, text: str) -> Dict[str, str]:
+        """Branch and account numbers from the header region."""
+        info = {}
+        for key, pattern in ACCOUNT_PATTERNS.items():
+            m = pattern.search(text)
+            if m:
+                info[key] = m.group(1)
         return info
 
+    def _merge_balances(self, data: Dict[str, Any], found: Dict[str, Any]) -> None:
+        """Balances read from the balance region take precedence over the table's."""
+        data['balance_info'].update({k: v for k, v in found.items() if v is not None})
+        data['validation'] = self._validate_consistency(data['transactions'], data['balance_info'])
+
+    def _update_balances(self, info: Dict[str, Any], classes: Dict[str, Any]) -> None:
+        """First start balance and last end balance (amount in group 2)."""
+        m = classes.get('balance_start')
+        if m and not info['start']:
+            try:
+                info['start'] = self._parse_amount(m.group(2))
+            except: 
+                pass
+
+        m = classes.get('balance_end')
+        if m:
+            try:
+                info['end'] = self._parse_amount(m.group(2))
+            except: 
+                pass
+
     def _validate_consistency(self, transactions: List[Dict], balances: Dict) -> Dict:
         """Validate that Start + Movements = End."""
         if balances['start'] is None or balances['end'] is None:
@@ -244,31 +297,4 @@ class GenericPDFExtractor(BaseExtractor):
 
     def _is_continuation_line(self, line: str) -> bool:
         """Determine if line is part of previous transaction's memo."""
-        l = line.strip()
-        u = l.upper()
-        
-        if len(l) < 3: 
-            return False
-        
-        if "====" in l or "-----" in l or "_____" in l:
-            return False
-            
-        blocklist = [
-            "EXTRATO", "SALDO", "PAGE", "PÁGINA", "CONTINUA", 
-            "PERIODO:", "PAG.:", "DATA DOCUMENTO", 
-            "COOP CRED", "POUP E INVEST", "AGENCIA:", "CONTA:",
-            "TOTAL", "SUJEITO", "AUTENTICAÇÃO", "OUVIDORIA",
-            "SAC", "ALÔ", "DEFICIT", "SUPERAVIT",
-            "TRANSPORTE", "TRANSPORT",
-            "SALDO ANTERIOR", "SALDO ATUAL", "SALDO DO DIA",
-            "LANCAMENTOS", "DATA HISTORICO"
-        ]
-        if any(b in u for b in blocklist): 
-            return False
-
-        if "**/**/****" in l: 
-            return False
-        if l.startswith("..."): 
-            return False
-        
-        return True
+        return 'ignore' not in self.grammar.classify(line)
@@ -0,0 +1,399 @@
+"""
+Local Layout Inference
+
+Derives a BankLayout for an unknown statement from its first-page text,
+without any network call:
+
+1. Every line is tokenized and each token classified by shape: date,
+   amount, sign marker (C/D, +/-) or text. Runs of text collapse into one
+   memo token, so "05/01/2024 PIX RECEBIDO FULANO 150,00 C" has the shape
+   DATE TEXT AMOUNT SIGN.
+2. Lines starting with a date and holding an amount are clustered by
+   shape. The dominant shape (shorter variants without the trailing
+   balance count towards it) becomes `line_pattern`, with groups for date,
+   memo, amount and sign, and the date format / decimal separator seen in
+   the cluster.
+3. The pattern is checked against the page; keywords come from the bank
+   name found in the text and the column header line.
+
+First pages that yield no layout are remembered by a structural
+fingerprint (header lines with digits masked), so the same unknown
+statement is rejected at once the next time.
+"""
+import hashlib
+import logging
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.common.banks import BRAZILIAN_BANKS
+from src.common.metrics import registry as metrics
+from ..config.layout import BankLayout, ColumnDef
+from ..config.pattern_safety import UnsafePatternError, validate_layout
+
+logger = logging.getLogger(__name__)
+
+INFERENCES = metrics.counter(
+    "auditor_layout_inference_total",
+    "Local layout inference attempts, by result (inferred, rejected, cached).",
+    ("result",),
+)
+
+# (token regex, strptime format, regex used in line_pattern)
+DATE_FORMATS = [
+    (re.compile(r'^\d{2}/\d{2}/\d{4}$'), '%d/%m/%Y', r'\d{2}/\d{2}/\d{4}'),
+    (re.compile(r'^\d{2}/\d{2}/\d{2}$'), '%d/%m/%y', r'\d{2}/\d{2}/\d{2}'),
+    (re.compile(r'^\d{2}-\d{2}-\d{4}$'), '%d-%m-%Y', r'\d{2}-\d{2}-\d{4}'),
+    (re.compile(r'^\d{2}\.\d{2}\.\d{4}$'), '%d.%m.%Y', r'\d{2}\.\d{2}\.\d{4}'),
+]
+
+# Amounts with an optional leading sign and an optional attached C/D or sign suffix
+AMOUNT_BR = re.compile(r'^[-+]?\d{1,3}(?:\.\d{3})*,\d{2}([CD+-]?)$')
+AMOUNT_US = re.compile(r'^[-+]?\d{1,3}(?:,\d{3})*\.\d{2}([CD+-]?)$')
+AMOUNT_REGEX = {
+    ',': r'-?\d{1,3}(?:\.\d{3})*,\d{2}',
+    '.': r'-?\d{1,3}(?:,\d{3})*\.\d{2}',
+}
+SIGN_TOKENS = {'C', 'D', '+', '-', '(+)', '(-)', 'CR', 'DR'}
+CURRENCY_TOKENS = {'R$', 'RS'}
+
+# Shape elements
+DATE, TEXT, AMOUNT, SIGN = 'DATE', 'TEXT', 'AMOUNT', 'SIGN'
+
+MIN_TRANSACTION_LINES = 3
+MIN_COVERAGE = 0.6
+# Matched lines whose date does not parse (OCR noise, a stray total line)
+MAX_BAD_DATE_FRACTION = 0.1
+HEADER_WORDS = ('DATA', 'HISTORICO', 'DESCRICAO', 'LANCAMENTO', 'VALOR', 'SALDO', 'DOCUMENTO')
+FINGERPRINT_LINES = 12
+NEGATIVE_CACHE_SIZE = 1024
+
+
+def _normalize(text: str) -> str:
+    """Upper case without accents (as LayoutRegistry.detect compares keywords)."""
+    return "".join(
+        c for c in unicodedata.normalize('NFD', text.upper())
+        if unicodedata.category(c) != 'Mn'
+    )
+
+
+def _bank_aliases() -> List[Tuple[str, str, str]]:
+    """(normalized alias, alias, bank code), longest first: "Banco Inter", "SICOOB", ..."""
+    aliases = []
+    for code, name in BRAZILIAN_BANKS.items():
+        short = re.sub(r'\s*\(.*?\)', '', name)
+        short = re.sub(r'\s+(IP Ltda\.|Ltda\.?|S\.A\.|S/A)$', '', short).strip()
+        candidates = [short] + re.findall(r'\(([^)]+)\)', name)
+        for alias in candidates:
+            if len(alias) >= 4:
+                aliases.append((_normalize(alias), alias, code))
+    return sorted(aliases, key=lambda a: len(a[0]), reverse=True)
+
+
+class LayoutInferencer:
+    """Infers BankLayouts from first-page text, with a negative fingerprint cache."""
+
+    def __init__(self, cache_size: int = NEGATIVE_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._rejected: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._aliases = _bank_aliases()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def infer(self, text: str) -> Optional[BankLayout]:
+        """BankLayout for `text`, or None (remembered for this fingerprint)."""
+        lines = [line.strip() for line in (text or "").split('\n') if line.strip()]
+        fingerprint = self.fingerprint(lines)
+
+        with self._lock:
+            if fingerprint in self._rejected:
+                self._rejected.move_to_end(fingerprint)
+                INFERENCES.inc(result="cached")
+                logger.debug(f"Layout inference skipped (known unknown layout {fingerprint[:12]})")
+                return None
+
+        layout, reason = self._infer(lines, fingerprint)
+        if layout is None:
+            self._remember_rejection(fingerprint, reason)
+            INFERENCES.inc(result="rejected")
+            logger.info(f"Layout inference failed: {reason}")
+            return None
+
+        INFERENCES.inc(result="inferred")
+        logger.info(f"Layout inferred: {layout.name} ({layout.line_pattern})")
+        return layout
+
+    def fingerprint(self, lines: List[str]) -> str:
+        """Hash of the non-transaction lines with digits masked."""
+        skeleton = []
+        for line in lines:
+            tokens = line.split()
+            if self._date_format(tokens[0]) is not None:
+                continue
+            skeleton.append(re.sub(r'\d', '9', _normalize(" ".join(tokens))))
+            if len(skeleton) == FINGERPRINT_LINES:
+                break
+        return hashlib.sha1("\n".join(skeleton).encode('utf-8')).hexdigest()
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._rejected.clear()
+
+    # ------------------------------------------------------------------
+    # Tokens and shapes
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _date_format(token: str) -> Optional[int]:
+        for i, (pattern, _, _) in enumerate(DATE_FORMATS):
+            if pattern.match(token):
+                return i
+        return None
+
+    def _shape(self, line: str):
+        """
+        (shape, details) of a line. Shape is a tuple of DATE/TEXT/AMOUNT/SIGN
+        with text runs collapsed; details has the date formats, decimal
+        separators and whether amounts carry an attached suffix.
+        """
+        shape, dates, separators, suffixes = [], [], [], []
+        for token in line.split():
+            if token.upper() in CURRENCY_TOKENS:
+                continue
+            date_format = self._date_format(token)
+            br, us = AMOUNT_BR.match(token), AMOUNT_US.match(token)
+            if date_format is not None:
+                element = DATE
+                dates.append(date_format)
+            elif br or us:
+                element = AMOUNT
+                match = br or us
+                separators.append(',' if br else '.')
+                suffixes.append(bool(match.group(1)))
+            elif token.upper() in SIGN_TOKENS and shape and shape[-1] == AMOUNT:
+                element = SIGN
+            else:
+                element = TEXT
+            if element == TEXT and shape and shape[-1] == TEXT:
+                continue
+            shape.append(element)
+        return tuple(shape), {'dates': dates, 'separators': separators, 'suffixes': suffixes}
+
+    @staticmethod
+    def _is_transaction_shape(shape: tuple) -> bool:
+        return bool(shape) and shape[0] == DATE and AMOUNT in shape and TEXT in shape
+
+    @staticmethod
+    def _prefixes(shape: tuple) -> List[tuple]:
+        """Proper prefixes of `shape` ending right after an amount or sign (balance columns dropped)."""
+        first_amount = shape.index(AMOUNT)
+        return [
+            shape[:i] for i in range(first_amount + 1, len(shape))
+            if shape[i - 1] in (AMOUNT, SIGN) and shape[i] != SIGN
+        ]
+
+    def _dominant_shape(self, counts: Counter) -> Tuple[Optional[tuple], Optional[int], int]:
+        """(shape, index where the optional tail starts, supporting lines)."""
+        best, best_key = None, (0, 0)
+        for shape, count in counts.items():
+            support = count + sum(counts.get(p, 0) for p in self._prefixes(shape))
+            key = (support, count)
+            if key > best_key:
+                best, best_key = shape, key
+        if best is None:
+            return None, None, 0
+        present = [p for p in self._prefixes(best) if p in counts]
+        optional_from = len(min(present, key=len)) if present else None
+        return best, optional_from, best_key[0]
+
+    # ------------------------------------------------------------------
+    # Pattern
+    # ------------------------------------------------------------------
+
+    def _build_pattern(self, shape: tuple, optional_from: Optional[int], date_index: int, separator: str, suffix: bool):
+        """line_pattern and columns for `shape`."""
+        date_regex = DATE_FORMATS[date_index][2]
+        amount_regex = AMOUNT_REGEX[separator]
+        suffix_regex = r'([CD+-])?' if suffix else ''
+
+        parts, columns, seen, group = [], [], set(), 0
+        for element in shape:
+            first = element not in seen
+            seen.add(element)
+            if element == DATE:
+                piece = f"({date_regex})" if first else date_regex
+                if first:
+                    group += 1
+                    columns.append(ColumnDef(name='date', match_group=group))
+            elif element == TEXT:
+                # Bounded by non-blanks, so the \s+ around it cannot trade spaces (no cubic backtracking)
+                piece = r"(\S(?:.*?\S)?)" if first else r"\S(?:.*?\S)?"
+                if first:
+                    group += 1
+                    columns.append(ColumnDef(name='memo', match_group=group))
+            elif element == AMOUNT:
+                piece = r"(?:R\$\s*)?"
+                if first:
+                    group += 1
+                    columns.append(ColumnDef(name='amount', match_group=group))
+                    piece += f"({amount_regex})"
+                    if suffix:
+                        group += 1
+                        columns.append(ColumnDef(name='type', match_group=group))
+                        piece += suffix_regex
+                else:
+                    piece += f"{amount_regex}[CD+-]?"
+            else:  # SIGN, right after an amount
+                captured = first and shape.index(SIGN) == shape.index(AMOUNT) + 1 and not suffix
+                piece = r"(CR|DR|C|D|\(?[+-]\)?)" if captured else r"(?:CR|DR|C|D|\(?[+-]\)?)"
+                if captured:
+                    group += 1
+                    columns.append(ColumnDef(name='type', match_group=group))
+            parts.append((element, piece))
+
+        def join(items):
+            out = ""
+            for i, (element, piece) in enumerate(items):
+                if i:
+                    out += r"\s*" if element == SIGN else r"\s+"
+                out += piece
+            return out
+
+        if optional_from is not None:
+            head, tail = parts[:optional_from], parts[optional_from:]
+            tail_regex = join(tail)
+            separator_regex = r"\s*" if tail[0][0] == SIGN else r"\s+"
+            body = f"{join(head)}(?:{separator_regex}{tail_regex})?"
+        else:
+            body = join(parts)
+        return rf"^\s*{body}\s*$", columns
+
+    # ------------------------------------------------------------------
+    # Inference
+    # ------------------------------------------------------------------
+
+    def _infer(self, lines: List[str], fingerprint: str) -> Tuple[Optional[BankLayout], str]:
+        shapes = Counter()
+        details: Dict[tuple, List[dict]] = {}
+        first_transaction_line = None
+        for i, line in enumerate(lines):
+            shape, info = self._shape(line)
+            if not self._is_transaction_shape(shape):
+                continue
+            if first_transaction_line is None:
+                first_transaction_line = i
+            shapes[shape] += 1
+            details.setdefault(shape, []).append(info)
+
+        shape, optional_from, support = self._dominant_shape(shapes)
+        if shape is None or support < MIN_TRANSACTION_LINES:
+            return None, f"only {support} transaction-like lines"
+
+        # Date format, decimal separator and suffixes seen in the cluster
+        cluster = [info for s, infos in details.items() if s == shape or s in self._prefixes(shape) for info in infos]
+        date_index = Counter(info['dates'][0] for info in cluster).most_common(1)[0][0]
+        separator = Counter(sep for info in cluster for sep in info['separators'][:1]).most_common(1)[0][0]
+        suffix = any(info['suffixes'][:1] == [True] for info in cluster)
+        date_format = DATE_FORMATS[date_index][1]
+
+        line_pattern, columns = self._build_pattern(shape, optional_from, date_index, separator, suffix)
+        regex = re.compile(line_pattern)
+
+        # The pattern must cover the cluster and yield valid dates
+        candidates = sum(shapes.values())
+        matches = bad_dates = 0
+        for line in lines:
+            match = regex.match(line)
+            if not match:
+                continue
+            try:
+                datetime.strptime(match.group(1), date_format)
+            except ValueError:
+                bad_dates += 1
+                continue
+            matches += 1
+        if bad_dates > MAX_BAD_DATE_FRACTION * (matches + bad_dates):
+            return None, f"{bad_dates} of {matches + bad_dates} dates do not parse as {date_format}"
+        if matches < MIN_TRANSACTION_LINES or matches < MIN_COVERAGE * candidates:
+            return None, f"pattern matches {matches} of {candidates} transaction-like lines"
+
+        keywords, bank_id, bank_name = self._keywords(lines, first_transaction_line)
+        if len(keywords) < 2:
+            return None, "no distinctive keywords"
+
+        balance_start, balance_end = self._balance_patterns(lines, separator)
+        layout = BankLayout(
+            name=f"{bank_name or 'Layout'} - Inferido {fingerprint[:8]}",
+            bank_id=bank_id or "000",
+            keywords=keywords,
+            line_pattern=line_pattern,
+            columns=columns,
+            amount_decimal_separator=separator,
+            amount_thousand_separator='.' if separator == ',' else ',',
+            date_format=date_format,
+            balance_start_pattern=balance_start,
+            balance_end_pattern=balance_end,
+            inferred=True,
+        )
+        try:
+            validate_layout(layout)
+        except UnsafePatternError as e:
+            return None, str(e)
+        return layout, "ok"
+
+    def _keywords(self, lines: List[str], first_transaction_line: int):
+        """Bank name alias and column header line found before the first transaction."""
+        keywords, bank_id, bank_name = [], None, None
+        # Transaction memos ("TED ENVIADA BANCO X") name other banks
+        header_lines = lines[:first_transaction_line]
+        normalized_text = _normalize("\n".join(header_lines))
+        for normalized, alias, code in self._aliases:
+            if re.search(rf'\b{re.escape(normalized)}\b', normalized_text):
+                keywords.append(alias)
+                bank_id, bank_name = code, alias
+                break
+
+        header = next(
+            (line for line in reversed(header_lines)
+             if sum(word in _normalize(line) for word in HEADER_WORDS) >= 2 and not re.search(r'\d', line)),
+            None,
+        )
+        if header:
+            keywords.append(" ".join(header.split()))
+        elif bank_name is not None:
+            # Title line (e.g. "Extrato de Conta Corrente") as second keyword
+            title = next((l for l in header_lines if 'EXTRATO' in _normalize(l) and not re.search(r'\d', l)), None)
+            if title:
+                keywords.append(" ".join(title.split()))
+        return keywords, bank_id, bank_name
+
+    @staticmethod
+    def _balance_patterns(lines: List[str], separator: str):
+        """Start/end balance patterns (group 2 = amount) when a start balance is on the page."""
+        text = _normalize("\n".join(lines))
+        amount = AMOUNT_REGEX[separator]
+        start = next((label for label in ('SALDO ANTERIOR', 'SALDO INICIAL') if label in text), None)
+        if start is None:
+            return None, None
+        start_regex = start.replace(' ', r'\s+')
+        return (
+            rf"({start_regex}).*?({amount})",
+            rf"(SALDO\s+(?:FINAL|ATUAL|DISPON.VEL)).*?({amount})",
+        )
+
+    def _remember_rejection(self, fingerprint: str, reason: str) -> None:
+        with self._lock:
+            self._rejected[fingerprint] = reason
+            self._rejected.move_to_end(fingerprint)
+            while len(self._rejected) > self.cache_size:
+                self._rejected.popitem(last=False)
+
+
+# Process-wide instance used by ExtractorPipeline (the negative cache outlives requests)
+layout_inferencer = LayoutInferencer()
@@ -5,15 +5,15 @@ Extracts transactions from scanned PDFs using OCR (Tesseract).
 """
 import os
 import logging
-import pytesseract
-from pdf2image import convert_from_path
 from typing import Dict, Any
 from ..base import BaseExtractor
 from ..config.layout import BankLayout
 
 logger = logging.getLogger(__name__)
 
-# If Tesseract is not in PATH, specify it here:
+# pytesseract and pdf2image are imported in extract(): OCR is a rare fallback
+# and they are slow to load.
+# If Tesseract is not in PATH, specify it here (inside extract):
 # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
 
@@ -45,18 +45,25 @@ class OCRExtractor(BaseExtractor):
         Extract transactions from scanned PDF.
         
         Args:
-            file_path: Path to PDF file
+            file_path: Path to PDF file or binary file object
             
         Returns:
             Dict with transactions, account_info, etc.
         """
-        logger.info(f"Starting OCR for {os.path.basename(file_path)}")
+        logger.info(f"Starting OCR for {os.path.basename(str(getattr(file_path, 'name', None) or file_path))}")
         
         full_text = ""
         
         try:
+            import pytesseract
+            from pdf2image import convert_from_bytes, convert_from_path
+            
             # Convert PDF to images
-            images = convert_from_path(file_path)
+            if hasattr(file_path, 'read'):
+                file_path.seek(0)
+                images = convert_from_bytes(file_path.read())
+            else:
+                images = convert_from_path(file_path)
             
             for i, image in enumerate(images):
                 # OCR each page
@@ -0,0 +1,172 @@
+"""
+Word Geometry
+
+Coordinate-based parsers read a page as `extract_words()` output and need the
+same three steps: group words into visual lines, order each line by x, and
+split it into columns by x position. `PageWords` holds a page's words as
+arrays (x0, x1, top, text index) and does the three steps in one vectorized
+pass:
+
+1. Lines: words sorted by `top`; a new line starts wherever the gap to the
+   previous word exceeds the tolerance (words straddling a fixed bucket
+   boundary, such as tops 9.9 and 10.1, stay on the same line).
+2. Order: one lexsort by (line, x0).
+3. Columns: each `ColumnBands` range becomes a boolean mask over all the
+   page's words at once, cut into lines with one `searchsorted`.
+
+Bands are declared once per parser (or sub-layout) and reused for every page
+of the document. `crop_region` narrows a page to a declared region (see
+`BankLayout.regions`) before any text or word is extracted.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Words whose tops differ by at most this many points share a line
+LINE_TOLERANCE = 2.0
+
+
+class ColumnBands:
+    """
+    Named x ranges of a statement layout, matched against each word's x0.
+
+    Ranges are [start, end); None leaves a side open. Ranges may overlap (a
+    word can belong to both "date" and "memo") and need not cover the page.
+
+        ColumnBands(date=(None, 100), memo=(100, 450), amount=(450, 518), balance=(518, None))
+    """
+
+    def __init__(self, **bands: Tuple[Optional[float], Optional[float]]):
+        self.bands = dict(bands)
+
+    def masks(self, x0: np.ndarray) -> Dict[str, np.ndarray]:
+        """{name: boolean mask} of the words whose x0 falls in each band."""
+        result = {}
+        for name, (start, end) in self.bands.items():
+            mask = np.ones(len(x0), dtype=bool)
+            if start is not None:
+                mask &= x0 >= start
+            if end is not None:
+                mask &= x0 < end
+            result[name] = mask
+        return result
+
+
+class WordLine:
+    """
+    One visual line: its words in x order, with their x0 and column words.
+    """
+
+    __slots__ = ('top', 'words', 'x0', '_columns')
+
+    def __init__(self, top: float, words: List[str], x0: List[float], columns: Dict[str, List[str]]):
+        self.top = top
+        self.words = words
+        self.x0 = x0
+        self._columns = columns
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.words)
+
+    def column(self, name: str, sep: str = " ") -> str:
+        """Words of band `name` (see `ColumnBands`), joined with `sep`."""
+        return sep.join(self._columns[name])
+
+    def __iter__(self):
+        """(text, x0) of each word."""
+        return zip(self.words, self.x0)
+
+    def __repr__(self) -> str:
+        return f"WordLine({self.top:.1f}, {self.text!r})"
+
+
+class PageWords:
+    """
+    A page's words as parallel arrays.
+
+    Attributes:
+        texts: Word texts (the text index of the arrays)
+        x0, x1, top: Word coordinates as float arrays
+    """
+
+    def __init__(self, words: Sequence[dict]):
+        count = len(words)
+        self.texts = [w['text'] for w in words]
+        self.x0 = np.fromiter((w['x0'] for w in words), dtype=float, count=count)
+        self.x1 = np.fromiter((w['x1'] for w in words), dtype=float, count=count)
+        self.top = np.fromiter((w['top'] for w in words), dtype=float, count=count)
+
+    @classmethod
+    def from_page(cls, page, **kwargs) -> "PageWords":
+        """Words of a pdfplumber page (`kwargs` go to `extract_words`)."""
+        return cls(page.extract_words(**kwargs))
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def line_ids(self, tolerance: float = LINE_TOLERANCE) -> np.ndarray:
+        """Line number of each word, lines numbered from the top of the page."""
+        by_top = np.argsort(self.top, kind='stable')
+        breaks = np.diff(self.top[by_top]) > tolerance
+        ids = np.empty(len(self), dtype=np.intp)
+        ids[by_top] = np.concatenate(([0], np.cumsum(breaks)))
+        return ids
+
+    def lines(self, bands: Optional[ColumnBands] = None, tolerance: float = LINE_TOLERANCE) -> List[WordLine]:
+        """
+        Visual lines from top to bottom, words in x order.
+
+        Args:
+            bands: Column bands to evaluate for `WordLine.column`
+            tolerance: Largest `top` gap between words of one line
+        """
+        if not len(self):
+            return []
+        ids = self.line_ids(tolerance)
+        order = np.lexsort((self.x0, ids))
+        sorted_ids = ids[order]
+        starts = np.flatnonzero(np.concatenate(([True], sorted_ids[1:] != sorted_ids[:-1])))
+        ends = np.append(starts[1:], len(order))
+        # Topmost word of each line
+        tops = np.minimum.reduceat(self.top[order], starts).tolist()
+
+        words = [self.texts[i] for i in order.tolist()]
+        x0 = self.x0[order].tolist()
+        lines = [WordLine(top, words[s:e], x0[s:e], {})
+                 for top, s, e in zip(tops, starts.tolist(), ends.tolist())]
+
+        # Words of each band in page order, cut at the line starts
+        for name, mask in (bands.masks(self.x0) if bands else {}).items():
+            picked = np.flatnonzero(mask[order])
+            cuts = np.searchsorted(picked, np.append(starts, len(order))).tolist()
+            band_words = [words[i] for i in picked.tolist()]
+            for line, s, e in zip(lines, cuts, cuts[1:]):
+                line._columns[name] = band_words[s:e]
+        return lines
+
+
+def page_lines(page, bands: Optional[ColumnBands] = None, tolerance: float = LINE_TOLERANCE) -> List[WordLine]:
+    """Shortcut for `PageWords.from_page(page).lines(bands, tolerance)`."""
+    return PageWords.from_page(page).lines(bands, tolerance)
+
+
+def crop_region(page, region):
+    """
+    `page` cropped to `region` (x0, top, x1, bottom), or `page` itself when
+    `region` is None.
+
+    None edges are the page's own, and edges beyond the page are clamped to
+    it (pdfplumber rejects a crop box outside the page).
+    """
+    if region is None:
+        return page
+    page_x0, page_top, page_x1, page_bottom = page.bbox
+    x0, top, x1, bottom = region
+    bbox = (
+        page_x0 if x0 is None else min(max(x0, page_x0), page_x1),
+        page_top if top is None else min(max(top, page_top), page_bottom),
+        page_x1 if x1 is None else min(max(x1, page_x0), page_x1),
+        page_bottom if bottom is None else min(max(bottom, page_top), page_bottom),
+    )
+    return page.crop(bbox)
@@ -1,8 +1,7 @@
 import os
 import pandas as pd
-from .pipeline import ExtractorPipeline
 from .config.registry import LayoutRegistry
-from .sources.ofx import OfxParser
+from src.common.timing import StageTimer
 
 class ParserFacade:
     """
@@ -10,26 +9,45 @@ class ParserFacade:
     """
     
     def __init__(self):
+        # Imported here so that importing the facade does not load pdfplumber
+        from .pipeline import ExtractorPipeline
+        
         # Locate layouts relative to this file or project root
         # Assuming run from root
         root = os.getcwd()
         layouts_dir = os.path.join(root, 'src', 'parsing', 'layouts')
-        self.registry = LayoutRegistry(layouts_dir)
+        self.registry = LayoutRegistry.shared(layouts_dir)
         self.pipeline = ExtractorPipeline(self.registry)
-        self.ofx_parser = OfxParser()
+        self._ofx_parser = None
+
+    @property
+    def ofx_parser(self):
+        """OFX parser, created on the first OFX file (ofxparse is slow to import)."""
+        if self._ofx_parser is None:
+            from .sources.ofx import OfxParser
+            self._ofx_parser = OfxParser()
+        return self._ofx_parser
 
-    def parse(self, file_path: str):
+    def parse(self, file_path, file_name: str = None):
         """
         Unified parse method. Dispatches to appropriate parser.
+        `file_path` may also be a binary file object; pass `file_name` then
+        (the extension selects the parser).
         Returns: (pd.DataFrame, dict) -> (transactions, metadata)
         """
-        if file_path.lower().endswith('.ofx'):
+        file_name = file_name or os.path.basename(file_path)
+        if file_name.lower().endswith('.ofx'):
             return self.ofx_parser.parse(file_path)
         
-        # Default to PDF Pipeline
-        result = self.pipeline.process_file(file_path)
-        
-        # Convert Pipeline result (Dict) to Legacy format (DataFrame, Dict)
+        with StageTimer.activate(file_name=file_name) as timer:
+            # Default to PDF Pipeline
+            result = self.pipeline.process_file(file_path, file_name)
+            
+            with timer.stage("dataframe_build"):
+                return self._to_dataframe(result)
+
+    def _to_dataframe(self, result: dict):
+        """Convert a pipeline result (Dict) to the legacy (DataFrame, Dict) format."""
         metadata = result.get('account_info', {})
         # Map some keys if necessary
         if 'bank_id' in metadata:
@@ -5,15 +5,15 @@ Orchestrates the PDF extraction process with automatic layout detection,
 text-based extraction, OCR fallback, and auto-correction heuristics.
 """
 from src.common.logging_config import get_logger
+from src.common.timing import StageTimer
 import pdfplumber
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .config.registry import LayoutRegistry
 from .extractors.generic import GenericPDFExtractor
 from .extractors.ocr import OCRExtractor
 from src.common.models import UnifiedTransaction
 import os
-import dataclasses
-from .extractors.ai_generation import GeminiLayoutGenerator
+from .extractors.layout_inference import layout_inferencer
 
 logger = get_logger(__name__)
 
@@ -23,7 +23,7 @@ class ExtractorPipeline:
     Main orchestrator for PDF extraction.
     
     Handles:
-    - Layout detection from PDF text
+    - Layout detection from PDF text (local inference for unknown layouts)
     - Text-based extraction with GenericPDFExtractor
     - Auto-correction heuristics for balance discrepancies
     - OCR fallback for scanned PDFs
@@ -38,16 +38,29 @@ class ExtractorPipeline:
         """
         self.registry = registry
 
-    def process_file(self, file_path: str) -> Dict[str, Any]:
+    def process_file(self, file_path, file_name: Optional[str] = None) -> Dict[str, Any]:
         """
         Process a PDF file and extract transactions.
         
+        Every stage is timed (see `src.common.timing`) and the report is
+        logged once per file, aggregated per parser and layout.
+        
         Args:
-            file_path: Path to PDF file
+            file_path: Path to PDF file, or a seekable binary file object
+                (e.g. a spooled upload; every stage re-reads it from the start)
+            file_name: Name for logs and `source_file` (defaults to the
+                path's basename)
             
         Returns:
             Dict with transactions, account_info, method, layout, error
         """
+        if file_name is None:
+            file_name = os.path.basename(str(getattr(file_path, 'name', None) or file_path))
+        with StageTimer.activate(file_name=file_name) as timer:
+            return self._process_file(file_path, file_name, timer)
+
+    def _process_file(self, file_path, file_name: str, timer: StageTimer) -> Dict[str, Any]:
+        """Stage-by-stage implementation of `process_file`."""
         result = {
             'transactions': [],
             'account_info': {},
@@ -59,31 +72,32 @@ class ExtractorPipeline:
         # 1. Peek at text for Layout Detection
         try:
             full_text_sample = ""
-            with pdfplumber.open(file_path) as pdf:
+            with timer.stage("first_page_text"), pdfplumber.open(file_path) as pdf:
                 if len(pdf.pages) > 0:
                     full_text_sample = pdf.pages[0].extract_text() or ""
         except Exception as e:
-            logger.error(f"PDF Read Error: {e}", file_path=file_path, error_type=type(e).__name__)
+            logger.error(f"PDF Read Error: {e}", file_name=file_name, error_type=type(e).__name__)
             result['error'] = f"PDF Read Error: {e}"
             return result
 
         # 2. Detect Layout
-        layout = self.registry.detect(full_text_sample)
+        with timer.stage("layout_detection"):
+            layout = self.registry.detect(full_text_sample)
         
-        # AI Fallback
+        # Local inference fallback (offline; unknown first pages are negatively cached)
         if not layout and len(full_text_sample.strip()) > 50:
-             try:
-                 logger.info("Layout not detected. Attempting AI Layout Generation...", text_length=len(full_text_sample))
-                 ai_gen = GeminiLayoutGenerator(api_key=os.getenv('GEMINI_API_KEY'))
-                 generated_layout = ai_gen.generate_layout(full_text_sample)
-                 
-                 if generated_layout:
-                     logger.info(f"AI generated layout: {generated_layout.name}", bank_id=generated_layout.bank_id)
-                     # Save to registry
-                     self.registry.save_layout(dataclasses.asdict(generated_layout))
-                     layout = generated_layout
-             except Exception as e:
-                 logger.error(f"AI Generation failed: {e}", exc_info=True)
+            try:
+                with timer.stage("layout_inference"):
+                    inferred_layout = layout_inferencer.infer(full_text_sample)
+
+                if inferred_layout:
+                    logger.info(f"Layout inferred: {inferred_layout.name}", bank_id=inferred_layout.bank_id)
+                    layout = inferred_layout
+                    # Kept in memory (below the layouts on disk) until confirmed,
+                    # so the next statement is detected directly
+                    self.registry.add_inferred(inferred_layout)
+            except Exception as e:
+                logger.error(f"Layout inference failed: {e}", exc_info=True)
 
         if not layout:
             if len(full_text_sample.strip()) < 50:
@@ -97,8 +111,9 @@ class ExtractorPipeline:
         # 3. Choose Specialized Parser or Generic Extractor
         from .banks import PARSERS
         
-        parser_cls = PARSERS.get(layout.bank_id)
-        if not parser_cls:
+        # Inferred layouts describe their own lines; the bank's parser would not
+        parser_cls = None if layout.inferred else PARSERS.get(layout.bank_id)
+        if not parser_cls and not layout.inferred:
             # Try lookup by normalized name if bank_id fails
             name_key = layout.name.upper().replace(" ", "")
             parser_cls = PARSERS.get(name_key)
@@ -111,6 +126,7 @@ class ExtractorPipeline:
             parser = GenericPDFExtractor(layout)
 
         extractor = parser
+        timer.set_context(parser=type(parser).__name__, layout=layout.name)
         
         # Auto-correction loop
         max_attempts = 3
@@ -119,7 +135,8 @@ class ExtractorPipeline:
         for attempt in range(max_attempts):
             logger.debug(f"Extraction attempt {attempt+1}/{max_attempts}", attempt=attempt+1)
             
-            data = extractor.extract(file_path)
+            with timer.stage("extraction"):
+                data = extractor.extract(file_path)
             transactions_dict = data['transactions']
             validation = data.get('validation', {})
             
@@ -137,13 +154,15 @@ class ExtractorPipeline:
             if diff > 0.001:
                 logger.warning(f"Divergence detected: {diff:.2f}")
                 
-                fixed = self._try_sign_flip_heuristic(data, transactions_dict)
+                with timer.stage("auto_correction"):
+                    fixed = self._try_sign_flip_heuristic(data, transactions_dict)
                 if fixed:
                     logger.info("Heuristic A (Sign Flip) fixed the discrepancy.", method="sign_flip")
                     best_result = data
                     break
                 
-                fixed = self._try_ghost_recovery_heuristic(data, transactions_dict)
+                with timer.stage("auto_correction"):
+                    fixed = self._try_ghost_recovery_heuristic(data, transactions_dict)
                 if fixed:
                     logger.info("Heuristic B (Ghost Recovery) fixed the discrepancy.", method="ghost_recovery")
                     best_result = data
@@ -156,6 +175,8 @@ class ExtractorPipeline:
         data = best_result
         transactions = data.get('transactions', [])
         result['account_info'] = data.get('account_info', {})
+        # Specialized parsers report no bank_id; the detected layout knows it
+        result['account_info'].setdefault('bank_id', layout.bank_id)
         result['balance_info'] = data.get('balance_info', {})
         result['validation'] = data.get('validation', {})
         result['method'] = 'Text (Auto-Corrected)' if 'Corrigido' in str(result['validation'].get('msg')) else 'Text'
@@ -165,8 +186,9 @@ class ExtractorPipeline:
             if len(transactions) == 0:
                 logger.warning("No transactions found via Text. Attempting OCR...")
                 
-                ocr_extractor = OCRExtractor(layout, GenericPDFExtractor)
-                ocr_data = ocr_extractor.extract(file_path)
+                with timer.stage("ocr_fallback"):
+                    ocr_extractor = OCRExtractor(layout, GenericPDFExtractor)
+                    ocr_data = ocr_extractor.extract(file_path)
                 
                 if len(ocr_data['transactions']) > 0:
                     transactions = ocr_data['transactions']
@@ -179,19 +201,21 @@ class ExtractorPipeline:
 
             # Standardize to UnifiedTransaction
             unified_txs = []
-            for tx in transactions:
-                unified_txs.append(UnifiedTransaction(
-                    date=tx['date'],
-                    amount=tx['amount'],
-                    memo=tx['memo'],
-                    type=tx.get('type', 'OTHER'),
-                    doc_id=tx.get('doc_id'),
-                    fitid=tx.get('fitid'),
-                    internal_id=tx.get('internal_id'),
-                    source_file=tx.get('source_file', os.path.basename(file_path))
-                ))
+            with timer.stage("standardize"):
+                for tx in transactions:
+                    unified_txs.append(UnifiedTransaction(
+                        date=tx['date'],
+                        amount=tx['amount'],
+                        memo=tx['memo'],
+                        type=tx.get('type', 'OTHER'),
+                        doc_id=tx.get('doc_id'),
+                        fitid=tx.get('fitid'),
+                        internal_id=tx.get('internal_id'),
+                        source_file=tx.get('source_file', file_name)
+                    ))
             
             result['transactions'] = unified_txs
+            timer.set_tx_count(len(unified_txs))
             
         except Exception as e:
             result['error'] = str(e)
@@ -1,6 +1,10 @@
-# Source parsers
-from .ofx import OfxParser
-from .ledger_pdf import LedgerParser
-from .ledger_csv import LedgerCSVParser
+# Source parsers (imported on first access)
+from src.common.lazy import lazy_exports
+
+__getattr__ = lazy_exports(__name__, {
+    'OfxParser': '.ofx:OfxParser',
+    'LedgerParser': '.ledger_pdf:LedgerParser',
+    'LedgerCSVParser': '.ledger_csv:LedgerCSVParser',
+})
 
 __all__ = ['OfxParser', 'LedgerParser', 'LedgerCSVParser']
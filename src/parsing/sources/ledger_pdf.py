@@ -28,7 +28,8 @@ class LedgerParser(BaseParser):
             from .ledger_csv import LedgerCSVParser
             return LedgerCSVParser().parse(file_path_or_buffer)
         
-        if hasattr(file_path_or_buffer, 'name') and file_path_or_buffer.name.lower().endswith('.csv'):
+        name = getattr(file_path_or_buffer, 'name', None)
+        if isinstance(name, str) and name.lower().endswith('.csv'):
             from .ledger_csv import LedgerCSVParser
             return LedgerCSVParser().parse(file_path_or_buffer)
               
@@ -122,8 +122,25 @@ const Conciliation = () => {
 
     const handleDownload = async (type) => {
         try {
-            // Enviar dados filtrados para o backend
-            const response = await api.post(`/export/${type}`, filteredRows, {
+            // Exportação gerada no servidor a partir da conciliação em cache:
+            // enviamos apenas o id e os filtros da tela, não as linhas
+            const reconciliationId = reconcileResults?.reconciliation_id;
+            const params = new URLSearchParams();
+            filterStatus.forEach(s => params.append('status', s));
+            if (searchTerm) params.append('search', searchTerm);
+
+            let { data: job } = await api.post(`/export/reconciliation/${reconciliationId}/${type}?${params.toString()}`);
+
+            // Aguardar o job em segundo plano
+            while (job.status === 'pending' || job.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                ({ data: job } = await api.get(`/export/jobs/${job.job_id}`));
+            }
+            if (job.status !== 'done') {
+                throw new Error(job.error || 'Falha na exportação');
+            }
+
+            const response = await api.get(`/export/jobs/${job.job_id}/download`, {
                 responseType: 'blob' // Importante para receber arquivo binário
             });
 
@@ -132,18 +149,7 @@ const Conciliation = () => {
             const url = window.URL.createObjectURL(blob);
             const link = document.createElement('a');
             link.href = url;
-
-            // Extrair nome do arquivo do header Content-Disposition se disponível
-            const contentDisposition = response.headers['content-disposition'];
-            let filename = `conciliacao_${new Date().toISOString().slice(0, 10)}.${type === 'excel' ? 'xlsx' : 'pdf'}`;
-            if (contentDisposition) {
-                const filenameMatch = contentDisposition.match(/filename="([^"]+)"/);
-                if (filenameMatch && filenameMatch[1]) {
-                    filename = filenameMatch[1];
-                }
-            }
-
-            link.download = filename;
+            link.download = job.filename || `conciliacao_${new Date().toISOString().slice(0, 10)}.${type === 'excel' ? 'xlsx' : 'pdf'}`;
             document.body.appendChild(link);
             link.click();
             document.body.removeChild(link);
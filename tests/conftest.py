@@ -0,0 +1,9 @@
+"""
+Shared test setup.
+
+src.api.main configures logging when imported; an empty LOG_FILE keeps test
+runs on the console instead of appending to the repository's logs/app.log.
+"""
+import os
+
+os.environ["LOG_FILE"] = ""
@@ -0,0 +1,112 @@
+"""
+Unit Tests for Account Assignment Rules
+
+Tests the compiled rule set used by the lançamentos export:
+- Pattern, sign, amount range and bank conditions
+- First matching rule wins
+- Per-company JSON repository and applying rules through LancamentoStore
+"""
+import pytest
+import os
+import sys
+
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.account_rules import AccountRuleSet, AccountRuleRepository
+from src.api.state import AppState
+from src.api.lancamento_store import LancamentoStore
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def bank_df():
+    """Bank-only transactions from two banks."""
+    return pd.DataFrame({
+        'date': pd.to_datetime(['2025-01-02'] * 5),
+        'amount': [-12.0, 500.0, -2500.0, 80.0, -15.0],
+        'description': ['TARIFA PACOTE', 'PIX RECEBIDO JOAO', 'PAGTO FORNECEDOR', 'PIX RECEBIDO ANA', 'Tarifa DOC'],
+        'bank_account': ['BB 123', 'BB 123', 'STONE', 'STONE', 'STONE'],
+    })
+
+
+@pytest.fixture
+def rule_set():
+    return AccountRuleSet.from_dicts([
+        {'name': 'tarifas', 'pattern': r'TARIFA', 'sign': 'debit', 'conta_debito': '400'},
+        {'name': 'pix bb', 'pattern': r'^PIX RECEBIDO', 'sign': 'credit', 'bank': 'bb', 'conta_credito': '300'},
+        {'name': 'grandes', 'min_amount': 1000, 'conta_debito': '999', 'participante_debito': '7'},
+    ])
+
+
+# ============================================================================
+# RULE SET
+# ============================================================================
+
+class TestAccountRuleSet:
+
+    def test_conditions_and_first_match(self, bank_df, rule_set):
+        result = rule_set.apply(bank_df)
+
+        assert result['rule'].to_dict() == {0: 'tarifas', 1: 'pix bb', 2: 'grandes', 4: 'tarifas'}
+
+    def test_unset_fields_are_none(self, bank_df, rule_set):
+        result = rule_set.apply(bank_df)
+
+        assert result.loc[0, 'conta_debito'] == '400'
+        assert result.loc[0, 'conta_credito'] is None
+
+    def test_invalid_rules_rejected(self):
+        with pytest.raises(ValueError):
+            AccountRuleSet.from_dicts([{'name': 'bad', 'pattern': '(unclosed'}])
+        with pytest.raises(ValueError):
+            AccountRuleSet.from_dicts([{'name': 'bad', 'sign': 'both'}])
+
+    def test_patterns_that_cannot_be_combined(self, bank_df):
+        rule_set = AccountRuleSet.from_dicts([
+            {'name': 'flags', 'pattern': r'(?i)fornecedor'},
+            {'name': 'group a', 'pattern': r'(?P<x>JOAO)'},
+            {'name': 'group b', 'pattern': r'(?P<x>ANA)'},
+            {'name': 'repeat', 'pattern': r'(C)\1'},
+            {'name': 'pix', 'pattern': r'pix'},
+        ])
+
+        result = rule_set.apply(bank_df.assign(description=bank_df['description'].replace('Tarifa DOC', 'ACCOUNT')))
+
+        assert result['rule'].to_dict() == {1: 'group a', 2: 'flags', 3: 'group b', 4: 'repeat'}
+
+    def test_repository_roundtrip(self, tmp_path, rule_set):
+        repo = AccountRuleRepository(str(tmp_path))
+
+        assert repo.load('Empresa X').rules == []
+        repo.save('Empresa X', rule_set)
+
+        assert repo.load('Empresa X').to_dicts() == rule_set.to_dicts()
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class TestApplyRules:
+
+    def test_accept_writes_edits_and_keeps_manual_ones(self, bank_df, rule_set):
+        state = AppState()
+        state.reconcile_results = {'remaining_b': bank_df}
+        store = LancamentoStore(state)
+        store.edit('bank_4', {'conta_debito': '111'})
+
+        assignments = store.apply_rules(rule_set, accept=True)
+        frame = store.bank_frame()
+
+        assert list(assignments.index) == ['bank_0', 'bank_1', 'bank_2']
+        assert frame.loc['bank_0', 'conta_debito'] == '400'
+        assert frame.loc['bank_1', 'conta_credito'] == '300'
+        assert frame.loc['bank_2', 'participante_debito'] == '7'
+        assert frame.loc['bank_4', 'conta_debito'] == '111'
+        assert state.edited_transactions['bank_0'] == {'conta_debito': '400'}
@@ -0,0 +1,138 @@
+"""
+Unit Tests for the Account Suggestion Index
+
+Tests nearest-neighbour account suggestions from lançamentos history:
+- Parsing both lançamentos file layouts
+- Batch suggestions aligned with the input
+- Incremental refresh (new, changed and deleted files)
+- Only user/rule-assigned rows feed the history
+"""
+import pytest
+import os
+import sys
+
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.account_suggestions import (
+    AccountSuggestionIndex,
+    normalize_description,
+    parse_lancamento_lines,
+)
+from src.api.state import AppState
+from src.api.lancamento_store import LancamentoStore
+
+
+HISTORY = "\n".join([
+    "1,02/01/2025,78,,6670,,1850.41,,0000 14024 732 CIELO VENDAS CRÉDITO 107.245.912,DCTO,,001",
+    "2,02/01/2025,1201,,78,,114.66,,2936 99008 234 COMPRA COM CARTÃO 511.638 FORT ATACADISTA,DCTO,,000001",
+    "3,03/01/2025,4100,,78,,35.00,,TARIFA PACOTE SERVICOS,DCTO,,001",
+])
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def history_dir(tmp_path):
+    (tmp_path / "jan.txt").write_text(HISTORY, encoding="utf-8")
+    return tmp_path
+
+
+@pytest.fixture
+def index(history_dir):
+    idx = AccountSuggestionIndex(str(history_dir))
+    idx.refresh()
+    return idx
+
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+class TestParsing:
+
+    def test_current_layout(self):
+        postings = parse_lancamento_lines(HISTORY)
+
+        assert len(postings) == 3
+        assert postings.loc[1, "conta_debito"] == "1201"
+        assert postings.loc[1, "conta_credito"] == "78"
+
+    def test_layout_without_participants_and_commas_in_historico(self):
+        postings = parse_lancamento_lines("7,02/01/2025,78,6670,100.00,,DEP DINHEIRO, ATM,DCTO,,001")
+
+        assert postings.iloc[0].to_dict() == {
+            "description": "DEP DINHEIRO, ATM", "conta_debito": "78", "conta_credito": "6670"
+        }
+
+    def test_normalize_collapses_numbers_and_accents(self):
+        assert normalize_description("Compra com cartão 511.638") == "COMPRA COM CARTAO #.#"
+
+
+# ============================================================================
+# SUGGESTIONS
+# ============================================================================
+
+class TestSuggest:
+
+    def test_batch_aligned_with_input(self, index):
+        result = index.suggest([
+            "7777 55555 111 COMPRA COM CARTAO 999.111 FORT ATACADISTA",
+            "ALGO SEM RELACAO",
+            "0000 99999 732 CIELO VENDAS CREDITO 555.000.111",
+        ])
+
+        assert list(result.index) == [0, 2]
+        assert result.loc[0, "conta_debito"] == "1201"
+        assert result.loc[2, "conta_credito"] == "6670"
+
+    def test_refresh_is_incremental(self, history_dir, index):
+        assert index.refresh() == 0
+
+        (history_dir / "fev.txt").write_text(
+            "1,01/02/2025,5200,,78,,80.00,,PAGTO ENERGIA ELETRICA,DCTO,,001", encoding="utf-8"
+        )
+        assert index.refresh() == 1
+        assert index.suggest(["PAGTO ENERGIA ELETRICA"]).loc[0, "conta_debito"] == "5200"
+
+        os.remove(history_dir / "fev.txt")
+        index.refresh()
+        assert index.suggest(["PAGTO ENERGIA ELETRICA"]).empty
+
+    def test_store_suggestions_by_transaction_id(self, index):
+        state = AppState()
+        state.reconcile_results = {'remaining_b': pd.DataFrame({
+            'date': pd.to_datetime(['2025-02-03', '2025-02-04']),
+            'amount': [-40.0, -12.0],
+            'description': ['TARIFA PACOTE SERVICOS', 'XPTO'],
+        })}
+
+        suggestions = LancamentoStore(state).suggest_accounts(index, accept=True)
+
+        assert list(suggestions.index) == ['bank_0']
+        assert state.edited_transactions['bank_0'] == {'conta_debito': '4100', 'conta_credito': '78'}
+
+    def test_only_assigned_rows_go_to_history(self, index):
+        state = AppState()
+        state.reconcile_results = {'remaining_b': pd.DataFrame({
+            'date': pd.to_datetime(['2025-02-03', '2025-02-04']),
+            'amount': [-40.0, -12.0],
+            'description': ['TARIFA PACOTE SERVICOS', 'XPTO'],
+        })}
+        store = LancamentoStore(state)
+        store.suggest_accounts(index, accept=True)
+        manual = store.add_manual({
+            'date': '2025-02-05', 'amount': 9.9, 'description': 'ESTORNO',
+            'conta_debito': '78', 'participante_debito': '',
+            'conta_credito': '3100', 'participante_credito': '', 'documento': '001',
+        })
+
+        selected = store.selected(['bank_0', 'bank_1', manual['id']])
+        history = store.assigned(selected)
+
+        # bank_1 only has the default accounts 78/6670
+        assert list(history.index) == ['bank_0', manual['id']]
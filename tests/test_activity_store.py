@@ -0,0 +1,104 @@
+"""
+Unit Tests for the Activity Store
+
+Tests the SQLite-backed activity log:
+- Filters by user, category and time range (newest first)
+- Full-text search over action and details
+- Retention and legacy JSONL import
+- Buffered writes through ActivityLogger
+"""
+import pytest
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.common.activity_store import ActivityStore
+from src.common.activity_log import ActivityLogger
+
+
+def _entry(action, days_ago=0, user="ana", category="upload", **details):
+    return {
+        "timestamp": (datetime.now() - timedelta(days=days_ago)).isoformat(),
+        "user": user,
+        "category": category,
+        "action": action,
+        "details": details,
+    }
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def store(tmp_path):
+    store = ActivityStore(tmp_path / "activities.db")
+    store.insert_many([
+        _entry("Uploaded file", days_ago=3, filename="extrato_jan.pdf"),
+        _entry("Processed file", days_ago=2, category="process", filename="extrato_jan.pdf"),
+        _entry("Uploaded file", days_ago=1, user="bruno", filename="Razão contábil.xlsx"),
+    ])
+    return store
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+class TestQuery:
+
+    def test_filters_newest_first(self, store):
+        rows = store.query(category="upload")
+
+        assert [r["user"] for r in rows] == ["bruno", "ana"]
+        assert rows[1]["details"] == {"filename": "extrato_jan.pdf"}
+        assert store.count(user="ana") == 2
+
+    def test_time_range(self, store):
+        rows = store.query(start=datetime.now() - timedelta(days=2, hours=12), end=datetime.now() - timedelta(hours=12))
+
+        assert [(r["user"], r["action"]) for r in rows] == [("bruno", "Uploaded file"), ("ana", "Processed file")]
+
+    def test_text_search_ignores_accents(self, store):
+        assert [r["user"] for r in store.query(text="razao contabil")] == ["bruno"]
+        assert store.count(text="extrato_jan.pdf processed") == 1
+
+
+# ============================================================================
+# MAINTENANCE
+# ============================================================================
+
+class TestMaintenance:
+
+    def test_retention_removes_old_entries_and_index(self, store):
+        store.insert_many([_entry("Ancient upload", days_ago=1000)])
+
+        assert store.apply_retention(730) == 1
+        assert store.count(text="ancient") == 0
+        assert store.count() == 3
+
+    def test_incremental_vacuum_enabled(self, store, tmp_path):
+        assert store._conn().execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+        # Databases created without it are converted on open
+        legacy = tmp_path / "legacy.db"
+        sqlite3.connect(legacy).execute("CREATE TABLE t (x)").connection.close()
+        assert ActivityStore(legacy)._conn().execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+    def test_logger_buffers_and_imports_legacy_files(self, tmp_path):
+        legacy = tmp_path / "activity_2024-01-02.jsonl"
+        legacy.write_text(json.dumps(_entry("Old export", days_ago=5)) + "\nnot json\n", encoding="utf-8")
+
+        activity_logger = ActivityLogger(log_dir=tmp_path)
+        try:
+            activity_logger.log("Exported file", {"rows": 10}, category="export", user="ana")
+
+            assert activity_logger.count() == 2
+            assert activity_logger.query(category="export")[0]["details"] == {"rows": 10}
+        finally:
+            activity_logger.close()
@@ -0,0 +1,121 @@
+"""
+Unit Tests for Admission Control
+
+Tests the scheduler in front of CPU-heavy endpoints:
+- Concurrency limits and round-robin service across sessions
+- 429 + Retry-After on a full queue or a long wait
+- Cancelled waiters leave the queue consistent
+"""
+import pytest
+import asyncio
+import os
+import sys
+
+from fastapi import HTTPException
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.admission import AdmissionController
+
+
+async def _job(controller, session_id, order, release_event=None, name=None):
+    async with controller.slot("parse", session_id=session_id):
+        order.append(name or session_id)
+        if release_event is not None:
+            await release_event.wait()
+        else:
+            await asyncio.sleep(0)
+
+
+# ============================================================================
+# SCHEDULING
+# ============================================================================
+
+class TestScheduling:
+
+    def test_round_robin_across_sessions(self):
+        async def main():
+            controller = AdmissionController({"parse": 1}, queue_size=10, max_wait=5)
+            order, gate = [], asyncio.Event()
+
+            first = asyncio.create_task(_job(controller, "a", order, gate, "a1"))
+            await asyncio.sleep(0)
+            waiting = [
+                asyncio.create_task(_job(controller, session, order, name=name))
+                for session, name in [("a", "a2"), ("a", "a3"), ("a", "a4"), ("b", "b1"), ("c", "c1")]
+            ]
+            await asyncio.sleep(0)
+            assert controller.classes["parse"].queued == 5
+
+            gate.set()
+            await asyncio.gather(first, *waiting)
+            return order, controller.classes["parse"]
+
+        order, work = asyncio.run(main())
+
+        assert order == ["a1", "a2", "b1", "c1", "a3", "a4"]
+        assert (work.running, work.queued) == (0, 0)
+
+    def test_limit_runs_jobs_concurrently_up_to_limit(self):
+        async def main():
+            controller = AdmissionController({"parse": 2}, queue_size=10, max_wait=5)
+            order, gate = [], asyncio.Event()
+            tasks = [asyncio.create_task(_job(controller, f"s{i}", order, gate)) for i in range(3)]
+            await asyncio.sleep(0.01)
+            running = list(order)
+            gate.set()
+            await asyncio.gather(*tasks)
+            return running
+
+        assert len(asyncio.run(main())) == 2
+
+
+# ============================================================================
+# REJECTION
+# ============================================================================
+
+class TestRejection:
+
+    def test_full_queue_answers_429_with_retry_after(self):
+        async def main():
+            controller = AdmissionController({"parse": 1}, queue_size=1, max_wait=5)
+            gate = asyncio.Event()
+            running = asyncio.create_task(_job(controller, "a", [], gate))
+            queued = asyncio.create_task(_job(controller, "b", [], gate))
+            await asyncio.sleep(0)
+            try:
+                with pytest.raises(HTTPException) as exc:
+                    await _job(controller, "c", [])
+            finally:
+                gate.set()
+                await asyncio.gather(running, queued)
+            return exc.value
+
+        error = asyncio.run(main())
+
+        assert error.status_code == 429
+        assert int(error.headers["Retry-After"]) >= 1
+
+    def test_wait_timeout_and_cancellation_clean_up_queue(self):
+        async def main():
+            controller = AdmissionController({"parse": 1}, queue_size=5, max_wait=0.05)
+            gate = asyncio.Event()
+            running = asyncio.create_task(_job(controller, "a", [], gate))
+            await asyncio.sleep(0)
+
+            with pytest.raises(HTTPException):
+                await _job(controller, "b", [])
+
+            cancelled = asyncio.create_task(_job(controller, "c", []))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await asyncio.gather(cancelled, return_exceptions=True)
+            work = controller.classes["parse"]
+            queued_after = work.queued
+
+            gate.set()
+            await running
+            return queued_after, work.running
+
+        assert asyncio.run(main()) == (0, 0)
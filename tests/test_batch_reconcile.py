@@ -0,0 +1,161 @@
+"""
+Unit Tests for the Batch Reconciliation CLI
+
+Tests the headless multi-company run:
+- Manifest loading (JSON/CSV, relative paths, validation)
+- Per-company outputs and the overall summary
+- Resuming from the job ledger (done companies skipped, changed inputs re-run)
+"""
+import pytest
+import json
+import os
+import sys
+
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cli.batch_reconcile import JobLedger, load_manifest, main, run_batch
+from src.exporting.ofx import OFXWriter
+
+
+LEDGER_HEADER = "\nConsulta de lançamentos da empresa 123 - EMPRESA TESTE LTDA\n\nTransação;Chave;Data\n\n"
+
+
+def _ledger_line(i, date, debit, credit, amount, description):
+    fields = [''] * 16
+    fields[0], fields[2], fields[3], fields[7] = str(i), date, debit, credit
+    fields[11] = f"{amount:.2f}"
+    fields[15] = description
+    return ';'.join(fields)
+
+
+def _write_company(base, name):
+    folder = base / name
+    statements = folder / "extratos"
+    statements.mkdir(parents=True)
+
+    lines = [
+        _ledger_line(1, "05/01/2024", "1001", "3001", 150.00, "Recebimento cliente"),
+        _ledger_line(2, "10/01/2024", "4001", "1001", 80.50, "Pagamento fornecedor"),
+        _ledger_line(3, "20/01/2024", "1001", "3001", 200.00, "Recebimento cliente B"),
+    ]
+    (folder / "razao.csv").write_text(LEDGER_HEADER + "\n".join(lines) + "\n", encoding="utf-8")
+
+    bank = pd.DataFrame({
+        'date': pd.to_datetime(["2024-01-05", "2024-01-10", "2024-01-20"]),
+        'amount': [150.00, -80.50, 200.00],
+        'description': ["PIX RECEBIDO", "PAGTO BOLETO", "TED RECEBIDA"],
+    })
+    (statements / "janeiro.ofx").write_text(OFXWriter(bank_id="001", acct_id="12345").generate(bank), encoding="utf-8")
+    return {"company": name, "ledger": f"{name}/razao.csv", "statements": f"{name}/extratos"}
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    entries = [_write_company(tmp_path, "alfa"), _write_company(tmp_path, "beta")]
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps(entries), encoding="utf-8")
+    return path
+
+
+# ============================================================================
+# MANIFEST
+# ============================================================================
+
+class TestManifest:
+
+    def test_resolves_relative_paths_and_reads_csv(self, tmp_path):
+        (tmp_path / "m.csv").write_text("company,ledger,statements,tolerance\nalfa,a/razao.csv,a/extratos,5\n", encoding="utf-8")
+
+        job, = load_manifest(str(tmp_path / "m.csv"))
+
+        assert job.ledger == os.path.join(str(tmp_path), "a/razao.csv")
+        assert job.tolerance == 5
+
+    def test_rejects_duplicates_and_missing_fields(self, tmp_path):
+        path = tmp_path / "m.json"
+        path.write_text(json.dumps({"companies": [{"company": "a", "ledger": "x.csv"}]}), encoding="utf-8")
+        with pytest.raises(ValueError, match="statements"):
+            load_manifest(str(path))
+
+        path.write_text(json.dumps([{"company": "a", "ledger": "x", "statements": "y"}] * 2), encoding="utf-8")
+        with pytest.raises(ValueError, match="duplicate"):
+            load_manifest(str(path))
+
+        # Same output directory once sanitized
+        path.write_text(json.dumps([{"company": c, "ledger": "x", "statements": "y"} for c in ("ACME/LTDA", "acme ltda")]),
+                        encoding="utf-8")
+        with pytest.raises(ValueError, match="same output directory as 'ACME/LTDA'"):
+            load_manifest(str(path))
+
+
+# ============================================================================
+# BATCH RUN
+# ============================================================================
+
+class TestBatchRun:
+
+    def test_writes_company_outputs_and_summary(self, manifest, tmp_path):
+        out = tmp_path / "out"
+
+        assert main([str(manifest), "--out", str(out), "--workers", "1"]) == 0
+
+        summary = json.loads((out / "summary.json").read_text(encoding="utf-8"))
+        assert [row['company'] for row in summary] == ["alfa", "beta"]
+        assert all(row['status'] == 'done' for row in summary)
+        assert summary[0]['ledger_count'] == 3 and summary[0]['bank_count'] == 3
+        assert summary[0]['diff_final'] == 0
+        assert (out / "alfa" / "conciliacao.xlsx").exists()
+        result = json.loads((out / "alfa" / "resultado.json").read_text(encoding="utf-8"))
+        assert result['status_counts'] == {'Conciliado': 6}
+        assert (out / "summary.csv").exists()
+
+    def test_combined_matches_are_not_pending(self, manifest, tmp_path):
+        job = load_manifest(str(manifest))[0]
+        with open(job.ledger, 'a', encoding='utf-8') as f:
+            f.write(_ledger_line(4, "28/01/2024", "1001", "3001", 60.00, "Recebimento parte 1") + "\n")
+            f.write(_ledger_line(5, "28/01/2024", "1001", "3001", 40.00, "Recebimento parte 2") + "\n")
+            f.write(_ledger_line(6, "29/01/2024", "4001", "1001", 10.00, "Tarifa") + "\n")
+        bank = pd.DataFrame({
+            'date': pd.to_datetime(["2024-01-05", "2024-01-10", "2024-01-20", "2024-01-28"]),
+            'amount': [150.00, -80.50, 200.00, 100.00],
+            'description': ["PIX RECEBIDO", "PAGTO BOLETO", "TED RECEBIDA", "PIX RECEBIDO"],
+        })
+        with open(os.path.join(job.statements, "janeiro.ofx"), 'w', encoding='utf-8') as f:
+            f.write(OFXWriter(bank_id="001", acct_id="12345").generate(bank))
+
+        row, = run_batch([job], str(tmp_path / "out"), workers=1)
+
+        assert row['comb_count'] == 1
+        assert row['pending_count'] == 1
+
+    def test_resume_skips_done_and_reruns_interrupted_or_changed(self, manifest, tmp_path):
+        out = tmp_path / "out"
+        jobs = load_manifest(str(manifest))
+        run_batch(jobs, str(out), workers=1)
+
+        # Simulate a crash while "beta" was running
+        ledger = JobLedger(str(out / "jobs.db"))
+        ledger.mark_running(jobs[1])
+        ledger.close()
+        rows = run_batch(jobs, str(out), workers=1)
+        assert [r['attempts'] for r in rows] == [1, 3]
+
+        # Changed inputs re-run the company
+        with open(jobs[0].ledger, 'a', encoding='utf-8') as f:
+            f.write(_ledger_line(4, "25/01/2024", "4001", "1001", 10.00, "Tarifa") + "\n")
+        rows = run_batch(jobs, str(out), workers=1)
+        assert [r['attempts'] for r in rows] == [2, 3]
+        assert rows[0]['ledger_count'] == 4 and rows[0]['diff_final'] == pytest.approx(10.0)
+
+    def test_failed_company_is_recorded_and_fails_exit_code(self, manifest, tmp_path):
+        os.remove(tmp_path / "beta" / "extratos" / "janeiro.ofx")
+        out = tmp_path / "out"
+
+        assert main([str(manifest), "--out", str(out), "--workers", "1"]) == 1
+
+        rows = json.loads((out / "summary.json").read_text(encoding="utf-8"))
+        assert rows[0]['status'] == 'done'
+        assert rows[1]['status'] == 'failed' and 'No valid bank transactions' in rows[1]['error']
@@ -0,0 +1,124 @@
+"""
+Unit Tests for the Excel Reconciliation Report
+
+Tests the workbook written by ExcelExporter:
+- Summary sheet counts per status
+- Streaming output in chunks, temporary file removed afterwards
+- Temporary file removed when writing fails
+"""
+import pytest
+import io
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+import pandas as pd
+from openpyxl import load_workbook
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exporters.excel_exporter import ExcelExporter
+
+
+@pytest.fixture
+def rows():
+    return pd.DataFrame({
+        'date': pd.to_datetime(['2025-01-02', '2025-01-02', '2025-01-03', '2025-01-04', '2025-01-05']),
+        'source': ['Banco', 'Diário', 'Banco', 'Banco', 'Diário'],
+        'description': ['PIX RECEBIDO', 'Recebimento', 'TARIFA', 'IOF', 'Pagamento'],
+        'amount': [150.0, 150.0, -10.0, -1.5, -80.5],
+        'status': ['Conciliado', 'Conciliado (Comb)', 'Apenas no Banco', 'Apenas no Banco', 'Apenas no Diário'],
+        'group_id': ['1', '1', '-1', '-1', '-1'],
+    })
+
+
+@pytest.fixture
+def temp_dir(tmp_path, monkeypatch):
+    """Temporary files of the exporter land in an empty directory."""
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+
+def _metrics(book):
+    """Label -> value of the metrics table on the summary sheet."""
+    sheet = book['Resumo']
+    return {label: value for label, value in sheet.iter_rows(min_col=1, max_col=2, values_only=True) if label}
+
+
+# ============================================================================
+# SUMMARY
+# ============================================================================
+
+class TestSummarySheet:
+
+    @pytest.mark.parametrize("as_records", [False, True])
+    def test_counts_per_status(self, rows, as_records):
+        data = rows.to_dict(orient='records') if as_records else rows
+
+        book = load_workbook(io.BytesIO(ExcelExporter(company_name="Empresa Teste").generate(data)))
+
+        metrics = _metrics(book)
+        assert metrics["Total de Transações"] == 5
+        assert metrics["Transações Conciliadas"] == 2
+        assert metrics["Apenas no Banco"] == 2
+        assert metrics["Apenas no Diário"] == 1
+        assert metrics["Taxa de Conciliação"] == "40.0%"
+        assert book['Resumo']['A1'].value == "Relatório de Conciliação - Empresa Teste"
+
+    def test_empty_report(self):
+        book = load_workbook(io.BytesIO(ExcelExporter().generate([])))
+
+        assert _metrics(book)["Taxa de Conciliação"] == "0%"
+        assert book['Conciliados'].max_row == 1
+
+
+# ============================================================================
+# STREAMING
+# ============================================================================
+
+class TestStreaming:
+
+    def test_chunks_form_the_workbook_and_file_is_removed(self, rows, temp_dir):
+        chunks = list(ExcelExporter().generate_stream(rows, chunk_size=1024))
+
+        assert len(chunks) > 1 and all(len(chunk) <= 1024 for chunk in chunks)
+        book = load_workbook(io.BytesIO(b"".join(chunks)))
+        assert [r[2] for r in book['Apenas no Banco'].iter_rows(min_row=2, values_only=True)] == [
+            'TARIFA', 'IOF', 'TOTAL:',
+        ]
+        assert list(temp_dir.iterdir()) == []
+
+    def test_closing_the_iterator_removes_the_file(self, rows, temp_dir):
+        stream = ExcelExporter().generate_stream(rows, chunk_size=1024)
+        next(stream)
+        assert len(list(temp_dir.iterdir())) == 1
+
+        stream.close()
+
+        assert list(temp_dir.iterdir()) == []
+
+
+# ============================================================================
+# FAILURES
+# ============================================================================
+
+class TestFailures:
+
+    def test_failed_write_removes_temporary_file(self, rows, temp_dir):
+        with patch.object(ExcelExporter, '_create_data_sheet', side_effect=RuntimeError("falhou")):
+            with pytest.raises(RuntimeError):
+                ExcelExporter().generate_file(rows)
+
+        assert list(temp_dir.iterdir()) == []
+
+    def test_failed_write_keeps_caller_path(self, rows, tmp_path):
+        path = tmp_path / "relatorio.xlsx"
+        path.write_bytes(b"")
+
+        with patch.object(ExcelExporter, '_create_data_sheet', side_effect=RuntimeError("falhou")):
+            with pytest.raises(RuntimeError):
+                ExcelExporter().generate_file(rows, str(path))
+
+        assert path.exists()
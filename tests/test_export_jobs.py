@@ -0,0 +1,188 @@
+"""
+Unit Tests for Background Export Jobs
+
+Tests the server-side Excel/PDF export of the cached reconciliation:
+- Job lifecycle (pending -> done/failed), per-session ownership, expiry
+- Excel written straight from the view DataFrame
+- Export, status and download endpoints
+"""
+import pytest
+import io
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import pandas as pd
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api import export_jobs as export_jobs_module
+from src.api.export_jobs import ExportJobManager
+from src.exporters.excel_exporter import ExcelExporter
+
+
+def _wait(manager, job_id, session_id, timeout=10.0):
+    """Poll a job until it leaves pending/running."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id, session_id)
+        if job["status"] not in ("pending", "running"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+
+def _write(content):
+    def build(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+    return build
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return ExportJobManager(job_dir=str(tmp_path / "exports"), max_workers=1)
+
+
+@pytest.fixture
+def view():
+    return pd.DataFrame({
+        'date': pd.to_datetime(['2025-01-02', '2025-01-03', None, '2025-01-05']),
+        'source': ['Banco', 'Diário', 'Banco', 'Diário'],
+        'description': ['PIX RECEBIDO', 'Recebimento', 'TARIFA', 'Pagamento'],
+        'amount': [150.0, 150.0, -10.0, -80.5],
+        'status': ['Conciliado', 'Conciliado (Comb)', 'Apenas no Banco', 'Apenas no Diário'],
+        'group_id': ['1', '1', '-1', '-1'],
+    })
+
+
+# ============================================================================
+# JOB MANAGER
+# ============================================================================
+
+class TestExportJobManager:
+
+    def test_lifecycle(self, manager):
+        job = manager.submit("s1", "relatorio.txt", "text/plain", _write("ok"))
+        assert job["status"] in ("pending", "running")
+
+        done = _wait(manager, job["job_id"], "s1")
+
+        assert done["status"] == "done" and done["error"] is None
+        with open(done["path"], encoding="utf-8") as f:
+            assert f.read() == "ok"
+
+    def test_failed_builder(self, manager):
+        def build(path):
+            raise RuntimeError("sem dados")
+
+        job = _wait(manager, manager.submit("s1", "r.xlsx", "x", build)["job_id"], "s1")
+
+        assert job["status"] == "failed"
+        assert job["error"] == "sem dados"
+
+    def test_unknown_foreign_and_invalid_ids(self, manager):
+        job = _wait(manager, manager.submit("s1", "r.txt", "text/plain", _write("ok"))["job_id"], "s1")
+
+        assert manager.get(job["job_id"], "s2") is None
+        assert manager.get("0" * 32, "s1") is None
+        assert manager.get("../s1", "s1") is None
+
+    def test_expired_jobs_are_removed(self, manager, monkeypatch):
+        job = _wait(manager, manager.submit("s1", "r.txt", "text/plain", _write("ok"))["job_id"], "s1")
+        monkeypatch.setattr(export_jobs_module, "JOB_TTL_SECONDS", -1)
+
+        assert manager.cleanup_expired() == 2
+        assert manager.get(job["job_id"], "s1") is None
+
+
+# ============================================================================
+# EXCEL FROM DATAFRAME
+# ============================================================================
+
+class TestExcelFromFrame:
+
+    def test_frame_matches_records(self, view, tmp_path):
+        exporter = ExcelExporter(company_name="Empresa Teste")
+
+        with patch.object(pd.DataFrame, 'to_dict', side_effect=AssertionError("materialized")):
+            exporter.generate_file(view, str(tmp_path / "frame.xlsx"))
+        ExcelExporter(company_name="Empresa Teste").generate_file(
+            view.to_dict(orient='records'), str(tmp_path / "records.xlsx"))
+
+        frame_book = load_workbook(tmp_path / "frame.xlsx")
+        records_book = load_workbook(tmp_path / "records.xlsx")
+        assert frame_book.sheetnames == ['Resumo', 'Conciliados', 'Apenas no Banco', 'Apenas no Diário']
+        for name in frame_book.sheetnames[1:]:
+            frame_rows = list(frame_book[name].iter_rows(values_only=True))
+            assert frame_rows == list(records_book[name].iter_rows(values_only=True))
+        assert [r[2] for r in frame_book['Conciliados'].iter_rows(min_row=2, values_only=True)] == [
+            'PIX RECEBIDO', 'Recebimento', 'TOTAL:',
+        ]
+        # Undated row written as an empty cell
+        assert frame_book['Apenas no Banco'].cell(2, 1).value in (None, '')
+
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+class TestExportEndpoints:
+
+    @pytest.fixture
+    def client(self, manager, view):
+        from src.api.main import app
+        from src.api.state import session_manager
+
+        client = TestClient(app)
+        client.get("/api/upload/status")
+        state = session_manager.get_or_create_session(client.cookies.get("auditor_session_id"))
+        state.reconcile_results = {'reconciliation_id': 'rec1', 'view': view}
+        with patch('src.api.endpoints.export.export_jobs', manager):
+            yield client
+
+    def _finish(self, client, response):
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        deadline = time.monotonic() + 10
+        while True:
+            status = client.get(f"/api/export/jobs/{job_id}").json()
+            if status["status"] not in ("pending", "running") or time.monotonic() > deadline:
+                return status
+            time.sleep(0.01)
+
+    def test_excel_job_download(self, client):
+        status = self._finish(client, client.post("/api/export/reconciliation/rec1/excel",
+                                                  params={"status": ["Apenas no Banco"]}))
+
+        assert status["status"] == "done"
+        download = client.get(status["download_url"])
+        assert download.status_code == 200
+        book = load_workbook(io.BytesIO(download.content))
+        assert [r[2] for r in book['Apenas no Banco'].iter_rows(min_row=2, values_only=True)] == ['TARIFA', 'TOTAL:']
+        assert book['Conciliados'].max_row == 1
+
+    def test_pdf_job(self, client):
+        status = self._finish(client, client.post("/api/export/reconciliation/rec1/pdf"))
+
+        assert status["status"] == "done"
+        assert client.get(status["download_url"]).content.startswith(b"%PDF")
+
+    def test_unknown_reconciliation_format_and_job(self, client):
+        assert client.post("/api/export/reconciliation/other/excel").status_code == 404
+        assert client.post("/api/export/reconciliation/rec1/csv").status_code == 400
+        assert client.get(f"/api/export/jobs/{'0' * 32}").status_code == 404
+        assert client.get(f"/api/export/jobs/{'0' * 32}/download").status_code == 404
+
+    def test_download_before_done_and_after_expiry(self, client, manager, monkeypatch):
+        job = manager.submit(client.cookies.get("auditor_session_id"), "r.xlsx", "x", lambda path: time.sleep(0.3))
+        assert client.get(f"/api/export/jobs/{job['job_id']}/download").status_code == 409
+
+        _wait(manager, job["job_id"], client.cookies.get("auditor_session_id"))
+        monkeypatch.setattr(export_jobs_module, "JOB_TTL_SECONDS", -1)
+        manager.cleanup_expired()
+        assert client.get(f"/api/export/jobs/{job['job_id']}").status_code == 404
@@ -0,0 +1,129 @@
+"""
+Unit Tests for LancamentoStore
+
+Tests the indexed transaction store behind the lançamentos export:
+- Edits merged over bank transactions with defaults
+- Stable manual ids and O(1) deletes
+- Set-based selection and the vectorized TXT export
+"""
+import pytest
+import os
+import sys
+
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.state import AppState
+from src.api.lancamento_store import LancamentoStore
+from src.exporters.lancamento_exporter import LancamentoExporter
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def store():
+    """Store over a session with three bank-only transactions."""
+    state = AppState()
+    state.reconcile_results = {
+        'remaining_b': pd.DataFrame({
+            'date': pd.to_datetime(['2025-01-03', '2025-01-01', '2025-01-02']),
+            'amount': [10.0, -20.5, 30.0],
+            'description': ['PIX A', 'TARIFA', 'TED B'],
+            'bank_account': ['BB', 'BB', 'BB'],
+        })
+    }
+    return LancamentoStore(state)
+
+
+def _manual(**overrides):
+    txn = {
+        "date": "2025-01-02",
+        "amount": 5.0,
+        "description": "AJUSTE",
+        "conta_debito": "1",
+        "participante_debito": "",
+        "conta_credito": "2",
+        "participante_credito": "",
+        "documento": "002",
+    }
+    txn.update(overrides)
+    return txn
+
+
+# ============================================================================
+# BANK TRANSACTIONS
+# ============================================================================
+
+class TestBankFrame:
+
+    def test_defaults_without_edits(self, store):
+        frame = store.bank_frame()
+
+        assert list(frame.index) == ['bank_0', 'bank_1', 'bank_2']
+        assert (frame['conta_debito'] == '78').all()
+        assert not frame['is_edited'].any()
+
+    def test_edits_are_merged(self, store):
+        store.edit('bank_1', {'conta_debito': '11'})
+        store.edit('bank_1', {'documento': '999'})
+
+        row = store.bank_frame().loc['bank_1']
+
+        assert row['conta_debito'] == '11'
+        assert row['documento'] == '999'
+        assert row['conta_credito'] == '6670'
+        assert row['is_edited']
+
+    def test_page(self, store):
+        page = store.page(store.bank_frame(), offset=1, limit=1)
+
+        assert page['total'] == 3
+        assert page['count'] == 1
+        assert page['transactions'][0]['id'] == 'bank_1'
+
+
+# ============================================================================
+# MANUAL TRANSACTIONS
+# ============================================================================
+
+class TestManualTransactions:
+
+    def test_ids_not_reused_after_delete(self, store):
+        first = store.add_manual(_manual())
+        store.delete_manual(first['id'])
+        second = store.add_manual(_manual())
+
+        assert first['id'] != second['id']
+
+    def test_delete_unknown_returns_none(self, store):
+        assert store.delete_manual('manual_404') is None
+
+
+# ============================================================================
+# SELECTION / EXPORT
+# ============================================================================
+
+class TestSelection:
+
+    def test_selected_sorted_by_date(self, store):
+        manual = store.add_manual(_manual())
+
+        selected = store.selected(['bank_0', 'bank_1', manual['id']])
+
+        assert list(selected['description']) == ['TARIFA', 'AJUSTE', 'PIX A']
+
+    def test_export_frame_matches_export_transactions(self, store):
+        manual = store.add_manual(_manual(participante_debito=None))
+        store.edit('bank_0', {'participante_credito': '55'})
+        selected = store.selected(['bank_0', 'bank_2', manual['id']])
+        exporter = LancamentoExporter()
+
+        expected = exporter.export_transactions(selected.to_dict(orient='records'))
+
+        assert exporter.export_frame(selected) == expected
+        assert exporter.export_frame(selected).splitlines()[1] == \
+            "2,02/01/2025,1,,2,,5.00,,AJUSTE,DCTO,,002"
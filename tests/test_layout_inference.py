@@ -0,0 +1,227 @@
+"""
+Unit Tests for Local Layout Inference
+
+Tests the offline replacement of the Gemini layout generator:
+- Pattern, columns, date format and keywords from first-page text
+- Extraction with the inferred layout (GenericPDFExtractor)
+- Negative fingerprint cache for unknown layouts
+- Pipeline fallback when the registry detects nothing
+- Inferred layouts kept in memory, below the layouts on disk, until confirmed
+"""
+import pytest
+import os
+import sys
+from unittest.mock import Mock, patch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parsing.config.registry import LayoutRegistry
+from src.parsing.extractors.generic import GenericPDFExtractor
+from src.parsing.extractors.layout_inference import LayoutInferencer
+from src.parsing.pipeline import ExtractorPipeline
+
+
+SIGN_COLUMN_STATEMENT = """Banco Inter
+Extrato de Conta Corrente
+Cliente: FULANO DE TAL   Conta: 1234-5
+Data Histórico Documento Valor Saldo
+31/12/2023 SALDO ANTERIOR 1.000,00
+02/01/2024 PIX RECEBIDO JOAO 12345 150,00 C 1.150,00
+03/01/2024 PAGAMENTO BOLETO ENERGIA 80,50 D
+03/01/2024 TARIFA PACOTE 10,00 D 1.059,50
+05/01/2024 TED RECEBIDA EMPRESA X 2.500,00 C 3.559,50
+SALDO FINAL 3.559,50
+"""
+
+SIGNED_AMOUNT_STATEMENT = """Banco C6
+Data Descrição Valor
+02/01/24 Pix enviado Maria -1,234.56
+03/01/24 Pix recebido Jose 500.00
+04/01/24 Compra cartao Padaria -12.90
+"""
+
+UNKNOWN_STATEMENT = """Relatório Gerencial de Vendas
+Loja Centro - Janeiro de 2024
+Produto Quantidade Observações
+Camisa azul tamanho M
+Calça jeans
+"""
+
+
+@pytest.fixture
+def inferencer():
+    return LayoutInferencer()
+
+
+# ============================================================================
+# INFERENCE
+# ============================================================================
+
+class TestInference:
+
+    def test_sign_column_and_optional_balance(self, inferencer):
+        layout = inferencer.infer(SIGN_COLUMN_STATEMENT)
+
+        assert layout is not None
+        assert layout.bank_id == "077"
+        assert layout.keywords == ["Banco Inter", "Data Histórico Documento Valor Saldo"]
+        assert layout.date_format == "%d/%m/%Y"
+        assert [c.name for c in layout.columns] == ["date", "memo", "amount", "type"]
+
+        data = GenericPDFExtractor(layout).extract_from_text(SIGN_COLUMN_STATEMENT)
+        assert [t['amount'] for t in data['transactions']] == [150.0, -80.5, -10.0, 2500.0]
+        assert data['transactions'][0]['memo'] == "PIX RECEBIDO JOAO 12345"
+        assert data['validation']['is_valid'] is True
+
+    def test_signed_amounts_with_dot_decimals(self, inferencer):
+        layout = inferencer.infer(SIGNED_AMOUNT_STATEMENT)
+
+        assert layout.date_format == "%d/%m/%y"
+        assert layout.amount_decimal_separator == "."
+        data = GenericPDFExtractor(layout).extract_from_text(SIGNED_AMOUNT_STATEMENT)
+        assert [t['amount'] for t in data['transactions']] == [-1234.56, 500.0, -12.9]
+
+    def test_bank_named_in_a_memo_is_not_the_issuer(self, inferencer):
+        statement = SIGN_COLUMN_STATEMENT.replace("Banco Inter\n", "Cooperativa Regional\n").replace(
+            "PAGAMENTO BOLETO ENERGIA", "TED ENVIADA BANCO SANTANDER")
+
+        # Header line only: not distinctive enough to save as a layout
+        assert inferencer.infer(statement) is None
+
+    def test_a_few_unparseable_dates_are_tolerated(self, inferencer):
+        rows = "\n".join(f"{day:02d}/01/2024 PIX RECEBIDO CLIENTE {day} {day},00 C" for day in range(2, 13))
+        statement = SIGN_COLUMN_STATEMENT.split("31/12/2023")[0] + rows + "\n32/01/2024 ESTORNO 5,00 D\n"
+
+        layout = inferencer.infer(statement)
+
+        assert layout is not None
+        amounts = [t['amount'] for t in GenericPDFExtractor(layout).extract_from_text(statement)['transactions']]
+        assert amounts[:2] == [2.0, 3.0] and len(amounts) >= 11
+        assert inferencer.infer(statement.replace("/01/2024", "/13/2024")) is None
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+class TestInferredLayouts:
+
+    def test_detected_in_memory_after_layouts_on_disk(self, inferencer, tmp_path):
+        import dataclasses
+        inferred = inferencer.infer(SIGN_COLUMN_STATEMENT)
+        registry = LayoutRegistry(str(tmp_path))
+        registry.add_inferred(inferred)
+
+        next_month = SIGN_COLUMN_STATEMENT.replace("01/2024", "02/2024")
+        assert registry.detect(next_month) is inferred
+        assert os.listdir(tmp_path) == []
+
+        registry.save_layout({**dataclasses.asdict(inferred), 'name': 'Banco Inter', 'inferred': False})
+        assert registry.detect(next_month).name == "Banco Inter"
+
+    def test_confirm_writes_the_layout(self, inferencer, tmp_path):
+        registry = LayoutRegistry(str(tmp_path))
+        inferred = inferencer.infer(SIGN_COLUMN_STATEMENT)
+        registry.add_inferred(inferred)
+
+        assert registry.confirm_inferred("Outro") is False
+        assert registry.confirm_inferred(inferred.name) is True
+
+        assert registry.list_inferred() == []
+        assert registry.list_layouts() == [inferred.name]
+        assert registry.get_by_name(inferred.name).inferred is True
+
+    def test_unconfirmed_layouts_are_bounded(self, inferencer, tmp_path):
+        import dataclasses
+        registry = LayoutRegistry(str(tmp_path))
+        inferred = inferencer.infer(SIGN_COLUMN_STATEMENT)
+        with patch('src.parsing.config.registry.MAX_INFERRED_LAYOUTS', 2):
+            for i in range(3):
+                registry.add_inferred(dataclasses.replace(inferred, name=f"Inferido {i}"))
+
+        assert registry.list_inferred() == ["Inferido 1", "Inferido 2"]
+
+
+# ============================================================================
+# NEGATIVE CACHE
+# ============================================================================
+
+class TestNegativeCache:
+
+    def test_unknown_layout_is_rejected_once(self, inferencer):
+        with patch.object(inferencer, '_infer', wraps=inferencer._infer) as infer:
+            assert inferencer.infer(UNKNOWN_STATEMENT) is None
+            assert inferencer.infer(UNKNOWN_STATEMENT.replace("2024", "2025")) is None
+
+        assert infer.call_count == 1
+
+    def test_cache_is_bounded(self):
+        inferencer = LayoutInferencer(cache_size=2)
+        for month in ("Janeiro", "Fevereiro", "Março"):
+            inferencer.infer(UNKNOWN_STATEMENT.replace("Janeiro", month))
+
+        assert len(inferencer._rejected) == 2
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+class TestPipelineFallback:
+
+    @patch('src.parsing.pipeline.pdfplumber')
+    def test_pipeline_uses_and_keeps_inferred_layout(self, mock_pdfplumber):
+        page = Mock()
+        page.extract_text.return_value = SIGN_COLUMN_STATEMENT
+        pdf = Mock(pages=[page])
+        mock_pdfplumber.open.return_value.__enter__ = Mock(return_value=pdf)
+        mock_pdfplumber.open.return_value.__exit__ = Mock(return_value=False)
+
+        registry = Mock(spec=LayoutRegistry)
+        registry.detect.return_value = None
+
+        with patch('src.parsing.pipeline.GenericPDFExtractor.extract',
+                   lambda self, path: self.extract_from_text(SIGN_COLUMN_STATEMENT)), \
+             patch('src.parsing.pipeline.layout_inferencer', LayoutInferencer()):
+            result = ExtractorPipeline(registry).process_file("extrato.pdf")
+
+        assert result['error'] is None
+        assert result['layout'].startswith("Banco Inter - Inferido")
+        assert len(result['transactions']) == 4
+        registry.add_inferred.assert_called_once()
+        registry.save_layout.assert_not_called()
+
+    @patch('src.parsing.pipeline.pdfplumber')
+    def test_inferred_layout_skips_the_bank_parser(self, mock_pdfplumber):
+        page = Mock()
+        page.extract_text.return_value = SIGN_COLUMN_STATEMENT
+        mock_pdfplumber.open.return_value.__enter__ = Mock(return_value=Mock(pages=[page]))
+        mock_pdfplumber.open.return_value.__exit__ = Mock(return_value=False)
+        registry = Mock(spec=LayoutRegistry)
+        registry.detect.return_value = LayoutInferencer().infer(SIGN_COLUMN_STATEMENT)
+        bank_parser = Mock()
+
+        with patch('src.parsing.pipeline.GenericPDFExtractor.extract',
+                   lambda self, path: self.extract_from_text(SIGN_COLUMN_STATEMENT)), \
+             patch('src.parsing.banks.PARSERS', {'077': bank_parser}):
+            result = ExtractorPipeline(registry).process_file("extrato.pdf")
+
+        bank_parser.assert_not_called()
+        assert len(result['transactions']) == 4
+
+    @patch('src.parsing.pipeline.pdfplumber')
+    def test_inference_failure_is_reported_as_undetected(self, mock_pdfplumber):
+        page = Mock()
+        page.extract_text.return_value = SIGN_COLUMN_STATEMENT
+        mock_pdfplumber.open.return_value.__enter__ = Mock(return_value=Mock(pages=[page]))
+        mock_pdfplumber.open.return_value.__exit__ = Mock(return_value=False)
+        registry = Mock(spec=LayoutRegistry)
+        registry.detect.return_value = None
+        inferencer = Mock()
+        inferencer.infer.side_effect = RuntimeError("boom")
+
+        with patch('src.parsing.pipeline.layout_inferencer', inferencer):
+            result = ExtractorPipeline(registry).process_file("extrato.pdf")
+
+        assert result['error'] == "Layout not detected in Text mode."
@@ -0,0 +1,78 @@
+"""
+Unit Tests for Lazy Imports and Warm-up
+
+Tests the deferred loading of parsers and exporters:
+- LazyRegistry resolves only the keys that are looked up
+- Importing the API loads none of the heavy dependencies
+- Shared layout registries and the warm-up hook
+"""
+import pytest
+import json
+import os
+import subprocess
+import sys
+
+# Add project root to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.common.lazy import LazyRegistry
+from src.parsing.config.registry import LayoutRegistry
+
+
+# ============================================================================
+# LAZY REGISTRY
+# ============================================================================
+
+class TestLazyRegistry:
+
+    def test_resolves_on_lookup_only(self):
+        registry = LazyRegistry({'json': 'json:dumps', 'missing': 'no_such_module:thing'})
+
+        assert 'missing' in registry
+        assert registry.get('json') is json.dumps
+        assert registry.get('other') is None
+        with pytest.raises(ImportError):
+            registry['missing']
+
+    def test_package_exports_are_lazy(self):
+        from src.parsing import banks
+
+        assert banks.PARSERS['341'] is banks.ItauPDFParser
+        assert set(banks.PARSERS) >= {'001', 'STONE', 'CRESOL'}
+
+
+# ============================================================================
+# STARTUP
+# ============================================================================
+
+class TestStartup:
+
+    def test_api_import_skips_heavy_dependencies(self):
+        heavy = ['tkinter', 'pytesseract', 'pdf2image', 'reportlab', 'xlsxwriter', 'pdfplumber', 'pypdf', 'ofxparse']
+        probe = f"import sys, src.api.main; print([m for m in {heavy!r} if m in sys.modules])"
+
+        out = subprocess.run(
+            [sys.executable, '-c', probe], cwd=ROOT, capture_output=True, text=True, check=True,
+            env=dict(os.environ, API_WARMUP='0', LOG_ASYNC='0'),
+        ).stdout
+
+        assert out.strip().splitlines()[-1] == '[]'
+
+    def test_shared_registry_warm_up(self, tmp_path):
+        layout = {
+            'name': 'Banco Teste', 'bank_id': '999', 'keywords': ['BANCO TESTE'],
+            'line_pattern': r'^(\d{2}/\d{2}/\d{4})\s+(.+?)\s+([\d.,]+)$',
+            'columns': [{'name': 'date', 'match_group': 1}],
+            'balance_start_pattern': r'saldo anterior\s+([\d.,]+)',
+        }
+        (tmp_path / 'teste.json').write_text(json.dumps(layout), encoding='utf-8')
+
+        registry = LayoutRegistry.shared(str(tmp_path))
+        registry.warm_up()
+
+        assert LayoutRegistry.shared(str(tmp_path)) is registry
+        assert registry.list_layouts() == ['Banco Teste']
+
+        registry.save_layout({**layout, 'name': 'Outro Banco'})
+        assert sorted(LayoutRegistry.shared(str(tmp_path)).list_layouts()) == ['Banco Teste', 'Outro Banco']
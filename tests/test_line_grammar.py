@@ -0,0 +1,137 @@
+"""
+Unit Tests for the Line Grammar
+
+Tests the single-pass line classification shared by the text parsers:
+- Independent rules (balances) and exclusive rules (transaction, header/footer)
+- Capture groups numbered per rule inside the combined regex
+- Keyword tries and first-character skips matching like plain alternations
+- Rule-by-rule fallback, BankLayout configuration and BaseParser reuse
+"""
+import pytest
+import os
+import re
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parsing.base import BaseParser
+from src.parsing.config.grammar import HEADER_FOOTER_KEYWORDS, LineGrammar, LineRule, first_chars, keyword_pattern
+from src.parsing.config.layout import BankLayout, ColumnDef
+from src.parsing.extractors.generic import GenericPDFExtractor
+
+
+@pytest.fixture
+def layout():
+    return BankLayout(
+        name="Banco Grammar",
+        bank_id="999",
+        keywords=[],
+        line_pattern=r"^(\d{2}/\d{2}/\d{4})\s+(\S(?:.*?\S)?)\s+(-?\d{1,3}(?:\.\d{3})*,\d{2})\s*([CD])?$",
+        columns=[ColumnDef('date', 1), ColumnDef('memo', 2), ColumnDef('amount', 3), ColumnDef('type', 4)],
+        balance_start_pattern=r"(Saldo Anterior).*?(\d{1,3}(?:\.\d{3})*,\d{2})",
+        balance_end_pattern=r"(Saldo (?:Final|Atual)).*?(\d{1,3}(?:\.\d{3})*,\d{2})",
+        ignore_patterns=[r"Emitido em \d{2}/\d{2}/\d{4}"],
+    )
+
+
+LINES = [
+    "01/02/2024 PIX RECEBIDO 1.500,00 C",
+    "01/02/2024 SALDO ANTERIOR 1.000,00",
+    "Saldo Atual 2.500,00",
+    "Página 2 de 3",
+    "Emitido em 05/02/2024 às 10:00",
+    "REF. NOTA FISCAL 123",
+    "",
+    "..",
+]
+
+
+# ============================================================================
+# CLASSIFICATION
+# ============================================================================
+
+class TestClassify:
+
+    def test_rules_apply_independently_with_own_groups(self, layout):
+        grammar = LineGrammar.from_layout(layout)
+
+        classes = grammar.classify("01/02/2024 SALDO ANTERIOR 1.000,00")
+
+        assert set(classes) == {'transaction', 'balance_start'}
+        assert classes['transaction'].groups() == ("01/02/2024", "SALDO ANTERIOR", "1.000,00", None)
+        assert classes['balance_start'].group(2) == "1.000,00"
+
+    def test_exclusive_rules_stop_at_first_match(self, layout):
+        grammar = LineGrammar.from_layout(layout)
+
+        assert set(grammar.classify(LINES[0])) == {'transaction'}
+        assert set(grammar.classify("Saldo Atual 2.500,00")) == {'balance_end', 'ignore'}
+        assert [set(classes) for _, classes in grammar.scan("\n".join(LINES[3:]))] == [
+            {'ignore'}, {'ignore'}, set(), {'ignore'}, {'ignore'},
+        ]
+
+    def test_rule_by_rule_fallback_gives_same_classes(self, layout):
+        grammar = LineGrammar.from_layout(layout)
+        # A backreference cannot join the combined regex
+        fallback = LineGrammar(grammar.rules + [LineRule('repeat', r".*(\d)\1")], layout.name)
+
+        assert fallback._combined is None
+        for line in LINES:
+            expected = {k: m.groups() for k, m in grammar.classify(line).items()}
+            got = {k: m.groups() for k, m in fallback.classify(line).items() if k != 'repeat'}
+            assert got == expected
+        assert 'repeat' in fallback.classify("Tarifa 11,00")
+
+
+# ============================================================================
+# COMPILATION
+# ============================================================================
+
+class TestCompilation:
+
+    def test_keyword_trie_matches_plain_alternation(self):
+        plain = re.compile("|".join(re.escape(k) for k in HEADER_FOOTER_KEYWORDS), re.IGNORECASE)
+        trie = re.compile(keyword_pattern(HEADER_FOOTER_KEYWORDS, search=True), re.IGNORECASE)
+
+        for line in LINES + ["CONTA: 1234", "transportar", "sem palavra-chave", "==== fim"]:
+            assert bool(trie.match(line)) == bool(plain.search(line)), line
+
+    def test_first_chars(self):
+        assert first_chars(r"(SALDO\s+ANTERIOR).*") == frozenset("S")
+        assert first_chars(r"(?:Saldo|Total)\s") == frozenset("ST")
+        assert first_chars(r"\d+,\d{2}") is None
+
+
+# ============================================================================
+# PARSERS
+# ============================================================================
+
+class TestParsers:
+
+    def test_extractor_single_pass(self, layout):
+        text = "\n".join([
+            "Saldo Anterior 1.000,00",
+            "01/02/2024 PIX RECEBIDO 1.500,00 C",
+            "REF. NOTA FISCAL 123",
+            "Emitido em 05/02/2024 às 10:00",
+            "02/02/2024 TARIFA 10,00 D",
+            "Saldo Atual 2.490,00",
+        ])
+
+        data = GenericPDFExtractor(layout).extract_from_text(text)
+
+        assert [t['memo'] for t in data['transactions']] == ["PIX RECEBIDO REF. NOTA FISCAL 123", "TARIFA"]
+        assert data['balance_info'] == {'start': 1000.0, 'end': 2490.0}
+        assert data['validation']['is_valid'] is True
+
+    def test_base_parser_ignore_rules(self):
+        class Parser(BaseParser):
+            def parse(self, file_path_or_buffer):
+                return None
+
+        parser = Parser()
+
+        assert parser.should_ignore_line("SALDO DO DIA 100,00")
+        assert parser.should_ignore_line("Tarifa 0,00 D")
+        assert not parser.should_ignore_line("Tarifa 10,00 D")
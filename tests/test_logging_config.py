@@ -0,0 +1,198 @@
+"""
+Unit Tests for the Logging Pipeline
+
+Tests the queue-based structured logging:
+- Records reach the JSON file through the background listener
+- Request ids from contextvars stay correct across asyncio tasks
+- Exception fields, sampling and compressed rotation
+- One log file per worker process
+- Settings read from the environment when setup_logging is called
+"""
+import pytest
+import asyncio
+import gzip
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.common.logging_config import (
+    CompressingRotatingFileHandler,
+    JSONFormatter,
+    flush_logging,
+    get_logger,
+    set_request_id,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def log_file(tmp_path):
+    """Async logging to a temporary file; restored to a bare root logger afterwards."""
+    path = str(tmp_path / "logs" / "app.log")
+    setup_logging(log_file=path, sample_rates={"sampled": 0.0})
+    yield path
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in root.handlers:
+        handler.close()
+    root.handlers.clear()
+
+
+def _records(path):
+    flush_logging()
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+class TestAsyncPipeline:
+
+    def test_records_written_with_extra_fields(self, log_file):
+        get_logger("test.pipeline").info("hello", key="value")
+
+        record = next(r for r in _records(log_file) if r["message"] == "hello")
+
+        assert record["key"] == "value"
+        assert record["logger"] == "test.pipeline"
+
+    def test_request_id_per_asyncio_task(self, log_file):
+        logger = get_logger("test.context")
+
+        async def handle(request_id):
+            set_request_id(request_id)
+            await asyncio.sleep(0)
+            logger.info(f"from {request_id}")
+
+        async def main():
+            await asyncio.gather(*(handle(f"req-{i}") for i in range(5)))
+
+        asyncio.run(main())
+
+        records = [r for r in _records(log_file) if r["logger"] == "test.context"]
+        assert len(records) == 5
+        assert all(r["message"] == f"from {r['request_id']}" for r in records)
+
+    def test_exception_formatted_in_listener(self, log_file):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            get_logger("test.errors").error("failed", exc_info=True)
+
+        record = next(r for r in _records(log_file) if r["message"] == "failed")
+
+        assert record["exception"] == "ValueError: boom"
+        assert "raise ValueError" in record["stack_trace"]
+
+    def test_sampling_drops_info_but_keeps_warnings(self, log_file):
+        logger = get_logger("sampled.child")
+        logger.info("dropped")
+        logger.warning("kept")
+
+        messages = [r["message"] for r in _records(log_file)]
+
+        assert "dropped" not in messages
+        assert "kept" in messages
+
+
+# ============================================================================
+# ROTATION
+# ============================================================================
+
+class TestRotation:
+
+    def test_size_rotation_compresses_backups(self, tmp_path):
+        path = str(tmp_path / "rot.log")
+        handler = CompressingRotatingFileHandler(path, max_bytes=200, backup_count=2)
+        handler.setFormatter(JSONFormatter())
+
+        handler.emit_batch(["a" * 150])
+        handler.emit_batch(["b" * 150])
+        handler.close()
+
+        with gzip.open(path + ".1.gz", "rt") as f:
+            assert f.read() == "a" * 150 + "\n"
+        with open(path) as f:
+            assert f.read() == "b" * 150 + "\n"
+
+    def test_worker_processes_write_their_own_file(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "logs" / "app.log")
+        monkeypatch.setattr(multiprocessing, "parent_process", lambda: object())
+        try:
+            setup_logging(log_file=path, per_process_file=True)
+            get_logger("worker").info("from worker")
+            flush_logging()
+        finally:
+            shutdown_logging()
+            logging.getLogger().handlers.clear()
+
+        worker_path = str(tmp_path / "logs" / f"app.{os.getpid()}.log")
+        assert not os.path.exists(path)
+        with open(worker_path, encoding="utf-8") as f:
+            assert "from worker" in f.read()
+
+    def test_supervisor_and_single_worker_keep_the_shared_file(self, tmp_path):
+        path = str(tmp_path / "logs" / "app.log")
+        try:
+            setup_logging(log_file=path, per_process_file=True)
+            get_logger("main").info("from supervisor")
+            flush_logging()
+        finally:
+            shutdown_logging()
+            logging.getLogger().handlers.clear()
+
+        with open(path, encoding="utf-8") as f:
+            assert "from supervisor" in f.read()
+
+
+# ============================================================================
+# ENVIRONMENT
+# ============================================================================
+
+class TestEnvironment:
+
+    @pytest.fixture(autouse=True)
+    def restore_root(self):
+        yield
+        shutdown_logging()
+        root = logging.getLogger()
+        for handler in root.handlers:
+            handler.close()
+        root.handlers.clear()
+
+    def test_env_changes_after_import_are_used(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "logs" / "late.log")
+        monkeypatch.setenv("LOG_FILE", path)
+        monkeypatch.setenv("LOG_ASYNC", "0")
+
+        setup_logging()
+        get_logger("late").info("configured late")
+
+        assert not any(isinstance(h, logging.handlers.QueueHandler) for h in logging.getLogger().handlers)
+        with open(path, encoding="utf-8") as f:
+            assert "configured late" in f.read()
+
+    def test_invalid_numbers_fall_back_to_defaults(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "logs" / "app.log")
+        monkeypatch.setenv("API_WORKERS", "auto")
+        monkeypatch.setenv("LOG_MAX_BYTES", "10MB")
+
+        setup_logging(log_file=path)
+        # Treated as a single worker: the shared file, no pid suffix
+        records = _records(path)
+
+        assert any("API_WORKERS='auto'" in r["message"] and r["level"] == "WARNING" for r in records)
+        assert any("LOG_MAX_BYTES='10MB'" in r["message"] for r in records)
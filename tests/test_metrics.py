@@ -0,0 +1,129 @@
+"""
+Unit Tests for the Metrics Registry
+
+Tests the in-process Prometheus metrics:
+- Counter, gauge (set and scrape-time callback) and histogram samples
+- Label validation and escaping in the text format
+- Registry de-duplication and rendering
+- /api/metrics and request latency labelled by route template
+- Probes and scrapes skip session handling
+"""
+import pytest
+import os
+import sys
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.common.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+# ============================================================================
+# METRIC TYPES
+# ============================================================================
+
+class TestMetricTypes:
+
+    def test_counter(self, registry):
+        counter = registry.counter("jobs_total", "Jobs.", ("kind",))
+        counter.inc(kind="pdf")
+        counter.inc(2.5, kind="pdf")
+        counter.inc(kind="ofx")
+
+        assert counter.render().splitlines() == [
+            "# HELP jobs_total Jobs.",
+            "# TYPE jobs_total counter",
+            'jobs_total{kind="pdf"} 3.5',
+            'jobs_total{kind="ofx"} 1',
+        ]
+
+    def test_gauge_set_and_callback(self, registry):
+        gauge = registry.gauge("queue_size", "Queue.")
+        gauge.set(4)
+        gauge.dec()
+        pool = registry.gauge("pool", "Pool.", ("state",), callback=lambda: {("busy",): 2, ("idle",): 6})
+        failing = registry.gauge("broken", "Broken.", callback=lambda: 1 / 0)
+
+        assert gauge.samples() == ["queue_size 3"]
+        assert pool.samples() == ['pool{state="busy"} 2', 'pool{state="idle"} 6']
+        assert failing.samples() == []
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        histogram = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, route="/a")
+
+        assert histogram.samples() == [
+            'latency_seconds_bucket{route="/a",le="0.1"} 2',
+            'latency_seconds_bucket{route="/a",le="1"} 3',
+            'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+            'latency_seconds_sum{route="/a"} 3.65',
+            'latency_seconds_count{route="/a"} 4',
+        ]
+
+
+# ============================================================================
+# LABELS AND REGISTRY
+# ============================================================================
+
+class TestRegistry:
+
+    def test_labels_are_validated_and_escaped(self, registry):
+        counter = registry.counter("files_total", "Files.", ("name",))
+
+        with pytest.raises(ValueError):
+            counter.inc(other="x")
+        counter.inc(name='extrato "jan"\\2024\n')
+
+        assert counter.samples() == ['files_total{name="extrato \\"jan\\"\\\\2024\\n"} 1']
+
+    def test_same_name_returns_existing_metric(self, registry):
+        first = registry.counter("dup_total", "First.")
+        first.inc()
+
+        assert registry.counter("dup_total", "Second.") is first
+        assert registry.render() == "# HELP dup_total First.\n# TYPE dup_total counter\ndup_total 1\n"
+
+
+# ============================================================================
+# ENDPOINT
+# ============================================================================
+
+class TestMetricsEndpoint:
+
+    def test_latency_labelled_by_route_template(self):
+        from src.api.main import app
+
+        client = TestClient(app)
+        # The path parameter value also names a path segment
+        client.get("/api/export/jobs/jobs")
+        client.get("/api/not-a-route")
+        response = client.get("/api/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert 'route="/api/export/jobs/{job_id}",status="404"' in body
+        assert 'route="unmatched"' in body
+        assert "auditor_sessions_active" in body
+
+    def test_scrapes_and_probes_have_no_session(self):
+        from src.api.main import app
+        from src.api.state import session_manager
+
+        client = TestClient(app)
+        with patch.object(session_manager, "begin_request") as begin:
+            for path in ("/api/metrics", "/api/health"):
+                response = client.get(path)
+                assert response.status_code == 200
+                assert "auditor_session_id" not in response.cookies
+
+        begin.assert_not_called()
@@ -0,0 +1,105 @@
+"""
+Unit Tests for OFXWriter
+
+Tests the streaming OFX writer:
+- Chunked output matches the single-string output
+- Columnar input (DataFrame) and UnifiedTransaction input
+- TRNTYPE fallback, deterministic FITID and SGML escaping
+"""
+import pytest
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exporting.ofx import OFXWriter
+from src.common.models import UnifiedTransaction
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def transactions():
+    """A few transactions covering debit/credit, doc ids and missing FITIDs."""
+    return [
+        UnifiedTransaction(date=datetime(2025, 1, 2), amount=-10.5, memo="TARIFA", type="xx"),
+        UnifiedTransaction(date=datetime(2025, 1, 3), amount=250.0, memo="PIX RECEBIDO", type="CREDIT",
+                           doc_id="123", fitid="F1"),
+        UnifiedTransaction(date=datetime(2025, 1, 5), amount=-99.9, memo="PAG <BOLETO> & CIA", type="DEBIT"),
+    ]
+
+
+def _stmttrns(ofx: str):
+    return ofx.split("<STMTTRN>")[1:]
+
+
+# ============================================================================
+# STREAMING
+# ============================================================================
+
+class TestStreaming:
+
+    def test_stream_yields_header_body_and_footer(self, transactions):
+        chunks = list(OFXWriter().generate_stream(transactions, chunk_size=2))
+
+        assert chunks[0].startswith("OFXHEADER:100")
+        assert chunks[-1].rstrip().endswith("</OFX>")
+        # header + body start + 2 transaction chunks + footer
+        assert len(chunks) == 5
+
+    def test_dataframe_and_objects_produce_same_body(self, transactions):
+        df = pd.DataFrame([t.to_dict() for t in transactions])
+
+        from_objects = _stmttrns(OFXWriter().generate(transactions))
+        from_frame = _stmttrns(OFXWriter().generate(df))
+
+        assert from_objects == from_frame
+
+    def test_period_covers_all_dates(self, transactions):
+        ofx = OFXWriter().generate(transactions)
+
+        assert "<DTSTART>20250102000000</DTSTART>" in ofx
+        assert "<DTEND>20250105235959</DTEND>" in ofx
+
+    def test_empty_statement(self):
+        ofx = OFXWriter().generate([])
+
+        assert "<BANKTRANLIST>" in ofx
+        assert "<STMTTRN>" not in ofx
+
+
+# ============================================================================
+# FORMATTING
+# ============================================================================
+
+class TestFormatting:
+
+    def test_invalid_type_falls_back_to_sign(self, transactions):
+        first = _stmttrns(OFXWriter().generate(transactions))[0]
+
+        assert "<TRNTYPE>DEBIT</TRNTYPE>" in first
+        assert "<TRNAMT>-10.50</TRNAMT>" in first
+
+    def test_fitid_is_deterministic(self, transactions):
+        a = _stmttrns(OFXWriter().generate(transactions))[0]
+        b = _stmttrns(OFXWriter().generate(transactions))[0]
+
+        assert a == b
+        assert "<FITID>F1</FITID>" in _stmttrns(OFXWriter().generate(transactions))[1]
+
+    def test_memo_is_sgml_escaped(self, transactions):
+        last = _stmttrns(OFXWriter().generate(transactions))[2]
+
+        assert "<MEMO>PAG &lt;BOLETO&gt; &amp; CIA</MEMO>" in last
+
+    def test_check_number_only_when_doc_id(self, transactions):
+        blocks = _stmttrns(OFXWriter().generate(transactions))
+
+        assert "<CHECKNUM>123</CHECKNUM>" in blocks[1]
+        assert "<CHECKNUM>" not in blocks[0]
@@ -0,0 +1,170 @@
+"""
+Unit Tests for Layout Pattern Safety
+
+Tests the fuzzing of layout regexes before they run on statements:
+- Catastrophic backtracking detected under the probe budget
+- RE2 fallback (when installed) or rejection of unsafe patterns
+- Unsafe verdicts re-checked with a larger budget and never cached
+- Registry keeping unsafe layouts on load (on re) and refusing them on save
+- Per-pattern match cost counted at runtime
+"""
+import pytest
+import json
+import os
+import re
+import sys
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parsing.config import pattern_safety
+from src.parsing.config.layout import BankLayout, ColumnDef
+from src.parsing.config.pattern_safety import UnsafePatternError, check_pattern, compile_pattern
+from src.parsing.config.registry import LayoutRegistry
+from src.parsing.extractors.generic import GenericPDFExtractor
+
+
+SAFE_PATTERN = r"^(\d{2}/\d{2}/\d{4})\s+(\S(?:.*?\S)?)\s+(-?\d{1,3}(?:\.\d{3})*,\d{2})\s*([CD])?$"
+# Nested quantifier: exponential on a run of digits that ends in a non-digit
+EXPONENTIAL_PATTERN = r"^(\d{2}/\d{2}/\d{4})\s+((?:\d+)+)$"
+# Words with optional separators: exponential on a long word
+WORDS_PATTERN = r"^(\d{2}/\d{2}/\d{4})\s+((?:\w+\s?)*)\s+(\d+,\d{2})$"
+
+
+def _layout_data(line_pattern=SAFE_PATTERN, name="Banco Teste"):
+    return {
+        'name': name,
+        'bank_id': '999',
+        'keywords': ['BANCO TESTE', 'EXTRATO'],
+        'line_pattern': line_pattern,
+        'columns': [
+            {'name': 'date', 'match_group': 1},
+            {'name': 'memo', 'match_group': 2},
+            {'name': 'amount', 'match_group': 3},
+        ],
+        'balance_start_pattern': r"(SALDO\s+ANTERIOR).*?(-?\d{1,3}(?:\.\d{3})*,\d{2})",
+    }
+
+
+class FakeRE2:
+    """Stand-in for the google-re2 module (same compile interface)."""
+    compile = staticmethod(re.compile)
+
+
+# ============================================================================
+# FUZZING
+# ============================================================================
+
+class TestCheckPattern:
+
+    def test_linear_pattern_is_safe(self):
+        check = check_pattern(SAFE_PATTERN)
+
+        assert check.safe
+        assert check.worst_seconds < pattern_safety.PROBE_BUDGET
+
+    @pytest.mark.parametrize("pattern", [EXPONENTIAL_PATTERN, WORDS_PATTERN])
+    def test_backtracking_pattern_is_unsafe(self, pattern):
+        check = check_pattern(pattern)
+
+        assert not check.safe
+        assert check.worst_probe.endswith(pattern_safety.PROBE_TAIL)
+
+    def test_unsafe_verdict_is_rechecked_with_larger_budget(self):
+        pattern = r"^(\d{2})\s+recheck$"
+        verdicts = [pattern_safety.PatternCheck(False, 0.3, "x"), pattern_safety.PatternCheck(True, 0.3, "x")]
+
+        with patch.object(pattern_safety, '_fuzz', side_effect=verdicts) as fuzz:
+            assert check_pattern(pattern).safe
+
+        budgets = [c.args[3] for c in fuzz.call_args_list]
+        assert budgets == [pattern_safety.PROBE_BUDGET, pattern_safety.PROBE_BUDGET * pattern_safety.RECHECK_FACTOR]
+        assert (pattern, 0) in pattern_safety._checks
+
+    def test_unsafe_verdict_is_not_cached(self):
+        pattern = r"^(\d{2})\s+busy$"
+        unsafe = pattern_safety.PatternCheck(False, 0.3, "x")
+
+        with patch.object(pattern_safety, '_fuzz', return_value=unsafe):
+            assert not check_pattern(pattern).safe
+
+        assert (pattern, 0) not in pattern_safety._checks
+        assert check_pattern(pattern).safe
+
+    def test_invalid_regex_raises(self):
+        with pytest.raises(re.error):
+            check_pattern(r"^(\d{2}")
+
+
+# ============================================================================
+# ENGINE CHOICE
+# ============================================================================
+
+class TestCompilePattern:
+
+    def test_safe_pattern_uses_re(self):
+        assert compile_pattern(SAFE_PATTERN).engine == "re"
+
+    def test_unsafe_pattern_rejected_without_re2(self):
+        with patch.object(pattern_safety, '_re2', return_value=None):
+            with pytest.raises(UnsafePatternError):
+                compile_pattern(EXPONENTIAL_PATTERN, layout="Banco Teste")
+
+    def test_unsafe_pattern_routed_to_re2(self):
+        with patch.object(pattern_safety, '_re2', return_value=FakeRE2):
+            tracked = compile_pattern(EXPONENTIAL_PATTERN, re.IGNORECASE, layout="Banco Teste")
+
+        assert tracked.engine == "re2"
+        assert tracked.pattern.startswith("(?i)")
+        assert tracked.match("01/01/2024 123").group(2) == "123"
+
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+class TestRegistry:
+
+    def test_unsafe_layout_kept_on_re_when_loaded(self, tmp_path, caplog):
+        (tmp_path / "ok.json").write_text(json.dumps(_layout_data()), encoding="utf-8")
+        (tmp_path / "redos.json").write_text(json.dumps(_layout_data(EXPONENTIAL_PATTERN, "Banco Lento")), encoding="utf-8")
+
+        with patch.object(pattern_safety, '_re2', return_value=None), \
+                patch.object(pattern_safety, '_kept_unsafe', set()):
+            registry = LayoutRegistry(str(tmp_path))
+            tracked = compile_pattern(EXPONENTIAL_PATTERN, layout="Banco Lento")
+
+        assert sorted(registry.list_layouts()) == ["Banco Lento", "Banco Teste"]
+        assert tracked.engine == "re"
+        assert any("keeping layout Banco Lento on re" in r.getMessage() for r in caplog.records
+                   if r.levelname == "ERROR")
+
+    def test_save_refuses_unsafe_layout(self, tmp_path):
+        registry = LayoutRegistry(str(tmp_path))
+
+        with patch.object(pattern_safety, '_re2', return_value=None):
+            assert registry.save_layout(_layout_data(WORDS_PATTERN)) is False
+
+        assert os.listdir(tmp_path) == []
+
+
+# ============================================================================
+# RUNTIME COST
+# ============================================================================
+
+class TestMatchCost:
+
+    def test_lines_and_time_counted_per_pattern(self):
+        layout = BankLayout(
+            name="Banco Custo", bank_id="999", keywords=[], line_pattern=SAFE_PATTERN,
+            columns=[ColumnDef('date', 1), ColumnDef('memo', 2), ColumnDef('amount', 3)],
+        )
+        text = "01/01/2024 PIX RECEBIDO 10,00\nrodapé\n02/01/2024 TARIFA -1,50"
+
+        data = GenericPDFExtractor(layout).extract_from_text(text)
+
+        assert [t['amount'] for t in data['transactions']] == [10.0, -1.5]
+        rendered = pattern_safety.PATTERN_MATCHES.render()
+        assert 'auditor_layout_pattern_lines_total{layout="Banco Custo",pattern="grammar",engine="re"} 3' in rendered
+        assert 'layout="Banco Custo",pattern="grammar"' in pattern_safety.PATTERN_MATCH_SECONDS.render()
@@ -0,0 +1,94 @@
+"""
+Unit Tests for the PDF Reconciliation Report
+
+Tests the report renderer used by the PDF exports:
+- Preview (first 50 rows) vs full report in every output mode
+- Streaming output in chunks
+- Undated rows
+"""
+import pytest
+import os
+import sys
+from datetime import datetime
+from unittest.mock import patch
+
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.exporters.pdf_renderer import PREVIEW_ROWS, PDFReportExporter
+
+
+SUMMARY = {'bank_total': 0.0, 'ledger_total': 0.0, 'net_diff': 0.0,
+           'unmatched_bank_count': 0, 'unmatched_ledger_count': 0}
+
+
+def _unmatched(count):
+    return pd.DataFrame({
+        'date': pd.date_range('2025-01-01', periods=count, freq='h'),
+        'description': [f"PIX RECEBIDO {i}" for i in range(count)],
+        'amount': [float(i) for i in range(count)],
+    })
+
+
+def _rendered_rows(call):
+    """Row counts passed to _format_display_rows while running `call`."""
+    with patch.object(PDFReportExporter, '_format_display_rows',
+                      side_effect=PDFReportExporter._format_display_rows) as fmt:
+        call(PDFReportExporter())
+    return [len(c.args[0]) for c in fmt.call_args_list]
+
+
+# ============================================================================
+# OUTPUT MODES
+# ============================================================================
+
+class TestOutputModes:
+
+    def test_all_modes_default_to_preview(self, tmp_path):
+        bank, ledger = _unmatched(120), _unmatched(3)
+
+        rows = [
+            _rendered_rows(lambda e: e.generate(SUMMARY, bank, ledger)),
+            _rendered_rows(lambda e: e.generate_file(str(tmp_path / "r.pdf"), SUMMARY, bank, ledger)),
+            _rendered_rows(lambda e: list(e.generate_stream(SUMMARY, bank, ledger))),
+        ]
+
+        assert rows == [[PREVIEW_ROWS, 3]] * 3
+
+    def test_full_report_lists_every_row(self):
+        rows = _rendered_rows(lambda e: list(e.generate_stream(SUMMARY, _unmatched(120), _unmatched(3),
+                                                               full_report=True)))
+
+        assert rows == [120, 3]
+
+    def test_stream_chunks_form_the_pdf(self):
+        exporter = PDFReportExporter()
+        status_rows = pd.DataFrame({'status': ['Conciliado', 'Apenas no Banco']})
+
+        chunks = list(exporter.generate_stream(SUMMARY, _unmatched(5), _unmatched(0), all_rows=status_rows,
+                                               chunk_size=1024))
+
+        assert all(len(chunk) <= 1024 for chunk in chunks)
+        content = b"".join(chunks)
+        assert content.startswith(b"%PDF") and content.rstrip().endswith(b"%%EOF")
+
+
+# ============================================================================
+# ROWS
+# ============================================================================
+
+class TestRows:
+
+    def test_undated_rows_are_blank(self):
+        mixed = pd.DataFrame({
+            'date': [datetime(2025, 1, 2), pd.NaT, None],
+            'description': ["A", "B", "C"],
+            'amount': [1.0, 2.0, 3.0],
+        }, dtype=object)
+
+        assert [r[0] for r in PDFReportExporter._format_display_rows(mixed)] == ["02/01/2025", "", ""]
+        typed = mixed.assign(date=pd.to_datetime(mixed['date']))
+        assert [r[0] for r in PDFReportExporter._format_display_rows(typed)] == ["02/01/2025", "", ""]
+        assert PDFReportExporter().generate(SUMMARY, mixed, _unmatched(0)).startswith(b"%PDF")
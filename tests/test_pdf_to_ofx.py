@@ -0,0 +1,137 @@
+"""
+Unit Tests for the Bulk PDF -> OFX Command
+
+Tests the batch converter with a stubbed ExtractorPipeline:
+- Directory trees and ZIP archives as input
+- One OFX per account and month
+- Audit report with validation status, duplicates and errors
+"""
+import pytest
+import json
+import os
+import sys
+import zipfile
+from datetime import datetime
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cli.pdf_to_ofx import find_statements, main
+from src.common.models import UnifiedTransaction
+from src.parsing.pipeline import ExtractorPipeline
+
+
+# Statement contents understood by the fake pipeline: account|date:amount,...
+STATEMENTS = {
+    "2023/jan.pdf": b"111|2023-01-05:100.0,2023-01-20:-30.0,2023-02-01:-5.0",
+    "2023/fev.pdf": b"111|2023-02-10:40.0",
+    "outra_conta/mar.pdf": b"222|2023-03-03:-12.5",
+    "copia/jan.pdf": b"111|2023-01-05:100.0,2023-01-20:-30.0,2023-02-01:-5.0",
+    "quebrado.pdf": b"",
+}
+
+
+def fake_process_file(self, file_path, file_name=None):
+    content = file_path.read().decode()
+    if not content:
+        return {'transactions': [], 'account_info': {}, 'error': "PDF Read Error: empty file"}
+    account, rows = content.split('|')
+    txs = []
+    for i, row in enumerate(rows.split(',')):
+        date, amount = row.split(':')
+        txs.append(UnifiedTransaction(
+            date=datetime.fromisoformat(date), amount=float(amount), memo=f"Lançamento {i}", type="OTHER",
+            internal_id=i, source_file=file_name,
+        ))
+    is_valid = account != '222'
+    return {
+        'transactions': txs,
+        'account_info': {'bank_id': '756', 'acct_id': account},
+        'balance_info': {'start': 0.0, 'end': sum(t.amount for t in txs)},
+        'validation': {'is_valid': is_valid, 'msg': 'OK' if is_valid else 'Divergência', 'diff': 0.0 if is_valid else 1.5},
+        'layout': 'Sicoob', 'method': 'Text', 'error': None,
+    }
+
+
+@pytest.fixture
+def statements_dir(tmp_path):
+    root = tmp_path / "extratos"
+    for name, content in STATEMENTS.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_bytes(content)
+    (root / "2023" / "leia-me.txt").write_text("ignorado")
+    return root
+
+
+def _run(input_path, out):
+    with patch.object(ExtractorPipeline, 'process_file', fake_process_file):
+        code = main([str(input_path), "--out", str(out), "--workers", "1"])
+    audit = {row['file'].replace(os.sep, '/').split(':')[-1]: row
+             for row in json.loads((out / "audit.json").read_text(encoding="utf-8"))}
+    return code, audit
+
+
+# ============================================================================
+# INPUTS
+# ============================================================================
+
+class TestInputs:
+
+    def test_finds_pdfs_recursively_and_in_zip(self, statements_dir, tmp_path):
+        found = sorted(s.label.replace(os.sep, '/') for s in find_statements(str(statements_dir)))
+        assert found == sorted(STATEMENTS)
+
+        archive = tmp_path / "extratos.zip"
+        with zipfile.ZipFile(archive, 'w') as zf:
+            for name, content in STATEMENTS.items():
+                zf.writestr(name, content)
+            zf.writestr("__MACOSX/2023/._jan.pdf", b"")
+        assert sorted(s.member for s in find_statements(str(archive))) == sorted(STATEMENTS)
+
+    def test_rejects_plain_file(self, tmp_path):
+        path = tmp_path / "a.pdf"
+        path.write_bytes(b"x")
+        with pytest.raises(ValueError):
+            find_statements(str(path))
+
+
+# ============================================================================
+# CONVERSION
+# ============================================================================
+
+class TestConversion:
+
+    def test_one_ofx_per_account_and_month_with_audit(self, statements_dir, tmp_path):
+        out = tmp_path / "out"
+
+        code, audit = _run(statements_dir, out)
+
+        assert code == 1  # quebrado.pdf failed
+        assert sorted(os.listdir(out / "756_111")) == ["2023-01.ofx", "2023-02.ofx"]
+        assert os.listdir(out / "756_222") == ["2023-03.ofx"]
+        february = (out / "756_111" / "2023-02.ofx").read_text(encoding="utf-8")
+        assert february.count("<STMTTRN>") == 2  # jan.pdf's 01/02 entry + fev.pdf
+        assert "<ACCTID>111</ACCTID>" in february
+
+        assert audit["2023/jan.pdf"]['status'] == 'success'
+        assert sorted(audit["2023/jan.pdf"]['ofx_files']) == [os.path.join("756_111", "2023-01.ofx"), os.path.join("756_111", "2023-02.ofx")]
+        assert audit["outra_conta/mar.pdf"]['status'] == 'warning'
+        assert audit["copia/jan.pdf"]['duplicate_of'] == os.path.join("2023", "jan.pdf")
+        assert audit["copia/jan.pdf"]['ofx_files'] == []
+        assert audit["quebrado.pdf"]['status'] == 'error'
+        assert (out / "audit.csv").exists()
+
+    def test_zip_input_gives_same_outputs(self, statements_dir, tmp_path):
+        archive = tmp_path / "extratos.zip"
+        with zipfile.ZipFile(archive, 'w') as zf:
+            for name, content in STATEMENTS.items():
+                if name != "quebrado.pdf":
+                    zf.writestr(name, content)
+        out = tmp_path / "out"
+
+        code, audit = _run(archive, out)
+
+        assert code == 0
+        assert sorted(os.listdir(out / "756_111")) == ["2023-01.ofx", "2023-02.ofx"]
+        assert audit["2023/fev.pdf"]['ofx_files'] == [os.path.join("756_111", "2023-02.ofx")]
@@ -0,0 +1,141 @@
+"""
+Unit Tests for Post-extraction Processing
+
+Tests the declarative clean-up of parsed transactions:
+- Exclusions, balance rows and description clean-up on a frame (PostProcessor)
+- Keyword sign rules: first match wins, explicit negatives kept (SignRules)
+- Layouts declaring it in JSON and parsers using it (Stone, smart extraction)
+"""
+import pytest
+import json
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parsing.banks.stone import StonePDFParser
+from src.parsing.config.layout import PostProcessing, SignRule
+from src.parsing.config.postprocess import PostProcessor, SignRules
+from src.parsing.config.registry import LayoutRegistry
+from src.parsing.extractors.generic import GenericPDFExtractor
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'amount': [100.0, 10.0, -50.0, 30.0, 1000.0],
+        'description': ["PIX RECEBIDO  Doc 123", "Tarifa Pacote", "PIX ENVIADO", None, "SALDO DO DIA"],
+    })
+
+
+# ============================================================================
+# FRAME STAGE
+# ============================================================================
+
+class TestPostProcessor:
+
+    def test_exclude_balance_rows_and_cleanup(self, frame):
+        post = PostProcessor(PostProcessing(
+            exclude_patterns=["tarifa"], cleanup_patterns=[r"Doc \d+"], drop_balance_rows=True,
+        ))
+
+        result = post.apply(frame)
+
+        assert result.index.tolist() == [0, 2, 3]
+        assert result['description'].tolist() == ["PIX RECEBIDO", "PIX ENVIADO", ""]
+
+    def test_empty_declaration_is_a_no_op(self, frame):
+        post = PostProcessor()
+
+        assert not post
+        assert post.apply(frame) is frame
+
+
+# ============================================================================
+# SIGN RULES
+# ============================================================================
+
+class TestSignRules:
+
+    def test_first_rule_wins_and_negatives_are_kept(self):
+        rules = SignRules([
+            SignRule(['ESTORNO'], 'credit'),
+            SignRule(['TARIFA', 'PIX ENVIADO'], 'debit'),
+        ])
+
+        amounts = rules.apply(
+            [10.0, 10.0, -5.0, 20.0, 7.0],
+            ["Estorno tarifa", "TARIFA PACOTE", "PIX RECEBIDO", "pix enviado joão", None],
+        )
+
+        assert amounts.tolist() == [10.0, -10.0, -5.0, -20.0, 7.0]
+
+    def test_invalid_sign(self):
+        with pytest.raises(ValueError):
+            SignRules([SignRule(['X'], 'negative')])
+
+
+# ============================================================================
+# LAYOUTS AND PARSERS
+# ============================================================================
+
+class TestIntegration:
+
+    def test_layout_json_declares_post_processing(self, tmp_path):
+        (tmp_path / "banco.json").write_text(json.dumps({
+            "name": "Banco Pos", "bank_id": "999", "keywords": ["BANCO POS"],
+            "line_pattern": r"^(\d{2}/\d{2}/\d{4})\s+(.+?)\s+(\d+,\d{2})$",
+            "columns": [{"name": "date", "match_group": 1}, {"name": "memo", "match_group": 2},
+                        {"name": "amount", "match_group": 3}],
+            "post_processing": {
+                "exclude_patterns": ["aplicação automática"],
+                "sign_rules": [{"keywords": ["PAGAMENTO", "TARIFA"], "sign": "debit"}],
+            },
+        }), encoding="utf-8")
+        layout = LayoutRegistry(str(tmp_path)).get_by_name("Banco Pos")
+
+        data = GenericPDFExtractor(layout).extract_from_text(
+            "01/02/2024 PIX RECEBIDO 100,00\n"
+            "02/02/2024 PAGAMENTO BOLETO 40,00\n"
+            "03/02/2024 APLICAÇÃO AUTOMÁTICA 60,00"
+        )
+
+        assert [(t['memo'], t['amount'], t['type']) for t in data['transactions']] == [
+            ("PIX RECEBIDO", 100.0, 'CREDIT'), ("PAGAMENTO BOLETO", -40.0, 'DEBIT'),
+        ]
+
+    def test_stone_drops_tarifa_rows(self):
+        rows = [
+            {'date': '2024-05-02', 'amount': -2.5, 'description': "Débito Tarifa Pix", 'balance': 97.5},
+            {'date': '2024-05-01', 'amount': 100.0, 'description': "Crédito FULANO", 'balance': 100.0},
+        ]
+        pdf = MagicMock(pages=[MagicMock()])
+        pdf.__enter__.return_value = pdf
+
+        with patch('pdfplumber.open', return_value=pdf), \
+             patch.object(StonePDFParser, 'extract_page', return_value=(rows, 97.5, 100.0)):
+            df, metadata = StonePDFParser().parse("stone.pdf")
+
+        assert df['description'].tolist() == ["Crédito FULANO"]
+        assert metadata['balance_start'] == 0.0
+
+    def test_smart_extraction_keyword_signs(self):
+        page = MagicMock()
+        page.extract_words.return_value = [
+            {'text': t, 'x0': x, 'x1': x + 40, 'top': top}
+            for top, words in [
+                (100, ["05/02/2024", "PIX", "ENVIADO", "50,00"]),
+                (112, ["06/02/2024", "ESTORNO", "TARIFA", "5,00", "C"]),
+                (124, ["07/02/2024", "DEPOSITO", "20,00", "D"]),
+            ]
+            for x, t in zip(range(30, 400, 60), words)
+        ]
+        page.extract_text.return_value = "Extrato 2024"
+
+        txns, _, _ = StonePDFParser().extract_transactions_smart(page)
+
+        assert [t['amount'] for t in txns] == [-50.0, -5.0, -20.0]
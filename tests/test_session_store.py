@@ -0,0 +1,288 @@
+"""
+Unit Tests for SessionManager
+
+Tests the memory-budgeted session store:
+- LRU spill to disk when the budget is exceeded
+- Pinned (in-request) sessions are never spilled
+- Restore of spilled sessions on access
+- Idle spill and expiry by the reaper functions
+- Shared SQLite backend: in-place edits and concurrent writers
+"""
+import pytest
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.state import AppState, SessionManager
+from src.api.session_store import PickleSpillBackend, SQLiteSessionBackend
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def manager(tmp_path):
+    """SessionManager with a tiny budget and a temporary spill directory."""
+    mgr = SessionManager(memory_budget_mb=1, idle_spill_minutes=30, spill_dir=str(tmp_path))
+    return mgr
+
+
+def _load_session(mgr, sid, rows=8000):
+    """Simulate a request that stores a DataFrame in the session."""
+    mgr.begin_request(sid)
+    state = mgr.get_or_create_session(sid)
+    state.bank_df = pd.DataFrame({"amount": range(rows), "memo": ["PIX RECEBIDO"] * rows})
+    mgr.end_request(sid)
+    return state
+
+
+# ============================================================================
+# BUDGET / LRU
+# ============================================================================
+
+class TestMemoryBudget:
+
+    def test_lru_session_is_spilled(self, manager):
+        _load_session(manager, "a")
+        _load_session(manager, "b")
+
+        assert "a" not in manager.get_memory_usage()
+        assert "b" in manager.get_memory_usage()
+        assert manager.get_spilled_count() == 1
+
+    def test_spilled_session_is_restored(self, manager):
+        _load_session(manager, "a")
+        _load_session(manager, "b")
+
+        state = manager.get_session("a")
+
+        assert state is not None
+        assert len(state.bank_df) == 8000
+        assert manager.get_spilled_count() == 0
+
+    def test_pinned_session_is_not_spilled(self, manager):
+        _load_session(manager, "a")
+        manager.begin_request("a")
+        _load_session(manager, "b")
+
+        # "b" is now the only evictable session
+        assert "a" in manager.get_memory_usage()
+        assert "b" not in manager.get_memory_usage()
+        manager.end_request("a")
+
+    def test_delete_removes_spilled_file(self, manager):
+        _load_session(manager, "a")
+        _load_session(manager, "b")
+
+        assert manager.delete_session("a") is True
+        assert manager.get_spilled_count() == 0
+        assert manager.get_session("a") is None
+
+
+# ============================================================================
+# CONCURRENT I/O
+# ============================================================================
+
+class _BlockingBackend(PickleSpillBackend):
+    """Spill backend whose save/load wait for `release` (one session's slow disk)."""
+
+    def __init__(self, spill_dir):
+        super().__init__(spill_dir)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def _block(self):
+        self.started.set()
+        assert self.release.wait(5)
+
+    def save(self, session_id, state):
+        self._block()
+        return super().save(session_id, state)
+
+    def load(self, session_id):
+        if os.path.exists(self._path(session_id)):
+            self._block()
+        return super().load(session_id)
+
+
+class TestConcurrentIO:
+
+    def test_restore_during_spill_leaves_no_stale_copy(self, tmp_path):
+        backend = _BlockingBackend(str(tmp_path))
+        manager = SessionManager(backend=backend)
+        state = _load_session(manager, "a", rows=10)
+        state.last_accessed = datetime.now() - timedelta(hours=1)
+        spill = threading.Thread(target=manager.spill_idle_sessions)
+        spill.start()
+        assert backend.started.wait(5)
+
+        # Served from the in-flight spill, without waiting for the save
+        assert manager.get_session("a") is state
+        backend.release.set()
+        spill.join(5)
+
+        assert manager.get_spilled_count() == 0
+        assert manager.get_session_count() == 1
+
+    def test_slow_restore_does_not_block_other_sessions(self, tmp_path):
+        backend = PickleSpillBackend(str(tmp_path))
+        manager = SessionManager(backend=backend)
+        _load_session(manager, "a", rows=10).last_accessed = datetime.now() - timedelta(hours=1)
+        manager.spill_idle_sessions()
+        _load_session(manager, "b", rows=10)
+        manager.backend = blocking = _BlockingBackend(str(tmp_path))
+        restore = threading.Thread(target=manager.get_session, args=("a",))
+        restore.start()
+        assert blocking.started.wait(5)
+
+        # "a" is being unpickled; "b" and new sessions are served meanwhile
+        assert manager.get_session("b") is not None
+        assert manager.get_or_create_session("c") is not None
+        blocking.release.set()
+        restore.join(5)
+        assert manager.get_session_count() == 3
+
+
+# ============================================================================
+# REAPER
+# ============================================================================
+
+class TestReaper:
+
+    def test_idle_sessions_are_spilled(self, manager):
+        state = _load_session(manager, "a", rows=10)
+        state.last_accessed = datetime.now() - timedelta(hours=1)
+
+        assert manager.spill_idle_sessions() == 1
+        assert manager.get_session_count() == 0
+        assert manager.get_spilled_count() == 1
+
+    def test_expired_sessions_are_removed(self, manager):
+        state = _load_session(manager, "a", rows=10)
+        state.last_accessed = datetime.now() - timedelta(hours=5)
+
+        assert manager.cleanup_inactive_sessions() == 1
+        assert manager.get_session("a") is None
+
+
+class TestRequestBookkeeping:
+
+    def test_untouched_and_unchanged_sessions_are_not_measured(self, manager):
+        _load_session(manager, "a", rows=10)
+
+        with patch.object(AppState, "estimate_bytes", autospec=True, return_value=1) as estimate:
+            manager.begin_request("a")
+            assert manager.release_request("a") is False
+
+            manager.begin_request("a")
+            manager.get_or_create_session("a")
+            manager.end_request("a")
+            assert estimate.call_count == 0
+
+            manager.begin_request("a")
+            manager.get_or_create_session("a").bank_df = pd.DataFrame({"amount": [1.0]})
+            manager.end_request("a")
+
+        assert estimate.call_count == 1
+        assert manager.get_memory_usage() == {"a": 1}
+
+
+# ============================================================================
+# SHARED SQLITE BACKEND
+# ============================================================================
+
+class TestSQLiteBackend:
+
+    @pytest.fixture
+    def backend(self, tmp_path):
+        return SQLiteSessionBackend(str(tmp_path / "sessions.db"))
+
+    def test_two_workers_share_a_session(self, tmp_path, backend):
+        worker_a = SessionManager(spill_dir=str(tmp_path), backend=backend)
+        worker_b = SessionManager(spill_dir=str(tmp_path), backend=SQLiteSessionBackend(backend.db_path))
+
+        worker_a.begin_request("s1")
+        state = worker_a.get_or_create_session("s1")
+        state.company_name = "ACME"
+        state.bank_df = pd.DataFrame({"amount": [1.5, -2.0]})
+        state.reconcile_results = {"remaining_b": pd.DataFrame({"amount": [3.0]})}
+        worker_a.end_request("s1")
+
+        other = worker_b.get_session("s1")
+
+        assert other.company_name == "ACME"
+        assert "bank_df" not in other.__dict__  # loaded lazily
+        assert other.bank_df["amount"].tolist() == [1.5, -2.0]
+        assert other.reconcile_results["remaining_b"]["amount"].tolist() == [3.0]
+
+    def test_stale_copy_is_reloaded(self, tmp_path, backend):
+        worker_a = SessionManager(spill_dir=str(tmp_path), backend=backend)
+        worker_b = SessionManager(spill_dir=str(tmp_path), backend=SQLiteSessionBackend(backend.db_path))
+
+        worker_a.begin_request("s1")
+        worker_a.get_or_create_session("s1").company_name = "v1"
+        worker_a.end_request("s1")
+        assert worker_b.get_session("s1").company_name == "v1"
+
+        worker_a.begin_request("s1")
+        worker_a.get_or_create_session("s1").company_name = "v2"
+        worker_a.end_request("s1")
+
+        assert worker_b.get_session("s1").company_name == "v2"
+
+    def test_unchanged_session_keeps_version(self, tmp_path, backend):
+        manager = SessionManager(spill_dir=str(tmp_path), backend=backend)
+        manager.begin_request("s1")
+        manager.get_or_create_session("s1").bank_df = pd.DataFrame({"amount": [1.0]})
+        manager.end_request("s1")
+        version = backend.get_version("s1")
+
+        manager.begin_request("s1")
+        manager.get_or_create_session("s1")
+        manager.end_request("s1")
+
+        assert backend.get_version("s1") == version
+
+    def test_in_place_edits_are_saved(self, tmp_path, backend):
+        worker_a = SessionManager(spill_dir=str(tmp_path), backend=backend)
+        worker_b = SessionManager(spill_dir=str(tmp_path), backend=SQLiteSessionBackend(backend.db_path))
+        worker_a.begin_request("s1")
+        worker_a.get_or_create_session("s1").bank_df = pd.DataFrame({"amount": [1.0, 2.0, 3.0]})
+        worker_a.end_request("s1")
+
+        worker_a.begin_request("s1")
+        state = worker_a.get_or_create_session("s1")
+        state.bank_df.loc[0, "amount"] = 9.0
+        state.bank_df.drop(index=2, inplace=True)
+        state.edited_transactions["bank_1"] = {"conta_debito": "400"}
+        worker_a.end_request("s1")
+
+        other = worker_b.get_session("s1")
+        assert other.bank_df["amount"].tolist() == [9.0, 2.0]
+        assert other.edited_transactions == {"bank_1": {"conta_debito": "400"}}
+
+    def test_concurrent_writers_keep_each_others_fields(self, backend):
+        other_backend = SQLiteSessionBackend(backend.db_path)
+        backend.save("s1", AppState())
+        first, second = backend.load("s1"), other_backend.load("s1")
+
+        first.company_name = "ACME"
+        backend.save("s1", first)
+        second.ledger_filename = "razao.xlsx"
+        second.bank_df = pd.DataFrame({"amount": [5.0]})
+        other_backend.save("s1", second)
+
+        stored = backend.load("s1")
+        assert (stored.company_name, stored.ledger_filename) == ("ACME", "razao.xlsx")
+        assert stored.bank_df["amount"].tolist() == [5.0]
+        assert backend.get_version("s1") == 3
+        # The merged copy lacks the other writer's fields: reloaded on next access
+        assert second.__dict__["_version"] is None
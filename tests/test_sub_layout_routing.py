@@ -0,0 +1,118 @@
+"""
+Unit Tests for Sub-layout Routing
+
+Tests the per-document routing of specialized parsers:
+- Marker fingerprints and the route lookup table (SubLayoutRoutes)
+- Markers limited to the first lines of a page (SubLayout.max_lines)
+- Routes decided once per document, re-probed only while on the default
+- Page text read once per page (routing and extraction share it)
+"""
+import pytest
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parsing.banks.bb import BBMonthlyPDFParser
+from src.parsing.config.layout import SubLayout
+from src.parsing.config.registry import LayoutRegistry, SubLayoutRoutes
+
+
+ROUTES = [
+    SubLayout('both', markers=('ALPHA', 'BETA')),
+    SubLayout('alpha', markers=('ALPHA',)),
+    SubLayout('default'),
+]
+
+
+def _pdf(*texts):
+    pages = []
+    for text in texts:
+        page = MagicMock()
+        page.extract_text.return_value = text
+        pages.append(page)
+    pdf = MagicMock(pages=pages)
+    context = MagicMock()
+    context.__enter__.return_value = pdf
+    context.__exit__.return_value = None
+    return context, pages
+
+
+# ============================================================================
+# ROUTE TABLE
+# ============================================================================
+
+class TestSubLayoutRoutes:
+
+    def test_first_sub_layout_with_all_markers_wins(self):
+        routes = SubLayoutRoutes(ROUTES)
+
+        assert routes.route("x ALPHA y BETA").name == 'both'
+        assert routes.route("ALPHA only").name == 'alpha'
+        assert routes.route("BETA only").name == 'default'
+
+    def test_fingerprint_maps_through_lookup_table(self):
+        routes = SubLayoutRoutes(ROUTES)
+        routes.route("ALPHA 1")
+        routes.route("other ALPHA page")
+
+        assert list(routes._table) == [frozenset({'m0'})]
+
+    def test_max_lines_limits_the_marker_to_the_head_of_the_page(self):
+        routes = SubLayoutRoutes([SubLayout('head', markers=('ALPHA',), max_lines=2), SubLayout('default')])
+
+        assert routes.route("x\nALPHA\ny").name == 'head'
+        assert routes.route("x\ny\nALPHA").name == 'default'
+
+    def test_parser_without_sub_layouts_has_no_route(self):
+        assert LayoutRegistry.route(object, "any text") is None
+
+
+# ============================================================================
+# PARSER DISPATCH
+# ============================================================================
+
+class TestDocumentRouting:
+
+    def test_route_is_kept_for_the_whole_document(self):
+        # Page 2 has no dot dates: it still goes to the Mod. 0.51 extractor
+        context, pages = _pdf("Extrato\n02.05.2025 Pix recebido 10,00 C", "Continuação\nsem datas")
+        parser = BBMonthlyPDFParser()
+
+        with patch('pdfplumber.open', return_value=context), \
+             patch.object(BBMonthlyPDFParser, '_extract_dot_date_layout', return_value=([], None, None)) as dot, \
+             patch.object(BBMonthlyPDFParser, '_extract_simplified_format', return_value=([], None, None)) as simplified:
+            parser.parse("dummy.pdf")
+
+        assert dot.call_count == 2
+        simplified.assert_not_called()
+
+    def test_default_route_is_probed_again_on_next_page(self):
+        context, pages = _pdf("Capa sem lançamentos", "G331 Extrato\n02/05/2025 Pix 10,00 C")
+        parser = BBMonthlyPDFParser()
+
+        with patch('pdfplumber.open', return_value=context), \
+             patch.object(BBMonthlyPDFParser, '_extract_g331', return_value=([], None, None)) as g331, \
+             patch.object(BBMonthlyPDFParser, '_extract_simplified_format', return_value=([], None, None)) as simplified:
+            parser.parse("dummy.pdf")
+
+        assert (simplified.call_count, g331.call_count) == (1, 1)
+
+    def test_bb_full_format_marker_only_counts_in_first_30_lines(self):
+        full_line = "05/03/2025 3935 99020870 Transferência recebida 5.186,00 C"
+        late = "\n".join(["Extrato de conta corrente"] + ["Informações"] * 30 + [full_line])
+        early = "\n".join(["Extrato de conta corrente", full_line] + ["Informações"] * 30)
+
+        assert LayoutRegistry.route(BBMonthlyPDFParser, late).name == 'simplified'
+        assert LayoutRegistry.route(BBMonthlyPDFParser, early).name == 'full'
+
+    def test_page_text_is_extracted_once(self):
+        context, pages = _pdf("02.05.2025 870-Transferência recebida 504,00 C\n", "03.05.2025 830-Dep dinheiro ATM 100,00 C\n")
+
+        with patch('pdfplumber.open', return_value=context):
+            df, _ = BBMonthlyPDFParser().parse("dummy.pdf")
+
+        assert len(df) == 2
+        assert [p.extract_text.call_count for p in pages] == [1, 1]
@@ -0,0 +1,178 @@
+"""
+Unit Tests for Parse Timing Instrumentation
+
+Tests the stage timers used while parsing a file:
+- Nested activation reuses the outer timer and emits a single report
+- Repeated stages add up
+- Per-page attribution of pdfplumber time through _TimedPage
+- Aggregation per (parser, layout)
+"""
+import pytest
+import os
+import sys
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.common import timing
+from src.common.timing import ParseTimingStats, StageTimer, _TimedPage
+
+
+class FakeClock:
+    """perf_counter replacement advanced explicitly by the test."""
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakePage:
+    """pdfplumber page stand-in whose extraction takes a fixed clock time."""
+    def __init__(self, clock, text="PIX RECEBIDO 150,00"):
+        self.clock = clock
+        self.text = text
+        self.page_number = 1
+        self.text_calls = 0
+
+    def extract_text(self, *args, **kwargs):
+        self.text_calls += 1
+        self.clock.advance(0.5)
+        return self.text
+
+    def extract_words(self, *args, **kwargs):
+        self.clock.advance(0.25)
+        return [{"text": word} for word in self.text.split()]
+
+    def crop(self, bbox, *args, **kwargs):
+        return FakePage(self.clock, text=f"crop {bbox}")
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch.object(timing.time, "perf_counter", fake):
+        yield fake
+
+
+@pytest.fixture
+def stats():
+    fresh = ParseTimingStats()
+    with patch.object(timing, "parse_timing_stats", fresh):
+        yield fresh
+
+
+# ============================================================================
+# STAGE TIMER
+# ============================================================================
+
+class TestStageTimer:
+
+    def test_nested_activation_reuses_outer_timer(self, clock, stats):
+        with StageTimer.activate(file_name="extrato.pdf") as outer:
+            with StageTimer.activate(parser="BBMonthlyPDFParser", layout="Banco do Brasil",
+                                     file_name="other.pdf") as inner:
+                assert inner is outer
+                assert StageTimer.current() is outer
+                inner.set_tx_count(10)
+            assert StageTimer.current() is outer
+            outer.set_tx_count(12)
+            clock.advance(2.0)
+
+        assert StageTimer.current() is None
+        assert outer.context == {"file_name": "extrato.pdf", "parser": "BBMonthlyPDFParser",
+                                 "layout": "Banco do Brasil"}
+        assert outer.report()["tx_count"] == 12
+        # Only the outermost timer reported
+        [row] = stats.snapshot()
+        assert (row["parser"], row["layout"], row["count"]) == ("BBMonthlyPDFParser", "Banco do Brasil", 1)
+        assert row["total_ms"] == 2000.0
+
+    def test_repeated_stages_add_up(self, clock, stats):
+        with StageTimer.activate() as timer:
+            for seconds in (0.1, 0.2):
+                with timer.stage("regex_matching"):
+                    clock.advance(seconds)
+            with timer.stage("dedup"):
+                clock.advance(0.05)
+            timer.add_page(1, tx_count=3, text_extraction=0.5)
+
+        report = timer.report()
+        assert report["stages_ms"] == {"regex_matching": 300.0, "dedup": 50.0}
+        assert report["pages"] == [{"page": 1, "tx_count": 3, "text_extraction_ms": 500.0}]
+        assert "file_name" not in report
+
+    def test_stage_recorded_when_block_raises(self, clock, stats):
+        with pytest.raises(ValueError):
+            with StageTimer.activate(parser="X") as timer:
+                with timer.stage("layout_detection"):
+                    clock.advance(0.3)
+                    raise ValueError("layout")
+
+        assert timer.stages == {"layout_detection": pytest.approx(0.3)}
+        assert stats.snapshot()[0]["count"] == 1
+
+
+# ============================================================================
+# PAGES
+# ============================================================================
+
+class TestTimedPage:
+
+    def test_text_and_word_time_per_page(self, clock):
+        page = FakePage(clock)
+        timed = _TimedPage(page)
+
+        assert timed.extract_text() == page.text
+        assert timed.extract_text() == page.text
+        timed.extract_text(layout=True)
+        timed.extract_words()
+
+        # The plain call is cached; calls with arguments are not
+        assert page.text_calls == 2
+        assert timed.text_s == pytest.approx(1.0)
+        assert timed.words_s == pytest.approx(0.25)
+        assert timed.page_number == 1
+
+    def test_crops_are_cached_and_charged_to_the_page(self, clock):
+        timed = _TimedPage(FakePage(clock))
+
+        region = timed.crop((0, 0, 100, 50))
+        nested = region.crop([0, 0, 10, 10])
+        assert timed.crop([0, 0, 100, 50]) is region
+
+        region.extract_text()
+        nested.extract_words()
+
+        assert region.extract_text() == "crop (0, 0, 100, 50)"
+        assert (region.text_s, nested.words_s) == (0.0, 0.0)
+        assert timed.text_s == pytest.approx(0.5)
+        assert timed.words_s == pytest.approx(0.25)
+
+
+# ============================================================================
+# AGGREGATION
+# ============================================================================
+
+class TestParseTimingStats:
+
+    def test_aggregates_per_parser_and_layout(self):
+        stats = ParseTimingStats()
+        stats.record("BBParser", "BB", 1.0, {"text": 0.6, "regex": 0.2}, page_count=3)
+        stats.record("BBParser", "BB", 3.0, {"text": 2.0}, page_count=5)
+        stats.record("CEFParser", "CEF", 0.5, {"text": 0.5}, page_count=1)
+
+        slow, fast = stats.snapshot()
+
+        assert (slow["parser"], slow["count"], slow["pages"]) == ("BBParser", 2, 8)
+        assert (slow["avg_ms"], slow["max_ms"], slow["total_ms"]) == (2000.0, 3000.0, 4000.0)
+        assert slow["stages"]["text"] == {"avg_ms": 1300.0, "max_ms": 2000.0, "total_ms": 2600.0}
+        assert slow["stages"]["regex"] == {"avg_ms": 200.0, "max_ms": 200.0, "total_ms": 200.0}
+        assert fast["parser"] == "CEFParser"
+
+        stats.reset()
+        assert stats.snapshot() == []
@@ -0,0 +1,135 @@
+"""
+Unit Tests for Upload Spooling
+
+Tests the temp-file-free upload path:
+- Spools roll over to anonymous files and are always closed
+- Per-file and per-request size limits (413)
+- Bank uploads parsed straight from the spooled buffer
+- One admission slot per file; a busy server after the first file keeps it
+"""
+import pytest
+import asyncio
+import io
+import os
+import sys
+import tempfile
+from contextlib import asynccontextmanager
+from datetime import datetime
+from unittest.mock import patch
+
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.uploads import spooled_uploads
+from src.common.models import UnifiedTransaction
+from src.exporting.ofx import OFXWriter
+
+
+def _upload(name, data):
+    return UploadFile(io.BytesIO(data), filename=name)
+
+
+def _spool(files, **limits):
+    """Read every spooled file inside the context; return contents and spools."""
+    async def run():
+        async with spooled_uploads(files, **limits) as spools:
+            return [s.read() for s in spools], spools
+    return asyncio.run(run())
+
+
+# ============================================================================
+# SPOOLING
+# ============================================================================
+
+class TestSpooling:
+
+    def test_large_files_roll_over_without_named_temp_files(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+        contents, spools = _spool([_upload("a.pdf", b"x" * 5000), _upload("b.pdf", b"y")], spool_bytes=1024)
+
+        assert contents == [b"x" * 5000, b"y"]
+        assert all(s.closed for s in spools)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_file_limit(self):
+        with pytest.raises(HTTPException) as exc:
+            _spool([_upload("big.pdf", b"x" * 2048)], max_file_bytes=1024)
+
+        assert exc.value.status_code == 413
+        assert "big.pdf" in exc.value.detail
+
+    def test_request_limit(self):
+        files = [_upload(f"{i}.pdf", b"x" * 600) for i in range(3)]
+
+        with pytest.raises(HTTPException) as exc:
+            _spool(files, max_file_bytes=1024, max_request_bytes=1500)
+
+        assert exc.value.status_code == 413
+
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+class TestUploadEndpoints:
+
+    @pytest.fixture
+    def client(self):
+        from src.api.main import app
+        from src.api.state import session_manager
+
+        client = TestClient(app)
+        client.get("/api/upload/status")
+        session_manager.get_or_create_session(client.cookies.get("auditor_session_id"))
+        return client
+
+    @staticmethod
+    def _ofx(month=1):
+        return OFXWriter().generate([
+            UnifiedTransaction(date=datetime(2025, month, 2), amount=-10.5, memo="TARIFA", type="DEBIT"),
+            UnifiedTransaction(date=datetime(2025, month, 3), amount=250.0, memo="PIX RECEBIDO", type="CREDIT"),
+        ]).encode("cp1252")
+
+    def test_bank_ofx_parsed_from_buffer(self, client):
+        response = client.post(
+            "/api/upload/bank",
+            files=[("files", ("extrato.ofx", self._ofx(), "application/x-ofx"))],
+        )
+
+        assert response.status_code == 200
+        assert response.json()["count"] == 2
+
+    def test_slot_per_file_and_busy_after_first(self, client):
+        granted = []
+
+        @asynccontextmanager
+        async def slot(work_class, request=None, session_id=None):
+            if len(granted) == 2:
+                raise HTTPException(status_code=429, detail="busy", headers={"Retry-After": "1"})
+            granted.append(work_class)
+            yield
+
+        files = [("files", (f"extrato{i}.ofx", self._ofx(month=i + 1), "application/x-ofx")) for i in range(4)]
+        with patch("src.api.endpoints.upload.admission.slot", slot):
+            response = client.post("/api/upload/bank", files=files)
+
+        assert granted == ["parse", "parse"]
+        assert response.status_code == 200
+        assert response.json()["count"] == 4
+        assert response.json()["errors"] == ["Server busy, upload again: extrato2.ofx, extrato3.ofx"]
+
+    def test_busy_on_first_file_answers_429(self, client):
+        @asynccontextmanager
+        async def slot(work_class, request=None, session_id=None):
+            raise HTTPException(status_code=429, detail="busy", headers={"Retry-After": "1"})
+            yield
+
+        with patch("src.api.endpoints.upload.admission.slot", slot):
+            response = client.post("/api/upload/bank", files=[("files", ("extrato.ofx", self._ofx(), "application/x-ofx"))])
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
@@ -0,0 +1,182 @@
+"""
+Unit Tests for Word Geometry
+
+Tests the shared coordinate engine of the bank parsers:
+- Line clustering with tolerance and x ordering (PageWords)
+- Column bands evaluated once per page (ColumnBands)
+- Coordinate parsers reading their columns through it
+- Page regions declared by layouts and sub-layouts (crop_region)
+"""
+import pytest
+import os
+import sys
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.common.timing import _TimedPage
+from src.parsing.banks.itau import ItauPDFParser
+from src.parsing.banks.sicoob import SicoobPDFParser
+from src.parsing.config.layout import BankLayout, ColumnDef, SubLayout
+from src.parsing.extractors.generic import GenericPDFExtractor
+from src.parsing.extractors.word_geometry import ColumnBands, PageWords, crop_region
+
+
+def _word(text, x0, top):
+    return {'text': text, 'x0': x0, 'x1': x0 + 6 * len(text), 'top': top}
+
+
+def _page(words, text=""):
+    page = MagicMock()
+    page.extract_words.return_value = words
+    page.extract_text.return_value = text
+    return page
+
+
+# ============================================================================
+# LINES
+# ============================================================================
+
+class TestLines:
+
+    def test_words_grouped_by_top_and_ordered_by_x(self):
+        words = PageWords([
+            _word("150,00", 480, 120.4), _word("PIX", 110, 119.9), _word("01/02/2024", 30, 121.1),
+            _word("Extrato", 30, 80.0),
+            _word("TARIFA", 110, 140.0), _word("02/02/2024", 30, 140.2),
+        ])
+
+        lines = words.lines()
+
+        assert [line.text for line in lines] == ["Extrato", "01/02/2024 PIX 150,00", "02/02/2024 TARIFA"]
+        assert [line.top for line in lines] == [80.0, 119.9, 140.0]
+
+    def test_bucket_boundary_does_not_split_a_line(self):
+        # int(top // 2) * 2 put these in buckets 8 and 10
+        lines = PageWords([_word("DATA", 30, 9.9), _word("VALOR", 480, 10.1)]).lines()
+
+        assert [line.text for line in lines] == ["DATA VALOR"]
+
+    def test_empty_page(self):
+        assert PageWords([]).lines() == []
+
+
+# ============================================================================
+# COLUMNS
+# ============================================================================
+
+class TestColumns:
+
+    def test_bands_may_overlap_and_leave_gaps(self):
+        bands = ColumnBands(date=(None, 200), memo=(95, 430), balance=(525, None))
+        line, = PageWords([
+            _word("01/02/2024", 40, 50), _word("PIX", 171, 50), _word("RECEBIDO", 210, 50), _word("10,00C", 440, 50),
+        ]).lines(bands)
+
+        assert line.column('date', "") == "01/02/2024PIX"
+        assert line.column('memo') == "PIX RECEBIDO"
+        assert line.column('balance') == ""
+        assert list(line) == [("01/02/2024", 40), ("PIX", 171), ("RECEBIDO", 210), ("10,00C", 440)]
+
+
+# ============================================================================
+# PARSERS
+# ============================================================================
+
+class TestParsers:
+
+    def test_itau_sagrado_columns(self):
+        page = _page([
+            _word("05/02/2024", 35, 200.2), _word("PIX", 110, 199.8), _word("ENVIADO", 130, 200.0),
+            _word("-50,00", 480, 200.1), _word("950,00", 530, 200.0),
+            _word("06/02/2024", 35, 212.0), _word("RENDIMENTO", 110, 212.0), _word("1,50", 480, 212.0),
+        ])
+
+        rows, _, bal_end = ItauPDFParser()._extract_sagrado(page)
+
+        assert [(r['date'], r['description'], r['amount']) for r in rows] == [
+            (date(2024, 2, 5), "PIX ENVIADO", -50.0),
+            (date(2024, 2, 6), "RENDIMENTO", 1.5),
+        ]
+        assert bal_end == 950.0
+
+    def test_sicoob_continuation_lines(self):
+        page = _page([
+            _word("02/01/2024", 50, 300.0), _word("PIX", 120, 300.0), _word("RECEBIDO", 140, 300.0),
+            _word("100,00C", 440, 300.0),
+            _word("FULANO", 120, 310.0), _word("DE", 160, 310.0), _word("TAL", 180, 310.0),
+        ])
+        parser = SicoobPDFParser()
+
+        rows, _, _ = parser.extract_page(page)
+
+        assert [(r['description'], r['amount']) for r in rows] == [("PIX RECEBIDO FULANO DE TAL", 100.0)]
+
+
+# ============================================================================
+# REGIONS
+# ============================================================================
+
+def _cropping_page(texts):
+    """Page whose crops return the text registered for their bbox."""
+    page = MagicMock(bbox=(0, 0, 595, 842))
+    page.crop.side_effect = lambda bbox: MagicMock(**{'extract_text.return_value': texts[bbox]})
+    return page
+
+
+class TestRegions:
+
+    def test_open_and_outside_edges_become_page_edges(self):
+        page = MagicMock(bbox=(0, 0, 595, 842))
+
+        crop_region(page, (None, 180, 700, None))
+
+        page.crop.assert_called_once_with((0, 180, 595, 842))
+        assert crop_region(page, None) is page
+
+    def test_sub_layout_region_is_cropped_once_per_page(self):
+        class Parser(ItauPDFParser):
+            SUB_LAYOUTS = (SubLayout('smart', regions={'transactions': (None, 100, None, 700)}),)
+
+        page = MagicMock(bbox=(0, 0, 595, 842))
+        page.extract_text.return_value = "Extrato"
+        timed = _TimedPage(page)
+        parser = Parser()
+
+        with patch.object(Parser, 'extract_transactions_smart', return_value=([], None, None)) as smart:
+            parser.extract_page(timed)
+            parser.page_region(timed).extract_text()
+
+        table = smart.call_args.args[0]
+        page.crop.assert_called_once_with((0, 100, 595, 700))
+        assert table is parser.page_region(timed)
+        assert timed.text_s > 0
+
+    def test_generic_extractor_reads_declared_regions(self):
+        layout = BankLayout(
+            name="Banco Regiões", bank_id="999", keywords=[],
+            line_pattern=r"^(\d{2}/\d{2}/\d{4})\s+(.+?)\s+(\d+,\d{2})\s+([CD])$",
+            columns=[ColumnDef('date', 1), ColumnDef('memo', 2), ColumnDef('amount', 3), ColumnDef('type', 4)],
+            balance_start_pattern=r"(Saldo Anterior).*?(\d+,\d{2})",
+            balance_end_pattern=r"(Saldo Final).*?(\d+,\d{2})",
+            regions={'transactions': [None, 150, None, 700], 'header': [None, None, None, 150],
+                     'balance': [None, 700, None, None]},
+        )
+        page = _cropping_page({
+            (0, 150, 595, 700): "01/02/2024 PIX RECEBIDO 50,00 C\n02/02/2024 TARIFA 10,00 D",
+            (0, 0, 595, 150): "Agência: 1234 Conta: 56789-0",
+            (0, 700, 595, 842): "Saldo Anterior 100,00\nSaldo Final 140,00",
+        })
+        pdf = MagicMock(pages=[page])
+        pdf.__enter__.return_value = pdf
+
+        with patch('src.parsing.extractors.generic.pdfplumber.open', return_value=pdf):
+            data = GenericPDFExtractor(layout).extract("regioes.pdf")
+
+        page.extract_text.assert_not_called()
+        assert [t['amount'] for t in data['transactions']] == [50.0, -10.0]
+        assert (data['account_info']['branch_id'], data['account_info']['acct_id']) == ("1234", "56789-0")
+        assert data['balance_info'] == {'start': 100.0, 'end': 140.0}
+        assert data['validation']['is_valid'] is True
@@ -1,4 +1,4 @@
-from src.common.logging_config import setup_logging, get_logger, set_request_id
+from src.common.logging_config import setup_logging, get_logger, set_request_id, flush_logging
 import json
 import os
 
@@ -13,6 +13,7 @@ def test_logging():
     set_request_id("TEST-REQ-123")
     
     logger.info("Test message", key="value", nested={"a": 1})
+    flush_logging()
     
     with open(log_file, "r", encoding='utf-8') as f:
         lines = f.readlines()